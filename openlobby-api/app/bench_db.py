@@ -0,0 +1,98 @@
+"""
+Throughput of the request-path entity read under concurrency, for three ways of calling Supabase:
+
+  sync    supabase-py .execute() awaited inline in a coroutine (what the routers used to do;
+          blocks the event loop for each round trip)
+  thread  supabase-py in anyio worker threads (what the ingest jobs do)
+  async   app.services.db (pooled async PostgREST)
+
+Usage: python -m app.bench_db --requests 400 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+import anyio
+
+from app.config import get_settings
+from app.services.db import db
+from app.services.http_clients import close_http_clients
+from app.services.supabase_client import supabase_admin
+
+
+_FIELDS = "id,type,name,description,party,state,industry,total_lobbying,total_donations,metadata,last_updated"
+
+
+def _sync_read(limit: int) -> list[dict[str, Any]]:
+    return supabase_admin().table("entities").select(_FIELDS).order("last_updated", desc=True).limit(limit).execute().data or []
+
+
+async def _run(name: str, call: Callable[[], Awaitable[Any]], *, requests: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    await call()  # warm connections
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "mode": name,
+        "requests": requests,
+        "errors": errors,
+        "req_per_s": round(requests / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+async def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=400)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--modes", default="sync,thread,async")
+    args = p.parse_args()
+
+    s = get_settings()
+    if not (s.supabase_url and s.supabase_service_role_key):
+        print("bench_db: SUPABASE_URL/SUPABASE_SERVICE_ROLE_KEY are required", file=sys.stderr)
+        return 1
+
+    async def sync_call():
+        return _sync_read(args.limit)
+
+    async def thread_call():
+        return await anyio.to_thread.run_sync(_sync_read, args.limit)
+
+    async def async_call():
+        return await db().table("entities").select(_FIELDS).order("last_updated", desc=True).limit(args.limit).execute()
+
+    calls = {"sync": sync_call, "thread": thread_call, "async": async_call}
+    try:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            print(await _run(mode, calls[mode], requests=args.requests, concurrency=args.concurrency))
+    finally:
+        await close_http_clients()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -19,11 +19,28 @@ class Settings(BaseSettings):
     elastic_index_documents: str = "openlobby-documents"
     elastic_index_entities: str = "openlobby-entities"
     elastic_index_relationships: str = "openlobby-relationships"
+    # Index lifecycle (aliases over versioned indices; see app.services.index_manager)
+    es_index_keep_versions: int = 1
+    es_index_replicas: int = 1
+    es_reindex_page_size: int = 1000
+    es_bulk_max_bytes: int = 5_000_000
+    es_bulk_max_docs: int = 500
+    es_bulk_concurrency: int = 4
+    es_bulk_retries: int = 3
 
     # Jina embeddings
     jina_api_key: str = ""
     jina_model: str = "jina-embeddings-v3"
     jina_dims: int = 1024
+    jina_batch_max_items: int = 64
+    jina_batch_max_tokens: int = 16000
+    jina_batch_concurrency: int = 3
+    jina_batch_retries: int = 2
+
+    # Embedding cache: sqlite (local file), postgres (Supabase `embedding_cache` table) or off
+    embedding_cache_backend: str = "sqlite"
+    embedding_cache_path: str = ".cache/embeddings.sqlite3"
+    embedding_cache_max_entries: int = 200000
 
     # Perplexity Sonar
     perplexity_api_key: str = ""
@@ -39,6 +56,68 @@ class Settings(BaseSettings):
     modal_app_name: str = "openlobby-llm"
     modal_cls_name: str = "LLMService"
 
+    # Outbound HTTP (shared pooled clients, see services/http_clients.py)
+    http_http2: bool = True
+    http_keepalive_expiry: float = 30.0
+
+    # Article downloads: full-body hard cap, and the cap for head-only (metadata) fetches
+    fetch_max_body_bytes: int = 3_000_000
+    fetch_head_max_bytes: int = 65536
+
+    # On-disk page cache for fetched articles (revalidated with ETag / If-Modified-Since)
+    page_cache_enabled: bool = True
+    page_cache_dir: str = ".cache/pages"
+    page_cache_fresh_seconds: int = 3600
+
+    # HTML parsing process pool (0 workers = parse in a thread)
+    parse_workers: int = 2
+    parse_max_queue: int = 64
+    parse_timeout_seconds: float = 10.0
+    parse_max_html_chars: int = 2_000_000
+
+    # Search fan-out: per-backend timeouts (the vector one includes embedding the query)
+    search_keyword_timeout_seconds: float = 2.0
+    search_vector_timeout_seconds: float = 3.0
+    search_entity_timeout_seconds: float = 1.5
+    # Reciprocal-rank fusion constant for merging documents/entities/relationships lists
+    search_rrf_k: int = 60
+
+    # Local vector index (semantic search when Elasticsearch isn't configured)
+    vector_index_enabled: bool = True
+    vector_index_dir: str = ".cache/vectors"
+    vector_index_dtype: str = "float32"  # float32 | int8 (4x smaller on disk)
+    vector_index_approximate: bool = False
+    vector_index_approx_min_rows: int = 50000
+    vector_index_nprobe: int = 8
+    vector_index_sync_seconds: float = 300.0
+    # Syncs a row may fail to embed before the watermark moves past it (it's then left out).
+    vector_index_embed_attempts: int = 3
+
+    # Search result cache (per process; invalidated when an ingest run stores documents)
+    search_cache_enabled: bool = True
+    search_cache_ttl_seconds: float = 300.0
+    search_cache_max_bytes: int = 32_000_000
+    search_cache_generation_poll_seconds: float = 15.0
+
+    # Entity autocomplete (in-memory prefix index; incremental refresh by last_updated)
+    suggest_refresh_seconds: float = 60.0
+    suggest_full_refresh_seconds: float = 3600.0
+
+    # In-memory relationship graph (CSR snapshot) for /api/graph; Postgres graph_expand until it loads
+    graph_engine_enabled: bool = True
+    graph_refresh_seconds: float = 60.0
+    graph_full_refresh_seconds: float = 3600.0
+    # Default and ceiling for /api/graph/path search time
+    graph_path_budget_ms: int = 250
+    graph_path_max_budget_ms: int = 2000
+
+    # Entity centrality batch job (PageRank / degree / sampled betweenness -> entities columns)
+    centrality_damping: float = 0.85
+    centrality_tolerance: float = 1e-9
+    centrality_max_iterations: int = 100
+    centrality_betweenness_samples: int = 64
+    centrality_cron_enabled: bool = True
+
     # Ingest auth
     ingest_secret: str = ""
 
@@ -46,6 +125,21 @@ class Settings(BaseSettings):
     news_topics: str = "AI regulation,Drug pricing,Climate policy,Crypto oversight,Defense procurement"
     news_limit_default: int = 60
 
+    # News ingest pipeline (per-stage worker counts, per-host fetch cap, overall deadline)
+    ingest_discover_concurrency: int = 4
+    ingest_fetch_concurrency: int = 16
+    ingest_extract_concurrency: int = 8
+    ingest_embed_concurrency: int = 4
+    ingest_store_concurrency: int = 2
+    ingest_store_batch_size: int = 20
+    # How long a batched stage (embed, store) waits for a partial batch to fill before flushing it.
+    ingest_batch_linger_ms: int = 50
+    ingest_per_host_limit: int = 2
+    ingest_deadline_seconds: float = 240.0
+    ingest_incremental: bool = True
+    ingest_job_heartbeat_seconds: float = 5.0
+    ingest_job_stale_seconds: int = 120
+
     def news_topics_list(self) -> list[str]:
         return [t.strip() for t in self.news_topics.split(",") if t.strip()]
 
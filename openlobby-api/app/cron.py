@@ -5,7 +5,12 @@ import sys
 
 from app.config import get_settings
 from app.services.cases_service import ensure_default_cases
-from app.services.ingest_news import sync_news
+from app.services.centrality import compute_centrality
+from app.services.elasticsearch_client import close_es
+from app.services.http_clients import close_http_clients
+from app.services.index_manager import SYNC_KINDS, sync_index
+from app.services.ingest_jobs import IngestBusy, run_news_job
+from app.services.parse_executor import shutdown_parse_executor
 
 
 async def main() -> int:
@@ -26,8 +31,28 @@ async def main() -> int:
         return 1
 
     limit = int(s.news_limit_default or 60)
-    await sync_news(limit=limit)
-    await ensure_default_cases()
+    try:
+        try:
+            await run_news_job(limit=limit)
+        except IngestBusy as e:
+            print(f"OpenLobby cron: {e} Skipping news refresh.", file=sys.stderr)
+        # Entities/relationships are written by other pipelines; bring their indices up to date.
+        for kind in SYNC_KINDS:
+            try:
+                await sync_index(kind)
+            except Exception as e:
+                print(f"OpenLobby cron: {kind} index sync failed: {e}", file=sys.stderr)
+        if s.centrality_cron_enabled:
+            # After the syncs, so the metrics land in an up-to-date entities index.
+            try:
+                await compute_centrality()
+            except Exception as e:
+                print(f"OpenLobby cron: centrality job failed: {e}", file=sys.stderr)
+        await ensure_default_cases()
+    finally:
+        shutdown_parse_executor()
+        await close_http_clients()
+        await close_es()
     return 0
 
 
@@ -1,16 +1,48 @@
 from __future__ import annotations
 
+import sys
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
-from app.routers import ask, cases, entities, graph, ingest, news, search, user
+from app.routers import ask, cases, entities, graph, ingest, metrics, news, search, user
+from app.services.cursors import NEXT_CURSOR_HEADER
+from app.services.elasticsearch_client import close_es
+from app.services.entity_suggest import maybe_refresh_suggest
+from app.services.graph_engine import maybe_refresh_graph
+from app.services.http_clients import close_http_clients
+from app.services.index_manager import ensure_indices
+from app.services.ingest_jobs import interrupt_running_jobs
+from app.services.parse_executor import parse_executor, shutdown_parse_executor
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    s = get_settings()
+    if s.parse_workers > 0:
+        parse_executor().start()
+    if s.elastic_cloud_id and s.elastic_api_key:
+        # Once per process; search and ingest no longer check indices per request.
+        try:
+            await ensure_indices()
+        except Exception as e:
+            print(f"OpenLobby API: Elasticsearch index check failed ({e}); will retry on first ingest.", file=sys.stderr)
+    # Warm the autocomplete index and graph snapshot in the background so first requests don't wait on them.
+    maybe_refresh_suggest()
+    maybe_refresh_graph()
+    yield
+    await interrupt_running_jobs()
+    shutdown_parse_executor()
+    await close_http_clients()
+    await close_es()
 
 
 def create_app() -> FastAPI:
     settings = get_settings()
 
-    app = FastAPI(title="OpenLobby API", version="0.1.0")
+    app = FastAPI(title="OpenLobby API", version="0.1.0", lifespan=lifespan)
 
     allow_origins = [o.strip() for o in settings.cors_allow_origins.split(",") if o.strip()]
 
@@ -19,6 +51,7 @@ def create_app() -> FastAPI:
         allow_origins=allow_origins,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[search.PARTIAL_HEADER, NEXT_CURSOR_HEADER],
     )
 
     app.include_router(news.router, prefix="/api/news", tags=["news"])
@@ -29,6 +62,7 @@ def create_app() -> FastAPI:
     app.include_router(entities.router, prefix="/api/entities", tags=["entities"])
     app.include_router(graph.router, prefix="/api/graph", tags=["graph"])
     app.include_router(user.router, prefix="/api/user", tags=["user"])
+    app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 
     @app.get("/healthz")
     async def healthz():
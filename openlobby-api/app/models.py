@@ -54,10 +54,24 @@ class Entity(BaseModel):
     industry: str | None = None
     total_lobbying: float | None = None
     total_donations: float | None = None
+    # Influence metrics from the centrality batch job; None where the query didn't select them.
+    pagerank: float | None = None
+    degree: int | None = None
+    weighted_degree: float | None = None
+    betweenness: float | None = None
+    influence_rank: int | None = None
+    influence_percentile: float | None = None
     metadata: dict[str, Any] = Field(default_factory=dict)
     last_updated: datetime | None = None
 
 
+class EntitySuggestion(BaseModel):
+    id: str
+    type: EntityType
+    name: str
+    score: float | None = None
+
+
 class Relationship(BaseModel):
     id: str
     type: RelationshipType
@@ -71,10 +85,90 @@ class Relationship(BaseModel):
     last_updated: datetime | None = None
 
 
+class NodeEdgeSummary(BaseModel):
+    node_id: str
+    total: int
+    shown: int
+    hidden: dict[str, int] = Field(default_factory=dict)
+
+
 class GraphResponse(BaseModel):
     seed_id: str
+    format: Literal["full"] = "full"
     nodes: list[Entity] = Field(default_factory=list)
     edges: list[Relationship] = Field(default_factory=list)
+    summaries: list[NodeEdgeSummary] = Field(default_factory=list)
+
+
+class CompactEdge(BaseModel):
+    # Parallel relationships with the same endpoints, type and cycle, collapsed into one.
+    id: str  # the member with the largest amount
+    type: RelationshipType
+    source_id: str
+    target_id: str
+    cycle: str | None = None
+    count: int
+    amount: float | None = None  # sum over members; None when none has an amount
+    first_date: dt_date | None = None
+    last_date: dt_date | None = None
+
+
+class CompactGraphResponse(BaseModel):
+    seed_id: str
+    format: Literal["compact"] = "compact"
+    nodes: list[dict[str, Any]] = Field(default_factory=list)  # projected entity fields
+    edges: list[CompactEdge] = Field(default_factory=list)
+    summaries: list[NodeEdgeSummary] = Field(default_factory=list)
+
+
+class ColumnarEdges(BaseModel):
+    # Parallel arrays, one entry per collapsed edge: source/target are positions in the node
+    # columns, type indexes `types` and cycle indexes `cycles` (-1: none).
+    id: list[str] = Field(default_factory=list)
+    source: list[int] = Field(default_factory=list)
+    target: list[int] = Field(default_factory=list)
+    type: list[int] = Field(default_factory=list)
+    cycle: list[int] = Field(default_factory=list)
+    count: list[int] = Field(default_factory=list)
+    amount: list[float | None] = Field(default_factory=list)
+    first_date: list[str | None] = Field(default_factory=list)
+    last_date: list[str | None] = Field(default_factory=list)
+
+
+class ColumnarGraphResponse(BaseModel):
+    seed_id: str
+    format: Literal["columnar"] = "columnar"
+    types: list[str] = Field(default_factory=list)
+    cycles: list[str] = Field(default_factory=list)
+    nodes: dict[str, list[Any]] = Field(default_factory=dict)  # field -> one value per node
+    edges: ColumnarEdges = Field(default_factory=ColumnarEdges)
+    summaries: list[NodeEdgeSummary] = Field(default_factory=list)
+
+
+class GraphPath(BaseModel):
+    # Entity ids from from_id to to_id; edges[i] links nodes[i] and nodes[i + 1] (either direction).
+    nodes: list[str]
+    edges: list[Relationship]
+    hops: int
+    total_amount: float = 0.0
+    min_amount: float | None = None
+
+
+class PathResponse(BaseModel):
+    from_id: str
+    to_id: str
+    paths: list[GraphPath] = Field(default_factory=list)
+    entities: list[Entity] = Field(default_factory=list)
+    # True when the time budget ran out; `paths` then holds what was found before that.
+    timed_out: bool = False
+    elapsed_ms: float = 0.0
+
+
+class EdgePage(BaseModel):
+    node_id: str
+    edges: list[Relationship] = Field(default_factory=list)
+    total: int | None = None
+    next_cursor: str | None = None
 
 
 class SearchHit(BaseModel):
@@ -3,7 +3,7 @@ from __future__ import annotations
 from fastapi import APIRouter, HTTPException
 
 from app.models import AskRequest, AskResponse
-from app.routers.search import search as search_endpoint
+from app.routers.search import run_search
 from app.services.modal_client import modal_answer_question
 
 router = APIRouter()
@@ -17,7 +17,7 @@ async def ask(req: AskRequest):
         raise HTTPException(status_code=400, detail="question is required")
 
     # Retrieve context from Elasticsearch (documents index).
-    sources = await search_endpoint(q=q, limit=req.limit)  # type: ignore[arg-type]
+    sources, _ = await run_search(" ".join(q.split()), None, req.limit)
     context = "\n\n".join(
         [
             f"<document>\n<title>{s.title}</title>\n<url>{s.url or ''}</url>\n<snippet>{s.snippet}</snippet>\n</document>"
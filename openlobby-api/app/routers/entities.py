@@ -1,16 +1,32 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Query
+from typing import Literal
 
-from app.models import Entity
-from app.services.supabase_client import supabase_admin
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from app.config import get_settings
+from app.models import Entity, EntitySuggestion
+from app.services.centrality import INFLUENCE_TIEBREAK
+from app.services.cursors import NEXT_CURSOR_HEADER, CursorError, decode_cursor, encode_cursor, fingerprint, pit_page
+from app.services.db import db
+from app.services.elasticsearch_client import es
+from app.services.entity_suggest import maybe_refresh_suggest, suggest_index
+from app.services.index_manager import alias_for
 
 router = APIRouter()
 
+_FIELDS = (
+    "id,type,name,description,party,state,industry,total_lobbying,total_donations,"
+    "pagerank,degree,weighted_degree,betweenness,influence_rank,influence_percentile,metadata,last_updated"
+)
+
+# Listing order -> sort column; the metrics are precomputed by the centrality job and indexed with id.
+_SORT_COLUMNS = {"recent": "last_updated", "pagerank": "pagerank", "degree": "degree", "betweenness": "betweenness"}
+
 
-def _sb():
+def _db():
     try:
-        return supabase_admin()
+        return db()
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=str(e))
 
@@ -18,35 +34,145 @@ def _sb():
 @router.get("", response_model=list[Entity])
 @router.get("/", response_model=list[Entity])
 async def list_entities(
+    response: Response,
     q: str | None = Query(default=None, min_length=1),
     type: str | None = Query(default=None),
     limit: int = Query(20, ge=1, le=50),
+    paginate: bool = Query(False),
+    cursor: str | None = Query(default=None),
+    sort: Literal["recent", "pagerank", "degree", "betweenness"] = Query("recent"),
 ):
-    sb = _sb()
-    qry = sb.table("entities").select(
-        "id,type,name,description,party,state,industry,total_lobbying,total_donations,metadata,last_updated"
-    )
+    """
+    Listings (no q) page by keyset on (sort column, id), newest or most influential first, and
+    always return a cursor in X-Next-Cursor while more rows may follow. Text queries are ranked by
+    relevance (ties go to higher PageRank) and page on request (`paginate=true`): point-in-time
+    search_after on Elasticsearch, recency keyset in Postgres otherwise.
+    """
+    s = get_settings()
+    text = q.strip() if q else None
+    if text and sort != "recent":
+        raise HTTPException(status_code=400, detail="sort applies to listings; text queries are ranked by relevance")
+    use_es = bool(text and s.elastic_cloud_id and s.elastic_api_key)
+    fp = fingerprint("entities", "es" if use_es else "db", text.lower() if text else None, type or None, sort)
+    try:
+        # Keyset cursors hold (sort value, id); ES point-in-time ones hold the hit's sort values.
+        state = decode_cursor(cursor, fp=fp, after_len=None if use_es else 2) if cursor else None
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    paged = paginate or state is not None
+
+    qry = _db().table("entities").select(_FIELDS)
+    nxt: dict | None = None
+    if text and use_es:
+        # Text match runs on the entities index; Supabase only serves the rows by primary key.
+        if paged:
+            ids, nxt = await _page_entity_ids(text, type, limit, state)
+        else:
+            ids = await _search_entity_ids(text, type, limit)
+        if not ids:
+            return []
+        rows = await qry.in_("id", ids).execute()
+        order = {eid: i for i, eid in enumerate(ids)}
+        rows = sorted(rows, key=lambda r: order.get(r["id"], len(order)))
+    elif text and not paged:
+        # No Elasticsearch: ranked full-text + trigram search in Postgres (search_entities RPC).
+        rows = await _db().rpc("search_entities", {"q": text, "entity_type": type or None, "max_results": limit}) or []
+    elif text:
+        after = (state or {}).get("after") or [None, None]
+        rows = await _db().rpc(
+            "search_entities_page",
+            {"q": text, "entity_type": type or None, "after_ts": after[0], "after_id": after[1], "max_results": limit},
+        ) or []
+        nxt = {"after": [rows[-1]["last_updated"], rows[-1]["id"]]} if len(rows) == limit else None
+    else:
+        col = _SORT_COLUMNS[sort]
+        if type:
+            qry = qry.eq("type", type)
+        if state:
+            qry = qry.after((col, "id"), tuple(state["after"]))
+        rows = await qry.order(col, desc=True).order("id", desc=True).limit(limit).execute()
+        nxt = {"after": [rows[-1][col], rows[-1]["id"]]} if len(rows) == limit else None
+
+    if nxt:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"fp": fp, **nxt})
+    return [Entity(**r) for r in rows]
+
+
+def _entity_query(q: str, type: str | None) -> dict:
+    query: dict = {"multi_match": {"query": q, "fields": ["name^3", "description"]}}
+    if type:
+        query = {"bool": {"must": query, "filter": [{"term": {"type": type}}]}}
+    return query
+
+
+async def _search_entity_ids(q: str, type: str | None, limit: int) -> list[str]:
+    try:
+        resp = await es().search(
+            index=alias_for("entities"),
+            size=limit,
+            query=_entity_query(q, type),
+            sort=["_score", *INFLUENCE_TIEBREAK],
+            source=False,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Entity search is unavailable: {e}")
+    return [h["_id"] for h in (resp.get("hits") or {}).get("hits") or []]
+
+
+async def _page_entity_ids(q: str, type: str | None, limit: int, state: dict | None) -> tuple[list[str], dict | None]:
+    try:
+        hits, nxt = await pit_page(
+            [alias_for("entities")],
+            query=_entity_query(q, type),
+            size=limit,
+            state=state,
+            source=False,
+            tiebreak=INFLUENCE_TIEBREAK,
+        )
+    except Exception as e:
+        if state and getattr(e, "status_code", None) == 404:
+            raise HTTPException(status_code=410, detail="Cursor expired; restart the search.")
+        raise HTTPException(status_code=503, detail=f"Entity search is unavailable: {e}")
+    return [h["_id"] for h in hits], nxt
+
+
+@router.get("/suggest", response_model=list[EntitySuggestion])
+async def suggest_entities(
+    q: str = Query(..., min_length=1, max_length=100),
+    type: str | None = Query(default=None),
+    limit: int = Query(8, ge=1, le=20),
+):
+    """
+    As-you-type entity names from the in-memory prefix index, ranked by lobbying + donation totals.
+    No embedding or search backend call on the hot path; until the index's first load finishes,
+    a name-prefix query on Postgres answers instead.
+    """
+    maybe_refresh_suggest()
+    idx = suggest_index()
+    if idx is not None:
+        return idx.suggest(q, limit=limit, entity_type=type)
+    qry = _db().table("entities").select("id,type,name,total_lobbying").ilike("name", f"{_escape_like(q.strip())}%")
     if type:
         qry = qry.eq("type", type)
-    if q:
-        like = f"%{q.strip()}%"
-        qry = qry.or_(f"name.ilike.{like},description.ilike.{like}")
-    resp = qry.order("last_updated", desc=True).limit(limit).execute()
-    rows = resp.data or []
-    return [Entity(**r) for r in rows]
+    rows = await qry.order("total_lobbying", desc=True, nullsfirst=False).limit(limit).execute()
+    return [EntitySuggestion(id=r["id"], type=r["type"], name=r["name"]) for r in rows]
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 @router.get("/{entity_id}", response_model=Entity)
 async def get_entity(entity_id: str):
-    sb = _sb()
-    resp = (
-        sb.table("entities")
-        .select("id,type,name,description,party,state,industry,total_lobbying,total_donations,metadata,last_updated")
+    rows = await (
+        _db()
+        .table("entities")
+        .select(_FIELDS)
         .eq("id", entity_id)
         .limit(1)
         .execute()
     )
-    row = (resp.data or [None])[0]
+    row = (rows or [None])[0]
     if not row:
         raise HTTPException(status_code=404, detail="Entity not found")
     return Entity(**row)
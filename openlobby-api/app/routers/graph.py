@@ -1,22 +1,59 @@
 from __future__ import annotations
 
+import time
+from typing import Any, Literal
+
+import anyio
 from fastapi import APIRouter, HTTPException, Query
 
-from app.models import Entity, GraphResponse, Relationship
-from app.services.supabase_client import supabase_admin
+from app.config import get_settings
+from app.models import (
+    ColumnarGraphResponse,
+    CompactGraphResponse,
+    EdgePage,
+    Entity,
+    GraphPath,
+    GraphResponse,
+    NodeEdgeSummary,
+    PathResponse,
+    Relationship,
+)
+from app.services.cursors import CursorError, decode_cursor, encode_cursor, fingerprint
+from app.services.db import db
+from app.services.graph_engine import REL_TYPES, graph_snapshot, maybe_refresh_graph, record_traversal
+from app.services.graph_format import EdgeColumns, collapse, columnar_graph, compact_graph, parse_fields, project
 
 router = APIRouter()
 
-_REL_TYPES = {"donation", "lobbying", "vote", "employment"}
+_REL_TYPES = set(REL_TYPES)
 
 
-def _sb():
+def _db():
     try:
-        return supabase_admin()
+        return db()
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=str(e))
 
 
+def _edge_key(state: dict, in_memory: bool) -> tuple[Any, int | str]:
+    """
+    An edge-page cursor's (rank key, tie-breaker): a float and an edge position in memory; in
+    Postgres the sort_key as returned (possibly "-Infinity") and a relationship id.
+    """
+    k, e = state.get("k"), state.get("e")
+    try:
+        if isinstance(k, bool) or not isinstance(k, (int, float, str)):
+            raise TypeError
+        key = float(k)
+    except (TypeError, ValueError):
+        raise CursorError("Malformed cursor.")
+    if in_memory and isinstance(e, int) and not isinstance(e, bool):
+        return key, e
+    if not in_memory and isinstance(e, str):
+        return k, e
+    raise CursorError("Malformed cursor.")
+
+
 def _parse_types(types: str) -> list[str]:
     out: list[str] = []
     for t in (types or "").split(","):
@@ -29,89 +66,225 @@ def _parse_types(types: str) -> list[str]:
     return out or sorted(_REL_TYPES)
 
 
-def _dedup_edges(rows: list[dict]) -> list[dict]:
-    seen: set[str] = set()
-    out: list[dict] = []
-    for r in rows:
-        rid = str(r.get("id") or "")
-        if not rid or rid in seen:
-            continue
-        seen.add(rid)
-        out.append(r)
-    return out
+@router.get("", response_model=GraphResponse | CompactGraphResponse | ColumnarGraphResponse)
+@router.get("/", response_model=GraphResponse | CompactGraphResponse | ColumnarGraphResponse)
+async def graph(
+    seed_id: str = Query(..., min_length=1),
+    depth: int = Query(1, ge=1, le=4),
+    limit: int = Query(200, ge=1, le=2000),
+    types: str = Query("donation,lobbying,vote,employment"),
+    per_node: int = Query(25, ge=1, le=500),
+    rank: Literal["amount", "recent"] = Query("amount"),
+    format: Literal["full", "compact", "columnar"] = Query("full"),
+    fields: str | None = Query(default=None, description="Node fields for compact/columnar (comma-separated)."),
+):
+    """
+    Neighbourhood of seed_id. Each expanded node contributes at most `per_node` edges, best first
+    by `rank` (amount or date), so supernodes don't flood the response or the next frontier;
+    `summaries` counts what each returned node has beyond the edges shown (page through those
+    with /api/graph/edges).
 
+    `format=compact` collapses parallel edges into one per (source, target, type, cycle) with a
+    count, summed amount and date range, and trims nodes to `fields`; `format=columnar` is the
+    same data as one array per column, for large graphs.
+    """
+    rel_types = _parse_types(types)
+    try:
+        node_fields = parse_fields(fields) if format != "full" else []
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-def _fetch_edges(sb, node_ids: list[str], rel_types: list[str], limit: int) -> list[dict]:
-    if not node_ids or limit <= 0:
-        return []
+    maybe_refresh_graph()
+    snap = graph_snapshot()
+    if snap is None:
+        # Engine disabled or still loading: seed check, per-hop expansion with the same per-node
+        # budget and ranking, edge budget, summaries and hydration run in Postgres (graph_expand in
+        # supabase/migrations/*_graph_expand_budget.sql).
+        out = await _db().rpc(
+            "graph_expand",
+            {
+                "seed_id": seed_id,
+                "max_depth": depth,
+                "max_edges": limit,
+                "rel_types": rel_types,
+                "per_node": per_node,
+                "sort_by": rank,
+            },
+        )
+        if not out:
+            raise HTTPException(status_code=404, detail="Seed entity not found")
+        summaries = out.get("summaries") or []
+        if format != "full":
+            rows = {r["id"]: r for r in out.get("nodes") or []}
+            edge_rows = out.get("edges") or []
+            ids = list(dict.fromkeys([*rows, *(x for r in edge_rows for x in (r["source_id"], r["target_id"]))]))
+            cols = EdgeColumns.from_rows(edge_rows, {nid: i for i, nid in enumerate(ids)})
+            nodes = [project(rows.get(nid), nid, node_fields) for nid in ids]
+            return _formatted(format, seed_id, nodes, node_fields, cols, summaries)
+        nodes = [Entity(**r) for r in out.get("nodes") or []]
+        edges = [Relationship(**r) for r in out.get("edges") or []]
+        return GraphResponse(
+            seed_id=seed_id, nodes=nodes, edges=edges, summaries=[NodeEdgeSummary(**x) for x in summaries]
+        )
 
-    fields = "id,type,source_id,target_id,amount,date,cycle,description,metadata,last_updated"
+    # Traversal on the in-memory CSR snapshot; only node hydration goes to Postgres.
+    t0 = time.perf_counter()
+    node_nums, edge_pos = snap.neighborhood(
+        seed_id, depth=depth, max_edges=limit, types=rel_types, per_node=per_node, rank=rank
+    )
+    summaries = snap.summarize(node_nums, edge_pos, rel_types)
+    record_traversal(time.perf_counter() - t0)
 
-    q1 = sb.table("relationships").select(fields).in_("source_id", node_ids).in_("type", rel_types).limit(limit)
-    q2 = sb.table("relationships").select(fields).in_("target_id", node_ids).in_("type", rel_types).limit(limit)
-    r1 = q1.execute().data or []
-    r2 = q2.execute().data or []
-    return _dedup_edges([*r1, *r2])[:limit]
+    node_ids = [snap.node_ids[i] for i in node_nums] or [seed_id]
+    # Compact formats only fetch the projected columns.
+    select = ",".join(node_fields) if node_fields else None
+    rows = await _db().rpc("entities_by_ids", {"ids": node_ids}, select=select) or []
+    if not any(r.get("id") == seed_id for r in rows):
+        raise HTTPException(status_code=404, detail="Seed entity not found")
+    if format != "full":
+        by_id = {r["id"]: r for r in rows}
+        nodes = [project(by_id.get(nid), nid, node_fields) for nid in node_ids]
+        cols = EdgeColumns.from_snapshot(snap, edge_pos, node_nums)
+        return _formatted(format, seed_id, nodes, node_fields, cols, summaries)
+    nodes = [Entity(**r) for r in rows]
+    edges = [Relationship(**snap.edge_record(int(i))) for i in edge_pos]
+    return GraphResponse(
+        seed_id=seed_id, nodes=nodes, edges=edges, summaries=[NodeEdgeSummary(**x) for x in summaries]
+    )
 
 
-@router.get("", response_model=GraphResponse)
-@router.get("/", response_model=GraphResponse)
-async def graph(
-    seed_id: str = Query(..., min_length=1),
-    depth: int = Query(1, ge=1, le=2),
-    limit: int = Query(200, ge=1, le=500),
+def _formatted(
+    format: str, seed_id: str, nodes: list[dict], fields: list[str], cols: EdgeColumns, summaries: list[dict]
+) -> CompactGraphResponse | ColumnarGraphResponse:
+    edges = collapse(cols)
+    if format == "columnar":
+        return ColumnarGraphResponse(**columnar_graph(seed_id, nodes, fields, edges, summaries))
+    return CompactGraphResponse(**compact_graph(seed_id, nodes, edges, summaries))
+
+
+@router.get("/edges", response_model=EdgePage)
+async def node_edges(
+    node_id: str = Query(..., min_length=1),
     types: str = Query("donation,lobbying,vote,employment"),
+    rank: Literal["amount", "recent"] = Query("amount"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(default=None),
 ):
-    sb = _sb()
+    """
+    All of one node's edges, best first by `rank`, a page at a time (keyset on the rank key and a
+    tie-breaker). Pass the returned next_cursor to continue; it is null on the last page. `total`
+    counts all of the node's edges of these types (null only for an empty page past the first).
+    """
     rel_types = _parse_types(types)
+    maybe_refresh_graph()
+    snap = graph_snapshot()
+    fp = fingerprint("edges", "mem" if snap is not None else "db", node_id, rel_types, rank)
+    try:
+        state = decode_cursor(cursor, fp=fp) if cursor else None
+        if state is not None:
+            state["k"], state["e"] = _edge_key(state, snap is not None)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Ensure the seed exists.
-    seed = (
-        sb.table("entities")
-        .select("id,type,name,description,party,state,industry,total_lobbying,total_donations,metadata,last_updated")
-        .eq("id", seed_id)
-        .limit(1)
-        .execute()
-        .data
-        or []
-    )
-    if not seed:
-        raise HTTPException(status_code=404, detail="Seed entity not found")
+    if snap is not None:
+        if state and state.get("layout") != snap.layout:
+            raise HTTPException(status_code=410, detail="Cursor expired (graph reloaded); restart from the first page.")
+        after = (state["k"], state["e"]) if state else None
+        page, nxt, total = snap.edge_page(node_id, types=rel_types, rank=rank, limit=limit, after=after)
+        edges = [Relationship(**snap.edge_record(int(i))) for i in page]
+        next_cursor = encode_cursor({"fp": fp, "layout": snap.layout, "k": nxt[0], "e": nxt[1]}) if nxt else None
+        return EdgePage(node_id=node_id, edges=edges, total=total, next_cursor=next_cursor)
+
+    # Engine disabled or loading: keyset over the node's relationships in Postgres. Every row
+    # carries the node's total (node_edges_page_total.sql).
+    rows = await _db().rpc(
+        "node_edges_page",
+        {
+            "node_id": node_id,
+            "rel_types": rel_types,
+            "sort_by": rank,
+            "after_key": state["k"] if state else None,
+            "after_id": state["e"] if state else None,
+            "max_results": limit,
+        },
+    ) or []
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor({"fp": fp, "k": rows[-1]["sort_key"], "e": rows[-1]["id"]})
+    total = rows[0].get("total") if rows else (None if state else 0)
+    return EdgePage(node_id=node_id, edges=[Relationship(**r) for r in rows], total=total, next_cursor=next_cursor)
 
-    remaining = limit
-    edges_rows: list[dict] = []
-    frontier: set[str] = {seed_id}
-    nodeset: set[str] = {seed_id}
-
-    for _ in range(depth):
-        if remaining <= 0 or not frontier:
-            break
-        batch = _fetch_edges(sb, list(frontier), rel_types, remaining)
-        edges_rows.extend(batch)
-        remaining = limit - len(edges_rows)
-
-        nxt: set[str] = set()
-        for e in batch:
-            sid = e.get("source_id")
-            tid = e.get("target_id")
-            if isinstance(sid, str) and sid not in nodeset:
-                nxt.add(sid)
-            if isinstance(tid, str) and tid not in nodeset:
-                nxt.add(tid)
-        nodeset.update(nxt)
-        frontier = nxt
-
-    # Fetch node records.
-    ent_rows = (
-        sb.table("entities")
-        .select("id,type,name,description,party,state,industry,total_lobbying,total_donations,metadata,last_updated")
-        .in_("id", list(nodeset))
-        .execute()
-        .data
-        or []
+
+@router.get("/path", response_model=PathResponse)
+async def graph_path(
+    from_id: str = Query(..., min_length=1),
+    to_id: str = Query(..., min_length=1),
+    types: str = Query("donation,lobbying,vote,employment"),
+    max_hops: int = Query(6, ge=1, le=8),
+    k: int = Query(3, ge=1, le=10),
+    budget_ms: int | None = Query(default=None, ge=10, description="Search time budget (capped server-side)."),
+):
+    """
+    How from_id and to_id are connected: up to `k` paths of at most `max_hops` relationships
+    (either direction), fewest hops first and, among equal hops, the ones carrying the most money.
+    The search stops at the time budget and returns what it has with `timed_out` set. Without the
+    in-memory graph, Postgres finds a single shortest path (graph_path, *_graph_path.sql).
+    """
+    s = get_settings()
+    rel_types = _parse_types(types)
+    budget = min(budget_ms or s.graph_path_budget_ms, s.graph_path_max_budget_ms) / 1000
+
+    maybe_refresh_graph()
+    snap = graph_snapshot()
+    t0 = time.perf_counter()
+    if snap is not None:
+        # CPU-bound for up to the budget: keep it off the event loop.
+        found, timed_out = await anyio.to_thread.run_sync(
+            lambda: snap.paths(from_id, to_id, types=rel_types, max_hops=max_hops, k=k, budget=budget)
+        )
+        paths = [
+            _graph_path([snap.node_ids[n] for n in nodes], [Relationship(**snap.edge_record(e)) for e in edges])
+            for nodes, edges in found
+        ]
+    else:
+        out = await _db().rpc(
+            "graph_path",
+            {
+                "from_id": from_id,
+                "to_id": to_id,
+                "max_hops": max_hops,
+                "rel_types": rel_types,
+                "budget_ms": int(budget * 1000),
+            },
+        )
+        if not out:
+            raise HTTPException(status_code=404, detail="Entity not found")
+        timed_out = bool(out.get("timed_out"))
+        nodes = out.get("nodes") or []
+        paths = [_graph_path(nodes, [Relationship(**r) for r in out.get("edges") or []])] if nodes else []
+    elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    ids = list(dict.fromkeys([from_id, to_id, *(n for p in paths for n in p.nodes)]))
+    rows = await _db().rpc("entities_by_ids", {"ids": ids}) or []
+    missing = {from_id, to_id} - {r.get("id") for r in rows}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Entity not found: {', '.join(sorted(missing))}")
+    return PathResponse(
+        from_id=from_id,
+        to_id=to_id,
+        paths=paths,
+        entities=[Entity(**r) for r in rows],
+        timed_out=timed_out,
+        elapsed_ms=elapsed_ms,
     )
-    nodes = [Entity(**r) for r in ent_rows]
-    edges = [Relationship(**r) for r in _dedup_edges(edges_rows)]
 
-    return GraphResponse(seed_id=seed_id, nodes=nodes, edges=edges)
 
+def _graph_path(nodes: list[str], edges: list[Relationship]) -> GraphPath:
+    amounts = [e.amount for e in edges if e.amount is not None]
+    return GraphPath(
+        nodes=nodes,
+        edges=edges,
+        hops=len(edges),
+        total_amount=float(sum(amounts)),
+        min_amount=min(amounts) if amounts else None,
+    )
@@ -1,30 +1,187 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 
-from app.config import get_settings
-from app.services.ingest_news import sync_news
+from app.services.auth import require_ingest_secret
+from app.services.centrality import centrality_running, centrality_status, compute_centrality, start_centrality
+from app.services.index_manager import KINDS, SYNC_KINDS, index_status, rebuild, rebuild_running, start_rebuild, sync_index
+from app.services.ingest_jobs import IngestBusy, get_job, list_jobs, run_news_job, start_news_job
+from app.services.vector_index import sync_vector_index
 
 router = APIRouter()
 
 
 def _check_ingest(auth: str | None):
-    s = get_settings()
-    if not auth or not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing Authorization: Bearer <token>")
-    token = auth.removeprefix("Bearer ").strip()
-    if token != s.ingest_secret:
-        raise HTTPException(status_code=403, detail="Invalid token")
+    require_ingest_secret(auth)
 
 
-@router.post("/news")
+@router.post("/news", status_code=202)
 async def ingest_news(
+    response: Response,
     authorization: str | None = Header(default=None),
     limit: int = Query(60, ge=1, le=200),
+    incremental: int | None = Query(default=None, description="1 = skip unchanged URLs, 0 = re-ingest everything."),
+    wait: int = Query(0, description="Set to 1 to run in the request and return the final report."),
 ):
+    """
+    Start a background news ingest: 202 with {job_id, status, resumed, params}; poll
+    /api/ingest/jobs/{id} for progress and the final report. Resumes an interrupted run if there
+    is one (with this request's limit/incremental; `resumed` says so); 409 if another ingest is
+    already running; 503, before anything is queued, if Supabase or Perplexity isn't configured.
+    With wait=1 the run happens in the request and the final report comes back with 200.
+    """
     _check_ingest(authorization)
+    inc = None if incremental is None else incremental == 1
     try:
-        items = await sync_news(limit=limit)
+        if wait == 1:
+            job = await run_news_job(limit=limit, incremental=inc)
+            response.status_code = 200
+            return {
+                "job_id": job.get("id"),
+                "status": job.get("status"),
+                "resumed": job.get("resumed", False),
+                "params": job.get("params"),
+                **(job.get("report") or {}),
+            }
+        job = await start_news_job(limit=limit, incremental=inc)
+    except IngestBusy as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.get("id")})
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "job_id": job["id"],
+        "status": job.get("status"),
+        "resumed": job.get("resumed", False),
+        "params": job.get("params"),
+    }
+
+
+@router.get("/jobs")
+async def ingest_jobs(
+    authorization: str | None = Header(default=None),
+    limit: int = Query(20, ge=1, le=100),
+):
+    _check_ingest(authorization)
+    try:
+        return await list_jobs(limit=limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/jobs/{job_id}")
+async def ingest_job(job_id: str, authorization: str | None = Header(default=None)):
+    _check_ingest(authorization)
+    try:
+        job = await get_job(job_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # The checkpoint can be large (every pending hit); callers only need its size.
+    cp = job.pop("checkpoint", None) or {}
+    job["checkpoint"] = {
+        "topics_done": len(cp.get("topics_done") or []),
+        "pending": len(cp.get("pending") or []),
+        "done_urls": len(cp.get("done_urls") or []),
+    }
+    return job
+
+
+@router.post("/reindex", status_code=202)
+async def reindex(
+    response: Response,
+    authorization: str | None = Header(default=None),
+    kind: str = Query("all", description="documents | entities | relationships | all"),
+    wait: int = Query(0, description="Set to 1 to run in the request and return the final report."),
+):
+    """
+    Rebuild Elasticsearch indices from Supabase into new versioned indices and swap the aliases.
+    Search keeps using the old index until the swap.
+    """
+    _check_ingest(authorization)
+    kinds = list(KINDS) if kind == "all" else [kind]
+    if any(k not in KINDS for k in kinds):
+        raise HTTPException(status_code=400, detail=f"Invalid kind: {kind}")
+    busy = [k for k in kinds if rebuild_running(k)]
+    if busy:
+        raise HTTPException(status_code=409, detail=f"Rebuild already running: {', '.join(busy)}")
+    try:
+        if wait == 1:
+            reports = {k: (await rebuild(k)).as_dict() for k in kinds}
+            response.status_code = 200
+            return reports
+        for k in kinds:
+            start_rebuild(k)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"started": kinds}
+
+
+@router.post("/sync")
+async def sync(
+    authorization: str | None = Header(default=None),
+    kind: str = Query("entities,relationships", description="Comma-separated: entities, relationships"),
+):
+    """Copy entities/relationships changed since the last sync from Supabase into Elasticsearch."""
+    _check_ingest(authorization)
+    kinds = [k.strip() for k in kind.split(",") if k.strip()]
+    if not kinds or any(k not in SYNC_KINDS for k in kinds):
+        raise HTTPException(status_code=400, detail=f"Invalid kind: {kind}")
+    try:
+        return {k: await sync_index(k) for k in kinds}
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/vector-index")
+async def vector_index_sync(
+    authorization: str | None = Header(default=None),
+    full: int = Query(0, description="Set to 1 to clear and rebuild the local vector index."),
+):
+    """Sync (or rebuild) the local vector index from Supabase. Only used when ES isn't configured."""
+    _check_ingest(authorization)
+    try:
+        return await sync_vector_index(full=full == 1)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/centrality", status_code=202)
+async def centrality(
+    response: Response,
+    authorization: str | None = Header(default=None),
+    wait: int = Query(0, description="Set to 1 to run in the request and return the final report."),
+):
+    """
+    Recompute PageRank, degree and betweenness over all relationships and store them on entities
+    (and the entities index). Listings, search tie-breaks and graph node sizes read the result.
+    """
+    _check_ingest(authorization)
+    if centrality_running():
+        raise HTTPException(status_code=409, detail="Centrality job already running")
+    try:
+        if wait == 1:
+            report = (await compute_centrality()).as_dict()
+            response.status_code = 200
+            return report
+        start_centrality()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"started": True}
+
+
+@router.get("/centrality")
+async def centrality_report(authorization: str | None = Header(default=None)):
+    """Whether the centrality job is running, plus the last run's report or error."""
+    _check_ingest(authorization)
+    return centrality_status()
+
+
+@router.get("/indices")
+async def indices(authorization: str | None = Header(default=None)):
+    """Alias targets, live mapping version vs code, doc counts and the last rebuild per index."""
+    _check_ingest(authorization)
+    try:
+        return await index_status()
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=str(e))
-    return {"inserted": len(items)}
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Header
+
+from app.services.auth import require_ingest_secret
+from app.services.embedding_cache import embedding_cache
+from app.services.entity_suggest import suggest_stats
+from app.services.graph_engine import graph_stats
+from app.services.http_clients import http_clients
+from app.services.jina_embeddings import embedding_stats
+from app.services.parse_executor import parse_executor
+from app.services.search_cache import search_cache
+from app.services.vector_index import vector_index
+
+
+def _check_operator(authorization: str | None = Header(default=None)):
+    # Pool, cache, index and job internals are operator data: same bearer token as /api/ingest.
+    require_ingest_secret(authorization)
+
+
+router = APIRouter(dependencies=[Depends(_check_operator)])
+
+
+@router.get("/http")
+async def http_pool_stats():
+    """Per-upstream connection pool usage for the shared outbound HTTP clients."""
+    return http_clients().stats()
+
+
+@router.get("/embeddings")
+async def embeddings_stats():
+    """Cumulative Jina embedding throughput (texts per request, texts per second) and cache hit ratio."""
+    cache = embedding_cache()
+    # stats() counts the rows in the backend (SQLite in a worker thread, Postgres on the async client).
+    cache_stats = await cache.stats() if cache is not None else None
+    return {**embedding_stats(), "cache": cache_stats}
+
+
+@router.get("/parse")
+async def parse_stats():
+    """HTML parse pool: in-flight jobs, queue depth, timeouts and job latency."""
+    return parse_executor().snapshot()
+
+
+@router.get("/search-cache")
+async def search_cache_stats():
+    """Search result cache: hit ratio, entries/bytes, and upstream time saved by hits."""
+    return search_cache().stats()
+
+
+@router.get("/vector-index")
+async def vector_index_stats():
+    """Local vector index (used without Elasticsearch): rows per kind, storage, sync watermarks."""
+    return vector_index().stats()
+
+
+@router.get("/suggest")
+async def suggest_index_stats():
+    """Entity autocomplete index: entities/keys held, watermark, and last refresh/build time."""
+    return suggest_stats()
+
+
+@router.get("/graph")
+async def graph_engine_stats():
+    """In-memory graph snapshot: nodes/edges, memory (incl. bytes per million edges), traversal latency."""
+    return graph_stats()
@@ -1,19 +1,30 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from fastapi import APIRouter, HTTPException, Query, Response
 
 from app.config import get_settings
 from app.models import SearchHit
-from app.services.elasticsearch_client import es, ensure_indices
+from app.services.centrality import INFLUENCE_TIEBREAK
+from app.services.cursors import NEXT_CURSOR_HEADER, CursorError, decode_cursor, encode_cursor, fingerprint, pit_page
+from app.services.db import db
+from app.services.elasticsearch_client import es
+from app.services.index_manager import KINDS, alias_for, kind_for_index
 from app.services.jina_embeddings import embed_text
-from app.services.supabase_client import supabase_admin
+from app.services.search_cache import search_cache, sync_generation
+from app.services.vector_index import maybe_sync_vector_index, search_vectors, vector_index_active
 
 router = APIRouter()
 
+# Response header listing the backends that timed out or failed (comma-separated).
+PARTIAL_HEADER = "X-Search-Partial"
+
 
-def _sb_or_none():
+def _db_or_none():
     try:
-        return supabase_admin()
+        return db()
     except RuntimeError:
         return None
 
@@ -21,130 +32,334 @@ def _sb_or_none():
 @router.get("", response_model=list[SearchHit])
 @router.get("/", response_model=list[SearchHit])
 async def search(
+    response: Response,
     q: str = Query(..., min_length=1),
     entity_type: str | None = Query(default=None),
     limit: int = Query(20, ge=1, le=50),
+    paginate: bool = Query(False),
+    cursor: str | None = Query(default=None),
 ):
-    s = get_settings()
-    q = q.strip()
+    q = " ".join(q.split())
     if not q:
         raise HTTPException(status_code=400, detail="q is required")
+    if paginate or cursor:
+        hits, next_cursor = await page_search(q, entity_type, limit, cursor)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return hits
+    hits, missing = await run_search(q, entity_type, limit)
+    if missing:
+        response.headers[PARTIAL_HEADER] = ",".join(missing)
+    return hits
 
-    # Preferred: Elasticsearch hybrid (derived).
-    if s.elastic_cloud_id and s.elastic_api_key:
-        await ensure_indices()
-
-        knn = None
-        if s.jina_api_key:
-            try:
-                qvec = await embed_text(q, task="retrieval.query")
-                knn = {
-                    "field": "embedding",
-                    "query_vector": qvec,
-                    "k": limit,
-                    "num_candidates": max(50, limit * 5),
-                }
-            except Exception:
-                knn = None
 
-        client = es()
-        body: dict = {
-            "index": s.elastic_index_documents,
-            "size": limit,
-            "query": {"multi_match": {"query": q, "fields": ["title^3", "excerpt^2", "content"]}},
-        }
-        if knn is not None:
-            body["knn"] = knn
-
-        resp = await client.search(**body)
-
-        hits: list[SearchHit] = []
-        for h in resp.get("hits", {}).get("hits", []):
-            src = h.get("_source") or {}
-            hits.append(
-                SearchHit(
-                    id=src.get("id") or h.get("_id"),
-                    type="document",
-                    title=src.get("title") or "",
-                    snippet=(src.get("excerpt") or "")[:320],
-                    url=src.get("url"),
-                    score=h.get("_score"),
-                    image_url=src.get("image_url"),
-                    metadata={"source": src.get("source"), "published_at": src.get("published_at")},
-                )
-            )
-        # Also include canonical entity hits from Supabase when available (keyword).
-        sb = _sb_or_none()
-        if sb is None:
-            return hits
-
-        like = f"%{q}%"
-        ent_q = sb.table("entities").select("id,type,name,description,metadata,last_updated")
-        if entity_type:
-            ent_q = ent_q.eq("type", entity_type)
-        ent_rows = ent_q.or_(f"name.ilike.{like},description.ilike.{like}").limit(min(12, limit)).execute().data or []
-        ent_hits: list[SearchHit] = []
-        for r in ent_rows:
-            ent_hits.append(
-                SearchHit(
-                    id=r.get("id") or "",
-                    type="entity",
-                    title=r.get("name") or "",
-                    snippet=(r.get("description") or "")[:320],
-                    url=None,
-                    metadata={"entity_type": r.get("type"), "last_updated": r.get("last_updated")},
-                )
-            )
-        # Entities first, then documents.
-        return [*ent_hits, *hits][:limit]
+async def run_search(q: str, entity_type: str | None, limit: int) -> tuple[list[SearchHit], list[str]]:
+    """
+    Cached search. Returns (hits, missing) where `missing` names the backends that were slow or
+    down; partial results are returned but never cached.
+    """
+    if not get_settings().search_cache_enabled:
+        return await _search(q, entity_type, limit)
 
-    # Fallback: Supabase keyword search (canonical). No seeded data.
-    sb = _sb_or_none()
-    if sb is None:
-        return []
+    # Same query with different casing/spacing is the same search (ES and ilike are case-insensitive).
+    sync_generation()
+    key = ("search", q.lower(), entity_type or None, limit)
+    return await search_cache().get_or_compute(
+        key,
+        lambda: _search(q, entity_type, limit),
+        sizeof=lambda out: sum(len(h.model_dump_json()) for h in out[0]) + 64,
+        cacheable=lambda out: not out[1],
+    )
+
+
+async def _bounded(name: str, timeout: float, fn: Callable[[], Awaitable[Any]], missing: list[str]) -> Any:
+    try:
+        return await asyncio.wait_for(fn(), timeout=timeout)
+    except Exception:
+        missing.append(name)
+        return None
+
+
+def _doc_hit(src: dict[str, Any], doc_id: str, score: float | None) -> SearchHit:
+    return SearchHit(
+        id=src.get("id") or doc_id,
+        type="document",
+        title=src.get("title") or "",
+        snippet=(src.get("excerpt") or "")[:320],
+        url=src.get("url"),
+        score=score,
+        image_url=src.get("image_url"),
+        metadata={"source": src.get("source"), "published_at": src.get("published_at")},
+    )
 
-    like = f"%{q}%"
-    out: list[SearchHit] = []
 
-    ent_q = sb.table("entities").select("id,type,name,description,metadata,last_updated")
+def _entity_hit(r: dict[str, Any], score: float | None = None) -> SearchHit:
+    return SearchHit(
+        id=r.get("id") or "",
+        type="entity",
+        title=r.get("name") or "",
+        snippet=(r.get("description") or "")[:320],
+        url=None,
+        score=score,
+        metadata={
+            "entity_type": r.get("type"),
+            "last_updated": r.get("last_updated"),
+            "influence_rank": r.get("influence_rank"),
+        },
+    )
+
+
+async def _entity_rows(sb, q: str, entity_type: str | None, limit: int) -> list[dict[str, Any]]:
+    # Ranked full-text + trigram search (supabase/migrations/*_search_fallback.sql).
+    return await sb.rpc("search_entities", {"q": q, "entity_type": entity_type or None, "max_results": limit}) or []
+
+
+async def _document_rows(sb, q: str, limit: int) -> list[dict[str, Any]]:
+    return await sb.rpc("search_documents", {"q": q, "max_results": limit}) or []
+
+
+_DOC_FIELDS = "id,source,url,title,published_at,excerpt,image_url,metadata"
+_ENT_FIELDS = "id,type,name,description,pagerank,influence_rank,metadata,last_updated"
+
+
+def _doc_source(r: dict[str, Any]) -> dict[str, Any]:
+    # Supabase rows carry the feed in metadata.from; ES documents have it as `source`.
+    return {**r, "source": (r.get("metadata") or {}).get("from") or r.get("source")}
+
+
+def _as_hit(kind: str, r: dict[str, Any]) -> dict[str, Any]:
+    """Shape a Supabase row like an ES hit so _rrf can fuse it."""
+    return {"_id": r.get("id"), "_source": _doc_source(r) if kind == "documents" else r}
+
+
+def _relationship_hit(src: dict[str, Any], rid: str, score: float | None) -> SearchHit:
+    title = src.get("description") or f'{src.get("type")}: {src.get("source_id")} \u2192 {src.get("target_id")}'
+    return SearchHit(
+        id=src.get("id") or rid,
+        type="relationship",
+        title=title,
+        snippet=(src.get("description") or "")[:320],
+        url=None,
+        score=score,
+        metadata={k: src.get(k) for k in ("type", "source_id", "target_id", "amount", "date", "cycle")},
+    )
+
+
+def _keyword_queries(q: str, entity_type: str | None, limit: int) -> list[tuple[str, dict[str, Any]]]:
+    ent_query: dict[str, Any] = {"multi_match": {"query": q, "fields": ["name^3", "description"]}}
     if entity_type:
-        ent_q = ent_q.eq("type", entity_type)
-    ent_rows = ent_q.or_(f"name.ilike.{like},description.ilike.{like}").limit(min(25, limit)).execute().data or []
-    for r in ent_rows:
-        out.append(
-            SearchHit(
-                id=r.get("id") or "",
-                type="entity",
-                title=r.get("name") or "",
-                snippet=(r.get("description") or "")[:320],
-                url=None,
-                metadata={"entity_type": r.get("type"), "last_updated": r.get("last_updated")},
-            )
+        ent_query = {"bool": {"must": ent_query, "filter": [{"term": {"type": entity_type}}]}}
+    return [
+        ("documents", {"size": limit, "query": {"multi_match": {"query": q, "fields": ["title^3", "excerpt^2", "content"]}}}),
+        ("entities", {"size": limit, "query": ent_query, "sort": ["_score", *INFLUENCE_TIEBREAK]}),
+        ("relationships", {"size": limit, "query": {"multi_match": {"query": q, "fields": ["description", "cycle"]}}}),
+    ]
+
+
+def _vector_queries(qvec: list[float], entity_type: str | None, limit: int) -> list[tuple[str, dict[str, Any]]]:
+    knn = {"field": "embedding", "query_vector": qvec, "k": limit, "num_candidates": max(50, limit * 5)}
+    ent_knn = {**knn, "filter": {"term": {"type": entity_type}}} if entity_type else knn
+    return [("documents", {"size": limit, "knn": knn}), ("entities", {"size": limit, "knn": ent_knn})]
+
+
+async def _msearch(client, queries: list[tuple[str, dict[str, Any]]]) -> list[tuple[str, list[dict[str, Any]]]]:
+    """One round trip for several ranked lists. A failed sub-search raises (the backend is then partial)."""
+    searches: list[dict[str, Any]] = []
+    for kind, body in queries:
+        searches.extend([{"index": alias_for(kind)}, body])
+    resp = await client.msearch(searches=searches)
+    out: list[tuple[str, list[dict[str, Any]]]] = []
+    for (kind, _), r in zip(queries, resp.get("responses") or []):
+        if r.get("error"):
+            # A never-synced index is just empty; anything else is a real failure.
+            if (r["error"].get("type") if isinstance(r["error"], dict) else "") == "index_not_found_exception":
+                out.append((kind, []))
+                continue
+            raise RuntimeError(f"{kind} search failed: {r['error']}")
+        out.append((kind, (r.get("hits") or {}).get("hits") or []))
+    return out
+
+
+def _rrf(lists: list[tuple[str, list[dict[str, Any]]]], *, k: int, limit: int) -> list[SearchHit]:
+    """Reciprocal-rank fusion across ranked lists: score = sum(1 / (k + rank)) per (index, id)."""
+    scores: dict[tuple[str, str], float] = {}
+    sources: dict[tuple[str, str], dict[str, Any]] = {}
+    for kind, hits in lists:
+        for rank, h in enumerate(hits, start=1):
+            key = (kind, h.get("_id"))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            sources.setdefault(key, h.get("_source") or {})
+    # Equal fused scores (same ranks in different lists) go to the more influential entity.
+    ranked = sorted(
+        scores.items(), key=lambda kv: (kv[1], sources[kv[0]].get("pagerank") or 0.0), reverse=True
+    )[:limit]
+    out: list[SearchHit] = []
+    for (kind, hid), score in ranked:
+        src = sources[(kind, hid)]
+        if kind == "documents":
+            out.append(_doc_hit(src, hid, score))
+        elif kind == "entities":
+            out.append(_entity_hit({**src, "id": src.get("id") or hid}, score))
+        else:
+            out.append(_relationship_hit(src, hid, score))
+    return out
+
+
+async def _search(q: str, entity_type: str | None, limit: int) -> tuple[list[SearchHit], list[str]]:
+    s = get_settings()
+    missing: list[str] = []
+
+    # Preferred: Elasticsearch over documents, entities and relationships (all derived from
+    # Supabase). Keyword lists go out as one msearch and vector lists as another, concurrently
+    # and each under its own timeout; the ranked lists are merged with reciprocal-rank fusion.
+    if s.elastic_cloud_id and s.elastic_api_key:
+        client = es()
+
+        async def keyword():
+            return await _msearch(client, _keyword_queries(q, entity_type, limit))
+
+        async def vector():
+            qvec = await embed_text(q, task="retrieval.query")
+            return await _msearch(client, _vector_queries(qvec, entity_type, limit))
+
+        kw, vec = await asyncio.gather(
+            _bounded("keyword", s.search_keyword_timeout_seconds, keyword, missing),
+            _bounded("vector", s.search_vector_timeout_seconds, vector, missing) if s.jina_api_key else asyncio.sleep(0),
         )
+        return _rrf([*(kw or []), *(vec or [])], k=s.search_rrf_k, limit=limit), missing
 
-    rem = max(0, limit - len(out))
-    if rem:
-        doc_rows = (
-            sb.table("documents")
-            .select("id,title,url,excerpt,image_url,published_at,metadata,source")
-            .or_(f"title.ilike.{like},excerpt.ilike.{like},url.ilike.{like}")
-            .order("published_at", desc=True)
-            .limit(rem)
-            .execute()
-            .data
-            or []
+    sb = _db_or_none()
+
+    # Fallback: Supabase keyword search (canonical), fused with the local vector index when available.
+    if sb is None:
+        return [], missing
+
+    async def vector():
+        qvec = await embed_text(q, task="retrieval.query")
+        found = await search_vectors(qvec, k=limit)
+        doc_ids = [i for kind, i, _ in found if kind == "documents"]
+        ent_ids = [i for kind, i, _ in found if kind == "entities"]
+        docs, ents = await asyncio.gather(
+            sb.table("documents").select(_DOC_FIELDS).in_("id", doc_ids).execute() if doc_ids else asyncio.sleep(0, []),
+            sb.table("entities").select(_ENT_FIELDS).in_("id", ent_ids).execute() if ent_ids else asyncio.sleep(0, []),
         )
-        for r in doc_rows:
-            out.append(
-                SearchHit(
-                    id=r.get("id") or "",
-                    type="document",
-                    title=r.get("title") or "",
-                    snippet=(r.get("excerpt") or "")[:320],
-                    url=r.get("url"),
-                    image_url=r.get("image_url"),
-                    metadata={"source": (r.get("metadata") or {}).get("from") or r.get("source"), "published_at": r.get("published_at")},
-                )
+        by_id = {("documents", r["id"]): r for r in docs} | {("entities", r["id"]): r for r in ents}
+        ranked: dict[str, list[dict[str, Any]]] = {"documents": [], "entities": []}
+        for kind, i, _ in found:
+            r = by_id.get((kind, i))
+            if r is None or (kind == "entities" and entity_type and r.get("type") != entity_type):
+                continue
+            ranked[kind].append(r)
+        return ranked
+
+    use_vectors = vector_index_active()
+    if use_vectors:
+        maybe_sync_vector_index()
+    ent_rows, doc_rows, vec = await asyncio.gather(
+        _bounded("entities", s.search_entity_timeout_seconds, lambda: _entity_rows(sb, q, entity_type, min(25, limit)), missing),
+        _bounded("documents", s.search_keyword_timeout_seconds, lambda: _document_rows(sb, q, limit), missing),
+        _bounded("vector", s.search_vector_timeout_seconds, vector, missing) if use_vectors else asyncio.sleep(0),
+    )
+    if vec:
+        # Hybrid: keyword (Postgres full-text/trigram) and local-vector lists fused like the ES path.
+        lists = [
+            ("entities", ent_rows or []),
+            ("documents", doc_rows or []),
+            ("entities", vec["entities"]),
+            ("documents", vec["documents"]),
+        ]
+        return _rrf([(kind, [_as_hit(kind, r) for r in rows]) for kind, rows in lists], k=s.search_rrf_k, limit=limit), missing
+
+    out = [_entity_hit(r, r.get("rank")) for r in ent_rows or []]
+    rem = max(0, limit - len(out))
+    for r in (doc_rows or [])[:rem]:
+        out.append(_doc_hit(_doc_source(r), r.get("id") or "", r.get("rank")))
+
+    return out[:limit], missing
+
+
+def _paged_query(q: str, entity_type: str | None) -> dict[str, Any]:
+    """One keyword query over all three indices (fields an index lacks simply don't match)."""
+    query: dict[str, Any] = {
+        "multi_match": {"query": q, "fields": ["title^3", "excerpt^2", "content", "name^3", "description", "cycle"]}
+    }
+    if not entity_type:
+        return query
+    ent = alias_for("entities")
+    # The type filter applies to entities only, as in the fused search.
+    return {
+        "bool": {
+            "must": query,
+            "filter": [
+                {
+                    "bool": {
+                        "should": [
+                            {"bool": {"must_not": {"wildcard": {"_index": f"{ent}*"}}}},
+                            {"term": {"type": entity_type}},
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                }
+            ],
+        }
+    }
+
+
+async def page_search(q: str, entity_type: str | None, limit: int, token: str | None) -> tuple[list[SearchHit], str | None]:
+    """
+    Cursor paging for exports. Unlike the fused first page this is one stable ordering that can be
+    walked to the end: keyword relevance over a point-in-time on Elasticsearch, or newest-first
+    keyset pages (entities, then documents) in Postgres. Returns (hits, next cursor or None).
+    """
+    s = get_settings()
+    use_es = bool(s.elastic_cloud_id and s.elastic_api_key)
+    fp = fingerprint("search", "es" if use_es else "db", q.lower(), entity_type or None)
+    try:
+        state = decode_cursor(token, fp=fp, after_len=None if use_es else 2) if token else None
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if use_es:
+        try:
+            hits, nxt = await pit_page(
+                [alias_for(k) for k in KINDS],
+                query=_paged_query(q, entity_type),
+                size=limit,
+                state=state,
+                tiebreak=INFLUENCE_TIEBREAK,
             )
+        except Exception as e:
+            if state and getattr(e, "status_code", None) == 404:
+                raise HTTPException(status_code=410, detail="Cursor expired; restart the search.")
+            raise HTTPException(status_code=503, detail=f"Search is unavailable: {e}")
+        out: list[SearchHit] = []
+        for h in hits:
+            kind, src, hid = kind_for_index(h.get("_index") or ""), h.get("_source") or {}, h.get("_id") or ""
+            if kind == "documents":
+                out.append(_doc_hit(src, hid, h.get("_score")))
+            elif kind == "entities":
+                out.append(_entity_hit({**src, "id": src.get("id") or hid}, h.get("_score")))
+            elif kind == "relationships":
+                out.append(_relationship_hit(src, hid, h.get("_score")))
+        return out, encode_cursor({"fp": fp, **nxt}) if nxt else None
 
-    return out[:limit]
+    sb = _db_or_none()
+    if sb is None:
+        raise HTTPException(status_code=503, detail="Search is unavailable: no search backend is configured.")
+    phase, after = (state or {}).get("phase", "entities"), (state or {}).get("after") or [None, None]
+    out = []
+    if phase == "entities":
+        rows = await sb.rpc(
+            "search_entities_page",
+            {"q": q, "entity_type": entity_type or None, "after_ts": after[0], "after_id": after[1], "max_results": limit},
+        ) or []
+        out.extend(_entity_hit(r, r.get("rank")) for r in rows)
+        if len(rows) == limit:
+            return out, encode_cursor({"fp": fp, "phase": "entities", "after": [rows[-1]["last_updated"], rows[-1]["id"]]})
+        after = [None, None]
+    want = limit - len(out)
+    rows = await sb.rpc("search_documents_page", {"q": q, "after_ts": after[0], "after_id": after[1], "max_results": want}) or []
+    out.extend(_doc_hit(_doc_source(r), r.get("id") or "", r.get("rank")) for r in rows)
+    if len(rows) == want:
+        return out, encode_cursor({"fp": fp, "phase": "documents", "after": [rows[-1]["created_at"], rows[-1]["id"]]})
+    return out, None
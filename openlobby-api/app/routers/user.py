@@ -4,14 +4,14 @@ from fastapi import APIRouter, Header, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from app.services.auth import require_user
-from app.services.supabase_client import supabase_admin
+from app.services.db import db
 
 router = APIRouter()
 
 
-def _sb():
+def _db():
     try:
-        return supabase_admin()
+        return db()
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=str(e))
 
@@ -33,15 +33,15 @@ class BookmarkUpsert(BaseModel):
 @router.get("/profile")
 async def get_profile(authorization: str | None = Header(default=None)):
     ctx = require_user(authorization)
-    sb = _sb()
-    resp = (
-        sb.table("profiles")
+    rows = await (
+        _db()
+        .table("profiles")
         .select("user_id,full_name,avatar_url,created_at")
         .eq("user_id", ctx.user_id)
         .limit(1)
         .execute()
     )
-    row = (resp.data or [None])[0]
+    row = (rows or [None])[0]
     if not row:
         return {"user_id": ctx.user_id, "full_name": None, "avatar_url": None}
     return row
@@ -50,9 +50,8 @@ async def get_profile(authorization: str | None = Header(default=None)):
 @router.post("/profile")
 async def upsert_profile(body: ProfileUpsert, authorization: str | None = Header(default=None)):
     ctx = require_user(authorization)
-    sb = _sb()
     row = {"user_id": ctx.user_id, "full_name": body.full_name, "avatar_url": body.avatar_url}
-    sb.table("profiles").upsert(row).execute()
+    await _db().table("profiles").upsert(row).execute()
     return {"ok": True}
 
 
@@ -62,23 +61,21 @@ async def list_saved_queries(
     limit: int = Query(50, ge=1, le=50),
 ):
     ctx = require_user(authorization)
-    sb = _sb()
-    resp = (
-        sb.table("saved_queries")
+    return await (
+        _db()
+        .table("saved_queries")
         .select("id,query,created_at")
         .eq("user_id", ctx.user_id)
         .order("created_at", desc=True)
         .limit(limit)
         .execute()
     )
-    return resp.data or []
 
 
 @router.post("/saved-queries")
 async def create_saved_query(body: SavedQueryCreate, authorization: str | None = Header(default=None)):
     ctx = require_user(authorization)
-    sb = _sb()
-    sb.table("saved_queries").insert({"user_id": ctx.user_id, "query": body.query}).execute()
+    await _db().table("saved_queries").insert({"user_id": ctx.user_id, "query": body.query}).execute()
     return {"ok": True}
 
 
@@ -88,31 +85,28 @@ async def list_bookmarks(
     limit: int = Query(50, ge=1, le=50),
 ):
     ctx = require_user(authorization)
-    sb = _sb()
-    resp = (
-        sb.table("bookmarks")
+    return await (
+        _db()
+        .table("bookmarks")
         .select("id,entity_id,note,created_at")
         .eq("user_id", ctx.user_id)
         .order("created_at", desc=True)
         .limit(limit)
         .execute()
     )
-    return resp.data or []
 
 
 @router.post("/bookmarks")
 async def upsert_bookmark(body: BookmarkUpsert, authorization: str | None = Header(default=None)):
     ctx = require_user(authorization)
-    sb = _sb()
     row = {"user_id": ctx.user_id, "entity_id": body.entity_id, "note": body.note}
-    sb.table("bookmarks").upsert(row, on_conflict="user_id,entity_id").execute()
+    await _db().table("bookmarks").upsert(row, on_conflict="user_id,entity_id").execute()
     return {"ok": True}
 
 
 @router.delete("/bookmarks/{entity_id}")
 async def delete_bookmark(entity_id: str, authorization: str | None = Header(default=None)):
     ctx = require_user(authorization)
-    sb = _sb()
-    sb.table("bookmarks").delete().eq("user_id", ctx.user_id).eq("entity_id", entity_id).execute()
+    await _db().table("bookmarks").delete().eq("user_id", ctx.user_id).eq("entity_id", entity_id).execute()
     return {"ok": True}
 
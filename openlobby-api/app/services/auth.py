@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hmac
 from dataclasses import dataclass
 from typing import Any
 from uuid import UUID
@@ -51,3 +52,16 @@ def require_user(authorization_header: str | None) -> UserContext:
 
     return UserContext(user_id=uid, claims=claims)
 
+
+def require_ingest_secret(authorization_header: str | None) -> None:
+    """Operator endpoints (ingest, jobs, indices, metrics): `Authorization: Bearer <INGEST_SECRET>`."""
+    if not authorization_header or not authorization_header.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing Authorization: Bearer <token>")
+
+    s = get_settings()
+    if not s.ingest_secret:
+        raise HTTPException(status_code=503, detail="Operator auth is not configured (INGEST_SECRET missing).")
+
+    token = authorization_header.removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(token.encode("utf-8"), s.ingest_secret.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid token")
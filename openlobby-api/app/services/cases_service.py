@@ -1,30 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from typing import Any
 
 from app.config import get_settings
 from app.models import CaseFile, CaseStep
-from app.services.content_fetch import extract_og_image, fetch_html
+from app.services.content_fetch import fetch_og_image
+from app.services.db import db
 from app.services.perplexity_sonar import sonar_generate_case, sonar_search
-from app.services.supabase_client import supabase_admin
 
 
 async def list_cases(*, limit: int = 10) -> list[CaseFile]:
-    sb = supabase_admin()
-    resp = sb.table("case_files").select("id,title,dek,hero_image_url,tags,steps,entities_featured,updated_at").order(
+    rows = await db().table("case_files").select("id,title,dek,hero_image_url,tags,steps,entities_featured,updated_at").order(
         "updated_at", desc=True
     ).limit(limit).execute()
     out: list[CaseFile] = []
-    for r in (resp.data or []):
+    for r in rows:
         out.append(_row_to_case(r, include_steps=False))
     return out
 
 
 async def get_case(case_id: str) -> CaseFile | None:
-    sb = supabase_admin()
-    resp = sb.table("case_files").select("id,title,dek,hero_image_url,tags,steps,entities_featured,updated_at").eq("id", case_id).limit(1).execute()
-    row = (resp.data or [None])[0]
+    rows = await db().table("case_files").select("id,title,dek,hero_image_url,tags,steps,entities_featured,updated_at").eq("id", case_id).limit(1).execute()
+    row = (rows or [None])[0]
     if not row:
         return None
     return _row_to_case(row, include_steps=True)
@@ -56,7 +55,7 @@ async def generate_and_store_case(topic: str) -> CaseFile | None:
 
     # Attach real documents by executing per-step queries and storing doc IDs as relationships.
     steps_in: list[dict[str, Any]] = list(gen.get("steps") or [])
-    sb = supabase_admin()
+    sb = db()
 
     # Get candidate docs from existing documents table by searching on URL/title via Sonar.
     # We avoid "mocking" by always attaching live URLs.
@@ -73,16 +72,12 @@ async def generate_and_store_case(topic: str) -> CaseFile | None:
                 if u and u not in related_urls:
                     related_urls.append(u)
 
-        # Derive step images from OG images of related URLs.
+        # Derive step images from OG images of related URLs (head-only fetches, in parallel).
         collage_images: list[str] = []
-        for u in related_urls[:3]:
-            try:
-                html = await fetch_html(u)
-                og = extract_og_image(html)
-                if og and og not in collage_images:
-                    collage_images.append(og)
-            except Exception:
-                continue
+        ogs = await asyncio.gather(*(fetch_og_image(u) for u in related_urls[:3]), return_exceptions=True)
+        for og in ogs:
+            if isinstance(og, str) and og and og not in collage_images:
+                collage_images.append(og)
 
         step_id = st.get("id") or f"step-{idx+1}"
         step_objs.append(
@@ -111,7 +106,7 @@ async def generate_and_store_case(topic: str) -> CaseFile | None:
         "steps": step_objs,
         "entities_featured": gen.get("entities_featured") or [],
     }
-    sb.table("case_files").upsert(row).execute()
+    await sb.table("case_files").upsert(row).execute()
     return _row_to_case(row, include_steps=True)
 
 
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+import anyio
+import numpy as np
+
+from app.config import get_settings
+from app.services.db import db
+from app.services.es_bulk import BulkIndexer
+from app.services.graph_engine import GraphSnapshot, apply_rows
+from app.services.index_manager import SOURCES, alias_for, stream_rows
+from app.services.search_cache import bump_search_generation
+
+# Centrality columns on public.entities (supabase/migrations/*_entity_centrality.sql), written by
+# this batch job only; request handlers read and sort by them.
+CENTRALITY_FIELDS = ("pagerank", "degree", "weighted_degree", "betweenness", "influence_rank", "influence_percentile")
+
+# Elasticsearch sort clauses after _score: equal text scores go to the more influential entity.
+# unmapped_type keeps the sort valid on indices without the field (other kinds, or an entities
+# index built before it existed).
+INFLUENCE_TIEBREAK: list[dict[str, Any]] = [{"pagerank": {"order": "desc", "missing": 0, "unmapped_type": "double"}}]
+
+_WRITE_BATCH = 2000
+
+
+@dataclass
+class CentralityReport:
+    nodes: int = 0
+    edges: int = 0
+    pagerank_iterations: int = 0
+    pagerank_converged: bool = False
+    betweenness_samples: int = 0
+    written: int = 0
+    cleared: int = 0
+    es: dict[str, Any] | None = None
+    computed_at: str | None = None
+    seconds: dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "nodes": self.nodes,
+            "edges": self.edges,
+            "pagerank_iterations": self.pagerank_iterations,
+            "pagerank_converged": self.pagerank_converged,
+            "betweenness_samples": self.betweenness_samples,
+            "written": self.written,
+            "cleared": self.cleared,
+            "es": self.es,
+            "computed_at": self.computed_at,
+            "seconds": {k: round(v, 3) for k, v in self.seconds.items()},
+        }
+
+
+def edge_weights(snap: GraphSnapshot) -> np.ndarray:
+    # Money spans orders of magnitude; log keeps one $1B edge from outweighing hundreds of votes.
+    amount = np.nan_to_num(snap.amount, nan=0.0)
+    return 1.0 + np.log1p(np.maximum(amount, 0.0))
+
+
+def pagerank(
+    snap: GraphSnapshot, *, damping: float = 0.85, tol: float = 1e-9, max_iter: int = 100
+) -> tuple[np.ndarray, int, bool]:
+    """
+    Weighted PageRank on the directed graph (source_id -> target_id): power iteration where each
+    step is one sparse matvec written as a gather plus np.bincount over the edge arrays. Rank of
+    nodes without out-edges is spread evenly. Returns (scores summing to 1, iterations, converged).
+    """
+    n = snap.node_count
+    if n == 0:
+        return np.zeros(0), 0, True
+    src, dst = snap.src.astype(np.int64), snap.dst.astype(np.int64)
+    w = edge_weights(snap)
+    out_w = np.bincount(src, weights=w, minlength=n)
+    share = w / out_w[src]
+    dangling = out_w == 0
+    x = np.full(n, 1.0 / n)
+    for it in range(1, max_iter + 1):
+        nx = np.bincount(dst, weights=x[src] * share, minlength=n)
+        nx += x[dangling].sum() / n
+        nx = damping * nx + (1.0 - damping) / n
+        err = np.abs(nx - x).sum()
+        x = nx
+        if err < tol:
+            return x, it, True
+    return x, max_iter, False
+
+
+def degrees(snap: GraphSnapshot) -> tuple[np.ndarray, np.ndarray]:
+    """Incident edge count and summed amount per node, both directions (a self-loop counts once)."""
+    n = snap.node_count
+    degree = snap.type_degree.sum(axis=1).astype(np.int64)
+    amount = np.nan_to_num(snap.amount, nan=0.0)
+    back = snap.src != snap.dst
+    weighted = np.bincount(snap.src, weights=amount, minlength=n) + np.bincount(
+        snap.dst[back], weights=amount[back], minlength=n
+    )
+    return degree, weighted
+
+
+def _simple_adjacency(snap: GraphSnapshot) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The snapshot's CSR with parallel edges collapsed and self-loops dropped: betweenness counts
+    shortest paths between nodes, and two relationships between the same pair are one hop, not two paths.
+    """
+    n = snap.node_count
+    owner = np.repeat(np.arange(n, dtype=np.int64), np.diff(snap.indptr))
+    pairs = np.unique(owner * n + snap.nbr.astype(np.int64))
+    owner, nbr = pairs // n, pairs % n
+    keep = owner != nbr
+    owner, nbr = owner[keep], nbr[keep]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=n), out=indptr[1:])
+    return indptr, nbr
+
+
+def _dependencies(indptr: np.ndarray, nbr: np.ndarray, s: int) -> np.ndarray:
+    """
+    Brandes' single-source dependencies on the undirected, unweighted graph given by a simple CSR
+    (see _simple_adjacency). The BFS runs a whole level at a time over the CSR slices of the
+    frontier; path counts and dependencies accumulate per level with np.bincount instead of per edge.
+    """
+    n = indptr.size - 1
+    dist = np.full(n, -1, dtype=np.int64)
+    sigma = np.zeros(n)
+    dist[s], sigma[s] = 0, 1.0
+    frontier = np.array([s], dtype=np.int64)
+    levels: list[tuple[np.ndarray, np.ndarray]] = []
+    d = 0
+    while frontier.size:
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            break
+        owner = np.repeat(frontier, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        w = nbr[np.repeat(starts, counts) + offsets].astype(np.int64)
+        dist[w[dist[w] == -1]] = d + 1
+        on_path = dist[w] == d + 1
+        v, w = owner[on_path], w[on_path]
+        if not v.size:
+            break
+        sigma += np.bincount(w, weights=sigma[v], minlength=n)
+        levels.append((v, w))
+        # Next level = every node first reached here (a mask scan is cheaper than np.unique on w).
+        frontier = np.flatnonzero(dist == d + 1)
+        d += 1
+    delta = np.zeros(n)
+    for v, w in reversed(levels):
+        delta += np.bincount(v, weights=sigma[v] / sigma[w] * (1.0 + delta[w]), minlength=n)
+    delta[s] = 0.0
+    return delta
+
+
+def betweenness(snap: GraphSnapshot, *, samples: int, seed: int = 0) -> tuple[np.ndarray, int]:
+    """
+    Betweenness estimate from `samples` random source nodes (exact when samples >= node count),
+    normalized to [0, 1] like networkx's undirected betweenness. Returns (scores, sources used).
+    """
+    n = snap.node_count
+    if n < 3 or samples <= 0:
+        return np.zeros(n), 0
+    indptr, nbr = _simple_adjacency(snap)
+    candidates = np.flatnonzero(np.diff(indptr) > 0)
+    if samples >= candidates.size:
+        sources = candidates
+    else:
+        sources = np.random.default_rng(seed).choice(candidates, size=samples, replace=False)
+    total = np.zeros(n)
+    for s in sources:
+        total += _dependencies(indptr, nbr, int(s))
+    # Each pair is seen from both ends; scale the sample up to every source with a neighbour
+    # (the rest have no dependencies to add).
+    scale = (candidates.size / max(1, sources.size)) / 2.0
+    return total * scale / ((n - 1) * (n - 2) / 2.0), int(sources.size)
+
+
+def centrality_rows(
+    snap: GraphSnapshot, *, damping: float, tol: float, max_iter: int, samples: int
+) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+    """All metrics for every node of the snapshot, ready for apply_entity_centrality."""
+    timings: dict[str, float] = {}
+    t0 = time.perf_counter()
+    pr, iterations, converged = pagerank(snap, damping=damping, tol=tol, max_iter=max_iter)
+    timings["pagerank"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    degree, weighted = degrees(snap)
+    timings["degree"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    bc, used = betweenness(snap, samples=samples)
+    timings["betweenness"] = time.perf_counter() - t0
+
+    n = snap.node_count
+    # Influence rank is the PageRank order (1 = most influential), ties by entity id for stability.
+    order = np.lexsort((np.asarray(snap.node_ids, dtype=str), -pr))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(1, n + 1)
+    percentile = 1.0 - (rank - 1) / max(1, n - 1)
+    rows = [
+        {
+            "id": snap.node_ids[i],
+            "pagerank": float(pr[i]),
+            "degree": int(degree[i]),
+            "weighted_degree": float(weighted[i]),
+            "betweenness": float(bc[i]),
+            "influence_rank": int(rank[i]),
+            "influence_percentile": float(percentile[i]),
+        }
+        for i in range(n)
+    ]
+    info = {"iterations": iterations, "converged": converged, "samples": used, "timings": timings}
+    return rows, info
+
+
+_lock = asyncio.Lock()
+_task: asyncio.Task | None = None
+_last: CentralityReport | None = None
+_last_error: str | None = None
+
+
+async def compute_centrality() -> CentralityReport:
+    """
+    Batch job: load the full relationships graph, compute PageRank, degree and sampled betweenness
+    in a worker thread, then write them to entities (apply_entity_centrality RPC) and the entities
+    index. Entities that dropped out of the graph are reset to zero. Nothing is computed per request.
+    """
+    global _last, _last_error
+    async with _lock:
+        _last_error = None
+        try:
+            report = await _compute()
+        except Exception as e:
+            _last_error = str(e)
+            raise
+        _last = report
+    return report
+
+
+async def _compute() -> CentralityReport:
+    s = get_settings()
+    sb = db()
+    report = CentralityReport()
+
+    t0 = time.perf_counter()
+    rows: list[dict[str, Any]] = []
+    async for page in stream_rows(SOURCES["relationships"]):
+        rows.extend(page)
+    snap = await anyio.to_thread.run_sync(lambda: apply_rows(None, rows))
+    report.nodes, report.edges = snap.node_count, snap.edge_count
+    report.seconds["load"] = time.perf_counter() - t0
+
+    out, info = await anyio.to_thread.run_sync(
+        lambda: centrality_rows(
+            snap,
+            damping=s.centrality_damping,
+            tol=s.centrality_tolerance,
+            max_iter=s.centrality_max_iterations,
+            samples=s.centrality_betweenness_samples,
+        )
+    )
+    report.pagerank_iterations, report.pagerank_converged = info["iterations"], info["converged"]
+    report.betweenness_samples = info["samples"]
+    report.seconds.update(info["timings"])
+
+    t0 = time.perf_counter()
+    report.computed_at = datetime.now(timezone.utc).isoformat()
+    for i in range(0, len(out), _WRITE_BATCH):
+        chunk = out[i : i + _WRITE_BATCH]
+        report.written += int(await sb.rpc("apply_entity_centrality", {"rows": chunk, "computed_at": report.computed_at}) or 0)
+    cleared = await sb.rpc("clear_stale_centrality", {"computed_at": report.computed_at}) or []
+    report.cleared = len(cleared)
+    report.seconds["write"] = time.perf_counter() - t0
+
+    if s.elastic_cloud_id and s.elastic_api_key:
+        t0 = time.perf_counter()
+        zero = {k: (None if k == "influence_rank" else 0) for k in CENTRALITY_FIELDS}
+        docs = [(r["id"], {k: r[k] for k in CENTRALITY_FIELDS}) for r in out] + [(r["id"], zero) for r in cleared]
+        async with BulkIndexer(alias_for("entities")) as bulk:
+            await bulk.update_many(docs)
+        report.es = bulk.report.as_dict()
+        report.seconds["es"] = time.perf_counter() - t0
+    bump_search_generation()
+    return report
+
+
+def start_centrality() -> bool:
+    """Run compute_centrality() in the background. Returns False if a run is already in progress here."""
+    global _task
+    if centrality_running():
+        return False
+    _task = asyncio.create_task(compute_centrality())
+    # Failures are kept for centrality_status(); retrieve the exception so asyncio doesn't warn.
+    _task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return True
+
+
+def centrality_running() -> bool:
+    return _lock.locked() or (_task is not None and not _task.done())
+
+
+def centrality_status() -> dict[str, Any]:
+    return {
+        "running": centrality_running(),
+        "last": _last.as_dict() if _last is not None else None,
+        "error": _last_error,
+    }
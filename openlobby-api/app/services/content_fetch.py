@@ -1,34 +1,139 @@
 from __future__ import annotations
 
 import re
+import time
+from dataclasses import dataclass
 from typing import Any
 
 import httpx
 from bs4 import BeautifulSoup
 
 from app.config import get_settings
+from app.services.http_clients import http_client
+from app.services.page_cache import CachedPage, load_page, save_page
+from app.services.parse_executor import run_parse
 
 
 _OG_IMAGE_RE = re.compile(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']', re.I)
 
+_HEADERS = {
+    "user-agent": "OpenLobbyBot/0.1 (hackathon; contact: devnull)",
+    "accept": "text/html,application/xhtml+xml",
+}
+
+# Below this, the page is probably JS-rendered or paywalled; ask the reader service instead.
+_MIN_READABLE_CHARS = 400
+
+
+@dataclass
+class AcquiredDocument:
+    url: str
+    html: str
+    text: str
+    image_url: str | None = None
+    title: str | None = None
+    description: str | None = None
+    origin: str = "network"
+    used_reader: bool = False
+
+
+async def fetch_page(url: str) -> CachedPage:
+    """
+    Download a page once, through the on-disk page cache.
+
+    A recent cached copy is returned as-is; an older one is revalidated with ETag /
+    If-Modified-Since. Falls back to Bright Data Web Unlocker if the direct fetch fails.
+    """
+    s = get_settings()
+    cached = await load_page(url)
+    if cached is not None and cached.is_fresh(s.page_cache_fresh_seconds):
+        cached.origin = "cache"
+        return cached
+
+    headers = {**_HEADERS, **(cached.conditional_headers() if cached is not None else {})}
+    try:
+        async with http_client("web").stream("GET", url, headers=headers) as r:
+            if r.status_code == 304 and cached is not None:
+                cached.fetched_at = time.time()
+                cached.origin = "revalidated"
+                return cached
+            r.raise_for_status()
+            # Hard cap on body size; whatever fits is still good enough for text extraction.
+            body, _ = await _read_capped(r, max_bytes=s.fetch_max_body_bytes)
+            return CachedPage(
+                url=url,
+                html=_decode(body, r),
+                etag=r.headers.get("etag"),
+                last_modified=r.headers.get("last-modified"),
+            )
+    except Exception:
+        pass
+
+    return CachedPage(url=url, html=await _fetch_unlocker(url), origin="unlocker")
+
+
+async def _read_capped(r: httpx.Response, *, max_bytes: int, stop: bytes | None = None) -> tuple[bytes, bool]:
+    """
+    Read a streamed body until `max_bytes` (returns truncated=True) or until the lowercase
+    marker `stop` has been seen. The connection is released as soon as we stop reading.
+    """
+    buf = bytearray()
+    async for chunk in r.aiter_bytes():
+        buf += chunk
+        if stop is not None:
+            # Only rescan the new chunk plus enough overlap to catch a marker split across chunks.
+            window = bytes(buf[-(len(chunk) + len(stop)) :]).lower()
+            if stop in window:
+                return bytes(buf[:max_bytes]), False
+        if len(buf) >= max_bytes:
+            return bytes(buf[:max_bytes]), True
+    return bytes(buf), False
+
+
+def _decode(body: bytes, r: httpx.Response) -> str:
+    return body.decode(r.charset_encoding or "utf-8", errors="replace")
+
+
+async def fetch_head(url: str) -> str:
+    """
+    Stream just the document head: stop at `</head>` or FETCH_HEAD_MAX_BYTES, whichever comes
+    first. Enough for og:image and other metadata without pulling the whole article.
+    """
+    s = get_settings()
+    async with http_client("web").stream("GET", url, headers=_HEADERS) as r:
+        r.raise_for_status()
+        body, _ = await _read_capped(r, max_bytes=s.fetch_head_max_bytes, stop=b"</head>")
+        return _decode(body, r)
+
+
+async def fetch_og_image(url: str) -> str | None:
+    """
+    og:image for a URL: from the page cache if we have it, else from a head-only streamed fetch.
+    Falls back to a full fetch (and Bright Data) only if the direct head request fails.
+    """
+    cached = await load_page(url)
+    if cached is not None:
+        if cached.parsed:
+            return cached.parsed.get("image_url")
+        return await find_og_image(cached.html)
+    try:
+        head = await fetch_head(url)
+    except Exception:
+        head = await fetch_html(url)
+    return await find_og_image(head)
+
 
 async def fetch_html(url: str) -> str:
     """
     Fetch raw HTML. Prefer direct fetch; fall back to Bright Data Web Unlocker if configured.
     """
-    headers = {
-        "user-agent": "OpenLobbyBot/0.1 (hackathon; contact: devnull)",
-        "accept": "text/html,application/xhtml+xml",
-    }
+    page = await fetch_page(url)
+    if page.origin != "cache":
+        await save_page(page)
+    return page.html
 
-    async with httpx.AsyncClient(timeout=25, follow_redirects=True) as client:
-        try:
-            r = await client.get(url, headers=headers)
-            r.raise_for_status()
-            return r.text
-        except Exception:
-            pass
 
+async def _fetch_unlocker(url: str) -> str:
     s = get_settings()
     if not (s.brightdata_web_unlocker_url and s.brightdata_web_unlocker_token):
         raise RuntimeError("Direct fetch failed and Bright Data is not configured.")
@@ -37,17 +142,16 @@ async def fetch_html(url: str) -> str:
     unlock_headers = {"Authorization": f"Bearer {s.brightdata_web_unlocker_token}", "Content-Type": "application/json"}
     payload: dict[str, Any] = {"url": url, "zone": "web_unlocker"}
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        r = await client.post(s.brightdata_web_unlocker_url, headers=unlock_headers, json=payload)
-        r.raise_for_status()
-        data = r.json()
-        # Different Bright Data products return different shapes; accept common keys.
-        if isinstance(data, dict):
-            if "body" in data and isinstance(data["body"], str):
-                return data["body"]
-            if "content" in data and isinstance(data["content"], str):
-                return data["content"]
-        raise RuntimeError("Bright Data response did not contain HTML.")
+    r = await http_client("brightdata").post(s.brightdata_web_unlocker_url, headers=unlock_headers, json=payload)
+    r.raise_for_status()
+    data = r.json()
+    # Different Bright Data products return different shapes; accept common keys.
+    if isinstance(data, dict):
+        if "body" in data and isinstance(data["body"], str):
+            return data["body"]
+        if "content" in data and isinstance(data["content"], str):
+            return data["content"]
+    raise RuntimeError("Bright Data response did not contain HTML.")
 
 
 def extract_og_image(html: str) -> str | None:
@@ -61,25 +165,100 @@ def extract_og_image(html: str) -> str | None:
     return None
 
 
-async def fetch_readable_text(url: str) -> str:
-    """
-    Try Jina Reader first (cheap + often works), fall back to raw HTML text extraction.
-    """
-    reader_url = f"https://r.jina.ai/{url}"
-    async with httpx.AsyncClient(timeout=35, follow_redirects=True) as client:
-        try:
-            r = await client.get(reader_url, headers={"accept": "text/plain"})
-            r.raise_for_status()
-            txt = r.text.strip()
-            if len(txt) > 400:
-                return txt
-        except Exception:
-            pass
+async def find_og_image(html: str) -> str | None:
+    """extract_og_image without blocking the loop: regex in-process, BeautifulSoup in the parse pool."""
+    m = _OG_IMAGE_RE.search(html)
+    if m:
+        return m.group(1).strip()
+    return await run_parse(extract_og_image, html)
+
 
-    html = await fetch_html(url)
+def parse_page(html: str) -> dict[str, Any]:
+    """Derive OG image, title, description and readable text from one parse of the HTML."""
     soup = BeautifulSoup(html, "lxml")
+
+    def meta(*keys: str) -> str | None:
+        for k in keys:
+            tag = soup.find("meta", attrs={"property": k}) or soup.find("meta", attrs={"name": k})
+            if tag and tag.get("content"):
+                return str(tag.get("content")).strip()
+        return None
+
+    m = _OG_IMAGE_RE.search(html)
+    image_url = m.group(1).strip() if m else meta("og:image")
+    title = meta("og:title") or (soup.title.get_text(strip=True) if soup.title else None)
+    description = meta("og:description", "description")
+
     for el in soup(["script", "style", "noscript"]):
         el.decompose()
-    txt = soup.get_text("\n", strip=True)
-    return txt[:20000]
+    text = soup.get_text("\n", strip=True)[:20000]
+    return {"image_url": image_url, "title": title, "description": description, "text": text}
+
+
+async def _fetch_reader_text(url: str) -> str:
+    reader_url = f"https://r.jina.ai/{url}"
+    try:
+        r = await http_client("jina_reader").get(reader_url, headers={"accept": "text/plain"})
+        r.raise_for_status()
+        return r.text.strip()
+    except Exception:
+        return ""
 
+
+async def extract_document(page: CachedPage) -> AcquiredDocument:
+    """
+    Parse a fetched page (reusing the cached parse when the body hasn't changed) and persist it.
+    Only calls the Jina reader when the page itself yields too little text.
+    """
+    parsed_now = not page.parsed
+    if parsed_now:
+        page.parsed = await run_parse(parse_page, page.html)
+    if parsed_now or page.origin != "cache":
+        await save_page(page)
+
+    p = page.parsed
+    doc = AcquiredDocument(
+        url=page.url,
+        html=page.html,
+        text=p.get("text") or "",
+        image_url=p.get("image_url"),
+        title=p.get("title"),
+        description=p.get("description"),
+        origin=page.origin,
+    )
+    if len(doc.text) < _MIN_READABLE_CHARS:
+        txt = await _fetch_reader_text(page.url)
+        if len(txt) > len(doc.text):
+            doc.text = txt[:20000]
+            doc.used_reader = True
+    return doc
+
+
+async def acquire_document(url: str) -> AcquiredDocument:
+    """
+    One download per URL: HTML via fetch_page, then OG image, metadata and readable text from
+    that body. If the page can't be downloaded at all, the reader service is the last resort.
+    """
+    try:
+        page = await fetch_page(url)
+    except Exception:
+        doc = await reader_document(url)
+        if doc is not None:
+            return doc
+        raise
+    return await extract_document(page)
+
+
+async def reader_document(url: str) -> AcquiredDocument | None:
+    """Text-only document from the Jina reader, for pages we couldn't download ourselves."""
+    txt = await _fetch_reader_text(url)
+    if len(txt) <= _MIN_READABLE_CHARS:
+        return None
+    return AcquiredDocument(url=url, html="", text=txt[:20000], origin="reader", used_reader=True)
+
+
+async def fetch_readable_text(url: str) -> str:
+    """
+    Readable text for a URL (see acquire_document).
+    """
+    return (await acquire_document(url)).text
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from typing import Any
+
+from app.services.elasticsearch_client import es
+
+
+# Paged endpoints return the next page's token in this response header (absent on the last page).
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+PIT_KEEP_ALIVE = "2m"
+
+
+class CursorError(ValueError):
+    pass
+
+
+def fingerprint(*parts: Any) -> str:
+    """Ties a cursor to the query that produced it, so it can't be replayed against another one."""
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(state: dict[str, Any]) -> str:
+    raw = json.dumps({"v": 1, **state}, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, *, fp: str, after_len: int | None = None) -> dict[str, Any]:
+    """
+    Cursors are unsigned, so everything in one is client input. Besides version and fingerprint,
+    `after` (a keyset position or search_after values) must be a list of scalars, of exactly
+    `after_len` values when given; `pit` must be a string.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        state = json.loads(raw)
+    except (ValueError, TypeError):
+        raise CursorError("Malformed cursor.")
+    if not isinstance(state, dict) or state.get("v") != 1:
+        raise CursorError("Unsupported cursor version.")
+    if state.get("fp") != fp:
+        raise CursorError("Cursor does not match this query.")
+    after = state.get("after")
+    if after is not None:
+        if not isinstance(after, list) or not all(v is None or isinstance(v, (str, int, float)) for v in after):
+            raise CursorError("Malformed cursor.")
+        if after_len is not None and len(after) != after_len:
+            raise CursorError("Malformed cursor.")
+    if not isinstance(state.get("pit", ""), str):
+        raise CursorError("Malformed cursor.")
+    return state
+
+
+async def pit_page(
+    indices: list[str],
+    *,
+    query: dict[str, Any],
+    size: int,
+    state: dict[str, Any] | None,
+    source: bool = True,
+    tiebreak: list[dict[str, Any]] | None = None,
+) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+    """
+    One page of a point-in-time search sorted by relevance (then `tiebreak` sorts, then
+    _shard_doc), so paging is stable even while ingest writes or an alias swaps. Returns (hits, next state or None when
+    exhausted); the PIT is closed on the last page and otherwise expires after PIT_KEEP_ALIVE.
+    """
+    client = es()
+    pit_id = (state or {}).get("pit")
+    if not pit_id:
+        pit_id = (await client.open_point_in_time(index=",".join(indices), keep_alive=PIT_KEEP_ALIVE))["id"]
+    kwargs: dict[str, Any] = {
+        "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+        "size": size,
+        "query": query,
+        "sort": [{"_score": "desc"}, *(tiebreak or []), {"_shard_doc": "desc"}],
+        "track_total_hits": False,
+        "source": source,
+    }
+    if state and state.get("after"):
+        kwargs["search_after"] = state["after"]
+    resp = await client.search(**kwargs)
+    hits = (resp.get("hits") or {}).get("hits") or []
+    pit_id = resp.get("pit_id") or pit_id
+    if len(hits) < size:
+        try:
+            await client.close_point_in_time(id=pit_id)
+        except Exception:
+            pass
+        return hits, None
+    return hits, {"pit": pit_id, "after": hits[-1].get("sort")}
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import httpx
+
+from app.config import get_settings
+from app.services.http_clients import http_client
+
+
+class DbError(Exception):
+    """A PostgREST error response. `code` is the Postgres/PostgREST code (e.g. 23505)."""
+
+    def __init__(self, status: int, payload: Any):
+        body = payload if isinstance(payload, dict) else {}
+        self.status = status
+        self.code = body.get("code")
+        self.details = body.get("details")
+        super().__init__(body.get("message") or f"PostgREST request failed ({status}): {str(payload)[:300]}")
+
+
+def _text(v: Any) -> str:
+    return str(v).lower() if isinstance(v, bool) else str(v)
+
+
+def _quote(v: Any) -> str:
+    # PostgREST list/filter values: quote anything with reserved characters.
+    s = _text(v)
+    if any(c in s for c in ',()"\\:') or s != s.strip():
+        return '"' + s.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return s
+
+
+class Query:
+    """
+    Async PostgREST request builder. Mirrors the subset of the supabase-py chain the app uses
+    (select/eq/in_/or_/order/limit/insert/upsert/update/delete), but `execute()` is awaited on
+    the shared pooled HTTP client instead of blocking the event loop, and returns the rows.
+    """
+
+    def __init__(self, db: "AsyncDb", table: str):
+        self._db = db
+        self._table = table
+        self._method = "GET"
+        self._params: list[tuple[str, str]] = []
+        self._prefer: list[str] = []
+        self._body: Any = None
+
+    def select(self, columns: str = "*") -> "Query":
+        self._params.append(("select", "".join(columns.split())))
+        return self
+
+    def _filter(self, column: str, op: str, value: Any) -> "Query":
+        self._params.append((column, f"{op}.{_text(value)}"))
+        return self
+
+    def eq(self, column: str, value: Any) -> "Query":
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any) -> "Query":
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any) -> "Query":
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any) -> "Query":
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any) -> "Query":
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any) -> "Query":
+        return self._filter(column, "lte", value)
+
+    def ilike(self, column: str, pattern: str) -> "Query":
+        return self._filter(column, "ilike", pattern)
+
+    def is_(self, column: str, value: str) -> "Query":
+        return self._filter(column, "is", value)
+
+    def in_(self, column: str, values: list[Any]) -> "Query":
+        return self._filter(column, "in", "(" + ",".join(_quote(v) for v in values) + ")")
+
+    def or_(self, filters: str) -> "Query":
+        self._params.append(("or", f"({filters})"))
+        return self
+
+    def after(self, columns: tuple[str, str], values: tuple[Any, Any], *, desc: bool = True) -> "Query":
+        """Keyset predicate: rows strictly after `values` in (a, b) order (pair with the same .order())."""
+        op = "lt" if desc else "gt"
+        (a, b), (va, vb) = columns, (_quote(v) for v in values)
+        return self.or_(f"{a}.{op}.{va},and({a}.eq.{va},{b}.{op}.{vb})")
+
+    def order(self, column: str, *, desc: bool = False, nullsfirst: bool | None = None) -> "Query":
+        spec = f"{column}.{'desc' if desc else 'asc'}"
+        if nullsfirst is not None:
+            spec += ".nullsfirst" if nullsfirst else ".nullslast"
+        existing = [i for i, (k, _) in enumerate(self._params) if k == "order"]
+        if existing:
+            k, v = self._params[existing[0]]
+            self._params[existing[0]] = (k, f"{v},{spec}")
+        else:
+            self._params.append(("order", spec))
+        return self
+
+    def limit(self, n: int) -> "Query":
+        self._params.append(("limit", str(int(n))))
+        return self
+
+    def range(self, start: int, end: int) -> "Query":
+        self._params.append(("offset", str(int(start))))
+        self._params.append(("limit", str(int(end) - int(start) + 1)))
+        return self
+
+    def insert(self, rows: dict[str, Any] | list[dict[str, Any]]) -> "Query":
+        self._method = "POST"
+        self._body = rows
+        self._prefer.append("return=representation")
+        return self
+
+    def upsert(self, rows: dict[str, Any] | list[dict[str, Any]], *, on_conflict: str | None = None) -> "Query":
+        self.insert(rows)
+        self._prefer.append("resolution=merge-duplicates")
+        if on_conflict:
+            self._params.append(("on_conflict", on_conflict))
+        return self
+
+    def update(self, fields: dict[str, Any]) -> "Query":
+        self._method = "PATCH"
+        self._body = fields
+        self._prefer.append("return=representation")
+        return self
+
+    def delete(self) -> "Query":
+        self._method = "DELETE"
+        return self
+
+    async def execute(self) -> list[dict[str, Any]]:
+        headers: dict[str, str] = {}
+        if self._prefer:
+            headers["prefer"] = ",".join(self._prefer)
+        data = await self._db.request(self._method, f"/{self._table}", params=self._params, json_body=self._body, headers=headers)
+        if data is None:
+            return []
+        return data if isinstance(data, list) else [data]
+
+    async def count(self) -> int:
+        """Exact number of rows matching the filters (a HEAD request; PostgREST puts it in Content-Range)."""
+        params = [(k, v) for k, v in self._params if k not in ("select", "limit", "offset", "order")]
+        r = await self._db.send("HEAD", f"/{self._table}", params=params, headers={"prefer": "count=exact"})
+        total = r.headers.get("content-range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else 0
+
+
+class AsyncDb:
+    """
+    Non-blocking access to the Supabase tables over PostgREST, on the pooled `supabase`
+    upstream client (keep-alive/HTTP/2, see http_clients). Uses the service role key, so like
+    supabase_admin() it bypasses RLS; callers scope user rows by user_id themselves.
+    """
+
+    def __init__(self, url: str, key: str):
+        self.base = f"{url.rstrip('/')}/rest/v1"
+        self._auth = {"apikey": key, "authorization": f"Bearer {key}"}
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
+
+    async def rpc(self, fn: str, params: dict[str, Any] | None = None, *, select: str | None = None) -> Any:
+        """Call a Postgres function; `select` projects the columns of a table-returning one."""
+        return await self.request(
+            "POST", f"/rpc/{fn}", params=[("select", select)] if select else None, json_body=params or {}
+        )
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: list[tuple[str, str]] | None = None,
+        json_body: Any = None,
+        headers: dict[str, str] | None = None,
+    ) -> Any:
+        r = await self.send(method, path, params=params, json_body=json_body, headers=headers)
+        if r.status_code == 204 or not r.content:
+            return None
+        try:
+            return r.json()
+        except ValueError as e:
+            raise DbError(r.status_code, f"Invalid JSON from PostgREST: {e}")
+
+    async def send(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: list[tuple[str, str]] | None = None,
+        json_body: Any = None,
+        headers: dict[str, str] | None = None,
+    ) -> httpx.Response:
+        """The raw response (for headers such as Content-Range); raises DbError on an error status."""
+        r = await http_client("supabase").request(
+            method,
+            self.base + path,
+            params=params,
+            content=json.dumps(json_body, default=str) if json_body is not None else None,
+            headers={**self._auth, "content-type": "application/json", "accept": "application/json", **(headers or {})},
+        )
+        if r.status_code >= 400:
+            try:
+                payload = r.json()
+            except ValueError:
+                payload = r.text
+            raise DbError(r.status_code, payload)
+        return r
+
+
+_db: AsyncDb | None = None
+
+
+def db() -> AsyncDb:
+    global _db
+    if _db is None:
+        s = get_settings()
+        if not (s.supabase_url and s.supabase_service_role_key):
+            raise RuntimeError("Supabase is not configured (SUPABASE_URL/SUPABASE_SERVICE_ROLE_KEY).")
+        _db = AsyncDb(s.supabase_url, s.supabase_service_role_key)
+    return _db
+
@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-import os
-
 from elasticsearch import AsyncElasticsearch
 
 from app.config import get_settings
@@ -20,34 +18,9 @@ def es() -> AsyncElasticsearch:
     return _es
 
 
-async def ensure_indices():
-    """Create minimal indices if they don't exist. Safe to call on startup/ingest."""
-    s = get_settings()
-    client = es()
-
-    if not await client.indices.exists(index=s.elastic_index_documents):
-        await client.indices.create(
-            index=s.elastic_index_documents,
-            mappings={
-                "properties": {
-                    "id": {"type": "keyword"},
-                    "type": {"type": "keyword"},
-                    "title": {"type": "text"},
-                    "url": {"type": "keyword"},
-                    "source": {"type": "keyword"},
-                    "published_at": {"type": "date"},
-                    "excerpt": {"type": "text"},
-                    "content": {"type": "text"},
-                    "image_url": {"type": "keyword"},
-                    "tags": {"type": "keyword"},
-                    "entities_mentioned": {"type": "keyword"},
-                    "embedding": {
-                        "type": "dense_vector",
-                        "dims": s.jina_dims,
-                        "index": True,
-                        "similarity": "cosine",
-                    },
-                    "last_updated": {"type": "date"},
-                }
-            },
-        )
+async def close_es():
+    global _es
+    if _es is not None:
+        client, _es = _es, None
+        await client.close()
+
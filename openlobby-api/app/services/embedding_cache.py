@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import hashlib
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Protocol
+
+import anyio
+
+from app.config import get_settings
+
+
+def cache_key(text: str, *, model: str, task: str, dims: int) -> str:
+    h = hashlib.sha256()
+    h.update(f"{model}\x1f{task}\x1f{dims}\x1f".encode("utf-8"))
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class _Backend(Protocol):
+    # Methods may also be coroutines (PostgresBackend); sync ones run in a worker thread.
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]: ...
+
+    def put_many(self, items: dict[str, list[float]]) -> None: ...
+
+    def size(self) -> int: ...
+
+
+_RECOUNT_PUTS = 100
+
+
+class SqliteBackend:
+    """Local file cache. Vectors are stored as float32 blobs; LRU by last_used."""
+
+    def __init__(self, path: str, *, max_entries: int):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute(
+            "create table if not exists embedding_cache ("
+            " key text primary key, vector blob not null, last_used real not null)"
+        )
+        self._db.execute("create index if not exists embedding_cache_last_used_idx on embedding_cache(last_used)")
+        self._db.commit()
+        # Running row count, so a put doesn't scan the table. Recounted every _RECOUNT_PUTS puts and
+        # on size(), which also picks up rows other processes sharing the file added.
+        self._entries = self._count()
+        self._puts = 0
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        if not keys:
+            return {}
+        out: dict[str, list[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, blob in self._db.execute(
+                    f"select key, vector from embedding_cache where key in ({marks})", chunk
+                ):
+                    out[key] = array("f", blob).tolist()
+            if out:
+                now = time.time()
+                self._db.executemany("update embedding_cache set last_used = ? where key = ?", [(now, k) for k in out])
+                self._db.commit()
+        return out
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        keys = list(items)
+        with self._lock:
+            known = 0
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                sql = f"select count(*) from embedding_cache where key in ({marks})"
+                known += self._db.execute(sql, chunk).fetchone()[0]
+            self._db.executemany(
+                "insert or replace into embedding_cache(key, vector, last_used) values (?, ?, ?)",
+                [(k, array("f", v).tobytes(), now) for k, v in items.items()],
+            )
+            self._puts += 1
+            if self._puts % _RECOUNT_PUTS == 0:
+                self._entries = self._count()
+            else:
+                self._entries += len(keys) - known
+            over = self._entries - self.max_entries
+            if over > 0:
+                deleted = self._db.execute(
+                    "delete from embedding_cache where key in"
+                    " (select key from embedding_cache order by last_used asc limit ?)",
+                    (over,),
+                ).rowcount
+                self._entries -= max(0, deleted)
+            self._db.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            self._entries = self._count()
+            return self._entries
+
+    def _count(self) -> int:
+        return int(self._db.execute("select count(*) from embedding_cache").fetchone()[0])
+
+
+class PostgresBackend:
+    """
+    Shared cache in the `embedding_cache` table (see supabase/migrations), so every worker and
+    cron run reads the same entries. Eviction runs in the database via embedding_cache_evict().
+    Async: it goes through the pooled PostgREST client (app.services.db) on the event loop.
+    """
+
+    def __init__(self, *, max_entries: int):
+        from app.services.db import db
+
+        self.max_entries = max_entries
+        self._db = db()
+        self._puts = 0
+
+    async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        if not keys:
+            return {}
+        out: dict[str, list[float]] = {}
+        for i in range(0, len(keys), 200):
+            chunk = keys[i : i + 200]
+            rows = await self._db.table("embedding_cache").select("key,vector").in_("key", chunk).execute()
+            for r in rows:
+                out[r["key"]] = [float(x) for x in r["vector"]]
+        if out:
+            now = datetime.now(timezone.utc).isoformat()
+            await self._db.table("embedding_cache").update({"last_used_at": now}).in_("key", list(out)).execute()
+        return out
+
+    async def put_many(self, items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [{"key": k, "vector": v, "last_used_at": now} for k, v in items.items()]
+        await self._db.table("embedding_cache").upsert(rows).execute()
+        # Evicting is a full-table ordered delete; amortize it over several writes.
+        self._puts += 1
+        if self._puts % 10 == 1:
+            await self._db.rpc("embedding_cache_evict", {"max_entries": self.max_entries})
+
+    async def size(self) -> int:
+        return await self._db.table("embedding_cache").count()
+
+
+async def _call(fn, *args):
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args)
+    return await anyio.to_thread.run_sync(fn, *args)
+
+
+@dataclass
+class EmbeddingCache:
+    backend: _Backend
+    hits: int = 0
+    misses: int = 0
+    errors: int = 0
+
+    async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        try:
+            found = await _call(self.backend.get_many, keys)
+        except Exception:
+            # A broken cache must never break embedding; treat it as all-miss.
+            self.errors += 1
+            found = {}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, items: dict[str, list[float]]):
+        try:
+            await _call(self.backend.put_many, items)
+        except Exception:
+            self.errors += 1
+
+    async def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        try:
+            size = await _call(self.backend.size)
+        except Exception:
+            size = None
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+
+_cache: EmbeddingCache | None = None
+_cache_init = False
+
+
+def embedding_cache() -> EmbeddingCache | None:
+    """Configured cache (EMBEDDING_CACHE_BACKEND=sqlite|postgres|off), or None when disabled."""
+    global _cache, _cache_init
+    if _cache_init:
+        return _cache
+    _cache_init = True
+
+    s = get_settings()
+    kind = (s.embedding_cache_backend or "").strip().lower()
+    try:
+        if kind == "sqlite":
+            _cache = EmbeddingCache(SqliteBackend(s.embedding_cache_path, max_entries=s.embedding_cache_max_entries))
+        elif kind == "postgres":
+            _cache = EmbeddingCache(PostgresBackend(max_entries=s.embedding_cache_max_entries))
+    except Exception:
+        _cache = None
+    return _cache
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import math
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Any
+
+import anyio
+
+from app.config import get_settings
+from app.services.db import db
+from app.services.index_manager import SOURCES, stream_rows
+
+# Prefixes matching more keys than this get their top results precomputed at build time, so no
+# lookup scans more than _HEAVY keys.
+_HEAVY = 512
+_TOP = 20
+# Multi-word queries check at most this many entries of their rarest word's range.
+_SCAN = 4096
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Casefolded, accent-stripped, punctuation collapsed to single spaces ("Pelosi, Nancy" -> "pelosi nancy")."""
+    t = unicodedata.normalize("NFKD", text or "")
+    t = "".join(c for c in t if not unicodedata.combining(c)).casefold()
+    return _NON_WORD.sub(" ", t).strip()
+
+
+def weight(row: dict[str, Any]) -> float:
+    # Money spans orders of magnitude; log keeps a $1B PAC from burying every exact-name match.
+    total = float(row.get("total_lobbying") or 0) + float(row.get("total_donations") or 0)
+    return math.log1p(max(0.0, total))
+
+
+class SuggestIndex:
+    """
+    Immutable prefix index over entity names: a sorted array of keys (the normalized name and each
+    word-start suffix of it, so "war" finds "Elizabeth Warren") with a parallel array of entry
+    positions. A lookup is two bisects plus a top-k over the matching range; prefixes whose range
+    is large ("a", "john ") answer from top-k lists precomputed per prefix and entity type.
+    """
+
+    def __init__(self, entries: list[tuple[str, str, str, float]]):
+        self.ids = [e[0] for e in entries]
+        self.names = [e[1] for e in entries]
+        self.types = [e[2] for e in entries]
+        self.weights = [e[3] for e in entries]
+        self.norms = [normalize(e[1]) for e in entries]
+
+        pairs: list[tuple[str, int]] = []
+        for i, norm in enumerate(self.norms):
+            words = norm.split(" ")
+            for w in range(len(words)):
+                pairs.append((" ".join(words[w:]), i))
+        pairs.sort()
+        self.keys = [k for k, _ in pairs]
+        self.pos = [i for _, i in pairs]
+
+        # (prefix, type or None) -> best entries, for every prefix with more than _HEAVY keys.
+        self.heavy: dict[tuple[str, str | None], list[int]] = {}
+        stack = [(0, len(self.keys), 0)]
+        while stack:
+            lo, hi, n = stack.pop()
+            start = lo
+            while start < hi:
+                key = self.keys[start]
+                if len(key) <= n:
+                    start += 1
+                    continue
+                prefix = key[: n + 1]
+                end = bisect_left(self.keys, prefix + "\uffff", start, hi)
+                if end - start > _HEAVY:
+                    self._precompute(prefix, start, end)
+                    stack.append((start, end, n + 1))
+                start = end
+
+    def _precompute(self, prefix: str, lo: int, hi: int):
+        scored = {i: self._score(i, prefix) for i in (self.pos[j] for j in range(lo, hi))}
+        self.heavy[(prefix, None)] = heapq.nlargest(_TOP, scored, key=scored.__getitem__)
+        by_type: dict[str, list[int]] = {}
+        for i in scored:
+            by_type.setdefault(self.types[i], []).append(i)
+        for t, ids in by_type.items():
+            self.heavy[(prefix, t)] = heapq.nlargest(_TOP, ids, key=scored.__getitem__)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _range(self, prefix: str) -> range:
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        return range(lo, hi)
+
+    def _matches(self, prefix: str, entity_type: str | None) -> list[int]:
+        top = self.heavy.get((prefix, entity_type))
+        if top is not None:
+            return top
+        if (prefix, None) in self.heavy:
+            return []  # heavy prefix with no entity of this type
+        return [i for i in (self.pos[j] for j in self._range(prefix)) if not entity_type or self.types[i] == entity_type]
+
+    def _score(self, i: int, q: str) -> float:
+        # Names that start with the query outrank mid-name matches of similar weight.
+        return self.weights[i] + (2.0 if self.norms[i].startswith(q) else 0.0)
+
+    def suggest(self, text: str, *, limit: int = 10, entity_type: str | None = None) -> list[dict[str, Any]]:
+        q = normalize(text)
+        if not q:
+            return []
+        limit = min(limit, _TOP)
+        cands = set(self._matches(q, entity_type))
+        tokens = q.split(" ")
+        if len(tokens) > 1:
+            # "eliz war": every token must start some word of the name, in any order. Scan the
+            # rarest token's range (bounded by _SCAN) and check the rest.
+            rare = min((self._range(t) for t in tokens), key=len)
+            scan = [self.pos[j] for j in rare[:_SCAN]]
+            # Past the cap, the heaviest entries for each word still get checked.
+            for t in tokens:
+                scan.extend(self.heavy.get((t, entity_type), ()))
+            for i in scan:
+                if entity_type and self.types[i] != entity_type:
+                    continue
+                words = self.norms[i].split(" ")
+                if all(any(w.startswith(t) for w in words) for t in tokens):
+                    cands.add(i)
+        best = heapq.nlargest(limit, cands, key=lambda i: self._score(i, q))
+        return [
+            {"id": self.ids[i], "type": self.types[i], "name": self.names[i], "score": round(self._score(i, q), 4)}
+            for i in best
+        ]
+
+
+_entries: dict[str, tuple[str, str, str, float]] = {}
+_index: SuggestIndex | None = None
+_watermark: str | None = None
+_lock = asyncio.Lock()
+_task: asyncio.Task | None = None
+_last_refresh = 0.0
+_last_full = 0.0
+_stats: dict[str, Any] = {}
+
+
+def suggest_index() -> SuggestIndex | None:
+    return _index
+
+
+async def refresh_suggest(*, full: bool = False) -> dict[str, Any]:
+    """
+    Pull entities changed since the watermark (last_updated) and swap in a rebuilt index. The
+    build runs in a worker thread and readers keep the old snapshot until the swap. A periodic
+    full reload drops deleted entities, which an incremental pass can't see.
+    """
+    global _index, _watermark, _last_refresh, _last_full
+    s = get_settings()
+    async with _lock:
+        if _index is None or time.monotonic() - _last_full >= s.suggest_full_refresh_seconds:
+            full = True
+        started = time.perf_counter()
+        since = None if full else _watermark
+        entries = {} if full else dict(_entries)
+        mark = _watermark if not full else None
+        changed = 0
+        async for rows in stream_rows(SOURCES["entities"], since=since):
+            for r in rows:
+                entry = (r["id"], r["name"], r.get("type") or "", weight(r)) if r.get("name") else None
+                # `since` is inclusive, so rows at the watermark come back every pass; only real changes count.
+                if entry is not None and entries.get(r["id"]) != entry:
+                    entries[r["id"]] = entry
+                    changed += 1
+                if r.get("last_updated") and (mark is None or r["last_updated"] > mark):
+                    mark = r["last_updated"]
+        built_ms = None
+        if full or changed:
+            t0 = time.perf_counter()
+            idx = await anyio.to_thread.run_sync(lambda: SuggestIndex(list(entries.values())))
+            built_ms = round((time.perf_counter() - t0) * 1000, 1)
+            _entries.clear()
+            _entries.update(entries)
+            _index = idx
+        _watermark = mark
+        _last_refresh = time.monotonic()
+        if full:
+            _last_full = _last_refresh
+        _stats.update(
+            {
+                "entities": len(_entries),
+                "keys": len(_index.keys) if _index is not None else 0,
+                "watermark": _watermark,
+                "last_refresh_full": full,
+                "last_refresh_changed": changed,
+                "last_build_ms": built_ms if built_ms is not None else _stats.get("last_build_ms"),
+                "last_refresh_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        )
+    return dict(_stats)
+
+
+def maybe_refresh_suggest():
+    """Non-blocking: schedule a refresh when the index is missing or older than suggest_refresh_seconds."""
+    global _task, _last_refresh
+    if _index is not None and time.monotonic() - _last_refresh < get_settings().suggest_refresh_seconds:
+        return
+    if _task is not None and not _task.done():
+        return
+    try:
+        db()
+    except RuntimeError:
+        return
+    _last_refresh = time.monotonic()
+    _task = asyncio.create_task(refresh_suggest())
+    _task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def suggest_stats() -> dict[str, Any]:
+    return {"ready": _index is not None, "refreshing": _task is not None and not _task.done(), **_stats}
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from elasticsearch.helpers import async_streaming_bulk
+
+from app.config import get_settings
+from app.services.elasticsearch_client import es
+
+
+# Item statuses worth retrying; everything else (mapping errors, bad ids) fails permanently.
+_RETRYABLE = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class BulkReport:
+    index: str
+    indexed: int = 0
+    failed: int = 0
+    retried: int = 0
+    requests: int = 0
+    bytes: int = 0
+    retried_bytes: int = 0
+    seconds: float = 0.0
+    refreshed: bool = False
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "index": self.index,
+            "indexed": self.indexed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "retried_bytes": self.retried_bytes,
+            "seconds": round(self.seconds, 3),
+            "docs_per_second": round(self.indexed / self.seconds, 2) if self.seconds > 0 else None,
+            "refreshed": self.refreshed,
+            "errors": self.errors[:5],
+        }
+
+    def add(self, other: BulkReport) -> BulkReport:
+        """Fold another run's counts into this one (e.g. a rebuild's load and catch-up passes)."""
+        self.indexed += other.indexed
+        self.failed += other.failed
+        self.retried += other.retried
+        self.requests += other.requests
+        self.bytes += other.bytes
+        self.retried_bytes += other.retried_bytes
+        self.seconds += other.seconds
+        self.refreshed = self.refreshed or other.refreshed
+        self.errors.extend(other.errors[: max(0, 5 - len(self.errors))])
+        return self
+
+
+class BulkIndexer:
+    """
+    Writes documents to one index with the bulk API.
+
+    Documents are packed into requests by serialized size (ES_BULK_MAX_BYTES / ES_BULK_MAX_DOCS),
+    several requests run in parallel, and items that fail with a retryable status are resent on
+    their own. Use as an async context manager: refresh is paused for the run (optional) and the
+    index is refreshed once on exit instead of per write.
+
+        async with BulkIndexer(s.elastic_index_documents) as bulk:
+            await bulk.index_many([(doc_id, body), ...])
+        bulk.report.as_dict()
+    """
+
+    def __init__(self, index: str, *, pause_refresh: bool = False):
+        s = get_settings()
+        self.index = index
+        self.pause_refresh = pause_refresh
+        self.max_bytes = max(1024, s.es_bulk_max_bytes)
+        self.max_docs = max(1, s.es_bulk_max_docs)
+        self.retries = max(0, s.es_bulk_retries)
+        self.report = BulkReport(index=index)
+        self._sem = asyncio.Semaphore(max(1, s.es_bulk_concurrency))
+        self._started = 0.0
+        self._prev_refresh: str | None = None
+
+    async def __aenter__(self) -> BulkIndexer:
+        self._started = time.perf_counter()
+        if self.pause_refresh:
+            client = es()
+            settings = await client.indices.get_settings(index=self.index, name="index.refresh_interval")
+            self._prev_refresh = (
+                next(iter(settings.values()), {}).get("settings", {}).get("index", {}).get("refresh_interval")
+            )
+            await client.indices.put_settings(index=self.index, settings={"index": {"refresh_interval": "-1"}})
+        return self
+
+    async def __aexit__(self, *exc: Any):
+        client = es()
+        try:
+            if self.pause_refresh:
+                await client.indices.put_settings(
+                    index=self.index, settings={"index": {"refresh_interval": self._prev_refresh}}
+                )
+            if self.report.indexed:
+                await client.indices.refresh(index=self.index)
+                self.report.refreshed = True
+        finally:
+            self.report.seconds = time.perf_counter() - self._started
+
+    async def index_many(self, docs: list[tuple[str, dict[str, Any]]]):
+        pending = [{"_op_type": "index", "_index": self.index, "_id": doc_id, "_source": body} for doc_id, body in docs]
+        for attempt in range(self.retries + 1):
+            if not pending:
+                return
+            if attempt:
+                self.report.retried += len(pending)
+                await asyncio.sleep(min(10.0, 0.5 * (2 ** (attempt - 1))))
+            results = await asyncio.gather(*(self._send(chunk, n, resend=attempt > 0) for chunk, n in self._chunks(pending)))
+            pending = [a for retry in results for a in retry]
+        self.report.failed += len(pending)
+
+    async def update_many(self, docs: list[tuple[str, dict[str, Any]]]):
+        """Partial updates (`doc` merged into the stored source); ids missing from the index fail without retry."""
+        pending = [{"_op_type": "update", "_index": self.index, "_id": doc_id, "doc": body} for doc_id, body in docs]
+        for attempt in range(self.retries + 1):
+            if not pending:
+                return
+            if attempt:
+                self.report.retried += len(pending)
+                await asyncio.sleep(min(10.0, 0.5 * (2 ** (attempt - 1))))
+            results = await asyncio.gather(*(self._send(chunk, n, resend=attempt > 0) for chunk, n in self._chunks(pending)))
+            pending = [a for retry in results for a in retry]
+        self.report.failed += len(pending)
+
+    def _chunks(self, actions: list[dict[str, Any]]) -> list[tuple[list[dict[str, Any]], int]]:
+        """Actions packed into requests, each with its approximate payload size."""
+        chunks: list[tuple[list[dict[str, Any]], int]] = []
+        cur: list[dict[str, Any]] = []
+        cur_bytes = 0
+        for a in actions:
+            # Serialized source (or partial doc) plus room for the action line.
+            n = len(json.dumps(a["_source"] if "_source" in a else a["doc"], default=str)) + 64
+            if cur and (len(cur) >= self.max_docs or cur_bytes + n > self.max_bytes):
+                chunks.append((cur, cur_bytes))
+                cur, cur_bytes = [], 0
+            cur.append(a)
+            cur_bytes += n
+        if cur:
+            chunks.append((cur, cur_bytes))
+        return chunks
+
+    async def _send(self, chunk: list[dict[str, Any]], nbytes: int, *, resend: bool = False) -> list[dict[str, Any]]:
+        """Send one bulk request; return the actions that should be retried."""
+        by_id = {a["_id"]: a for a in chunk}
+        retry: list[dict[str, Any]] = []
+        async with self._sem:
+            self.report.requests += 1
+            # Counted as the request goes out; resent items go to retried_bytes so `bytes` is the payload once.
+            if resend:
+                self.report.retried_bytes += nbytes
+            else:
+                self.report.bytes += nbytes
+            try:
+                async for ok, item in async_streaming_bulk(
+                    es(),
+                    chunk,
+                    chunk_size=len(chunk),
+                    max_chunk_bytes=self.max_bytes * 2,
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                ):
+                    info = next(iter(item.values()), {})
+                    if ok:
+                        self.report.indexed += 1
+                        continue
+                    status = int(info.get("status") or 0)
+                    action = by_id.get(str(info.get("_id")))
+                    if status in _RETRYABLE and action is not None:
+                        retry.append(action)
+                    else:
+                        self.report.failed += 1
+                        if len(self.report.errors) < 5:
+                            self.report.errors.append({"id": info.get("_id"), "status": status, "error": info.get("error")})
+            except Exception:
+                # Transport-level failure: the whole request is retryable.
+                return chunk
+        return retry
+
+
+async def bulk_index(index: str, docs: list[tuple[str, dict[str, Any]]], *, pause_refresh: bool = False) -> BulkReport:
+    async with BulkIndexer(index, pause_refresh=pause_refresh) as bulk:
+        await bulk.index_many(docs)
+    return bulk.report
@@ -0,0 +1,693 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import anyio
+import numpy as np
+
+from app.config import get_settings
+from app.services.db import db
+from app.services.index_manager import SOURCES, stream_rows
+
+REL_TYPES = ("donation", "lobbying", "vote", "employment")
+_TYPE_CODES = {t: i for i, t in enumerate(REL_TYPES)}
+# Null markers in the int date (days since epoch), cycle code and last_updated (microseconds
+# since epoch) columns.
+NO_DATE = np.iinfo(np.int32).min
+NO_CYCLE = -1
+NO_TIME = np.iinfo(np.int64).min
+
+# Snapshot loads also read metadata, so edges served from memory match the graph_expand rows.
+_EDGE_SOURCE = replace(SOURCES["relationships"], columns=SOURCES["relationships"].columns + ",metadata")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@dataclass
+class GraphSnapshot:
+    """
+    Immutable relationship graph in CSR form. Edges are rows of parallel typed arrays (endpoint
+    node numbers, type code, amount, date as days since epoch, cycle code); `indptr`/`nbr`/`eid`
+    is the undirected adjacency: node n's incident edges are eid[indptr[n]:indptr[n + 1]], with
+    the node at the other end in nbr at the same positions. Each node's slice is sorted by amount
+    (largest first, ties by edge position); `eid_recent` holds the same slices sorted by date, so
+    a node's top-k edges are the head of its slice. Refreshes build a new snapshot.
+    """
+
+    node_ids: list[str] = field(default_factory=list)
+    node_index: dict[str, int] = field(default_factory=dict)
+    edge_ids: list[str] = field(default_factory=list)
+    edge_index: dict[str, int] = field(default_factory=dict)
+    description: list[str | None] = field(default_factory=list)
+    # Relationship metadata; None stands for {} so the common empty case costs one pointer.
+    metadata: list[dict[str, Any] | None] = field(default_factory=list)
+    cycles: list[str] = field(default_factory=list)
+    src: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    dst: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    etype: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int8))
+    amount: np.ndarray = field(default_factory=lambda: np.zeros(0, np.float64))
+    date: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    cycle: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int16))
+    updated: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int64))
+    indptr: np.ndarray = field(default_factory=lambda: np.zeros(1, np.int64))
+    nbr: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    eid: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    eid_recent: np.ndarray = field(default_factory=lambda: np.zeros(0, np.int32))
+    # Incident edge counts per node and type code (summaries of what a budget left out).
+    type_degree: np.ndarray = field(default_factory=lambda: np.zeros((0, len(REL_TYPES)), np.int32))
+    watermark: str | None = None
+    built_at: float = 0.0
+    # Edge positions are stable across incremental refreshes and renumbered by a full reload;
+    # edge cursors carry this to detect that.
+    layout: int = 0
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_ids)
+
+    def _slices(self, rank: str) -> np.ndarray:
+        return self.eid_recent if rank == "recent" else self.eid
+
+    def rank_key(self, edges: np.ndarray, rank: str) -> np.ndarray:
+        """Sort key of the given edges for `rank` ("amount" or "recent"); missing values are -inf."""
+        if rank == "recent":
+            d = self.date[edges]
+            return np.where(d == NO_DATE, -np.inf, d.astype(np.float64))
+        a = self.amount[edges]
+        return np.where(np.isnan(a), -np.inf, a)
+
+    def neighborhood(
+        self,
+        seed_id: str,
+        *,
+        depth: int,
+        max_edges: int,
+        types: list[str] | None = None,
+        per_node: int = 25,
+        rank: str = "amount",
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Degree-aware bounded BFS from seed_id. Each frontier node contributes at most `per_node`
+        of its not-yet-seen edges of the allowed types, best first by `rank`; if a hop's picks
+        exceed what is left of `max_edges`, the best of them across the hop are kept. Stops after
+        `depth` hops. Returns (node numbers, edge positions); a seed with no edges (or not in the
+        graph) gives two empty arrays.
+        """
+        s = self.node_index.get(seed_id)
+        if s is None:
+            return np.zeros(0, np.int32), np.zeros(0, np.int32)
+        allowed = _allowed(types)
+
+        node_seen = np.zeros(self.node_count, dtype=bool)
+        edge_seen = np.zeros(self.edge_count, dtype=bool)
+        node_seen[s] = True
+        frontier = np.array([s], dtype=np.int64)
+        picked: list[np.ndarray] = []
+        remaining = max_edges
+        for _ in range(depth):
+            if remaining <= 0 or frontier.size == 0:
+                break
+            hop = self._expand(frontier, allowed, edge_seen, per_node=per_node, budget=remaining, rank=rank)
+            if hop.size == 0:
+                break
+            picked.append(hop)
+            remaining -= int(hop.size)
+            nxt = np.unique(np.concatenate([self.src[hop], self.dst[hop]]))
+            frontier = nxt[~node_seen[nxt]]
+            node_seen[frontier] = True
+        edges = np.concatenate(picked) if picked else np.zeros(0, np.int32)
+        return np.flatnonzero(node_seen), edges
+
+    def _expand(
+        self, frontier: np.ndarray, allowed: np.ndarray, edge_seen: np.ndarray, *, per_node: int, budget: int, rank: str
+    ) -> np.ndarray:
+        """
+        Top `per_node` unseen edges of allowed types for every frontier node, read from the head of
+        each node's ranked slice a window at a time (the window grows only for nodes whose head was
+        mostly filtered out), so a hub with 100k edges costs about `per_node` reads, not 100k.
+        """
+        eids = self._slices(rank)
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        need = np.full(frontier.size, per_node, dtype=np.int64)
+        offset = np.zeros(frontier.size, dtype=np.int64)
+        window = max(8, 2 * per_node)
+        out: list[np.ndarray] = []
+        while True:
+            a = np.flatnonzero((need > 0) & (offset < counts))
+            if a.size == 0:
+                break
+            take = np.minimum(counts[a] - offset[a], window)
+            grp = np.repeat(np.arange(a.size), take)
+            within = np.arange(int(take.sum())) - np.repeat(np.cumsum(take) - take, take)
+            e = eids[starts[a][grp] + offset[a][grp] + within]
+            ok = allowed[self.etype[e]] & ~edge_seen[e]
+            e, grp = e[ok], grp[ok]
+            # Position of each edge within its node's picks (grp is non-decreasing here).
+            nth = np.arange(e.size) - np.searchsorted(grp, grp, side="left")
+            keep = nth < need[a][grp]
+            e, grp = e[keep], grp[keep]
+            need[a] -= np.bincount(grp, minlength=a.size)
+            out.append(e)
+            offset[a] += take
+            window *= 4
+        hop = np.concatenate(out) if out else np.zeros(0, np.int32)
+        # An edge between two frontier nodes can be in both nodes' picks; keep its first occurrence.
+        _, first = np.unique(hop, return_index=True)
+        hop = hop[np.sort(first)]
+        edge_seen[hop] = True
+        if hop.size > budget:
+            best = np.sort(np.argsort(-self.rank_key(hop, rank), kind="stable")[:budget])
+            dropped = np.ones(hop.size, dtype=bool)
+            dropped[best] = False
+            edge_seen[hop[dropped]] = False
+            hop = hop[best]
+        return hop
+
+    def summarize(self, nodes: np.ndarray, edges: np.ndarray, types: list[str] | None = None) -> list[dict[str, Any]]:
+        """
+        For each returned node whose incident edges (of the allowed types) aren't all in `edges`:
+        its total, how many are shown, and the hidden ones counted by type. `nodes` is sorted.
+        """
+        if nodes.size == 0:
+            return []
+        codes = np.flatnonzero(_allowed(types))
+        degree = self.type_degree[nodes][:, codes]
+        shown = np.zeros_like(degree)
+        col = {c: j for j, c in enumerate(codes)}
+        tcol = np.array([col.get(int(t), -1) for t in range(len(REL_TYPES))])[self.etype[edges]]
+        src, dst = self.src[edges], self.dst[edges]
+        loop = src == dst
+        for endpoint, t in ((src, tcol), (dst[~loop], tcol[~loop])):
+            np.add.at(shown, (np.searchsorted(nodes, endpoint), t), 1)
+        hidden = degree - shown
+        total, visible = degree.sum(axis=1), shown.sum(axis=1)
+        rows = np.flatnonzero(total > visible)
+        names = [REL_TYPES[int(c)] for c in codes]
+        return [
+            {
+                "node_id": self.node_ids[n],
+                "total": t,
+                "shown": v,
+                "hidden": {name: h for name, h in zip(names, hid) if h > 0},
+            }
+            for n, t, v, hid in zip(
+                nodes[rows].tolist(), total[rows].tolist(), visible[rows].tolist(), hidden[rows].tolist()
+            )
+        ]
+
+    def edge_page(
+        self, node_id: str, *, types: list[str] | None, rank: str, limit: int, after: tuple[float, int] | None
+    ) -> tuple[np.ndarray, tuple[float, int] | None, int]:
+        """
+        One page of a node's edges in rank order, after the keyset (key, edge position) of the
+        previous page's last edge. Returns (edge positions, next keyset or None, total edges).
+        """
+        n = self.node_index.get(node_id)
+        if n is None:
+            return np.zeros(0, np.int32), None, 0
+        sl = self._slices(rank)[self.indptr[n] : self.indptr[n + 1]]
+        sl = sl[_allowed(types)[self.etype[sl]]]
+        key = self.rank_key(sl, rank)
+        start = 0
+        if after is not None:
+            later = (key < after[0]) | ((key == after[0]) & (sl > after[1]))
+            start = int(np.argmax(later)) if later.any() else sl.size
+        page = sl[start : start + limit]
+        nxt = None
+        if start + limit < sl.size and page.size:
+            nxt = (float(key[start + page.size - 1]), int(page[-1]))
+        return page, nxt, int(sl.size)
+
+    def paths(
+        self,
+        from_id: str,
+        to_id: str,
+        *,
+        types: list[str] | None = None,
+        max_hops: int = 6,
+        k: int = 1,
+        budget: float = 0.25,
+    ) -> tuple[list[tuple[list[int], list[int]]], bool]:
+        """
+        Up to `k` loopless connections from from_id to to_id of at most `max_hops` edges, followed
+        in either direction: fewest hops first, and among equal hop counts the one whose links carry
+        the most money (edge cost 1 / (1 + log1p(amount)), summed). The first is a bidirectional
+        BFS; alternatives come from Yen's algorithm, which reruns it from each node of the previous
+        path with that path's next link and its root nodes removed, so every alternative differs
+        in its nodes, not just in which of several parallel donations it uses. Stops when `budget`
+        seconds are spent. Returns ([(node numbers, edge positions), ...], timed out).
+        """
+        s, t = self.node_index.get(from_id), self.node_index.get(to_id)
+        if s is None or t is None:
+            return [], False
+        deadline = time.perf_counter() + budget
+        allowed = _allowed(types)
+        found: list[tuple[list[int], list[int]]] = []
+        try:
+            first = self._best_path(s, t, allowed=allowed, max_hops=max_hops, deadline=deadline)
+            if first is None:
+                return [], False
+            found.append(first)
+            seen = {tuple(first[0])}
+            candidates: list[tuple[int, float, int, list[int], list[int]]] = []
+            while len(found) < k:
+                nodes, edges = found[-1]
+                for i in range(len(nodes) - 1):
+                    root = nodes[: i + 1]
+                    # Links the known paths take out of this root; the spur must leave differently.
+                    banned = [
+                        self._pair_edges(p[i], p[i + 1]) for p, _ in found if len(p) > i + 1 and p[: i + 1] == root
+                    ]
+                    spur = self._best_path(
+                        nodes[i],
+                        t,
+                        allowed=allowed,
+                        max_hops=max_hops - i,
+                        deadline=deadline,
+                        banned_nodes=root[:-1],
+                        banned_edges=np.concatenate(banned) if banned else None,
+                    )
+                    if spur is None:
+                        continue
+                    cand_nodes, cand_edges = root[:-1] + spur[0], edges[:i] + spur[1]
+                    if tuple(cand_nodes) in seen:
+                        continue
+                    seen.add(tuple(cand_nodes))
+                    cost = float(_path_cost(self.amount[np.asarray(cand_edges)]).sum())
+                    heapq.heappush(candidates, (len(cand_edges), cost, len(seen), cand_nodes, cand_edges))
+                if not candidates:
+                    break
+                _, _, _, cand_nodes, cand_edges = heapq.heappop(candidates)
+                found.append((cand_nodes, cand_edges))
+        except _OutOfTime:
+            return found, True
+        return found, False
+
+    def _pair_edges(self, u: int, v: int) -> np.ndarray:
+        lo, hi = self.indptr[u], self.indptr[u + 1]
+        return self.eid[lo:hi][self.nbr[lo:hi] == v]
+
+    def _best_path(
+        self,
+        s: int,
+        t: int,
+        *,
+        allowed: np.ndarray,
+        max_hops: int,
+        deadline: float,
+        banned_nodes: list[int] | None = None,
+        banned_edges: np.ndarray | None = None,
+    ) -> tuple[list[int], list[int]] | None:
+        """
+        Bidirectional BFS: each step expands whichever side's frontier has fewer incident edges, so
+        a hub on one end doesn't get expanded while the other side is still cheap. Every node
+        reached keeps its cheapest way back to its side's root (a min over the level's edges), so
+        when the frontiers meet, the best of the meeting nodes gives the cheapest shortest path.
+        """
+        if s == t:
+            return [s], []
+        n = self.node_count
+        degree = np.diff(self.indptr)
+        dist = (np.full(n, -1, np.int32), np.full(n, -1, np.int32))
+        cost = (np.zeros(n), np.zeros(n))
+        pred = (np.full(n, -1, np.int64), np.full(n, -1, np.int64))
+        for d in dist:
+            if banned_nodes:
+                d[banned_nodes] = -2  # never entered by either side
+        dist[0][s], dist[1][t] = 0, 0
+        front = [np.array([s], dtype=np.int64), np.array([t], dtype=np.int64)]
+        depth = [0, 0]
+        while depth[0] + depth[1] < max_hops:
+            if time.perf_counter() > deadline:
+                raise _OutOfTime
+            volume = (int(degree[front[0]].sum()), int(degree[front[1]].sum()))
+            side = 0 if volume[0] <= volume[1] else 1
+            # A hub's level can take longer than the whole budget; don't start one that won't fit.
+            if time.perf_counter() + volume[side] * _SECONDS_PER_EDGE > deadline:
+                raise _OutOfTime
+            owner, other, e = self._incident(front[side], allowed, banned_edges)
+            ds, level = dist[side], depth[side] + 1
+            ds[other[ds[other] == -1]] = level
+            on = ds[other] == level
+            owner, other, e = owner[on], other[on], e[on]
+            if other.size == 0:
+                return None
+            c = cost[side][owner] + _path_cost(self.amount[e])
+            # Cheapest edge into each newly reached node, ties by edge position (ufunc.at, not a sort:
+            # a hub's level can hold millions of edges).
+            cs, ps = cost[side], pred[side]
+            cs[other] = np.inf
+            np.minimum.at(cs, other, c)
+            cheapest = c == cs[other]
+            ps[other] = np.iinfo(np.int64).max
+            np.minimum.at(ps, other[cheapest], e[cheapest].astype(np.int64))
+            reached = np.flatnonzero(ds == level) if other.size > n // 64 else np.unique(other)
+            depth[side], front[side] = level, reached
+            met = reached[dist[1 - side][reached] >= 0]
+            if met.size:
+                hops = level + dist[1 - side][met]
+                met = met[hops == hops.min()]
+                m = int(met[np.argmin(cost[0][met] + cost[1][met])])
+                head, head_edges = self._trace(m, s, pred[0])
+                tail, tail_edges = self._trace(m, t, pred[1])
+                return head[::-1] + tail[1:], head_edges[::-1] + tail_edges
+        return None
+
+    def _incident(
+        self, frontier: np.ndarray, allowed: np.ndarray, banned_edges: np.ndarray | None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(frontier node, node at the other end, edge position) for every allowed incident edge."""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        owner = np.repeat(frontier, counts)
+        pos = np.repeat(starts, counts) + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        other, e = self.nbr[pos].astype(np.int64), self.eid[pos]
+        ok = allowed[self.etype[e]]
+        if banned_edges is not None and banned_edges.size:
+            ok &= ~np.isin(e, banned_edges)
+        return owner[ok], other[ok], e[ok]
+
+    def _trace(self, m: int, root: int, pred: np.ndarray) -> tuple[list[int], list[int]]:
+        """Nodes and edges from m back to root along one side's pred edges."""
+        nodes, edges = [m], []
+        while nodes[-1] != root:
+            e = int(pred[nodes[-1]])
+            edges.append(e)
+            a, b = int(self.src[e]), int(self.dst[e])
+            nodes.append(a if b == nodes[-1] else b)
+        return nodes, edges
+
+    def edge_record(self, i: int) -> dict[str, Any]:
+        amount = float(self.amount[i])
+        d = int(self.date[i])
+        c = int(self.cycle[i])
+        return {
+            "id": self.edge_ids[i],
+            "type": REL_TYPES[int(self.etype[i])],
+            "source_id": self.node_ids[int(self.src[i])],
+            "target_id": self.node_ids[int(self.dst[i])],
+            "amount": None if np.isnan(amount) else amount,
+            "date": None if d == NO_DATE else str(np.datetime64(d, "D")),
+            "cycle": None if c == NO_CYCLE else self.cycles[c],
+            "description": self.description[i],
+            "metadata": self.metadata[i] or {},
+            "last_updated": _time(int(self.updated[i])),
+        }
+
+    def memory(self) -> dict[str, Any]:
+        arrays = sum(
+            a.nbytes
+            for a in (
+                self.src, self.dst, self.etype, self.amount, self.date, self.cycle, self.updated,
+                self.indptr, self.nbr, self.eid, self.eid_recent, self.type_degree,
+            )
+        )
+        # Python-side ids/dicts/descriptions: container sizes plus string payloads.
+        objects = sum(
+            sys.getsizeof(x)
+            for x in (self.node_ids, self.node_index, self.edge_ids, self.edge_index, self.description, self.metadata)
+        )
+        objects += sum(sys.getsizeof(x) for x in self.node_ids) + sum(sys.getsizeof(x) for x in self.edge_ids)
+        objects += sum(sys.getsizeof(x) for x in self.description if x is not None)
+        # Shallow: a metadata dict's own size, not its keys and values.
+        objects += sum(sys.getsizeof(x) for x in self.metadata if x is not None)
+        total = arrays + objects
+        per_m = total / self.edge_count * 1_000_000 if self.edge_count else None
+        return {
+            "array_bytes": arrays,
+            "object_bytes": objects,
+            "total_bytes": total,
+            "bytes_per_million_edges": int(per_m) if per_m is not None else None,
+        }
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+# Conservative cost of one frontier edge in a path-search level, for the budget check.
+_SECONDS_PER_EDGE = 1e-7
+
+
+def _path_cost(amount: np.ndarray) -> np.ndarray:
+    # In (0, 1]: a link with no amount costs 1, a $1M donation about 0.07.
+    return 1.0 / (1.0 + np.log1p(np.maximum(np.nan_to_num(amount, nan=0.0), 0.0)))
+
+
+def _allowed(types: list[str] | None) -> np.ndarray:
+    allowed = np.zeros(len(REL_TYPES), dtype=bool)
+    allowed[[_TYPE_CODES[t] for t in (types or REL_TYPES)]] = True
+    return allowed
+
+
+def _csr(n: int, arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    src, dst = arrays["src"], arrays["dst"]
+    # Every edge sits in both endpoints' slices, except a self-loop, which sits in its node's once.
+    back = np.flatnonzero(src != dst).astype(np.int32)
+    ends = np.concatenate([src, dst[back]])
+    other = np.concatenate([dst, src[back]])
+    edge = np.concatenate([np.arange(src.size, dtype=np.int32), back])
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=n), out=indptr[1:])
+
+    amount = np.where(np.isnan(arrays["amount"]), -np.inf, arrays["amount"])[edge]
+    date = np.where(arrays["date"] == NO_DATE, -np.inf, arrays["date"].astype(np.float64))[edge]
+    # Group by node, then best first, then edge position (the tie-break edge cursors rely on).
+    by_amount = np.lexsort((edge, -amount, ends))
+    by_date = np.lexsort((edge, -date, ends))
+
+    type_degree = np.bincount(
+        ends.astype(np.int64) * len(REL_TYPES) + arrays["etype"][edge], minlength=n * len(REL_TYPES)
+    )
+    return {
+        "indptr": indptr,
+        "nbr": other[by_amount].astype(np.int32),
+        "eid": edge[by_amount],
+        "eid_recent": edge[by_date],
+        "type_degree": type_degree.reshape(n, len(REL_TYPES)).astype(np.int32),
+    }
+
+
+def date_days(v: Any) -> int:
+    if not v:
+        return NO_DATE
+    try:
+        return int(np.datetime64(str(v)[:10], "D").astype(np.int64))
+    except ValueError:
+        return NO_DATE
+
+
+def time_micros(v: Any) -> int:
+    """ISO timestamp (as PostgREST returns timestamptz) to microseconds since epoch, NO_TIME if unparseable."""
+    if not v:
+        return NO_TIME
+    try:
+        t = datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+    except ValueError:
+        return NO_TIME
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return (t - _EPOCH) // _MICROSECOND
+
+
+def _time(us: int) -> datetime | None:
+    return None if us == NO_TIME else _EPOCH + us * _MICROSECOND
+
+
+def apply_rows(prev: GraphSnapshot | None, rows: list[dict[str, Any]]) -> GraphSnapshot:
+    """
+    New snapshot = prev + changed relationship rows: rows already present are updated in place in
+    copied arrays, new ones appended, then the adjacency is rebuilt (a sort over 2E endpoints).
+    """
+    prev = prev or GraphSnapshot()
+    node_ids, node_index = list(prev.node_ids), dict(prev.node_index)
+    edge_ids, edge_index = list(prev.edge_ids), dict(prev.edge_index)
+    description, metadata, cycles = list(prev.description), list(prev.metadata), list(prev.cycles)
+    cycle_codes = {c: i for i, c in enumerate(cycles)}
+
+    def node(nid: str) -> int:
+        i = node_index.get(nid)
+        if i is None:
+            i = node_index[nid] = len(node_ids)
+            node_ids.append(nid)
+        return i
+
+    def cycle_code(v: Any) -> int:
+        if not v:
+            return NO_CYCLE
+        c = cycle_codes.get(str(v))
+        if c is None:
+            c = cycle_codes[str(v)] = len(cycles)
+            cycles.append(str(v))
+        return c
+
+    upd_pos: list[int] = []
+    cols: dict[str, list[Any]] = {k: [] for k in ("src", "dst", "etype", "amount", "date", "cycle", "updated")}
+    new_cols: dict[str, list[Any]] = {k: [] for k in cols}
+    mark = prev.watermark
+    for r in rows:
+        if r.get("last_updated") and (mark is None or r["last_updated"] > mark):
+            mark = r["last_updated"]
+        code = _TYPE_CODES.get(r.get("type") or "")
+        if code is None or not r.get("source_id") or not r.get("target_id"):
+            continue
+        values = {
+            "src": node(r["source_id"]),
+            "dst": node(r["target_id"]),
+            "etype": code,
+            "amount": float(r["amount"]) if r.get("amount") is not None else np.nan,
+            "date": date_days(r.get("date")),
+            "cycle": cycle_code(r.get("cycle")),
+            "updated": time_micros(r.get("last_updated")),
+        }
+        pos = edge_index.get(r["id"])
+        if pos is None:
+            edge_index[r["id"]] = len(edge_ids)
+            edge_ids.append(r["id"])
+            description.append(r.get("description"))
+            metadata.append(r.get("metadata") or None)
+            target = new_cols
+        else:
+            upd_pos.append(pos)
+            description[pos] = r.get("description")
+            metadata[pos] = r.get("metadata") or None
+            target = cols
+        for k, v in values.items():
+            target[k].append(v)
+
+    dtypes = {
+        "src": np.int32,
+        "dst": np.int32,
+        "etype": np.int8,
+        "amount": np.float64,
+        "date": np.int32,
+        "cycle": np.int16,
+        "updated": np.int64,
+    }
+    arrays: dict[str, np.ndarray] = {}
+    for k, dt in dtypes.items():
+        a = np.concatenate([getattr(prev, k), np.asarray(new_cols[k], dtype=dt)])
+        if upd_pos:
+            a[np.asarray(upd_pos)] = np.asarray(cols[k], dtype=dt)
+        arrays[k] = a
+    return GraphSnapshot(
+        node_ids=node_ids,
+        node_index=node_index,
+        edge_ids=edge_ids,
+        edge_index=edge_index,
+        description=description,
+        metadata=metadata,
+        cycles=cycles,
+        watermark=mark,
+        built_at=time.time(),
+        layout=prev.layout if prev.edge_ids else time.time_ns(),
+        **arrays,
+        **_csr(len(node_ids), arrays),
+    )
+
+
+_snapshot: GraphSnapshot | None = None
+_lock = asyncio.Lock()
+_task: asyncio.Task | None = None
+_last_refresh = 0.0
+_last_full = 0.0
+_stats: dict[str, Any] = {}
+_traversals: deque[float] = deque(maxlen=2000)
+
+
+def graph_snapshot() -> GraphSnapshot | None:
+    return _snapshot if get_settings().graph_engine_enabled else None
+
+
+def record_traversal(seconds: float):
+    _traversals.append(seconds)
+
+
+async def refresh_graph(*, full: bool = False) -> dict[str, Any]:
+    """
+    Apply relationships changed since the snapshot watermark (last_updated) and swap the new
+    snapshot in; requests already traversing keep the old one. A periodic full reload drops
+    deleted relationships, which an incremental pass can't see.
+    """
+    global _snapshot, _last_refresh, _last_full
+    s = get_settings()
+    async with _lock:
+        if _snapshot is None or time.monotonic() - _last_full >= s.graph_full_refresh_seconds:
+            full = True
+        started = time.perf_counter()
+        base = None if full else _snapshot
+        rows: list[dict[str, Any]] = []
+        async for page in stream_rows(_EDGE_SOURCE, since=base.watermark if base else None):
+            # `since` is inclusive: rows at the watermark that are already applied come back every pass.
+            rows.extend(
+                r for r in page if not (base and r.get("last_updated") == base.watermark and r["id"] in base.edge_index)
+            )
+        if full or rows:
+            snap = await anyio.to_thread.run_sync(lambda: apply_rows(base, rows))
+            mem = await anyio.to_thread.run_sync(snap.memory)
+            _snapshot = snap
+            _stats.update({"memory": mem})
+        _last_refresh = time.monotonic()
+        if full:
+            _last_full = _last_refresh
+        _stats.update(
+            {
+                "nodes": _snapshot.node_count if _snapshot else 0,
+                "edges": _snapshot.edge_count if _snapshot else 0,
+                "watermark": _snapshot.watermark if _snapshot else None,
+                "last_refresh_full": full,
+                "last_refresh_rows": len(rows),
+                "last_refresh_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        )
+    return graph_stats()
+
+
+def maybe_refresh_graph():
+    """Non-blocking: schedule a refresh when the snapshot is missing or older than graph_refresh_seconds."""
+    global _task, _last_refresh
+    s = get_settings()
+    if not s.graph_engine_enabled:
+        return
+    if _snapshot is not None and time.monotonic() - _last_refresh < s.graph_refresh_seconds:
+        return
+    if _task is not None and not _task.done():
+        return
+    try:
+        db()
+    except RuntimeError:
+        return
+    _last_refresh = time.monotonic()
+    _task = asyncio.create_task(refresh_graph())
+    _task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def graph_stats() -> dict[str, Any]:
+    lat = sorted(_traversals)
+    traversal = None
+    if lat:
+        traversal = {
+            "count": len(lat),
+            "p50_ms": round(lat[len(lat) // 2] * 1000, 3),
+            "p99_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000, 3),
+        }
+    return {
+        "enabled": get_settings().graph_engine_enabled,
+        "ready": _snapshot is not None,
+        "refreshing": _task is not None and not _task.done(),
+        **_stats,
+        "traversal": traversal,
+    }
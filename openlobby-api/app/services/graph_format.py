@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from app.models import Entity
+from app.services.graph_engine import NO_CYCLE, NO_DATE, REL_TYPES, GraphSnapshot, date_days
+
+# Node projection for the compact graph formats when the request doesn't name fields: enough to
+# label, colour and size a node. `id` is always included.
+COMPACT_NODE_FIELDS = ("id", "type", "name", "party", "state", "influence_percentile")
+
+_TYPE_CODES = {t: i for i, t in enumerate(REL_TYPES)}
+_MAX_DAY = np.iinfo(np.int32).max
+
+
+def parse_fields(fields: str | None) -> list[str]:
+    """Requested node fields (comma-separated Entity fields), `id` first. Raises ValueError on unknown names."""
+    names = [f.strip() for f in (fields or "").split(",") if f.strip()] or list(COMPACT_NODE_FIELDS)
+    unknown = [f for f in names if f not in Entity.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown node field: {', '.join(unknown)}")
+    return ["id", *dict.fromkeys(f for f in names if f != "id")]
+
+
+@dataclass
+class EdgeColumns:
+    """
+    A response's edges as parallel arrays. Endpoints are positions in the response's node list,
+    type codes index REL_TYPES and cycle codes index `cycles` (NO_CYCLE for none); amount is NaN
+    and date (days since epoch) NO_DATE where the row has none.
+    """
+
+    ids: list[str]
+    source: np.ndarray
+    target: np.ndarray
+    type: np.ndarray
+    cycle: np.ndarray
+    amount: np.ndarray
+    date: np.ndarray
+    cycles: list[str]
+
+    @classmethod
+    def from_snapshot(cls, snap: GraphSnapshot, edges: np.ndarray, nodes: np.ndarray) -> EdgeColumns:
+        """Edge positions of `snap`; `nodes` is the sorted node numbers the endpoints index into."""
+        codes = snap.cycle[edges]
+        used = np.unique(codes[codes != NO_CYCLE])
+        cycle = np.full(codes.size, NO_CYCLE, dtype=np.int64)
+        cycle[codes != NO_CYCLE] = np.searchsorted(used, codes[codes != NO_CYCLE])
+        return cls(
+            ids=[snap.edge_ids[int(i)] for i in edges],
+            source=np.searchsorted(nodes, snap.src[edges]),
+            target=np.searchsorted(nodes, snap.dst[edges]),
+            type=snap.etype[edges].astype(np.int64),
+            cycle=cycle,
+            amount=snap.amount[edges],
+            date=snap.date[edges],
+            cycles=[snap.cycles[int(c)] for c in used],
+        )
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]], node_pos: dict[str, int]) -> EdgeColumns:
+        """Relationship rows whose endpoints are all keys of `node_pos`."""
+        cycles: dict[str, int] = {}
+        for r in rows:
+            if r.get("cycle"):
+                cycles.setdefault(str(r["cycle"]), len(cycles))
+        return cls(
+            ids=[r["id"] for r in rows],
+            source=np.array([node_pos[r["source_id"]] for r in rows], dtype=np.int64),
+            target=np.array([node_pos[r["target_id"]] for r in rows], dtype=np.int64),
+            type=np.array([_TYPE_CODES[r["type"]] for r in rows], dtype=np.int64),
+            cycle=np.array([cycles[str(r["cycle"])] if r.get("cycle") else NO_CYCLE for r in rows], dtype=np.int64),
+            amount=np.array([float(r["amount"]) if r.get("amount") is not None else np.nan for r in rows], dtype=np.float64),
+            date=np.array([date_days(r.get("date")) for r in rows], dtype=np.int32),
+            cycles=list(cycles),
+        )
+
+
+@dataclass
+class CollapsedEdges:
+    """One row per (source, target, type, cycle): member count, summed amount and date range."""
+
+    ids: list[str]  # the largest-amount member of each group, for drill-down
+    source: np.ndarray
+    target: np.ndarray
+    type: np.ndarray
+    cycle: np.ndarray
+    count: np.ndarray
+    amount: np.ndarray
+    first_date: np.ndarray
+    last_date: np.ndarray
+    cycles: list[str]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def collapse(cols: EdgeColumns) -> CollapsedEdges:
+    """
+    Group parallel edges with a sort over (source, target, type, cycle) and reduce each run with
+    ufunc.reduceat. Groups come out largest total amount first (no amount last).
+    """
+    n = len(cols.ids)
+    key_amount = np.where(np.isnan(cols.amount), -np.inf, cols.amount)
+    order = np.lexsort((-key_amount, cols.cycle, cols.type, cols.target, cols.source))
+    keys = [a[order] for a in (cols.source, cols.target, cols.type, cols.cycle)]
+    brk = np.zeros(n, dtype=bool)
+    brk[:1] = True
+    for k in keys:
+        brk[1:] |= k[1:] != k[:-1]
+    starts = np.flatnonzero(brk)
+    if starts.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return CollapsedEdges([], empty, empty, empty, empty, empty, np.zeros(0), empty, empty, cols.cycles)
+
+    amount = cols.amount[order]
+    has = ~np.isnan(amount)
+    total = np.add.reduceat(np.where(has, amount, 0.0), starts)
+    total = np.where(np.add.reduceat(has.astype(np.int64), starts) > 0, total, np.nan)
+    date = cols.date[order].astype(np.int64)
+    first = np.minimum.reduceat(np.where(date == NO_DATE, _MAX_DAY, date), starts)
+    first = np.where(first == _MAX_DAY, NO_DATE, first)
+    last = np.maximum.reduceat(date, starts)  # NO_DATE is the int32 minimum, so it never wins
+    count = np.diff(np.append(starts, n))
+    rep = order[starts]
+
+    out = np.lexsort((rep, -np.where(np.isnan(total), -np.inf, total)))
+    return CollapsedEdges(
+        ids=[cols.ids[int(i)] for i in rep[out]],
+        source=cols.source[rep][out],
+        target=cols.target[rep][out],
+        type=cols.type[rep][out],
+        cycle=cols.cycle[rep][out],
+        count=count[out],
+        amount=total[out],
+        first_date=first[out],
+        last_date=last[out],
+        cycles=cols.cycles,
+    )
+
+
+def project(row: dict[str, Any] | None, node_id: str, fields: list[str]) -> dict[str, Any]:
+    """The requested fields of an entity row; an endpoint with no entity row keeps only its id."""
+    if row is None:
+        return {"id": node_id}
+    return {f: row.get(f) for f in fields}
+
+
+def _day(d: int) -> str | None:
+    return None if d == NO_DATE else str(np.datetime64(int(d), "D"))
+
+
+def _amounts(a: np.ndarray) -> list[float | None]:
+    return [None if np.isnan(x) else x for x in a.tolist()]
+
+
+def compact_graph(
+    seed_id: str, nodes: list[dict[str, Any]], edges: CollapsedEdges, summaries: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Row-per-object compact format: projected nodes, collapsed edges with endpoint ids."""
+    ids = [n["id"] for n in nodes]
+    amount, first, last = _amounts(edges.amount), edges.first_date.tolist(), edges.last_date.tolist()
+    return {
+        "seed_id": seed_id,
+        "format": "compact",
+        "nodes": nodes,
+        "edges": [
+            {
+                "id": edges.ids[i],
+                "type": REL_TYPES[int(edges.type[i])],
+                "source_id": ids[int(edges.source[i])],
+                "target_id": ids[int(edges.target[i])],
+                "cycle": None if edges.cycle[i] == NO_CYCLE else edges.cycles[int(edges.cycle[i])],
+                "count": int(edges.count[i]),
+                "amount": amount[i],
+                "first_date": _day(first[i]),
+                "last_date": _day(last[i]),
+            }
+            for i in range(len(edges))
+        ],
+        "summaries": summaries,
+    }
+
+
+def columnar_graph(
+    seed_id: str, nodes: list[dict[str, Any]], fields: list[str], edges: CollapsedEdges, summaries: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """
+    Struct-of-arrays format for large graphs: one array per node field and per edge column, edge
+    endpoints as node positions and types/cycles as codes into the `types`/`cycles` tables, so
+    the payload carries no repeated keys or ids.
+    """
+    return {
+        "seed_id": seed_id,
+        "format": "columnar",
+        "types": list(REL_TYPES),
+        "cycles": edges.cycles,
+        "nodes": {f: [n.get(f) for n in nodes] for f in fields},
+        "edges": {
+            "id": edges.ids,
+            "source": edges.source.tolist(),
+            "target": edges.target.tolist(),
+            "type": edges.type.tolist(),
+            "cycle": edges.cycle.tolist(),
+            "count": edges.count.tolist(),
+            "amount": _amounts(edges.amount),
+            "first_date": [_day(d) for d in edges.first_date.tolist()],
+            "last_date": [_day(d) for d in edges.last_date.tolist()],
+        },
+        "summaries": summaries,
+    }
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from app.config import get_settings
+
+
+@dataclass(frozen=True)
+class Upstream:
+    timeout: float
+    connect_timeout: float = 10.0
+    max_connections: int = 20
+    max_keepalive: int = 10
+    follow_redirects: bool = False
+    http2: bool = True
+
+
+# One pool per upstream so a slow host can't starve connections for the others.
+UPSTREAMS: dict[str, Upstream] = {
+    # Arbitrary article hosts; connections rarely get reused, so keep fewer idle.
+    "web": Upstream(timeout=25, max_connections=64, max_keepalive=16, follow_redirects=True),
+    "brightdata": Upstream(timeout=60, max_connections=10, max_keepalive=5),
+    "jina_reader": Upstream(timeout=35, max_connections=16, max_keepalive=8, follow_redirects=True),
+    "jina": Upstream(timeout=30, max_connections=16, max_keepalive=8),
+    "perplexity": Upstream(timeout=60, max_connections=10, max_keepalive=5),
+    # PostgREST (app.services.db); request-path reads, so a short timeout and a deep pool.
+    "supabase": Upstream(timeout=15, connect_timeout=5, max_connections=50, max_keepalive=20),
+}
+
+
+@dataclass
+class _Counters:
+    requests: int = 0
+    responses: int = 0
+    errors: int = 0
+    status: dict[str, int] = field(default_factory=dict)
+
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, counters: _Counters, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.counters = counters
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.counters.requests += 1
+        try:
+            response = await super().handle_async_request(request)
+        except Exception:
+            self.counters.errors += 1
+            raise
+        self.counters.responses += 1
+        key = f"{response.status_code // 100}xx"
+        self.counters.status[key] = self.counters.status.get(key, 0) + 1
+        return response
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpClients:
+    """
+    Registry of long-lived httpx.AsyncClient instances, one per upstream.
+
+    Clients are created lazily on first use and reused for keep-alive (and HTTP/2 where the
+    server supports it). The FastAPI lifespan closes them on shutdown; scripts like app.cron
+    call aclose() themselves.
+    """
+
+    def __init__(self, upstreams: dict[str, Upstream] | None = None):
+        self._upstreams = dict(upstreams or UPSTREAMS)
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._counters: dict[str, _Counters] = {}
+        self._http2: dict[str, bool] = {}
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is not None and not client.is_closed:
+            return client
+
+        up = self._upstreams.get(name)
+        if up is None:
+            raise KeyError(f"Unknown upstream: {name}")
+
+        s = get_settings()
+        self._http2[name] = up.http2 and s.http_http2 and _http2_available()
+        transport = _CountingTransport(
+            self._counters.setdefault(name, _Counters()),
+            http2=self._http2[name],
+            limits=httpx.Limits(
+                max_connections=up.max_connections,
+                max_keepalive_connections=up.max_keepalive,
+                keepalive_expiry=s.http_keepalive_expiry,
+            ),
+        )
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(up.timeout, connect=up.connect_timeout),
+            follow_redirects=up.follow_redirects,
+        )
+        self._clients[name] = client
+        return client
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = {}
+        for name, up in self._upstreams.items():
+            c = self._counters.get(name) or _Counters()
+            client = self._clients.get(name)
+            out[name] = {
+                "open": client is not None and not client.is_closed,
+                "http2": self._http2.get(name, False),
+                "max_connections": up.max_connections,
+                "max_keepalive": up.max_keepalive,
+                "timeout": up.timeout,
+                "requests": c.requests,
+                "responses": c.responses,
+                "errors": c.errors,
+                "status": dict(c.status),
+                **_pool_stats(client),
+            }
+        return out
+
+
+def _pool_stats(client: httpx.AsyncClient | None) -> dict[str, Any]:
+    # httpcore doesn't expose a public stats API; read its pool defensively.
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    conns = list(getattr(pool, "connections", None) or [])
+    active = idle = h2 = 0
+    for conn in conns:
+        try:
+            if conn.is_idle():
+                idle += 1
+            else:
+                active += 1
+            if "HTTP/2" in conn.info():
+                h2 += 1
+        except Exception:
+            continue
+    queued = 0
+    for req in list(getattr(pool, "_requests", None) or []):
+        try:
+            queued += 1 if req.is_queued() else 0
+        except Exception:
+            continue
+    return {"connections": len(conns), "active": active, "idle": idle, "http2_connections": h2, "queued": queued}
+
+
+_clients: HttpClients | None = None
+
+
+def http_clients() -> HttpClients:
+    global _clients
+    if _clients is None:
+        _clients = HttpClients()
+    return _clients
+
+
+def http_client(name: str) -> httpx.AsyncClient:
+    return http_clients().get(name)
+
+
+async def close_http_clients():
+    if _clients is not None:
+        await _clients.aclose()
@@ -0,0 +1,519 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable
+
+from app.config import get_settings
+from app.services.db import db
+from app.services.elasticsearch_client import es
+from app.services.es_bulk import BulkIndexer
+from app.services.jina_embeddings import embed_batch
+from app.services.search_cache import bump_search_generation
+
+
+# Elasticsearch indices are derived from the Supabase tables. Each logical index is an alias
+# (ELASTIC_INDEX_*) over a versioned concrete index `<alias>-v<mapping version>-<timestamp>`.
+# Bump a kind's version when its mapping changes; rebuild() then loads a fresh index from
+# Supabase and swaps the alias atomically, so search never sees a half-built index.
+KINDS = ("documents", "entities", "relationships")
+
+# Kinds whose rows are written outside this service and are synced by sync_index().
+SYNC_KINDS = ("entities", "relationships")
+
+MAPPING_VERSIONS: dict[str, int] = {"documents": 1, "entities": 2, "relationships": 1}
+
+
+def _embedding_field() -> dict[str, Any]:
+    return {"type": "dense_vector", "dims": get_settings().jina_dims, "index": True, "similarity": "cosine"}
+
+
+def _mapping(kind: str) -> dict[str, Any]:
+    if kind == "documents":
+        props: dict[str, Any] = {
+            "id": {"type": "keyword"},
+            "type": {"type": "keyword"},
+            "title": {"type": "text"},
+            "url": {"type": "keyword"},
+            "source": {"type": "keyword"},
+            "published_at": {"type": "date"},
+            "excerpt": {"type": "text"},
+            "content": {"type": "text"},
+            "image_url": {"type": "keyword"},
+            "tags": {"type": "keyword"},
+            "entities_mentioned": {"type": "keyword"},
+            "embedding": _embedding_field(),
+            "last_updated": {"type": "date"},
+        }
+    elif kind == "entities":
+        props = {
+            "id": {"type": "keyword"},
+            "type": {"type": "keyword"},
+            "name": {"type": "text", "fields": {"raw": {"type": "keyword"}}},
+            "description": {"type": "text"},
+            "party": {"type": "keyword"},
+            "state": {"type": "keyword"},
+            "industry": {"type": "keyword"},
+            "total_lobbying": {"type": "double"},
+            "total_donations": {"type": "double"},
+            # Written by the centrality batch job (app/services/centrality.py).
+            "pagerank": {"type": "double"},
+            "degree": {"type": "integer"},
+            "weighted_degree": {"type": "double"},
+            "betweenness": {"type": "double"},
+            "influence_rank": {"type": "integer"},
+            "influence_percentile": {"type": "double"},
+            "embedding": _embedding_field(),
+            "last_updated": {"type": "date"},
+        }
+    elif kind == "relationships":
+        props = {
+            "id": {"type": "keyword"},
+            "type": {"type": "keyword"},
+            "source_id": {"type": "keyword"},
+            "target_id": {"type": "keyword"},
+            "amount": {"type": "double"},
+            "date": {"type": "date"},
+            "cycle": {"type": "keyword"},
+            "description": {"type": "text"},
+            "last_updated": {"type": "date"},
+        }
+    else:
+        raise ValueError(f"Unknown index kind: {kind}")
+    return {"_meta": {"kind": kind, "mapping_version": MAPPING_VERSIONS[kind]}, "properties": props}
+
+
+def alias_for(kind: str) -> str:
+    s = get_settings()
+    return {
+        "documents": s.elastic_index_documents,
+        "entities": s.elastic_index_entities,
+        "relationships": s.elastic_index_relationships,
+    }[kind]
+
+
+def kind_for_index(index: str) -> str | None:
+    """Maps a concrete index name from a hit (`<alias>-v...` or a legacy index named like the alias) to its kind."""
+    for kind in KINDS:
+        alias = alias_for(kind)
+        if index == alias or index.startswith(alias + "-v"):
+            return kind
+    return None
+
+
+def _versioned_name(kind: str, *, suffix: str | None = None) -> str:
+    stamp = suffix or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    return f"{alias_for(kind)}-v{MAPPING_VERSIONS[kind]}-{stamp}"
+
+
+def document_text(row: dict[str, Any]) -> str:
+    """Embedding input for a documents row (derivable from the table, so rebuilds hit the embedding cache)."""
+    return f'{row.get("title","")}\n\n{row.get("excerpt","")}\n\n{row.get("url","")}'
+
+
+def document_body(row: dict[str, Any], embedding: list[float] | None = None) -> dict[str, Any]:
+    body = {
+        "id": row["id"],
+        "type": "document",
+        "title": row["title"],
+        "url": row["url"],
+        "source": (row.get("metadata") or {}).get("from", "web"),
+        "published_at": row.get("published_at"),
+        "excerpt": row.get("excerpt") or "",
+        "content": "",  # keep ES slim for hackathon; canonical text can live in Supabase metadata later
+        "image_url": row.get("image_url"),
+        "tags": (row.get("metadata") or {}).get("topic_tags", []),
+        "entities_mentioned": row.get("entities_mentioned") or [],
+        "last_updated": datetime.now(timezone.utc).isoformat(),
+    }
+    if embedding is not None:
+        body["embedding"] = embedding
+    return body
+
+
+def entity_text(row: dict[str, Any]) -> str:
+    return f'{row.get("name","")}\n\n{row.get("description") or ""}'
+
+
+def entity_body(row: dict[str, Any], embedding: list[float] | None = None) -> dict[str, Any]:
+    body = {k: row.get(k) for k in ("id", "type", "name", "description", "party", "state", "industry", "last_updated")}
+    body["total_lobbying"] = float(row["total_lobbying"]) if row.get("total_lobbying") is not None else None
+    body["total_donations"] = float(row["total_donations"]) if row.get("total_donations") is not None else None
+    # Centrality columns (app/services/centrality.py); null until the batch job first runs.
+    for k in ("pagerank", "degree", "weighted_degree", "betweenness", "influence_rank", "influence_percentile"):
+        body[k] = row.get(k)
+    if embedding is not None:
+        body["embedding"] = embedding
+    return body
+
+
+def relationship_body(row: dict[str, Any], embedding: list[float] | None = None) -> dict[str, Any]:
+    body = {k: row.get(k) for k in ("id", "type", "source_id", "target_id", "date", "cycle", "description", "last_updated")}
+    body["amount"] = float(row["amount"]) if row.get("amount") is not None else None
+    return body
+
+
+@dataclass(frozen=True)
+class Source:
+    table: str
+    columns: str
+    # Column compared against the rebuild start time to catch rows written during the load.
+    changed_col: str
+    body: Callable[[dict[str, Any], list[float] | None], dict[str, Any]]
+    text: Callable[[dict[str, Any]], str] | None
+
+
+SOURCES: dict[str, Source] = {
+    "documents": Source(
+        "documents",
+        "id,source,url,title,published_at,excerpt,image_url,entities_mentioned,metadata,created_at,updated_at",
+        "updated_at",
+        document_body,
+        document_text,
+    ),
+    "entities": Source(
+        "entities",
+        "id,type,name,description,party,state,industry,total_lobbying,total_donations,"
+        "pagerank,degree,weighted_degree,betweenness,influence_rank,influence_percentile,last_updated",
+        "last_updated",
+        entity_body,
+        entity_text,
+    ),
+    "relationships": Source(
+        "relationships",
+        "id,type,source_id,target_id,amount,date,cycle,description,last_updated",
+        "last_updated",
+        relationship_body,
+        None,
+    ),
+}
+
+
+_ready = False
+_ready_lock = asyncio.Lock()
+
+
+async def _ensure_template(kind: str):
+    client = es()
+    alias = alias_for(kind)
+    name = f"{alias}-template"
+    version = MAPPING_VERSIONS[kind]
+    try:
+        cur = await client.indices.get_index_template(name=name)
+        templates = cur.get("index_templates") or []
+        if templates and templates[0].get("index_template", {}).get("version") == version:
+            return
+    except Exception:
+        pass
+    await client.indices.put_index_template(
+        name=name,
+        index_patterns=[f"{alias}-v*"],
+        version=version,
+        template={"mappings": _mapping(kind)},
+    )
+
+
+async def _ensure_alias(kind: str):
+    client = es()
+    alias = alias_for(kind)
+    if await client.indices.exists_alias(name=alias):
+        return
+    if await client.indices.exists(index=alias):
+        # Pre-alias deployment: a concrete index holds the name. It keeps serving until the
+        # first rebuild replaces it (the swap removes it in the same atomic action).
+        return
+    # A deterministic (and oldest-sorting) name makes concurrent first starts converge on one index.
+    initial = _versioned_name(kind, suffix="00000000000000")
+    try:
+        await client.indices.create(index=initial, aliases={alias: {}})
+    except Exception as e:
+        if "resource_already_exists" not in str(e):
+            raise
+
+
+async def ensure_indices():
+    """
+    Make sure templates and aliases exist. Does the round trips once per process (at startup
+    via the lifespan, or on first use), not per request.
+    """
+    global _ready
+    if _ready:
+        return
+    async with _ready_lock:
+        if _ready:
+            return
+        for kind in KINDS:
+            await _ensure_template(kind)
+            await _ensure_alias(kind)
+        _ready = True
+
+
+@dataclass
+class RebuildReport:
+    kind: str
+    index: str
+    previous: list[str] = field(default_factory=list)
+    rows: int = 0
+    caught_up: int = 0
+    embedded: int = 0
+    deleted: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+    status: str = "running"
+    error: str | None = None
+    bulk: dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "index": self.index,
+            "previous": self.previous,
+            "rows": self.rows,
+            "caught_up": self.caught_up,
+            "embedded": self.embedded,
+            "deleted": self.deleted,
+            "seconds": round(self.seconds, 3),
+            "status": self.status,
+            "error": self.error,
+            "bulk": self.bulk,
+        }
+
+
+_rebuilds: dict[str, RebuildReport] = {}
+_rebuild_tasks: dict[str, asyncio.Task] = {}
+
+
+async def stream_rows(
+    src: Source, *, since: str | None = None, by_change: bool = False
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """
+    Keyset-paginate a table (no OFFSET scans), optionally only rows changed since `since`. Pages
+    go by id, or with by_change by (changed_col, id) oldest change first, so a consumer that stops
+    part-way has copied every row up to the last change it saw and a watermark taken from its
+    output never skips older rows.
+    """
+    page = max(100, get_settings().es_reindex_page_size)
+    last: dict[str, Any] | None = None
+    while True:
+        q = db().table(src.table).select(src.columns)
+        if since is not None:
+            q = q.gte(src.changed_col, since)
+        if by_change:
+            if last is not None:
+                q = q.after((src.changed_col, "id"), (last[src.changed_col], last["id"]), desc=False)
+            q = q.order(src.changed_col).order("id")
+        else:
+            if last is not None:
+                q = q.gt("id", last["id"])
+            q = q.order("id")
+        rows = await q.limit(page).execute()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page:
+            return
+        last = rows[-1]
+
+
+async def _index_rows(src: Source, bulk: BulkIndexer, rows: list[dict[str, Any]]) -> int:
+    """Embed (when configured) and index `rows`. Returns how many got a vector."""
+    vecs: list[list[float] | None] = [None] * len(rows)
+    if src.text is not None and get_settings().jina_api_key:
+        try:
+            # Texts are derived from the table, so unchanged rows are embedding-cache hits.
+            vecs = await embed_batch([src.text(r) for r in rows], task="retrieval.passage")
+        except Exception:
+            pass
+    await bulk.index_many([(r["id"], src.body(r, v)) for r, v in zip(rows, vecs)])
+    return sum(1 for v in vecs if v is not None)
+
+
+async def _load(
+    src: Source, bulk: BulkIndexer, *, since: str | None = None, by_change: bool = False
+) -> tuple[int, int]:
+    """Stream `src` into `bulk`. Returns (rows, rows embedded)."""
+    n = embedded = 0
+    async for rows in stream_rows(src, since=since, by_change=by_change):
+        embedded += await _index_rows(src, bulk, rows)
+        n += len(rows)
+    return n, embedded
+
+
+async def _reembed_missing(kind: str, bulk: BulkIndexer) -> int:
+    """
+    Re-send one page of indexed rows that have no vector (their embedding failed when they were
+    loaded). Later syncs take the next page. Returns how many got a vector this time.
+    """
+    src = SOURCES[kind]
+    if src.text is None or not get_settings().jina_api_key:
+        return 0
+    resp = await es().search(
+        index=alias_for(kind),
+        size=max(100, get_settings().es_reindex_page_size),
+        query={"bool": {"must_not": {"exists": {"field": "embedding"}}}},
+        source=False,
+    )
+    ids = [h["_id"] for h in (resp.get("hits") or {}).get("hits") or []]
+    if not ids:
+        return 0
+    rows = await db().table(src.table).select(src.columns).in_("id", ids).execute()
+    return await _index_rows(src, bulk, rows) if rows else 0
+
+
+async def _alias_targets(alias: str) -> list[str]:
+    client = es()
+    if not await client.indices.exists_alias(name=alias):
+        return []
+    return list((await client.indices.get_alias(name=alias)).keys())
+
+
+async def rebuild(kind: str) -> RebuildReport:
+    """
+    Build a new versioned index for `kind` from Supabase and atomically point the alias at it.
+    Old versions beyond ES_INDEX_KEEP_VERSIONS are deleted afterwards.
+    """
+    if kind not in SOURCES:
+        raise ValueError(f"Unknown index kind: {kind}")
+    s = get_settings()
+    client = es()
+    src = SOURCES[kind]
+    alias = alias_for(kind)
+    started = time.perf_counter()
+    since = datetime.now(timezone.utc).isoformat()
+
+    await _ensure_template(kind)
+    new_index = _versioned_name(kind)
+    report = RebuildReport(kind=kind, index=new_index)
+    _rebuilds[kind] = report
+    try:
+        # Bulk-load settings: no refresh and no replicas until the data is in.
+        await client.indices.create(
+            index=new_index, settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+        )
+        async with BulkIndexer(new_index) as load:
+            report.rows, report.embedded = await _load(src, load)
+        await client.indices.put_settings(
+            index=new_index,
+            settings={"index": {"refresh_interval": None, "number_of_replicas": s.es_index_replicas}},
+        )
+        await client.indices.refresh(index=new_index)
+
+        report.previous = await _alias_targets(alias)
+        actions: list[dict[str, Any]] = [{"remove": {"index": old, "alias": alias}} for old in report.previous]
+        if not report.previous and await client.indices.exists(index=alias):
+            # Replace a pre-alias concrete index in the same request.
+            actions.append({"remove_index": {"index": alias}})
+            report.previous = [alias]
+        actions.append({"add": {"index": new_index, "alias": alias}})
+        await client.indices.update_aliases(actions=actions)
+        bump_search_generation()
+
+        # Rows written to the old index while we were loading: they're in Supabase, so copy
+        # them over now that writers go through the alias to the new index.
+        async with BulkIndexer(new_index) as catch_up:
+            report.caught_up, embedded = await _load(src, catch_up, since=since)
+        report.embedded += embedded
+        report.bulk = load.report.add(catch_up.report).as_dict()
+
+        report.deleted = await _prune(kind, keep=new_index)
+        report.status = "succeeded"
+    except Exception as e:
+        report.status = "failed"
+        report.error = str(e)[:2000]
+        # The alias still points at the old index; drop the partial one unless it went live.
+        if new_index not in await _alias_targets(alias):
+            try:
+                await client.indices.delete(index=new_index)
+            except Exception:
+                pass
+        raise
+    finally:
+        report.seconds = time.perf_counter() - started
+    return report
+
+
+async def _prune(kind: str, *, keep: str) -> list[str]:
+    client = es()
+    alias = alias_for(kind)
+    live = set(await _alias_targets(alias))
+    versions = sorted(
+        (name for name in (await client.indices.get(index=f"{alias}-v*")).keys() if name != keep and name not in live),
+        reverse=True,
+    )
+    # Newest first: keep a few previous versions around for a manual rollback.
+    drop = versions[max(0, get_settings().es_index_keep_versions) :]
+    for name in drop:
+        await client.indices.delete(index=name)
+    return drop
+
+
+async def _watermark(kind: str) -> str | None:
+    """Newest `last_updated` already in the index, or None if it's empty."""
+    resp = await es().search(index=alias_for(kind), size=0, aggs={"wm": {"max": {"field": "last_updated"}}})
+    return ((resp.get("aggregations") or {}).get("wm") or {}).get("value_as_string")
+
+
+async def sync_index(kind: str) -> dict[str, Any]:
+    """
+    Incrementally copy rows changed since the index's watermark from Supabase. For the tables
+    other pipelines write (entities, relationships); the news ingest indexes documents itself.
+    Rows go in change order, so an interrupted sync leaves the watermark at the last row it sent.
+    Boundary rows are re-sent, which is harmless; deletions are only picked up by rebuild().
+    Rows indexed without a vector are re-embedded a page per sync.
+    """
+    if kind not in SYNC_KINDS:
+        raise ValueError(f"Unknown index kind: {kind}")
+    await ensure_indices()
+    since = await _watermark(kind)
+    async with BulkIndexer(alias_for(kind)) as bulk:
+        rows, embedded = await _load(SOURCES[kind], bulk, since=since, by_change=True)
+        reembedded = await _reembed_missing(kind, bulk)
+    if rows or reembedded:
+        bump_search_generation()
+    return {
+        "kind": kind,
+        "since": since,
+        "rows": rows,
+        "embedded": embedded,
+        "reembedded": reembedded,
+        "bulk": bulk.report.as_dict(),
+    }
+
+
+def start_rebuild(kind: str) -> RebuildReport | None:
+    """Run rebuild(kind) in the background. Returns None if one is already running here."""
+    task = _rebuild_tasks.get(kind)
+    if task is not None and not task.done():
+        return None
+    task = asyncio.create_task(rebuild(kind))
+    _rebuild_tasks[kind] = task
+    # Failures are recorded on the report; retrieve the exception so asyncio doesn't warn.
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return _rebuilds.get(kind)
+
+
+def rebuild_running(kind: str) -> bool:
+    task = _rebuild_tasks.get(kind)
+    return task is not None and not task.done()
+
+
+async def index_status() -> dict[str, Any]:
+    client = es()
+    out: dict[str, Any] = {}
+    for kind in KINDS:
+        alias = alias_for(kind)
+        targets = await _alias_targets(alias)
+        legacy = not targets and await client.indices.exists(index=alias)
+        live = targets or ([alias] if legacy else [])
+        info: dict[str, Any] = {"alias": alias, "indices": live, "legacy": legacy, "mapping_version": MAPPING_VERSIONS[kind]}
+        if live:
+            mapping = await client.indices.get_mapping(index=live[0])
+            meta = next(iter(mapping.values()), {}).get("mappings", {}).get("_meta") or {}
+            info["live_mapping_version"] = meta.get("mapping_version")
+            info["stale"] = meta.get("mapping_version") != MAPPING_VERSIONS[kind]
+            info["docs"] = (await client.count(index=alias)).get("count")
+        last = _rebuilds.get(kind)
+        info["rebuild"] = last.as_dict() if last is not None else None
+        out[kind] = info
+    return out
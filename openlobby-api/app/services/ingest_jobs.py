@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from app.config import get_settings
+from app.services.db import DbError, db
+from app.services.ingest_news import IngestCheckpoint, check_news_config, run_news_ingest
+
+
+# Jobs are rows in `ingest_jobs` (see supabase/migrations). A partial unique index allows only
+# one queued/running job per kind, which is the overlap guard across workers and the cron.
+ACTIVE = ("queued", "running")
+_FIELDS = "id,kind,status,params,progress,checkpoint,report,error,created_at,started_at,finished_at,heartbeat_at"
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_tasks: set[asyncio.Task] = set()
+_lock = asyncio.Lock()
+
+
+class IngestBusy(RuntimeError):
+    def __init__(self, job: dict[str, Any]):
+        super().__init__(f"An ingest job is already running ({job.get('id')}).")
+        self.job = job
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_ts(v: Any) -> datetime | None:
+    if not isinstance(v, str) or not v:
+        return None
+    try:
+        dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def _is_stale(job: dict[str, Any]) -> bool:
+    s = get_settings()
+    beat = _parse_ts(job.get("heartbeat_at")) or _parse_ts(job.get("created_at"))
+    return beat is None or _now() - beat > timedelta(seconds=s.ingest_job_stale_seconds)
+
+
+async def get_job(job_id: str) -> dict[str, Any] | None:
+    rows = await db().table("ingest_jobs").select(_FIELDS).eq("id", job_id).limit(1).execute()
+    return rows[0] if rows else None
+
+
+async def list_jobs(*, limit: int = 20) -> list[dict[str, Any]]:
+    return await (
+        db()
+        .table("ingest_jobs")
+        .select("id,kind,status,params,progress,error,created_at,started_at,finished_at,heartbeat_at")
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+
+
+def _resume_params(job: dict[str, Any], *, limit: int, incremental: bool | None) -> dict[str, Any]:
+    # A resumed run keeps its checkpoint but takes the new request's limit (and incremental, if given).
+    old = job.get("params") or {}
+    return {**old, "limit": limit, "incremental": old.get("incremental") if incremental is None else incremental}
+
+
+async def _claim_news_job(*, limit: int, incremental: bool | None) -> dict[str, Any]:
+    """
+    Create a job row, or take over an abandoned one so it resumes from its checkpoint with the
+    new request's params. Raises IngestBusy if a live job holds the guard, and RuntimeError if
+    the ingest isn't configured (nothing is queued then).
+    """
+    check_news_config()
+    sb = db()
+    now = _now().isoformat()
+
+    active = await (
+        sb.table("ingest_jobs").select(_FIELDS).eq("kind", "news").in_("status", list(ACTIVE)).limit(1).execute()
+    )
+    if active:
+        job = active[0]
+        if not _is_stale(job):
+            raise IngestBusy(job)
+        # The process that owned it died (no heartbeat); resume it here. Matching on the old
+        # heartbeat makes the takeover atomic if two workers notice at the same time.
+        params = _resume_params(job, limit=limit, incremental=incremental)
+        takeover = (
+            sb.table("ingest_jobs")
+            .update({"status": "running", "params": params, "owner": _OWNER, "heartbeat_at": now, "error": None})
+            .eq("id", job["id"])
+        )
+        beat = job.get("heartbeat_at")
+        taken = await (takeover.eq("heartbeat_at", beat) if beat else takeover.is_("heartbeat_at", "null")).execute()
+        if not taken:
+            raise IngestBusy(job)
+        return {**job, "status": "running", "params": params, "resumed": True}
+
+    # A run that stopped early (deadline or crash noticed at startup) resumes before starting fresh.
+    interrupted = await (
+        sb.table("ingest_jobs")
+        .select(_FIELDS)
+        .eq("kind", "news")
+        .eq("status", "interrupted")
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    try:
+        if interrupted:
+            row = interrupted[0]
+            params = _resume_params(row, limit=limit, incremental=incremental)
+            updated = await (
+                sb.table("ingest_jobs")
+                .update({"status": "queued", "params": params, "owner": _OWNER, "heartbeat_at": now, "error": None})
+                .eq("id", row["id"])
+                .eq("status", "interrupted")
+                .execute()
+            )
+            if updated:
+                return {**row, "status": "queued", "params": params, "resumed": True}
+
+        created = await (
+            sb.table("ingest_jobs")
+            .insert(
+                {
+                    "kind": "news",
+                    "status": "queued",
+                    "params": {"limit": limit, "incremental": incremental},
+                    "owner": _OWNER,
+                    "heartbeat_at": now,
+                }
+            )
+            .execute()
+        )
+    except DbError as e:
+        # 23505: the one-active-job index caught a concurrent start from another worker.
+        if e.code == "23505":
+            raise IngestBusy({"id": None})
+        raise
+    return {**created[0], "resumed": False}
+
+
+async def _run_job(job: dict[str, Any]):
+    s = get_settings()
+    job_id = job["id"]
+    params = job.get("params") or {}
+    checkpoint = IngestCheckpoint.from_dict(job.get("checkpoint"))
+    latest: dict[str, Any] = {}
+    last_write = 0.0
+
+    async def save(fields: dict[str, Any]):
+        fields = {**fields, "heartbeat_at": _now().isoformat()}
+        await db().table("ingest_jobs").update(fields).eq("id", job_id).execute()
+
+    async def on_progress(cp: IngestCheckpoint, report: dict[str, Any]):
+        nonlocal last_write
+        latest.update(report)
+        # Checkpoint writes are cheap but not free; coalesce bursts of small batches.
+        if time.monotonic() - last_write >= 1.0:
+            last_write = time.monotonic()
+            await save({"progress": report, "checkpoint": cp.as_dict()})
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(s.ingest_job_heartbeat_seconds)
+            try:
+                await save({"progress": latest} if latest else {})
+            except Exception:
+                pass
+
+    await save({"status": "running", "started_at": job.get("started_at") or _now().isoformat()})
+    beat = asyncio.create_task(heartbeat())
+    try:
+        run = await run_news_ingest(
+            limit=int(params.get("limit") or s.news_limit_default),
+            incremental=params.get("incremental"),
+            checkpoint=checkpoint,
+            on_progress=on_progress,
+        )
+    except asyncio.CancelledError:
+        # Shutdown: persist the latest checkpoint so the next start resumes from here.
+        beat.cancel()
+        await save({"status": "interrupted", "checkpoint": checkpoint.as_dict()})
+        raise
+    except Exception as e:
+        beat.cancel()
+        await save({"status": "failed", "error": str(e)[:2000], "checkpoint": checkpoint.as_dict(), "finished_at": _now().isoformat()})
+        raise
+    beat.cancel()
+
+    # Deadline hit with work left: keep the checkpoint so the next start resumes it. (Items that
+    # merely failed are not retried forever; a finished run is done.)
+    status = "interrupted" if run.report.get("timed_out") and run.report.get("remaining") else "succeeded"
+    # Batches a stage dropped don't fail the run, but their last error shouldn't go unnoticed.
+    stage_errors = [f"{name}: {st['last_error']}" for name, st in run.report.get("stages", {}).items() if st.get("last_error")]
+    await save(
+        {
+            "status": status,
+            "error": "; ".join(stage_errors)[:2000] or None,
+            "progress": run.report,
+            "report": {"inserted": len(run.items), **run.report},
+            "checkpoint": checkpoint.as_dict(),
+            "finished_at": _now().isoformat(),
+        }
+    )
+
+
+async def start_news_job(*, limit: int, incremental: bool | None = None) -> dict[str, Any]:
+    """Claim the ingest guard and run the job in the background. Returns the job row."""
+    async with _lock:
+        job = await _claim_news_job(limit=limit, incremental=incremental)
+    task = asyncio.create_task(_run_job(job))
+    _tasks.add(task)
+    task.add_done_callback(_job_done)
+    return job
+
+
+def _job_done(task: asyncio.Task):
+    _tasks.discard(task)
+    # Failures are recorded on the job row; retrieve the exception so asyncio doesn't warn.
+    if not task.cancelled():
+        task.exception()
+
+
+async def run_news_job(*, limit: int, incremental: bool | None = None) -> dict[str, Any]:
+    """Same as start_news_job but waits for completion (used by app.cron)."""
+    async with _lock:
+        job = await _claim_news_job(limit=limit, incremental=incremental)
+    await _run_job(job)
+    return {**((await get_job(job["id"])) or job), "resumed": job.get("resumed", False)}
+
+
+async def interrupt_running_jobs():
+    """On shutdown: hand this process's unfinished jobs back so another start resumes them."""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    if not tasks:
+        return
+    await asyncio.gather(*tasks, return_exceptions=True)
+    try:
+        await (
+            db()
+            .table("ingest_jobs")
+            .update({"status": "interrupted", "heartbeat_at": _now().isoformat()})
+            .eq("owner", _OWNER)
+            .in_("status", list(ACTIVE))
+            .execute()
+        )
+    except Exception:
+        pass
@@ -1,159 +1,384 @@
 from __future__ import annotations
 
 import hashlib
-from datetime import datetime
-from typing import Any
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
 
 from app.config import get_settings
 from app.models import NewsItem
-from app.services.content_fetch import extract_og_image, fetch_html, fetch_readable_text
-from app.services.elasticsearch_client import ensure_indices, es
-from app.services.jina_embeddings import embed_text
+from app.services.content_fetch import AcquiredDocument, extract_document, fetch_page, reader_document
+from app.services.db import AsyncDb, db
+from app.services.es_bulk import BulkIndexer
+from app.services.index_manager import document_body, document_text, ensure_indices
+from app.services.jina_embeddings import embed_batch
+from app.services.page_cache import load_page, save_page
 from app.services.perplexity_sonar import sonar_search
-from app.services.supabase_client import supabase_admin
+from app.services.pipeline import HostLimiter, Pipeline, Stage
+from app.services.search_cache import bump_search_generation
+from app.services.vector_index import sync_vector_index, vector_index_active
 
 
 def _doc_id(url: str) -> str:
     return hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
 
 
+def _content_hash(h: dict[str, Any]) -> str:
+    # Only fields known from discovery, so changed listings are caught before any fetch. The
+    # snippet is left out: Sonar writes it fresh on every search, so it changes between runs.
+    # Body edits under the same listing are caught by the conditional re-fetch (see fetch()).
+    parts = [str(h.get(k) or "").strip() for k in ("url", "title", "published_at")]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:24]
+
+
+@dataclass
+class IngestRun:
+    items: list[NewsItem]
+    report: dict[str, Any]
+
+
+@dataclass
+class IngestCheckpoint:
+    """
+    Resumable progress of one ingest run. Background jobs persist it (see ingest_jobs) after each
+    discovered topic and each stored batch; a resumed run skips finished topics and stored URLs.
+    """
+
+    topics_done: list[str] = field(default_factory=list)
+    # Discovered hits that have not been stored yet.
+    pending: list[dict[str, Any]] = field(default_factory=list)
+    done_urls: list[str] = field(default_factory=list)
+    counts: dict[str, int] = field(default_factory=lambda: {"new": 0, "changed": 0, "skipped": 0, "stale": 0})
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any] | None) -> IngestCheckpoint:
+        data = data or {}
+        cp = cls(
+            topics_done=list(data.get("topics_done") or []),
+            pending=list(data.get("pending") or []),
+            done_urls=list(data.get("done_urls") or []),
+        )
+        cp.counts.update(data.get("counts") or {})
+        return cp
+
+
+def check_news_config():
+    """Raise RuntimeError if a news ingest can't run at all (so callers can refuse before queuing one)."""
+    if not get_settings().perplexity_api_key:
+        raise RuntimeError("Perplexity is not configured (PERPLEXITY_API_KEY).")
+
+
 async def sync_news(*, limit: int) -> list[NewsItem]:
     """
     Pull fresh headlines via Sonar, fetch readable content, store in Supabase, index into Elasticsearch.
     No seeded/mocked data; if sources fail, returns whatever is already stored.
     """
+    run = await run_news_ingest(limit=limit)
+    return run.items
+
+
+async def run_news_ingest(
+    *,
+    limit: int,
+    incremental: bool | None = None,
+    checkpoint: IngestCheckpoint | None = None,
+    on_progress: Callable[[IngestCheckpoint, dict[str, Any]], Awaitable[None]] | None = None,
+) -> IngestRun:
+    """
+    Same as sync_news, but also returns the per-stage pipeline report.
+
+    In incremental mode (INGEST_INCREMENTAL, default on) each topic's hits are looked up by id
+    against the stored content hashes (url, title, published_at). A known hit whose hash changed
+    is re-ingested. One whose hash is unchanged is re-checked with a conditional GET when the page
+    cache holds its ETag/Last-Modified (a 304, or an identical body, drops it), and is dropped
+    without a fetch otherwise. Each topic keeps a high-water mark on published_at in
+    `ingest_state`: Sonar is asked for newer coverage, and new hits published before the mark are
+    dropped as stale.
+
+    Stages: discover (Sonar per topic) -> fetch (article HTML, one download per URL) -> extract
+    (OG image, metadata and readable text from that body) -> embed (Jina) -> store (Supabase upsert
+    + Elasticsearch index). Each stage has its own worker pool; article fetches are additionally
+    capped per host, and the whole run has a deadline.
+
+    `checkpoint` is updated in place as the run progresses (and `on_progress` is awaited with it
+    and the live stage report); passing a saved one resumes that run.
+    """
     s = get_settings()
-    sb = supabase_admin()
+    sb = db()
+    check_news_config()
 
-    # 1) Collect URLs from Sonar across configured topics.
     topics = s.news_topics_list()
     per_topic = max(4, min(12, (limit + len(topics) - 1) // max(1, len(topics))))
+    use_es = bool(s.elastic_cloud_id and s.elastic_api_key)
+    # Without ES the vectors aren't stored here, but embedding now warms the cache that the
+    # local vector index sync reads from.
+    use_embed = bool(s.jina_api_key) and (use_es or vector_index_active())
+    hosts = HostLimiter(s.ingest_per_host_limit)
 
-    raw_hits: list[dict[str, Any]] = []
-    for t in topics:
-        q = f"{t} lobbying campaign finance latest"
-        raw_hits.extend(await sonar_search(q, max_results=per_topic))
+    if incremental is None:
+        incremental = s.ingest_incremental
 
-    # Dedup by URL
-    seen = set()
-    hits: list[dict[str, Any]] = []
-    for h in raw_hits:
-        url = (h.get("url") or "").strip()
-        if not url or url in seen:
-            continue
-        seen.add(url)
-        hits.append(h)
-        if len(hits) >= limit:
-            break
-
-    # 2) For each URL: fetch OG image + readable text.
-    docs_rows: list[dict[str, Any]] = []
-    for h in hits:
+    if use_es:
+        await ensure_indices()
+
+    high_water: dict[str, datetime] = {}
+    if incremental:
+        high_water = await _load_high_water(sb)
+    cp = checkpoint if checkpoint is not None else IngestCheckpoint()
+    counts = cp.counts
+    done_urls = set(cp.done_urls)
+    pending = [h for h in cp.pending if (h.get("url") or "").strip() not in done_urls]
+    cp.pending = pending
+
+    # Dedup by URL across concurrently-running topic searches (and what a resumed run already has).
+    seen: set[str] = done_urls | {(h.get("url") or "").strip() for h in pending}
+    accepted = len(seen)
+    pipeline: Pipeline | None = None
+
+    async def progress():
+        if on_progress is not None and pipeline is not None:
+            await on_progress(cp, pipeline.result.report())
+
+    async def discover(item: str | dict[str, Any]) -> list[dict[str, Any]]:
+        nonlocal accepted
+        if isinstance(item, dict):
+            # Hit carried over from a checkpoint; discovery already ran for it.
+            return [item]
+        topic = item
+        q = f"{topic} lobbying campaign finance latest"
+        mark = high_water.get(topic)
+        if mark is not None:
+            # Only a hint to Sonar; the mark is enforced on the hits below.
+            q += f" since {mark.date().isoformat()}"
+        out: list[dict[str, Any]] = []
+        hits = await sonar_search(q, max_results=per_topic)
+        known: dict[str, str | None] = {}
+        if incremental:
+            ids = list({_doc_id(u) for u in ((h.get("url") or "").strip() for h in hits) if u})
+            known = await _load_known_hashes(sb, ids)
+        for h in hits:
+            url = (h.get("url") or "").strip()
+            if not url or url in seen or accepted >= limit:
+                continue
+            seen.add(url)
+            doc_id = _doc_id(url)
+            h_hash = _content_hash(h)
+            if incremental and doc_id in known:
+                if known[doc_id] == h_hash:
+                    # Same listing; the body may still have been edited. Worth a conditional GET
+                    # only if the page cache has validators for it.
+                    cached = await load_page(url)
+                    if cached is None or not cached.conditional_headers():
+                        counts["skipped"] += 1
+                        continue
+                    out.append({**h, "_topic": topic, "_content_hash": h_hash, "_recheck": True})
+                    continue
+                counts["changed"] += 1
+            else:
+                published = _parse_published(h.get("published_at"))
+                if incremental and mark is not None and published is not None and published < mark:
+                    counts["stale"] += 1
+                    continue
+                counts["new"] += 1
+            accepted += 1
+            out.append({**h, "_topic": topic, "_content_hash": h_hash})
+        pending.extend(out)
+        cp.topics_done.append(topic)
+        await progress()
+        return out
+
+    async def fetch(h: dict[str, Any]) -> list[dict[str, Any]]:
         url = (h.get("url") or "").strip()
-        title = (h.get("title") or "").strip() or url
-        source = (h.get("source") or "").strip() or "web"
-        snippet = (h.get("snippet") or "").strip()
-        published_at = h.get("published_at")
-        published_dt: datetime | None = None
-        if isinstance(published_at, str) and published_at:
+        previous = await load_page(url) if h.get("_recheck") else None
+        async with hosts.for_url(url):
             try:
-                published_dt = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+                page = await fetch_page(url)
             except Exception:
-                published_dt = None
+                page = None
+        if h.get("_recheck"):
+            # Still fresh in the cache, a 304, or the same body again: nothing to re-ingest. A
+            # failed direct fetch can't tell either way, so it counts as unchanged too.
+            unchanged = page is None or page.origin in ("cache", "revalidated", "unlocker")
+            if not unchanged and previous is not None and page.html == previous.html:
+                # Server without working validators: keep the parse, store the new ones.
+                page.parsed = previous.parsed
+                unchanged = True
+            if unchanged:
+                if page is not None and page.origin in ("revalidated", "network"):
+                    await save_page(page)
+                counts["skipped"] += 1
+                cp.done_urls.append(url)
+                pending[:] = [p for p in pending if (p.get("url") or "").strip() != url]
+                await progress()
+                return []
+            counts["changed"] += 1
+        return [{"hit": h, "page": page}]
 
+    async def extract(ctx: dict[str, Any]) -> list[dict[str, Any]]:
+        h = ctx["hit"]
+        url = (h.get("url") or "").strip()
         try:
-            html = await fetch_html(url)
-            image_url = extract_og_image(html)
+            doc = await extract_document(ctx["page"]) if ctx["page"] is not None else await reader_document(url)
         except Exception:
-            html = ""
-            image_url = None
+            doc = None
+        row = _hit_to_row(h, doc=doc, topics=topics)
+        row["content_hash"] = h["_content_hash"]
+        row["_topic"] = h["_topic"]
+        row["_content"] = doc.text if doc is not None else ""
+        return [row]
+
+    async def embed(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if use_embed:
+            try:
+                vecs = await embed_batch([document_text(r) for r in rows], task="retrieval.passage")
+            except Exception:
+                vecs = [None] * len(rows)
+            for r, v in zip(rows, vecs):
+                r["_embedding"] = v
+        return rows
+
+    async def store(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        docs_rows = [{k: v for k, v in r.items() if not k.startswith("_")} for r in rows]
+        # 3) Upsert into Supabase (canonical).
+        await sb.table("documents").upsert(docs_rows).execute()
+        for r in rows:
+            pub = _parse_published(r.get("published_at"))
+            if pub is not None and (r["_topic"] not in stored_high or pub > stored_high[r["_topic"]]):
+                stored_high[r["_topic"]] = pub
+
+        stored = {r["url"] for r in rows}
+        cp.done_urls.extend(stored)
+        pending[:] = [h for h in pending if (h.get("url") or "").strip() not in stored]
+        await progress()
+
+        # 4) Index into Elasticsearch (derived) if configured. If Jina is not configured,
+        # index without vectors so BM25-only search still works.
+        if bulk is not None:
+            await bulk.index_many([(r["id"], document_body(r, r.get("_embedding"))) for r in rows])
+        return rows
+
+    pipeline = Pipeline(
+        [
+            Stage("discover", discover, concurrency=s.ingest_discover_concurrency),
+            Stage("fetch", fetch, concurrency=s.ingest_fetch_concurrency),
+            Stage("extract", extract, concurrency=s.ingest_extract_concurrency),
+            Stage(
+                "embed",
+                embed,
+                concurrency=s.ingest_embed_concurrency,
+                batch_size=max(2, s.jina_batch_max_items),
+                linger_seconds=s.ingest_batch_linger_ms / 1000.0,
+            ),
+            Stage(
+                "store",
+                store,
+                concurrency=s.ingest_store_concurrency,
+                batch_size=s.ingest_store_batch_size,
+                linger_seconds=s.ingest_batch_linger_ms / 1000.0,
+            ),
+        ]
+    )
+    # Only advance a topic's high-water mark past documents that were actually stored.
+    stored_high: dict[str, datetime] = {}
+
+    inputs: list[Any] = [t for t in topics if t not in cp.topics_done] + list(pending)
+
+    # One refresh for the whole run instead of one per write.
+    bulk = BulkIndexer(s.elastic_index_documents) if use_es else None
+    if bulk is not None:
+        async with bulk:
+            result = await pipeline.run(inputs, deadline_seconds=s.ingest_deadline_seconds)
+    else:
+        result = await pipeline.run(inputs, deadline_seconds=s.ingest_deadline_seconds)
+
+    # 5) Return latest from Supabase
+    items = await read_cached_news(limit=limit)
+    report = result.report()
+    report["stored"] = len(result.outputs)
+    report["remaining"] = len(pending) + len([t for t in topics if t not in cp.topics_done])
+    report["incremental"] = incremental
+    report.update(counts)
+    if stored_high:
+        await _save_high_water(sb, stored_high, high_water)
+    if bulk is not None:
+        report["index"] = bulk.report.as_dict()
+    if report["stored"] and vector_index_active():
+        try:
+            report["vector_index"] = await sync_vector_index()
+        except Exception as e:
+            report["vector_index"] = {"error": str(e)[:500]}
+    if report["stored"]:
+        # Cached search results may now be missing the new documents.
+        bump_search_generation()
+    return IngestRun(items=items, report=report)
+
+
+def _hit_to_row(h: dict[str, Any], *, doc: AcquiredDocument | None, topics: list[str]) -> dict[str, Any]:
+    url = (h.get("url") or "").strip()
+    title = (h.get("title") or "").strip() or (doc.title if doc is not None else None) or url
+    source = (h.get("source") or "").strip() or "web"
+    snippet = (h.get("snippet") or "").strip() or (doc.description if doc is not None else None) or ""
+    published_dt = _parse_published(h.get("published_at"))
+
+    return {
+        "id": _doc_id(url),
+        "source": "news",
+        "url": url,
+        "title": title,
+        "published_at": published_dt.isoformat() if published_dt else None,
+        "excerpt": snippet[:600],
+        "image_url": doc.image_url if doc is not None else None,
+        "entities_mentioned": [],
+        "metadata": {"from": source, "topic_tags": topics},
+    }
 
+
+def _parse_published(published_at: Any) -> datetime | None:
+    if isinstance(published_at, str) and published_at:
         try:
-            content = await fetch_readable_text(url)
+            dt = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
         except Exception:
-            content = ""
-
-        doc_id = _doc_id(url)
-        docs_rows.append(
-            {
-                "id": doc_id,
-                "source": "news",
-                "url": url,
-                "title": title,
-                "published_at": published_dt.isoformat() if published_dt else None,
-                "excerpt": snippet[:600],
-                "image_url": image_url,
-                "entities_mentioned": [],
-                "metadata": {"from": source, "topic_tags": topics},
-            }
-        )
+            return None
+        # Date-only / naive values are treated as UTC so high-water comparisons stay valid.
+        return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+    return None
 
-    # 3) Upsert into Supabase (canonical).
-    if docs_rows:
-        sb.table("documents").upsert(docs_rows).execute()
 
-    # 4) Index into Elasticsearch (derived) if configured. If Jina is not configured,
-    # index without vectors so BM25-only search still works.
-    if s.elastic_cloud_id and s.elastic_api_key and docs_rows:
-        await ensure_indices()
-        client = es()
-        for row in docs_rows:
-            emb = None
-            if s.jina_api_key:
-                content_for_embed = f'{row.get("title","")}\n\n{row.get("excerpt","")}\n\n{row.get("url","")}'
-                try:
-                    emb = await embed_text(content_for_embed, task="retrieval.passage")
-                except Exception:
-                    emb = None
-            body = {
-                "id": row["id"],
-                "type": "document",
-                "title": row["title"],
-                "url": row["url"],
-                "source": row.get("metadata", {}).get("from", "web"),
-                "published_at": row.get("published_at"),
-                "excerpt": row.get("excerpt") or "",
-                "content": "",  # keep ES slim for hackathon; canonical text can live in Supabase metadata later
-                "image_url": row.get("image_url"),
-                "tags": row.get("metadata", {}).get("topic_tags", []),
-                "entities_mentioned": [],
-                "last_updated": datetime.utcnow().isoformat(),
-            }
-            if emb is not None:
-                body["embedding"] = emb
-            await client.index(index=s.elastic_index_documents, id=row["id"], document=body)
+async def _load_known_hashes(sb: AsyncDb, ids: list[str]) -> dict[str, str | None]:
+    """Content hash of each of `ids` that is already stored, in one lookup."""
+    if not ids:
+        return {}
+    rows = await sb.table("documents").select("id,content_hash").in_("id", ids).execute()
+    return {r["id"]: r.get("content_hash") for r in rows}
 
-    # 5) Return latest from Supabase
-    resp = (
-        sb.table("documents")
-        .select("id, title, url, source, published_at, excerpt, image_url, entities_mentioned, metadata")
-        .eq("source", "news")
-        .order("published_at", desc=True)
-        .limit(limit)
-        .execute()
-    )
-    out: list[NewsItem] = []
-    for r in (resp.data or []):
-        out.append(
-            NewsItem(
-                id=r["id"],
-                title=r.get("title") or "",
-                url=r.get("url") or "",
-                source=(r.get("metadata") or {}).get("from") or "web",
-                published_at=r.get("published_at"),
-                excerpt=r.get("excerpt") or "",
-                image_url=r.get("image_url"),
-                entities_mentioned=r.get("entities_mentioned") or [],
-                tags=(r.get("metadata") or {}).get("topic_tags") or [],
-            )
-        )
+
+async def _load_high_water(sb: AsyncDb) -> dict[str, datetime]:
+    rows = await sb.table("ingest_state").select("topic,high_water_published_at").execute()
+    out: dict[str, datetime] = {}
+    for r in rows:
+        dt = _parse_published(r.get("high_water_published_at"))
+        if dt is not None:
+            out[r["topic"]] = dt
     return out
 
 
+async def _save_high_water(sb: AsyncDb, stored: dict[str, datetime], previous: dict[str, datetime]):
+    rows = [
+        {"topic": t, "high_water_published_at": dt.isoformat(), "updated_at": datetime.now(timezone.utc).isoformat()}
+        for t, dt in stored.items()
+        if t not in previous or dt > previous[t]
+    ]
+    if rows:
+        await sb.table("ingest_state").upsert(rows).execute()
+
+
 async def read_cached_news(*, limit: int) -> list[NewsItem]:
-    sb = supabase_admin()
-    resp = (
-        sb.table("documents")
+    rows = await (
+        db()
+        .table("documents")
         .select("id, title, url, source, published_at, excerpt, image_url, entities_mentioned, metadata")
         .eq("source", "news")
         .order("published_at", desc=True)
@@ -161,7 +386,7 @@ async def read_cached_news(*, limit: int) -> list[NewsItem]:
         .execute()
     )
     out: list[NewsItem] = []
-    for r in (resp.data or []):
+    for r in rows:
         out.append(
             NewsItem(
                 id=r["id"],
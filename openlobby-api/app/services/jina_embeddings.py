@@ -1,29 +1,185 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from dataclasses import dataclass
 from typing import Any
 
 import httpx
 
 from app.config import get_settings
+from app.services.embedding_cache import cache_key, embedding_cache
+from app.services.http_clients import http_client
 
 
-async def embed_text(text: str, task: str = "retrieval.passage") -> list[float]:
-    s = get_settings()
-    if not text.strip():
-        return [0.0] * s.jina_dims
-    if not s.jina_api_key:
-        raise RuntimeError("Jina is not configured (JINA_API_KEY).")
+JINA_EMBEDDINGS_URL = "https://api.jina.ai/v1/embeddings"
+
+
+@dataclass
+class _EmbedStats:
+    texts: int = 0
+    requests: int = 0
+    retries: int = 0
+    splits: int = 0
+    failed_texts: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "texts": self.texts,
+            "requests": self.requests,
+            "retries": self.retries,
+            "splits": self.splits,
+            "failed_texts": self.failed_texts,
+            "seconds": round(self.seconds, 3),
+            "texts_per_request": round(self.texts / self.requests, 2) if self.requests else None,
+            "texts_per_second": round(self.texts / self.seconds, 2) if self.seconds > 0 else None,
+        }
+
+
+_stats = _EmbedStats()
 
+
+def embedding_stats() -> dict[str, Any]:
+    return _stats.as_dict()
+
+
+async def _post_embeddings(texts: list[str], task: str) -> list[list[float]]:
+    s = get_settings()
     payload: dict[str, Any] = {
         "model": s.jina_model,
         "task": task,
-        "input": [text],
+        "input": texts,
         "dimensions": s.jina_dims,
     }
     headers = {"Authorization": f"Bearer {s.jina_api_key}", "Content-Type": "application/json"}
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        resp = await client.post("https://api.jina.ai/v1/embeddings", json=payload, headers=headers)
+    _stats.requests += 1
+    t0 = time.perf_counter()
+    try:
+        resp = await http_client("jina").post(JINA_EMBEDDINGS_URL, json=payload, headers=headers)
         resp.raise_for_status()
         data = resp.json()
-        return data["data"][0]["embedding"]
+    finally:
+        _stats.seconds += time.perf_counter() - t0
+
+    # Jina echoes each input's position; don't rely on response order.
+    out: list[list[float] | None] = [None] * len(texts)
+    for i, item in enumerate(data["data"]):
+        out[int(item.get("index", i))] = item["embedding"]
+    if any(v is None for v in out):
+        raise RuntimeError("Jina response is missing embeddings for some inputs.")
+    _stats.texts += len(texts)
+    return out  # type: ignore[return-value]
+
+
+async def embed_text(text: str, task: str = "retrieval.passage") -> list[float]:
+    s = get_settings()
+    if not text.strip():
+        return [0.0] * s.jina_dims
+    if not s.jina_api_key:
+        raise RuntimeError("Jina is not configured (JINA_API_KEY).")
+
+    cache = embedding_cache()
+    key = cache_key(text, model=s.jina_model, task=task, dims=s.jina_dims)
+    if cache is not None:
+        hit = (await cache.get_many([key])).get(key)
+        if hit is not None:
+            return hit
+
+    vec = (await _post_embeddings([text], task))[0]
+    if cache is not None:
+        await cache.put_many({key: vec})
+    return vec
+
+
+def _estimate_tokens(text: str) -> int:
+    # Rough (~4 chars/token for English); only used to keep requests under the API limits.
+    return len(text) // 4 + 1
+
+
+def _pack(indexed: list[tuple[int, str]], *, max_items: int, max_tokens: int) -> list[list[tuple[int, str]]]:
+    batches: list[list[tuple[int, str]]] = []
+    cur: list[tuple[int, str]] = []
+    cur_tokens = 0
+    for i, text in indexed:
+        n = _estimate_tokens(text)
+        if cur and (len(cur) >= max_items or cur_tokens + n > max_tokens):
+            batches.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append((i, text))
+        cur_tokens += n
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+async def embed_batch(texts: list[str], task: str = "retrieval.passage") -> list[list[float] | None]:
+    """
+    Embed many texts with as few Jina requests as possible.
+
+    Texts are packed into requests bounded by JINA_BATCH_MAX_ITEMS and JINA_BATCH_MAX_TOKENS and
+    sent with bounded concurrency. A sub-batch that fails is retried on its own; one the API
+    rejects as too large is split in half. Results are in input order; an item whose sub-batch
+    still fails after retries comes back as None so callers can index it without a vector.
+    Texts already in the embedding cache are never sent.
+    """
+    s = get_settings()
+    if not s.jina_api_key:
+        raise RuntimeError("Jina is not configured (JINA_API_KEY).")
+
+    out: list[list[float] | None] = [None] * len(texts)
+    indexed: list[tuple[int, str]] = []
+    for i, t in enumerate(texts):
+        if t.strip():
+            indexed.append((i, t))
+        else:
+            out[i] = [0.0] * s.jina_dims
+
+    cache = embedding_cache()
+    keys = {i: cache_key(t, model=s.jina_model, task=task, dims=s.jina_dims) for i, t in indexed}
+    if cache is not None and indexed:
+        cached = await cache.get_many(list(set(keys.values())))
+        for i, _ in indexed:
+            out[i] = cached.get(keys[i])
+        indexed = [(i, t) for i, t in indexed if out[i] is None]
+
+    sem = asyncio.Semaphore(max(1, s.jina_batch_concurrency))
+
+    async def run(batch: list[tuple[int, str]], attempt: int = 0):
+        try:
+            async with sem:
+                vecs = await _post_embeddings([t for _, t in batch], task)
+        except httpx.HTTPStatusError as e:
+            too_large = e.response.status_code in (400, 413)
+            if too_large and len(batch) > 1:
+                _stats.splits += 1
+                mid = len(batch) // 2
+                await asyncio.gather(run(batch[:mid]), run(batch[mid:]))
+                return
+            if too_large or (e.response.status_code < 500 and e.response.status_code != 429):
+                _stats.failed_texts += len(batch)
+                return
+            await retry(batch, attempt)
+            return
+        except Exception:
+            await retry(batch, attempt)
+            return
+        for (i, _), v in zip(batch, vecs):
+            out[i] = v
+
+    async def retry(batch: list[tuple[int, str]], attempt: int):
+        if attempt >= s.jina_batch_retries:
+            _stats.failed_texts += len(batch)
+            return
+        _stats.retries += 1
+        await asyncio.sleep(0.5 * (2**attempt))
+        await run(batch, attempt + 1)
+
+    batches = _pack(indexed, max_items=max(1, s.jina_batch_max_items), max_tokens=max(1, s.jina_batch_max_tokens))
+    await asyncio.gather(*(run(b) for b in batches))
+
+    if cache is not None:
+        fresh = {keys[i]: out[i] for i, _ in indexed if out[i] is not None}
+        await cache.put_many(fresh)  # type: ignore[arg-type]
+    return out
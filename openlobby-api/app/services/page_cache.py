@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import anyio
+
+from app.config import get_settings
+
+
+@dataclass
+class CachedPage:
+    url: str
+    html: str
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched_at: float = field(default_factory=time.time)
+    # Parsed fields derived from `html`, so a 304 doesn't need a re-parse.
+    parsed: dict[str, Any] = field(default_factory=dict)
+    # How this copy was obtained: network | unlocker | cache | revalidated
+    origin: str = "network"
+
+    def is_fresh(self, max_age: float) -> bool:
+        return time.time() - self.fetched_at < max_age
+
+    def conditional_headers(self) -> dict[str, str]:
+        h: dict[str, str] = {}
+        if self.etag:
+            h["if-none-match"] = self.etag
+        if self.last_modified:
+            h["if-modified-since"] = self.last_modified
+        return h
+
+
+def _path(url: str) -> str:
+    s = get_settings()
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(s.page_cache_dir, digest[:2], f"{digest}.json.gz")
+
+
+def _read(url: str) -> CachedPage | None:
+    try:
+        with gzip.open(_path(url), "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("url") != url:
+        return None
+    return CachedPage(**data)
+
+
+def _write(page: CachedPage):
+    path = _path(page.url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(asdict(page), f)
+    os.replace(tmp, path)
+
+
+async def load_page(url: str) -> CachedPage | None:
+    if not get_settings().page_cache_enabled:
+        return None
+    return await anyio.to_thread.run_sync(_read, url)
+
+
+async def save_page(page: CachedPage):
+    if not get_settings().page_cache_enabled:
+        return
+    try:
+        await anyio.to_thread.run_sync(_write, page)
+    except OSError:
+        pass
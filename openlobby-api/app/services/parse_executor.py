@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+import anyio
+
+from app.config import get_settings
+
+
+T = TypeVar("T")
+
+
+def _warm():
+    # Pay the bs4/lxml import and first-parse cost at worker start, not on the first job.
+    from bs4 import BeautifulSoup
+
+    BeautifulSoup("<html><head><title>x</title></head><body><p>x</p></body></html>", "lxml").get_text()
+
+
+def _noop() -> int:
+    return 0
+
+
+@dataclass
+class _ParseStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    truncated: int = 0
+    recycled: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    busy_seconds: float = 0.0
+    completed_seconds: float = 0.0
+    max_job_seconds: float = 0.0
+
+
+class ParseExecutor:
+    """
+    Runs CPU-heavy HTML parsing (BeautifulSoup/lxml) in a pool of warm worker processes so it
+    never blocks the event loop. Each job gets a size cap (input is truncated) and a timeout; a
+    timed-out worker can't be interrupted, so the pool is replaced and the old workers killed.
+    Jobs wait in the event loop until a worker is free (so the timeout covers only the parse);
+    when more than PARSE_MAX_QUEUE jobs are waiting, new jobs are rejected with RuntimeError.
+    """
+
+    def __init__(self, *, workers: int, max_queue: int, timeout: float, max_chars: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.timeout = timeout
+        self.max_chars = max_chars
+        self.stats = _ParseStats()
+        self._pool: ProcessPoolExecutor | None = None
+        # Jobs running per pool, and replaced pools waiting for theirs to finish before being killed.
+        self._jobs: dict[ProcessPoolExecutor, int] = {}
+        self._retiring: set[ProcessPoolExecutor] = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._waiting = 0
+
+    def start(self):
+        if self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm)
+        # ProcessPoolExecutor spawns lazily; submit no-ops so every worker is up before traffic.
+        for _ in range(self.workers):
+            self._pool.submit(_noop)
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle(self, pool: ProcessPoolExecutor):
+        """Stop sending jobs to `pool`; its workers are terminated when it has no jobs left."""
+        if self._pool is pool:
+            self._pool = None
+            self.stats.recycled += 1
+            self.start()
+        if pool not in self._retiring:
+            self._retiring.add(pool)
+            # Jobs already handed to this pool keep running (each has its own timeout).
+            pool.shutdown(wait=False, cancel_futures=False)
+        self._release(pool, 0)
+
+    def _release(self, pool: ProcessPoolExecutor, jobs: int):
+        left = self._jobs.get(pool, 0) - jobs
+        if left > 0:
+            self._jobs[pool] = left
+            return
+        self._jobs.pop(pool, None)
+        if pool in self._retiring:
+            self._retiring.discard(pool)
+            for p in list((getattr(pool, "_processes", None) or {}).values()):
+                try:
+                    p.terminate()
+                except Exception:
+                    pass
+
+    def cap(self, html: str) -> str:
+        if self.max_chars > 0 and len(html) > self.max_chars:
+            self.stats.truncated += 1
+            return html[: self.max_chars]
+        return html
+
+    async def run(self, fn: Callable[..., T], html: str, *args: Any) -> T:
+        st = self.stats
+        if self._waiting >= self.max_queue:
+            st.rejected += 1
+            raise RuntimeError("HTML parse queue is full.")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        html = self.cap(html)
+        st.submitted += 1
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            if self._pool is None:
+                self.start()
+            pool = self._pool
+            self._jobs[pool] = self._jobs.get(pool, 0) + 1
+            st.in_flight += 1
+            st.max_in_flight = max(st.max_in_flight, st.in_flight)
+            t0 = time.perf_counter()
+            try:
+                fut = asyncio.get_running_loop().run_in_executor(pool, fn, html, *args)
+                out = await asyncio.wait_for(fut, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                st.timeouts += 1
+                self._recycle(pool)
+                raise RuntimeError("HTML parse timed out.")
+            except Exception:
+                st.failed += 1
+                raise
+            finally:
+                st.in_flight -= 1
+                self._release(pool, 1)
+                dt = time.perf_counter() - t0
+                st.busy_seconds += dt
+                st.max_job_seconds = max(st.max_job_seconds, dt)
+        finally:
+            self._slots.release()
+        st.completed += 1
+        st.completed_seconds += dt
+        return out
+
+    def snapshot(self) -> dict[str, Any]:
+        st = self.stats
+        return {
+            "workers": self.workers,
+            "running": self._pool is not None,
+            "in_flight": st.in_flight,
+            "queue_depth": self._waiting,
+            "max_in_flight": st.max_in_flight,
+            "max_queue": self.max_queue,
+            "submitted": st.submitted,
+            "completed": st.completed,
+            "failed": st.failed,
+            "timeouts": st.timeouts,
+            "rejected": st.rejected,
+            "truncated": st.truncated,
+            "recycled": st.recycled,
+            "avg_job_seconds": round(st.completed_seconds / st.completed, 4) if st.completed else None,
+            "max_job_seconds": round(st.max_job_seconds, 4),
+        }
+
+
+_executor: ParseExecutor | None = None
+
+
+def parse_executor() -> ParseExecutor:
+    global _executor
+    if _executor is None:
+        s = get_settings()
+        _executor = ParseExecutor(
+            workers=s.parse_workers,
+            max_queue=s.parse_max_queue,
+            timeout=s.parse_timeout_seconds,
+            max_chars=s.parse_max_html_chars,
+        )
+    return _executor
+
+
+async def run_parse(fn: Callable[..., T], html: str, *args: Any) -> T:
+    """
+    Run `fn(html, *args)` off the event loop. `fn` must be a module-level (picklable) function.
+    With PARSE_WORKERS=0 it runs in a thread instead (e.g. where subprocesses aren't allowed).
+    """
+    s = get_settings()
+    if s.parse_workers <= 0:
+        return await anyio.to_thread.run_sync(fn, parse_executor().cap(html), *args)
+    return await parse_executor().run(fn, html, *args)
+
+
+def shutdown_parse_executor():
+    if _executor is not None:
+        _executor.shutdown()
@@ -3,9 +3,8 @@ from __future__ import annotations
 import json
 from typing import Any
 
-import httpx
-
 from app.config import get_settings
+from app.services.http_clients import http_client
 
 
 PERPLEXITY_CHAT_URL = "https://api.perplexity.ai/chat/completions"
@@ -55,11 +54,10 @@ Constraints:
         "temperature": 0.2,
     }
 
-    async with httpx.AsyncClient(timeout=45) as client:
-        resp = await client.post(PERPLEXITY_CHAT_URL, headers=headers, json=body)
-        resp.raise_for_status()
-        out = resp.json()
-        content = out["choices"][0]["message"]["content"]
+    resp = await http_client("perplexity").post(PERPLEXITY_CHAT_URL, headers=headers, json=body, timeout=45)
+    resp.raise_for_status()
+    out = resp.json()
+    content = out["choices"][0]["message"]["content"]
 
     try:
         parsed = json.loads(content)
@@ -122,11 +120,10 @@ Constraints:
         "temperature": 0.4,
     }
 
-    async with httpx.AsyncClient(timeout=60) as client:
-        resp = await client.post(PERPLEXITY_CHAT_URL, headers=headers, json=body)
-        resp.raise_for_status()
-        out = resp.json()
-        content = out["choices"][0]["message"]["content"]
+    resp = await http_client("perplexity").post(PERPLEXITY_CHAT_URL, headers=headers, json=body, timeout=60)
+    resp.raise_for_status()
+    out = resp.json()
+    content = out["choices"][0]["message"]["content"]
 
     try:
         return json.loads(content)
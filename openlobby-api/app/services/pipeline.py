@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlsplit
+
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+_LINGER_POLL_SECONDS = 0.005
+
+
+@dataclass
+class StageStats:
+    name: str
+    concurrency: int
+    received: int = 0
+    emitted: int = 0
+    failed: int = 0
+    # "<ExceptionType>: <message>" of the most recent failed call, for the run report.
+    last_error: str | None = None
+    busy_seconds: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        wall = 0.0
+        if self.started_at is not None:
+            wall = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "concurrency": self.concurrency,
+            "received": self.received,
+            "emitted": self.emitted,
+            "failed": self.failed,
+            "last_error": self.last_error,
+            "wall_seconds": round(wall, 3),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.received / wall, 2) if wall > 0 else None,
+        }
+
+
+@dataclass
+class Stage:
+    """
+    One step of a Pipeline.
+
+    `fn` receives a single item (or a list of up to `batch_size` items when `batch_size > 1`)
+    and returns a list of outputs for the next stage. Returning [] drops the item.
+    A batched stage waits up to `linger_seconds` for a partial batch to fill before calling `fn`.
+    """
+
+    name: str
+    fn: Callable[[Any], Awaitable[list[Any]]]
+    concurrency: int = 4
+    batch_size: int = 1
+    linger_seconds: float = 0.0
+
+
+@dataclass
+class PipelineResult:
+    outputs: list[Any] = field(default_factory=list)
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+    timed_out: bool = False
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "timed_out": self.timed_out,
+            "stages": {name: st.as_dict() for name, st in self.stages.items()},
+        }
+
+
+class HostLimiter:
+    """Caps concurrent requests per remote host (keyed by URL netloc)."""
+
+    def __init__(self, per_host: int):
+        self._per_host = max(1, per_host)
+        self._sems: dict[str, asyncio.Semaphore] = {}
+
+    def for_url(self, url: str) -> asyncio.Semaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        sem = self._sems.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self._per_host)
+            self._sems[host] = sem
+        return sem
+
+
+class Pipeline:
+    """
+    Streams items through stages connected by bounded queues. Each stage runs its own
+    worker pool, so a slow item only occupies one worker instead of stalling the batch.
+    A failing item is logged, counted and dropped (its stage keeps the last error); it never
+    aborts the run.
+    """
+
+    def __init__(self, stages: list[Stage], *, queue_size: int = 256):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage.")
+        self.stages = stages
+        self.queue_size = queue_size
+        # Live while run() is in progress, so callers can report progress.
+        self.result = PipelineResult(stages={st.name: StageStats(st.name, max(1, st.concurrency)) for st in stages})
+
+    async def run(self, inputs: list[Any], *, deadline_seconds: float | None = None) -> PipelineResult:
+        result = self.result
+        queues: list[asyncio.Queue] = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        sink: list[Any] = result.outputs
+        started = time.perf_counter()
+
+        async def feed():
+            for item in inputs:
+                await queues[0].put(item)
+            await queues[0].put(_DONE)
+
+        async def emit(idx: int, outs: list[Any]):
+            if idx + 1 < len(self.stages):
+                for o in outs:
+                    await queues[idx + 1].put(o)
+            else:
+                sink.extend(outs)
+
+        async def worker(idx: int, stage: Stage, stats: StageStats):
+            q = queues[idx]
+            while True:
+                first = await q.get()
+                if first is _DONE:
+                    # Let sibling workers see the sentinel too.
+                    await q.put(_DONE)
+                    return
+                batch = [first]
+                if stage.batch_size > 1:
+                    linger_until = time.perf_counter() + stage.linger_seconds
+                    while len(batch) < stage.batch_size:
+                        try:
+                            nxt = q.get_nowait()
+                        except asyncio.QueueEmpty:
+                            # Poll rather than wait_for(q.get()): a get cancelled at the timeout can drop an item.
+                            left = linger_until - time.perf_counter()
+                            if left <= 0:
+                                break
+                            await asyncio.sleep(min(left, _LINGER_POLL_SECONDS))
+                            continue
+                        if nxt is _DONE:
+                            await q.put(_DONE)
+                            break
+                        batch.append(nxt)
+
+                if stats.started_at is None:
+                    stats.started_at = time.perf_counter()
+                stats.received += len(batch)
+                t0 = time.perf_counter()
+                try:
+                    outs = await stage.fn(batch if stage.batch_size > 1 else first)
+                except Exception as e:
+                    log.exception("pipeline stage %s failed on a batch of %d", stage.name, len(batch))
+                    stats.failed += len(batch)
+                    stats.last_error = f"{type(e).__name__}: {e}"[:500]
+                    outs = []
+                stats.busy_seconds += time.perf_counter() - t0
+                stats.emitted += len(outs or [])
+                await emit(idx, list(outs or []))
+
+        async def run_stage(idx: int, stage: Stage):
+            stats = result.stages[stage.name]
+            try:
+                await asyncio.gather(*(worker(idx, stage, stats) for _ in range(stats.concurrency)))
+            finally:
+                stats.finished_at = time.perf_counter()
+            if idx + 1 < len(self.stages):
+                await queues[idx + 1].put(_DONE)
+
+        async def run_all():
+            await asyncio.gather(feed(), *(run_stage(i, st) for i, st in enumerate(self.stages)))
+
+        try:
+            if deadline_seconds and deadline_seconds > 0:
+                await asyncio.wait_for(run_all(), timeout=deadline_seconds)
+            else:
+                await run_all()
+        except asyncio.TimeoutError:
+            result.timed_out = True
+            for stats in result.stages.values():
+                if stats.finished_at is None:
+                    stats.finished_at = time.perf_counter()
+
+        result.elapsed_seconds = time.perf_counter() - started
+        return result
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.config import get_settings
+from app.services.db import db
+
+
+@dataclass
+class _Entry:
+    value: Any
+    generation: int
+    expires_at: float
+    size: int
+    compute_seconds: float
+
+
+class SearchCache:
+    """
+    In-process result cache for hot read endpoints.
+
+    - TTL per entry, plus a byte budget enforced with LRU eviction.
+    - Single-flight: concurrent misses for the same key share one computation.
+    - Generation counter: bump_generation() (called when an ingest run stores documents)
+      makes every older entry a miss without walking the cache.
+    """
+
+    def __init__(self, *, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def bump_generation(self):
+        self.generation += 1
+
+    def _drop(self, key: Hashable):
+        e = self._entries.pop(key, None)
+        if e is not None:
+            self._bytes -= e.size
+
+    def _get(self, key: Hashable) -> _Entry | None:
+        e = self._entries.get(key)
+        if e is None:
+            return None
+        if e.generation != self.generation or e.expires_at <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return e
+
+    def _put(self, key: Hashable, value: Any, *, size: int, compute_seconds: float, generation: int):
+        if size > self.max_bytes or generation != self.generation:
+            return
+        self._drop(key)
+        self._entries[key] = _Entry(value, generation, time.monotonic() + self.ttl_seconds, size, compute_seconds)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        *,
+        sizeof: Callable[[Any], int],
+        cacheable: Callable[[Any], bool] = lambda v: True,
+    ) -> Any:
+        e = self._get(key)
+        if e is not None:
+            self.hits += 1
+            self.saved_seconds += e.compute_seconds
+            return e.value
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        self.misses += 1
+        generation = self.generation
+
+        async def run() -> Any:
+            t0 = time.perf_counter()
+            try:
+                value = await compute()
+            finally:
+                self._inflight.pop(key, None)
+            if cacheable(value):
+                self._put(key, value, size=sizeof(value), compute_seconds=time.perf_counter() - t0, generation=generation)
+            return value
+
+        # The computation is its own task so a caller that disconnects doesn't cancel it for
+        # everyone else waiting on the same key.
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "generation": self.generation,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+_cache: SearchCache | None = None
+_remote_marker: str | None = None
+_remote_checked = 0.0
+_remote_task: asyncio.Task | None = None
+
+
+def search_cache() -> SearchCache:
+    global _cache
+    if _cache is None:
+        s = get_settings()
+        _cache = SearchCache(ttl_seconds=s.search_cache_ttl_seconds, max_bytes=s.search_cache_max_bytes)
+    return _cache
+
+
+def bump_search_generation():
+    search_cache().bump_generation()
+
+
+async def _latest_ingest_marker() -> str | None:
+    # Interrupted jobs have no finished_at; their last write (heartbeat_at, set on every save) is
+    # the marker. Nulls last, so a row without one can't pin the marker at None.
+    rows = await (
+        db()
+        .table("ingest_jobs")
+        .select("heartbeat_at")
+        .in_("status", ["succeeded", "interrupted"])
+        .order("heartbeat_at", desc=True, nullsfirst=False)
+        .limit(1)
+        .execute()
+    )
+    return rows[0].get("heartbeat_at") if rows else None
+
+
+async def _poll_remote():
+    global _remote_marker
+    try:
+        marker = await _latest_ingest_marker()
+    except Exception:
+        return
+    if _remote_marker is not None and marker != _remote_marker:
+        bump_search_generation()
+    _remote_marker = marker
+
+
+def sync_generation():
+    """
+    Ingests that ran in another process (cron, another worker) can't bump our counter directly;
+    poll the latest finished ingest job every SEARCH_CACHE_GENERATION_POLL_SECONDS, in the
+    background so no request waits on it.
+    """
+    global _remote_checked, _remote_task
+    now = time.monotonic()
+    if now - _remote_checked < get_settings().search_cache_generation_poll_seconds:
+        return
+    if _remote_task is not None and not _remote_task.done():
+        return
+    _remote_checked = now
+    _remote_task = asyncio.create_task(_poll_remote())
@@ -0,0 +1,501 @@
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import anyio
+import numpy as np
+
+from app.config import get_settings
+from app.services.index_manager import SOURCES, stream_rows
+from app.services.jina_embeddings import embed_batch
+
+
+# Kinds held in the local index; the code is the per-row kind tag stored alongside the vectors.
+KIND_CODES = {"documents": 0, "entities": 1}
+_KIND_NAMES = {v: k for k, v in KIND_CODES.items()}
+
+_CHUNK = 65536
+
+
+class VectorIndex:
+    """
+    On-disk vector index for semantic search when Elasticsearch isn't configured.
+
+    Layout under VECTOR_INDEX_DIR:
+      vectors.bin  row-major matrix (float32, or int8 with per-row scales in scales.bin)
+      kinds.bin    uint8 kind code per row
+      ids.jsonl    one id per row (append-only)
+      ivf.npz      optional coarse quantizer for approximate search (centroids + row lists)
+      meta.json    row count, dims, dtype, sync watermarks and embedding failures; written last, so
+                   it is the commit point
+      lock         flock(2) target; every writer (upsert, clear, train) holds it exclusively
+
+    Vectors are L2-normalized on insert, so dot product is cosine similarity. Matrices are
+    memory-mapped read-only and scored in chunks; other processes pick up changes when
+    meta.json changes. Several processes (API workers, the ingest, the cron) may write: each
+    write takes the file lock and reloads the committed state first, so no writer appends at
+    a stale row count or truncates rows another process committed.
+    """
+
+    def __init__(self, path: str, *, dims: int, dtype: str):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.path = path
+        self.dims = dims
+        self.dtype = dtype
+        self.meta: dict[str, Any] = {"count": 0, "dims": dims, "dtype": dtype, "watermarks": {}}
+        self._ids: list[str] = []
+        self._ids_bytes = 0
+        self._row: dict[tuple[int, str], int] = {}
+        self._vecs: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._kinds: np.ndarray | None = None
+        self._ivf: dict[str, np.ndarray] | None = None
+        self._meta_version: tuple[int, int] | None = None
+        # Set when the files on disk are for other dims/dtype; the next write starts over.
+        self._reset_pending = False
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @property
+    def count(self) -> int:
+        return int(self.meta.get("count") or 0)
+
+    def reload_if_changed(self):
+        try:
+            st = os.stat(self._file("meta.json"))
+        except OSError:
+            return
+        # meta.json is replaced (new inode) on every commit, so inode + mtime identifies a version.
+        version = (st.st_ino, st.st_mtime_ns)
+        if version != self._meta_version:
+            self._load()
+            self._meta_version = version
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Exclusive inter-process lock for a write, with the latest committed state loaded."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file("lock"), "a+b") as lf:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+            try:
+                self.reload_if_changed()
+                if self._reset_pending:
+                    self._clear()
+                yield
+            finally:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+    def _load(self):
+        with open(self._file("meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dims") != self.dims or meta.get("dtype") != self.dtype:
+            # Model or storage format changed: serve nothing and start over on the next write (sync
+            # repopulates from Supabase). Readers don't hold the write lock, so they don't delete.
+            self._reset_memory()
+            self._reset_pending = True
+            return
+        self._reset_pending = False
+        n = int(meta.get("count") or 0)
+        ids: list[str] = []
+        ids_bytes = 0
+        kinds = np.zeros(0, dtype=np.uint8)
+        if n:
+            with open(self._file("ids.jsonl"), "rb") as f:
+                for line in f:
+                    if len(ids) >= n:
+                        break
+                    ids.append(json.loads(line))
+                    ids_bytes += len(line)
+            kinds = np.fromfile(self._file("kinds.bin"), dtype=np.uint8, count=n)
+        self.meta = meta
+        self._ids = ids
+        self._ids_bytes = ids_bytes
+        self._kinds = kinds
+        self._row = {(int(k), i): r for r, (k, i) in enumerate(zip(kinds.tolist(), ids))}
+        self._map_vectors(n)
+        self._scales = (
+            np.fromfile(self._file("scales.bin"), dtype=np.float32, count=n) if n and self.dtype == "int8" else None
+        )
+        self._ivf = None
+        if os.path.exists(self._file("ivf.npz")):
+            with np.load(self._file("ivf.npz")) as z:
+                if int(z["count"]) <= n:
+                    self._ivf = {"centroids": z["centroids"], "assign": z["assign"]}
+
+    def _map_vectors(self, n: int):
+        self._vecs = (
+            np.memmap(self._file("vectors.bin"), dtype=np.dtype(self.dtype), mode="r", shape=(n, self.dims)) if n else None
+        )
+
+    def _reset_memory(self):
+        self.meta = {"count": 0, "dims": self.dims, "dtype": self.dtype, "watermarks": {}}
+        self._ids, self._row, self._ids_bytes = [], {}, 0
+        self._vecs = self._scales = self._kinds = None
+        self._ivf = None
+
+    def clear(self):
+        with self._write_lock():
+            self._clear()
+
+    def _clear(self):
+        for name in ("vectors.bin", "scales.bin", "kinds.bin", "ids.jsonl", "ivf.npz"):
+            try:
+                os.remove(self._file(name))
+            except FileNotFoundError:
+                pass
+        self._reset_memory()
+        self._reset_pending = False
+        self._write_meta()
+
+    def _write_meta(self):
+        tmp = self._file(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self._file("meta.json"))
+        st = os.stat(self._file("meta.json"))
+        self._meta_version = (st.st_ino, st.st_mtime_ns)
+
+    def _encode(self, mat: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+        if self.dtype == "float32":
+            return mat.astype(np.float32), None
+        scales = np.maximum(np.abs(mat).max(axis=1), 1e-12) / 127.0
+        q = np.clip(np.rint(mat / scales[:, None]), -127, 127).astype(np.int8)
+        return q, scales.astype(np.float32)
+
+    def upsert(
+        self,
+        kind: str,
+        items: list[tuple[str, list[float]]],
+        *,
+        watermark: str | None = None,
+        failures: dict[str, dict[str, Any]] | None = None,
+    ):
+        """
+        Add or replace vectors. Existing rows are overwritten in place; new rows are appended.
+        `watermark` and `failures` (the kind's rows that failed to embed) commit with them.
+        """
+        with self._write_lock():
+            if failures is not None:
+                self.meta.setdefault("embed_failures", {})[kind] = failures
+            self._upsert(kind, items, watermark=watermark)
+
+    def embed_failures(self, kind: str) -> dict[str, dict[str, Any]]:
+        """id -> {"at": changed stamp, "attempts": n} for rows of `kind` that failed to embed."""
+        return dict((self.meta.get("embed_failures") or {}).get(kind) or {})
+
+    def _upsert(self, kind: str, items: list[tuple[str, list[float]]], *, watermark: str | None):
+        code = KIND_CODES[kind]
+        items = list(dict(items).items())  # last write wins within a batch
+        new_ids: list[str] = []
+        if items:
+            mat = np.asarray([v for _, v in items], dtype=np.float32)
+            if mat.shape[1] != self.dims:
+                raise ValueError(f"Expected {self.dims}-dim vectors, got {mat.shape[1]}")
+            mat /= np.maximum(np.linalg.norm(mat, axis=1, keepdims=True), 1e-12)
+            enc, scales = self._encode(mat)
+            n = self.count
+            itemsize = np.dtype(self.dtype).itemsize * self.dims
+
+            # Drop bytes past the committed count (left by an interrupted write; under the lock
+            # nobody else can be mid-write).
+            for name, size in (
+                ("vectors.bin", n * itemsize),
+                ("kinds.bin", n),
+                ("scales.bin", n * 4),
+                ("ids.jsonl", self._ids_bytes),
+            ):
+                if os.path.exists(self._file(name)) and os.path.getsize(self._file(name)) > size:
+                    os.truncate(self._file(name), size)
+
+            new_rows: list[int] = []
+            replace: list[tuple[int, int]] = []
+            for j, (item_id, _) in enumerate(items):
+                row = self._row.get((code, item_id))
+                if row is None:
+                    new_rows.append(j)
+                else:
+                    replace.append((j, row))
+            with open(self._file("vectors.bin"), "r+b" if os.path.exists(self._file("vectors.bin")) else "w+b") as vf:
+                for j, row in replace:
+                    vf.seek(row * itemsize)
+                    vf.write(enc[j].tobytes())
+                vf.seek(n * itemsize)
+                vf.write(enc[new_rows].tobytes())
+            if scales is not None and replace:
+                with open(self._file("scales.bin"), "r+b") as sf:
+                    for j, row in replace:
+                        sf.seek(row * 4)
+                        sf.write(scales[j : j + 1].tobytes())
+            if scales is not None:
+                with open(self._file("scales.bin"), "ab") as sf:
+                    sf.write(scales[new_rows].tobytes())
+            with open(self._file("kinds.bin"), "ab") as kf:
+                kf.write(np.full(len(new_rows), code, dtype=np.uint8).tobytes())
+            new_ids = [items[j][0] for j in new_rows]
+            lines = b"".join(json.dumps(i).encode("utf-8") + b"\n" for i in new_ids)
+            with open(self._file("ids.jsonl"), "ab") as idf:
+                idf.write(lines)
+            # Keep the in-memory view in step instead of re-reading every file (ids.jsonl grows
+            # with the index, so reloading per batch made a full build quadratic). The count goes
+            # last so a concurrent search never sees more rows than the arrays hold.
+            for r, item_id in enumerate(new_ids, start=n):
+                self._row[(code, item_id)] = r
+            self._ids.extend(new_ids)
+            self._ids_bytes += len(lines)
+            self._kinds = np.concatenate(
+                [self._kinds if self._kinds is not None else np.zeros(0, dtype=np.uint8), np.full(len(new_ids), code, dtype=np.uint8)]
+            )
+            if scales is not None:
+                old = self._scales if self._scales is not None else np.zeros(0, dtype=np.float32)
+                old = old.copy()
+                for j, row in replace:
+                    old[row] = scales[j]
+                self._scales = np.concatenate([old, scales[new_rows]])
+            self._map_vectors(n + len(new_ids))
+            self.meta["count"] = n + len(new_ids)
+
+        if watermark is not None:
+            self.meta.setdefault("watermarks", {})[kind] = watermark
+        if self._ivf is not None and new_ids:
+            self._assign_new()
+        self._write_meta()
+
+    def train(self, *, nlist: int | None = None, iterations: int = 8, sample: int = 20000):
+        """Fit a spherical k-means coarse quantizer (IVF) for approximate search."""
+        with self._write_lock():
+            self._train(nlist=nlist, iterations=iterations, sample=sample)
+
+    def _train(self, *, nlist: int | None = None, iterations: int = 8, sample: int = 20000):
+        n = self.count
+        if n == 0 or self._vecs is None:
+            return
+        nlist = nlist or int(min(4096, max(16, np.sqrt(n))))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(0)
+        pick = np.sort(rng.choice(n, size=min(sample, n), replace=False))
+        data = self._dense(pick)
+        centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = data[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        assign_all = np.empty(n, dtype=np.int32)
+        for start in range(0, n, _CHUNK):
+            rows = np.arange(start, min(n, start + _CHUNK))
+            assign_all[rows] = np.argmax(self._dense(rows) @ centroids.T, axis=1)
+        self._save_ivf(centroids, assign_all)
+        self.meta["ivf_trained_count"] = n
+        self._write_meta()
+
+    def _save_ivf(self, centroids: np.ndarray, assign: np.ndarray):
+        np.savez(self._file("ivf.npz"), centroids=centroids, assign=assign, count=np.int64(len(assign)))
+        self._ivf = {"centroids": centroids, "assign": assign}
+
+    def _assign_new(self):
+        assert self._ivf is not None
+        n = self.count
+        assign = self._ivf["assign"]
+        if len(assign) >= n:
+            return
+        if n >= 2 * int(self.meta.get("ivf_trained_count") or 0):
+            # The corpus doubled since training; refit so lists stay balanced.
+            self._train()
+            return
+        rows = np.arange(len(assign), n)
+        extra = np.argmax(self._dense(rows) @ self._ivf["centroids"].T, axis=1).astype(np.int32)
+        self._save_ivf(self._ivf["centroids"], np.concatenate([assign, extra]))
+
+    def _dense(self, rows: np.ndarray) -> np.ndarray:
+        assert self._vecs is not None
+        block = np.asarray(self._vecs[rows], dtype=np.float32)
+        if self._scales is not None:
+            block *= self._scales[rows][:, None]
+        return block
+
+    def _score_rows(self, q: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        out = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), _CHUNK):
+            sel = rows[start : start + _CHUNK]
+            block = np.asarray(self._vecs[sel], dtype=np.float32)  # type: ignore[index]
+            s = block @ q
+            if self._scales is not None:
+                s *= self._scales[sel]
+            out[start : start + len(sel)] = s
+        return out
+
+    def search(
+        self, qvec: list[float], *, k: int, kinds: list[str] | None = None, approximate: bool | None = None, nprobe: int = 8
+    ) -> list[tuple[str, str, float]]:
+        """Top-k by cosine similarity. Returns [(kind, id, score)] best first."""
+        self.reload_if_changed()
+        n = self.count
+        if n == 0 or self._vecs is None or k <= 0:
+            return []
+        q = np.asarray(qvec, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+
+        if approximate is None:
+            approximate = self._ivf is not None
+        if approximate and self._ivf is not None:
+            cs = self._ivf["centroids"] @ q
+            probe = np.argpartition(-cs, min(nprobe, len(cs) - 1))[:nprobe]
+            rows = np.flatnonzero(np.isin(self._ivf["assign"][:n], probe))
+        else:
+            rows = np.arange(n)
+        if kinds:
+            codes = [KIND_CODES[kd] for kd in kinds]
+            rows = rows[np.isin(self._kinds[rows], codes)]  # type: ignore[index]
+        if len(rows) == 0:
+            return []
+
+        scores = self._score_rows(q, rows)
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [
+            (_KIND_NAMES[int(self._kinds[rows[t]])], self._ids[rows[t]], float(scores[t]))  # type: ignore[index]
+            for t in top
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        self.reload_if_changed()
+        size = 0
+        for name in ("vectors.bin", "scales.bin", "kinds.bin", "ids.jsonl", "ivf.npz"):
+            try:
+                size += os.path.getsize(self._file(name))
+            except OSError:
+                pass
+        by_kind = {}
+        if self._kinds is not None:
+            counts = np.bincount(self._kinds, minlength=len(KIND_CODES))
+            by_kind = {name: int(counts[code]) for name, code in KIND_CODES.items()}
+        return {
+            "rows": self.count,
+            "by_kind": by_kind,
+            "dims": self.dims,
+            "dtype": self.dtype,
+            "bytes_on_disk": size,
+            "approximate": self._ivf is not None,
+            "ivf_lists": int(len(self._ivf["centroids"])) if self._ivf is not None else 0,
+            "watermarks": dict(self.meta.get("watermarks") or {}),
+            "embed_failures": {kind: len(f) for kind, f in (self.meta.get("embed_failures") or {}).items()},
+        }
+
+
+_index: VectorIndex | None = None
+_sync_lock = asyncio.Lock()
+_last_sync = 0.0
+_sync_task: asyncio.Task | None = None
+
+
+def vector_index() -> VectorIndex:
+    global _index
+    if _index is None:
+        s = get_settings()
+        _index = VectorIndex(s.vector_index_dir, dims=s.jina_dims, dtype=s.vector_index_dtype)
+    return _index
+
+
+def vector_index_active() -> bool:
+    """The local index stands in for Elasticsearch kNN; it needs Jina for query embeddings."""
+    s = get_settings()
+    return s.vector_index_enabled and bool(s.jina_api_key) and not (s.elastic_cloud_id and s.elastic_api_key)
+
+
+async def sync_vector_index(*, full: bool = False) -> dict[str, Any]:
+    """
+    Bring the local index up to date with Supabase: rows changed since each kind's watermark are
+    embedded (mostly embedding-cache hits, since ingest just embedded the same text) and upserted.
+
+    A row that fails to embed holds the watermark, so the next sync retries it, for up to
+    VECTOR_INDEX_EMBED_ATTEMPTS syncs. After that the watermark moves past it and the row stays
+    out of the index (listed under embed_failures) until it changes again.
+    """
+    global _last_sync
+    s = get_settings()
+    idx = vector_index()
+    report: dict[str, Any] = {}
+    async with _sync_lock:
+        if full:
+            await anyio.to_thread.run_sync(idx.clear)
+        else:
+            await anyio.to_thread.run_sync(idx.reload_if_changed)
+        for kind in KIND_CODES:
+            src = SOURCES[kind]
+            since = (idx.meta.get("watermarks") or {}).get(kind)
+            rows_seen = added = skipped = given_up = 0
+            wm = since
+            failures = idx.embed_failures(kind)
+            # Rows arrive oldest change first, so the watermark can follow them page by page. It
+            # stops at the first row whose embedding failed and still has attempts left (the next
+            # sync starts there, `since` is inclusive), so that row and everything after it are
+            # retried. Attempts count per version of the row: a new change starts over.
+            stuck = False
+            async for rows in stream_rows(src, since=since, by_change=True):
+                rows_seen += len(rows)
+                vecs = await embed_batch([src.text(r) for r in rows], task="retrieval.passage")  # type: ignore[misc]
+                items = [(r["id"], v) for r, v in zip(rows, vecs) if v is not None]
+                for r, v in zip(rows, vecs):
+                    changed = r.get(src.changed_col)
+                    retry = False
+                    if v is None:
+                        prev = failures.get(r["id"]) or {}
+                        attempts = (prev.get("attempts", 0) if prev.get("at") == changed else 0) + 1
+                        failures[r["id"]] = {"at": changed, "attempts": attempts}
+                        retry = attempts < s.vector_index_embed_attempts
+                        given_up += not retry
+                    else:
+                        failures.pop(r["id"], None)
+                    if stuck:
+                        continue
+                    if changed:
+                        wm = changed
+                    stuck = retry
+                skipped += len(rows) - len(items)
+                await anyio.to_thread.run_sync(lambda: idx.upsert(kind, items, watermark=wm, failures=failures))
+                added += len(items)
+            report[kind] = {
+                "since": since,
+                "rows": rows_seen,
+                "upserted": added,
+                "skipped": skipped,
+                "given_up": given_up,
+                "watermark": wm,
+            }
+        if s.vector_index_approximate and idx.count >= s.vector_index_approx_min_rows and "ivf_trained_count" not in idx.meta:
+            await anyio.to_thread.run_sync(idx.train)
+    _last_sync = time.monotonic()
+    report["index"] = idx.stats()
+    return report
+
+
+def maybe_sync_vector_index():
+    """Background refresh for processes that didn't run the ingest themselves (e.g. a separate cron)."""
+    global _sync_task, _last_sync
+    if not vector_index_active():
+        return
+    if time.monotonic() - _last_sync < get_settings().vector_index_sync_seconds:
+        return
+    if _sync_task is not None and not _sync_task.done():
+        return
+    _last_sync = time.monotonic()
+    _sync_task = asyncio.create_task(sync_vector_index())
+    _sync_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def search_vectors(qvec: list[float], *, k: int, kinds: list[str] | None = None) -> list[tuple[str, str, float]]:
+    s = get_settings()
+    approximate = s.vector_index_approximate and vector_index().count >= s.vector_index_approx_min_rows
+    return await anyio.to_thread.run_sync(
+        lambda: vector_index().search(qvec, k=k, kinds=kinds, approximate=approximate, nprobe=s.vector_index_nprobe)
+    )
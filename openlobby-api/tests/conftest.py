@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fakes import FakeElasticsearch, FakePostgrest
+
+from app.config import get_settings
+from app.services import db as db_module
+from app.services import elasticsearch_client
+
+
+@pytest.fixture
+def anyio_backend():
+    # The app uses asyncio primitives directly (Queue, Lock, create_task).
+    return "asyncio"
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """Override Settings fields for one test: settings(jina_api_key="k", ...)."""
+    s = get_settings()
+
+    def override(**values):
+        for name, value in values.items():
+            monkeypatch.setattr(s, name, value)
+        return s
+
+    return override
+
+
+@pytest.fixture
+def fake_es(monkeypatch):
+    """A FakeElasticsearch behind app.services.elasticsearch_client.es()."""
+    fake = FakeElasticsearch()
+    monkeypatch.setattr(elasticsearch_client, "_es", fake.client)
+    return fake
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """A FakePostgrest behind app.services.db.db()."""
+    fake = FakePostgrest()
+    monkeypatch.setattr(db_module, "_db", fake.db)
+    monkeypatch.setattr(db_module, "http_client", lambda name: fake.client)
+    return fake
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Retry backoffs (asyncio.sleep with a delay) return at once; sleep(0) still yields."""
+    sleep = asyncio.sleep
+
+    async def instant(_delay, result=None):
+        return await sleep(0, result)
+
+    monkeypatch.setattr(asyncio, "sleep", instant)
@@ -0,0 +1,439 @@
+"""
+In-memory stand-ins for the services the app talks to, plugged in at the transport layer so the
+real clients (elasticsearch-py and its bulk helpers, the PostgREST query builder) run unchanged.
+"""
+
+from __future__ import annotations
+
+import copy
+import fnmatch
+import itertools
+import json
+from typing import Any, Callable
+from urllib.parse import unquote, urlsplit
+
+import httpx
+from elastic_transport import ApiResponseMeta, BaseAsyncNode, HttpHeaders
+from elastic_transport._node._base import NodeApiResponse
+from elasticsearch import AsyncElasticsearch
+
+from app.services.db import AsyncDb
+
+
+class _FakeNode(BaseAsyncNode):
+    fake: FakeElasticsearch
+
+    async def perform_request(self, method, target, body=None, headers=None, request_timeout=None):
+        status, payload = self.fake.handle(method, target, body)
+        raw = b"" if method == "HEAD" or payload is None else json.dumps(payload).encode("utf-8")
+        meta = ApiResponseMeta(
+            status=status,
+            http_version="1.1",
+            headers=HttpHeaders({"x-elastic-product": "Elasticsearch", "content-type": "application/json"}),
+            duration=0.0,
+            node=self.config,
+        )
+        return NodeApiResponse(meta, raw)
+
+    async def close(self):
+        pass
+
+
+def _missing(kind: str, name: str) -> tuple[int, dict[str, Any]]:
+    return 404, {"error": {"type": kind, "reason": f"no such index [{name}]"}, "status": 404}
+
+
+class FakeElasticsearch:
+    """
+    The Elasticsearch APIs the app calls: bulk index/update, index create/delete/exists/get,
+    aliases, settings, refresh, index templates, mappings, count, and a search that understands
+    `must_not exists` and a `max` aggregation. Alias names resolve like in ES (a write through an
+    alias needs exactly one target).
+
+    `bulk_status(op, index, id, attempt)` can override an item's status (e.g. 429 then 201);
+    `fail_requests` makes the next that many _bulk requests fail as a whole with a 503.
+    """
+
+    def __init__(self):
+        self.indices: dict[str, dict[str, Any]] = {}
+        self.aliases: dict[str, set[str]] = {}
+        self.templates: dict[str, dict[str, Any]] = {}
+        self.bulk_requests: list[list[tuple[str, str]]] = []
+        self.refreshes: list[str] = []
+        self.bulk_status: Callable[[str, str, str, int], int | None] | None = None
+        self.fail_requests = 0
+        self._attempts: dict[str, int] = {}
+        node = type("FakeNode", (_FakeNode,), {"fake": self})
+        self.client = AsyncElasticsearch("http://fake-es:9200", node_class=node, max_retries=0, retry_on_status=())
+
+    # --- state helpers for tests ---
+
+    def create_index(self, name: str, *, aliases: list[str] = (), mappings: dict[str, Any] | None = None):
+        self.indices[name] = {"docs": {}, "settings": {}, "mappings": mappings or {}}
+        for a in aliases:
+            self.aliases.setdefault(a, set()).add(name)
+
+    def docs(self, name: str) -> dict[str, dict[str, Any]]:
+        """Documents of an index or of an alias's single target."""
+        return self.indices[self._write_target(name)]["docs"]
+
+    def _resolve(self, name: str) -> list[str]:
+        if name in self.aliases:
+            return sorted(self.aliases[name])
+        if any(c in name for c in "*?"):
+            return sorted(n for n in self.indices if fnmatch.fnmatchcase(n, name))
+        return [name] if name in self.indices else []
+
+    def _write_target(self, name: str) -> str:
+        targets = self._resolve(name)
+        if len(targets) != 1:
+            raise KeyError(name)
+        return targets[0]
+
+    # --- transport ---
+
+    def handle(self, method: str, target: str, body: bytes | None) -> tuple[int, Any]:
+        parts = urlsplit(target)
+        path = [unquote(p) for p in parts.path.strip("/").split("/") if p]
+        data = json.loads(body) if body and not path[-1:] == ["_bulk"] else None
+        if path[:1] == ["_bulk"] or path[1:2] == ["_bulk"]:
+            return self._bulk(body or b"")
+        if path[:1] == ["_aliases"]:
+            return self._update_aliases(data["actions"])
+        if path[:1] == ["_alias"]:
+            name = path[1]
+            if name not in self.aliases or not self.aliases[name]:
+                return _missing("aliases_not_found_exception", name)
+            return 200, {i: {"aliases": {name: {}}} for i in sorted(self.aliases[name])}
+        if path[:1] == ["_index_template"]:
+            if method == "PUT":
+                self.templates[path[1]] = data
+                return 200, {"acknowledged": True}
+            t = self.templates.get(path[1])
+            if t is None:
+                return _missing("resource_not_found_exception", path[1])
+            return 200, {"index_templates": [{"name": path[1], "index_template": t}]}
+
+        name, action = path[0], path[1] if len(path) > 1 else None
+        if action is None:
+            if method == "HEAD":
+                return (200 if name in self.indices else 404), None
+            if method == "PUT":
+                if name in self.indices or name in self.aliases:
+                    return 400, {"error": {"type": "resource_already_exists_exception", "reason": name}, "status": 400}
+                self.create_index(name, aliases=list((data or {}).get("aliases") or {}))
+                self.indices[name]["settings"] = dict(((data or {}).get("settings") or {}).get("index") or {})
+                return 200, {"acknowledged": True, "index": name}
+            if method == "DELETE":
+                if name not in self.indices:
+                    return _missing("index_not_found_exception", name)
+                self._drop(name)
+                return 200, {"acknowledged": True}
+            found = self._resolve(name)
+            if not found and not any(c in name for c in "*?"):
+                return _missing("index_not_found_exception", name)
+            return 200, {i: {"settings": {"index": self.indices[i]["settings"]}} for i in found}
+
+        found = self._resolve(name)
+        if not found:
+            return _missing("index_not_found_exception", name)
+        if action == "_settings":
+            if method == "PUT":
+                for i in found:
+                    self.indices[i]["settings"].update(data["index"])
+                return 200, {"acknowledged": True}
+            key = path[2].removeprefix("index.") if len(path) > 2 else None
+            return 200, {
+                i: {"settings": {"index": {k: v for k, v in self.indices[i]["settings"].items() if key in (None, k)}}}
+                for i in found
+            }
+        if action == "_refresh":
+            self.refreshes.extend(found)
+            return 200, {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if action == "_mapping":
+            return 200, {i: {"mappings": self.indices[i]["mappings"]} for i in found}
+        if action == "_count":
+            return 200, {"count": sum(len(self.indices[i]["docs"]) for i in found)}
+        if action == "_search":
+            return 200, self._search(found, data or {})
+        raise NotImplementedError(f"{method} {target}")
+
+    def _drop(self, name: str):
+        del self.indices[name]
+        for targets in self.aliases.values():
+            targets.discard(name)
+
+    def _update_aliases(self, actions: list[dict[str, Any]]) -> tuple[int, Any]:
+        # All or nothing, like ES: validate every action before applying any.
+        for a in actions:
+            (op, spec), = a.items()
+            if spec["index"] not in self.indices:
+                return _missing("index_not_found_exception", spec["index"])
+            if op == "remove" and spec["index"] not in self.aliases.get(spec["alias"], ()):
+                return _missing("aliases_not_found_exception", spec["alias"])
+        for a in actions:
+            (op, spec), = a.items()
+            if op == "add":
+                self.aliases.setdefault(spec["alias"], set()).add(spec["index"])
+            elif op == "remove":
+                self.aliases[spec["alias"]].discard(spec["index"])
+            elif op == "remove_index":
+                self._drop(spec["index"])
+        return 200, {"acknowledged": True}
+
+    def _bulk(self, body: bytes) -> tuple[int, Any]:
+        lines = [json.loads(line) for line in body.decode("utf-8").splitlines() if line.strip()]
+        ops = [(lines[i], lines[i + 1]) for i in range(0, len(lines), 2)]
+        self.bulk_requests.append([(next(iter(a)), next(iter(a.values()))["_id"]) for a, _ in ops])
+        if self.fail_requests > 0:
+            self.fail_requests -= 1
+            return 503, {"error": {"type": "unavailable_shards_exception", "reason": "try later"}, "status": 503}
+        items = []
+        for action, source in ops:
+            (op, meta), = action.items()
+            doc_id = meta["_id"]
+            key = f"{op}:{doc_id}"
+            attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+            try:
+                index = self._write_target(meta["_index"])
+            except KeyError:
+                index = meta["_index"]
+                self.create_index(index)  # like ES auto-creating an index on first write
+            docs = self.indices[index]["docs"]
+            status = self.bulk_status(op, index, doc_id, attempt) if self.bulk_status else None
+            if status is None:
+                if op == "update" and doc_id not in docs:
+                    status = 404
+                else:
+                    status = 200 if doc_id in docs else 201
+            item: dict[str, Any] = {"_index": index, "_id": doc_id, "status": status}
+            if status < 300:
+                docs[doc_id] = {**docs[doc_id], **source["doc"]} if op == "update" else source
+            else:
+                item["error"] = {"type": "document_missing_exception" if status == 404 else "fake_error", "reason": str(status)}
+            items.append({op: item})
+        return 200, {"took": 1, "errors": any(next(iter(i.values()))["status"] >= 300 for i in items), "items": items}
+
+    def _search(self, indices: list[str], body: dict[str, Any]) -> dict[str, Any]:
+        hits = [(i, doc_id, doc) for i in indices for doc_id, doc in sorted(self.indices[i]["docs"].items())]
+        must_not = (((body.get("query") or {}).get("bool") or {}).get("must_not") or {}).get("exists")
+        if must_not:
+            hits = [h for h in hits if h[2].get(must_not["field"]) is None]
+        out: dict[str, Any] = {
+            "hits": {
+                "total": {"value": len(hits), "relation": "eq"},
+                "hits": [
+                    {"_index": i, "_id": doc_id, **({} if body.get("_source") is False else {"_source": doc})}
+                    for i, doc_id, doc in hits[: body.get("size", 10)]
+                ],
+            }
+        }
+        aggs = {}
+        for name, spec in (body.get("aggs") or {}).items():
+            values = [doc.get(spec["max"]["field"]) for _, _, doc in hits]
+            values = [v for v in values if v is not None]
+            top = max(values) if values else None
+            aggs[name] = {"value": None if top is None else 1.0, "value_as_string": top} if top else {"value": None}
+        if aggs:
+            out["aggregations"] = aggs
+        return out
+
+
+def _split(expr: str) -> list[str]:
+    """Split a PostgREST logic tree on top-level commas (not inside parens or quotes)."""
+    out, depth, quoted, cur = [], 0, False, ""
+    for i, c in enumerate(expr):
+        if c == '"' and (i == 0 or expr[i - 1] != "\\"):
+            quoted = not quoted
+        elif not quoted and c in "()":
+            depth += 1 if c == "(" else -1
+        elif not quoted and depth == 0 and c == ",":
+            out.append(cur)
+            cur = ""
+            continue
+        cur += c
+    return out + [cur] if cur else out
+
+
+def _unquote(v: str) -> str:
+    if len(v) >= 2 and v[0] == v[-1] == '"':
+        return v[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return v
+
+
+def _coerce(have: Any, raw: str) -> Any:
+    if isinstance(have, bool):
+        return raw == "true"
+    if isinstance(have, (int, float)):
+        return float(raw)
+    return raw
+
+
+class FakePostgrest:
+    """
+    The PostgREST surface the app uses, over in-memory tables: select with eq/neq/gt/gte/lt/lte/
+    in/is/ilike and nested or/and filters, multi-column order, limit/offset, insert, upsert
+    (merge-duplicates on the table key or `on_conflict`), update, delete, an exact count on HEAD,
+    and RPCs registered as Python callables.
+
+    `unique(table, columns, where=)` adds a (partial) unique index: a write that breaks it fails
+    with 409 / code 23505 and changes nothing.
+    """
+
+    def __init__(self):
+        self.tables: dict[str, list[dict[str, Any]]] = {}
+        self.keys: dict[str, tuple[str, ...]] = {}
+        self.defaults: dict[str, Callable[[], dict[str, Any]]] = {}
+        self.indexes: dict[str, list[tuple[tuple[str, ...], Callable[[dict[str, Any]], bool]]]] = {}
+        self.rpcs: dict[str, Callable[[dict[str, Any]], Any]] = {}
+        self.requests: list[tuple[str, str, list[tuple[str, str]]]] = []
+        self._ids = itertools.count(1)
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        self.db = AsyncDb("http://fake-pg", "service-role-key")
+
+    # --- state helpers for tests ---
+
+    def create_table(
+        self,
+        name: str,
+        rows: list[dict[str, Any]] = (),
+        *,
+        key: tuple[str, ...] = ("id",),
+        defaults: Callable[[], dict[str, Any]] | None = None,
+    ):
+        self.tables[name] = [dict(r) for r in rows]
+        self.keys[name] = key
+        if defaults is not None:
+            self.defaults[name] = defaults
+
+    def unique(self, table: str, columns: tuple[str, ...], *, where: Callable[[dict[str, Any]], bool] = lambda r: True):
+        self.indexes.setdefault(table, []).append((columns, where))
+
+    def next_id(self) -> str:
+        return f"row-{next(self._ids)}"
+
+    def rows(self, name: str) -> list[dict[str, Any]]:
+        return self.tables[name]
+
+    # --- filters ---
+
+    def _test(self, row: dict[str, Any], column: str, spec: str) -> bool:
+        if column in ("or", "and"):
+            return self._logic(row, column, spec[1:-1])
+        negate = spec.startswith("not.")
+        op, _, raw = spec.removeprefix("not.").partition(".")
+        return self._op(row.get(column), op, raw) != negate
+
+    def _logic(self, row: dict[str, Any], kind: str, body: str) -> bool:
+        results = []
+        for term in _split(body):
+            if term.startswith(("or(", "and(")):
+                inner_kind, _, rest = term.partition("(")
+                results.append(self._logic(row, inner_kind, rest[:-1]))
+            else:
+                column, _, spec = term.partition(".")
+                results.append(self._test(row, column, spec))
+        return any(results) if kind == "or" else all(results)
+
+    def _op(self, have: Any, op: str, raw: str) -> bool:
+        if op == "is":
+            return have is None if raw == "null" else have is (raw == "true")
+        if op == "in":
+            return have is not None and have in [_coerce(have, _unquote(v)) for v in _split(raw[1:-1])]
+        if have is None:
+            return False
+        want = _coerce(have, _unquote(raw))
+        if op == "ilike":
+            return fnmatch.fnmatchcase(str(have).lower(), str(want).lower().replace("%", "*"))
+        return {
+            "eq": have == want,
+            "neq": have != want,
+            "gt": have > want,
+            "gte": have >= want,
+            "lt": have < want,
+            "lte": have <= want,
+        }[op]
+
+    # --- transport ---
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/rest/v1/")
+        params = list(request.url.params.multi_items())
+        self.requests.append((request.method, path, params))
+        body = json.loads(request.content) if request.content else None
+        if path.startswith("rpc/"):
+            fn = self.rpcs.get(path.removeprefix("rpc/"))
+            if fn is None:
+                return httpx.Response(404, json={"code": "PGRST202", "message": f"no function {path}"})
+            out = fn(body or {})
+            return httpx.Response(204) if out is None else httpx.Response(200, json=out)
+        if path not in self.tables:
+            return httpx.Response(404, json={"code": "42P01", "message": f'relation "{path}" does not exist'})
+
+        special = {"select", "order", "limit", "offset", "on_conflict"}
+        filters = [(k, v) for k, v in params if k not in special]
+        opts = {k: v for k, v in params if k in special}
+        table = self.tables[path]
+        matched = [r for r in table if all(self._test(r, k, v) for k, v in filters)]
+
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"content-range": f"*/{len(matched)}"})
+        if request.method == "GET":
+            return httpx.Response(200, json=self._project(self._page(matched, opts), opts.get("select")))
+
+        before = copy.deepcopy(table)
+        if request.method == "DELETE":
+            self.tables[path] = [r for r in table if r not in matched]
+            return httpx.Response(204)
+        if request.method == "PATCH":
+            for r in matched:
+                r.update(body)
+            out = matched
+        else:
+            merge = "resolution=merge-duplicates" in request.headers.get("prefer", "")
+            key = tuple(opts["on_conflict"].split(",")) if "on_conflict" in opts else self.keys[path]
+            out = []
+            for item in body if isinstance(body, list) else [body]:
+                same = (r for r in table if all(r.get(k) == item.get(k) for k in key))
+                existing = next(same, None) if merge else None
+                if existing is not None:
+                    existing.update(item)
+                    out.append(existing)
+                else:
+                    row = {**(self.defaults[path]() if path in self.defaults else {}), **item}
+                    table.append(row)
+                    out.append(row)
+        violated = self._violated(path)
+        if violated:
+            self.tables[path] = before
+            return httpx.Response(409, json={"code": "23505", "message": f"duplicate key value violates {violated}"})
+        return httpx.Response(201 if request.method == "POST" else 200, json=copy.deepcopy(out))
+
+    def _violated(self, table: str) -> str | None:
+        for columns, where in self.indexes.get(table, []):
+            seen = [tuple(r.get(c) for c in columns) for r in self.tables[table] if where(r)]
+            if len(seen) != len(set(seen)):
+                return f"unique index on {table}({','.join(columns)})"
+        return None
+
+    @staticmethod
+    def _page(rows: list[dict[str, Any]], opts: dict[str, str]) -> list[dict[str, Any]]:
+        rows = list(rows)
+        for spec in reversed(opts.get("order", "").split(",") if opts.get("order") else []):
+            column, direction, *nulls = spec.split(".")
+            desc = direction == "desc"
+            # Postgres default: nulls sort as if larger than every value.
+            nulls_first = (nulls[0] == "nullsfirst") if nulls else desc
+            present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: r[column], reverse=desc)
+            missing = [r for r in rows if r.get(column) is None]
+            rows = missing + present if nulls_first else present + missing
+        start = int(opts.get("offset", 0))
+        end = start + int(opts["limit"]) if "limit" in opts else None
+        return rows[start:end]
+
+    @staticmethod
+    def _project(rows: list[dict[str, Any]], select: str | None) -> list[dict[str, Any]]:
+        if not select or select == "*":
+            return copy.deepcopy(rows)
+        cols = select.split(",")
+        return [{c: copy.deepcopy(r.get(c)) for c in cols} for r in rows]
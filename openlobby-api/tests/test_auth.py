@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import HTTPException
+
+pytest.importorskip("jose")
+
+from app.config import get_settings  # noqa: E402
+from app.services.auth import require_ingest_secret  # noqa: E402
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    def set_secret(value: str):
+        monkeypatch.setattr(get_settings(), "ingest_secret", value)
+
+    return set_secret
+
+
+def status(header: str | None) -> int:
+    try:
+        require_ingest_secret(header)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+def test_ingest_secret(secret):
+    secret("s3cret")
+    assert status("Bearer s3cret") == 200
+    assert status("Bearer wrong") == 403
+    assert status("Bearer ") == 403
+    assert status(None) == 401
+    assert status("s3cret") == 401
+
+
+def test_unset_ingest_secret_is_not_configured(secret):
+    secret("")
+    assert status("Bearer ") == 503
+    assert status("Bearer anything") == 503
+    assert status(None) == 401
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import random
+from collections import deque
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from app.services.centrality import betweenness, degrees, edge_weights, pagerank
+from app.services.graph_engine import GraphSnapshot, apply_rows
+
+
+def rel(rid: str, src: str, dst: str, amount=None) -> dict:
+    return {"id": rid, "type": "donation", "source_id": src, "target_id": dst, "amount": amount, "date": None}
+
+
+def random_graph(seed: int, *, nodes: int = 25, edges: int = 70) -> GraphSnapshot:
+    """Random multigraph: parallel edges, self-loops, missing amounts and dangling nodes all turn up."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(edges):
+        a, b = rng.randrange(nodes), rng.randrange(nodes)
+        rows.append(rel(f"e{i}", f"n{a}", f"n{b}", amount=None if i % 5 == 0 else rng.uniform(1, 1e6)))
+    return apply_rows(None, rows)
+
+
+def brute_pagerank(snap: GraphSnapshot, damping: float = 0.85) -> np.ndarray:
+    n = snap.node_count
+    m = np.zeros((n, n))
+    for s, d, w in zip(snap.src, snap.dst, edge_weights(snap)):
+        m[d, s] += w
+    out = m.sum(axis=0)
+    m[:, out > 0] /= out[out > 0]
+    m[:, out == 0] = 1.0 / n
+    x = np.full(n, 1.0 / n)
+    for _ in range(1000):
+        x = damping * m @ x + (1.0 - damping) / n
+    return x
+
+
+def brute_betweenness(snap: GraphSnapshot) -> np.ndarray:
+    """Pair-by-pair definition: the share of shortest s-t paths through v, over the simple graph."""
+    n = snap.node_count
+    adj = [set() for _ in range(n)]
+    for s, d in zip(snap.src.tolist(), snap.dst.tolist()):
+        if s != d:
+            adj[s].add(d)
+            adj[d].add(s)
+
+    def bfs(s: int) -> tuple[list[int], list[int]]:
+        dist, sigma = [-1] * n, [0] * n
+        dist[s], sigma[s] = 0, 1
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            for w in adj[v]:
+                if dist[w] < 0:
+                    dist[w] = dist[v] + 1
+                    queue.append(w)
+                if dist[w] == dist[v] + 1:
+                    sigma[w] += sigma[v]
+        return dist, sigma
+
+    runs = [bfs(s) for s in range(n)]
+    bc = np.zeros(n)
+    for s, t in combinations(range(n), 2):
+        dist_s, sigma_s = runs[s]
+        dist_t, sigma_t = runs[t]
+        if dist_s[t] <= 0:
+            continue
+        for v in range(n):
+            if v not in (s, t) and dist_s[v] > 0 and dist_t[v] > 0 and dist_s[v] + dist_t[v] == dist_s[t]:
+                bc[v] += sigma_s[v] * sigma_t[v] / sigma_s[t]
+    return bc / ((n - 1) * (n - 2) / 2.0)
+
+
+def at(snap: GraphSnapshot, values: np.ndarray) -> dict[str, float]:
+    return {nid: float(values[i]) for i, nid in enumerate(snap.node_ids)}
+
+
+def test_parallel_edges_do_not_count_as_extra_shortest_paths():
+    # 4-cycle a-b-c-d with a-b doubled: b and d are symmetric, each on one of the two a-c paths.
+    rows = [rel("ab", "a", "b"), rel("ab2", "a", "b"), rel("bc", "b", "c"), rel("cd", "c", "d"), rel("da", "d", "a")]
+    snap = apply_rows(None, rows)
+    bc, used = betweenness(snap, samples=10)
+    assert used == 4
+    assert at(snap, bc) == pytest.approx({"a": 1 / 6, "b": 1 / 6, "c": 1 / 6, "d": 1 / 6})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_exact_betweenness_matches_the_definition(seed):
+    snap = random_graph(seed)
+    bc, _ = betweenness(snap, samples=snap.node_count)
+    np.testing.assert_allclose(bc, brute_betweenness(snap), atol=1e-12)
+
+
+def test_sampled_betweenness_is_a_scaled_up_estimate():
+    snap = random_graph(7, nodes=60, edges=200)
+    exact, _ = betweenness(snap, samples=snap.node_count)
+    sampled, used = betweenness(snap, samples=30, seed=1)
+    assert used == 30
+    assert sampled.sum() == pytest.approx(exact.sum(), rel=0.35)
+    assert betweenness(snap, samples=0) == (pytest.approx(np.zeros(snap.node_count)), 0)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_pagerank_matches_the_dense_power_iteration(seed):
+    snap = random_graph(seed)
+    pr, iterations, converged = pagerank(snap, tol=1e-12, max_iter=500)
+    assert converged and iterations < 500
+    assert pr.sum() == pytest.approx(1.0)
+    np.testing.assert_allclose(pr, brute_pagerank(snap), atol=1e-9)
+
+
+def test_pagerank_reports_when_it_runs_out_of_iterations():
+    _, iterations, converged = pagerank(random_graph(0), tol=0.0, max_iter=3)
+    assert (iterations, converged) == (3, False)
+
+
+def test_degrees_count_parallel_edges_and_self_loops_once():
+    snap = apply_rows(
+        None, [rel("ab", "a", "b", 10.0), rel("ab2", "b", "a", 5.0), rel("aa", "a", "a", 1.0), rel("bc", "b", "c")]
+    )
+    degree, weighted = degrees(snap)
+    assert at(snap, degree) == {"a": 3, "b": 3, "c": 1}
+    assert at(snap, weighted) == {"a": 16.0, "b": 15.0, "c": 0.0}
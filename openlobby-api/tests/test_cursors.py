@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import base64
+import json
+
+import pytest
+
+from app.services.cursors import CursorError, decode_cursor, encode_cursor, fingerprint
+
+
+def raw_token(state) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    fp = fingerprint("entities", "warren", None)
+    token = encode_cursor({"fp": fp, "after": [3.5, "e12"], "pit": "abc"})
+    assert "=" not in token
+    assert decode_cursor(token, fp=fp, after_len=2) == {"v": 1, "fp": fp, "after": [3.5, "e12"], "pit": "abc"}
+    assert decode_cursor(encode_cursor({"fp": fp}), fp=fp, after_len=2) == {"v": 1, "fp": fp}
+
+
+def test_fingerprint_is_stable_and_query_specific():
+    assert fingerprint("search", "x", ["a", "b"]) == fingerprint("search", "x", ["a", "b"])
+    assert fingerprint("search", "x", ["a", "b"]) != fingerprint("search", "x", ["b", "a"])
+
+
+def test_rejects_other_query():
+    token = encode_cursor({"fp": fingerprint("a"), "after": [1, "x"]})
+    with pytest.raises(CursorError, match="does not match"):
+        decode_cursor(token, fp=fingerprint("b"))
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "not base64!!",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        raw_token([1, 2]),
+        raw_token({"v": 2, "fp": "f"}),
+    ],
+)
+def test_rejects_unreadable_tokens(token):
+    with pytest.raises(CursorError):
+        decode_cursor(token, fp="f")
+
+
+@pytest.mark.parametrize(
+    "state, after_len",
+    [
+        ({"after": "e12"}, None),
+        ({"after": {"k": 1}}, None),
+        ({"after": [1, {"k": 1}]}, None),
+        ({"after": [1, [2]]}, None),
+        ({"after": [1]}, 2),
+        ({"after": [1, "a", "b"]}, 2),
+        ({"pit": 7}, None),
+        ({"pit": ["x"]}, None),
+    ],
+)
+def test_rejects_malformed_state(state, after_len):
+    with pytest.raises(CursorError, match="Malformed"):
+        decode_cursor(raw_token({"v": 1, "fp": "f", **state}), fp="f", after_len=after_len)
+
+
+def test_after_allows_search_after_scalars():
+    after = [12.5, None, "doc-1", 3]
+    assert decode_cursor(raw_token({"v": 1, "fp": "f", "after": after}), fp="f")["after"] == after
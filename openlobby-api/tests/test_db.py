@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services.db import DbError, Query, _quote, db
+
+pytestmark = pytest.mark.anyio
+
+
+def params(q: Query) -> list[tuple[str, str]]:
+    return q._params
+
+
+def test_quote_reserved_characters():
+    assert _quote("plain") == "plain"
+    assert _quote(True) == "true"
+    assert _quote("a,b") == '"a,b"'
+    assert _quote('say "hi"') == '"say \\"hi\\""'
+    assert _quote(" padded") == '" padded"'
+
+
+def test_after_renders_a_keyset_predicate():
+    q = Query(None, "t").after(("last_updated", "id"), ("2024-05-01T00:00:00+00:00", "a,b"))
+    ts = '"2024-05-01T00:00:00+00:00"'
+    assert params(q) == [("or", f'(last_updated.lt.{ts},and(last_updated.eq.{ts},id.lt."a,b"))')]
+    asc = Query(None, "t").after(("n", "id"), (3, "x"), desc=False)
+    assert params(asc) == [("or", "(n.gt.3,and(n.eq.3,id.gt.x))")]
+
+
+def test_order_merges_columns_and_in_quotes_values():
+    q = Query(None, "t").select("id, name").order("a", desc=True).in_("id", ["x", "y,z"]).order("id", nullsfirst=False)
+    assert params(q) == [("select", "id,name"), ("order", "a.desc,id.asc.nullslast"), ("id", 'in.(x,"y,z")')]
+
+
+async def test_keyset_pages_cover_ties_exactly_once(fake_db):
+    rows = [{"id": f"e{i}", "last_updated": f"2024-01-0{1 + i // 3}T00:00:00+00:00", "name": f"n{i}"} for i in range(8)]
+    fake_db.create_table("entities", rows)
+    seen, after = [], None
+    while True:
+        q = db().table("entities").select("id,last_updated").order("last_updated", desc=True).order("id", desc=True)
+        q = q.limit(3)
+        if after:
+            q = q.after(("last_updated", "id"), after)
+        page = await q.execute()
+        if not page:
+            break
+        seen += [r["id"] for r in page]
+        after = (page[-1]["last_updated"], page[-1]["id"])
+    assert seen == sorted(seen, key=lambda i: (rows[int(i[1:])]["last_updated"], i), reverse=True)
+    assert sorted(seen) == sorted(r["id"] for r in rows)
+
+
+async def test_writes_count_and_errors(fake_db):
+    fake_db.create_table("jobs", [])
+    fake_db.unique("jobs", ("kind",), where=lambda r: r.get("status") == "running")
+    jobs = db().table("jobs")
+    assert await jobs.insert({"id": "1", "kind": "news", "status": "running"}).execute() == [
+        {"id": "1", "kind": "news", "status": "running"}
+    ]
+    with pytest.raises(DbError) as err:
+        await db().table("jobs").insert({"id": "2", "kind": "news", "status": "running"}).execute()
+    assert err.value.code == "23505" and err.value.status == 409
+
+    upsert = [{"id": "1", "status": "done"}, {"id": "3", "kind": "news", "status": "running"}]
+    await db().table("jobs").upsert(upsert).execute()
+    assert await db().table("jobs").update({"status": "done"}).eq("id", "3").execute() == [
+        {"id": "3", "kind": "news", "status": "done"}
+    ]
+    assert await db().table("jobs").eq("status", "done").count() == 2
+    await db().table("jobs").delete().eq("id", "1").execute()
+    assert await db().table("jobs").count() == 1
+
+    fake_db.rpcs["double"] = lambda p: p["n"] * 2
+    assert await db().rpc("double", {"n": 4}) == 8
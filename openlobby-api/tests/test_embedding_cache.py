@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import itertools
+
+import pytest
+
+from app.services import embedding_cache as ec
+from app.services.embedding_cache import EmbeddingCache, PostgresBackend, SqliteBackend, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Deterministic last_used stamps: every time.time() call is one second later."""
+    ticks = itertools.count(1)
+
+    class Clock:
+        @staticmethod
+        def time():
+            return float(next(ticks))
+
+    monkeypatch.setattr(ec, "time", Clock)
+
+
+def test_cache_key_covers_model_task_and_dims():
+    base = cache_key("text", model="m", task="retrieval.passage", dims=8)
+    assert base == cache_key("text", model="m", task="retrieval.passage", dims=8)
+    assert len({
+        base,
+        cache_key("text ", model="m", task="retrieval.passage", dims=8),
+        cache_key("text", model="m2", task="retrieval.passage", dims=8),
+        cache_key("text", model="m", task="retrieval.query", dims=8),
+        cache_key("text", model="m", task="retrieval.passage", dims=16),
+    }) == 5
+
+
+def test_sqlite_round_trip_as_float32(tmp_path):
+    b = SqliteBackend(str(tmp_path / "c" / "e.sqlite3"), max_entries=10)
+    b.put_many({"a": [0.5, -1.25], "b": [0.1, 0.2]})
+    got = b.get_many(["a", "b", "missing"])
+    assert got["a"] == [0.5, -1.25]
+    assert got["b"] == pytest.approx([0.1, 0.2], rel=1e-6)
+    assert "missing" not in got and b.size() == 2
+    # Persists across opens.
+    assert SqliteBackend(str(tmp_path / "c" / "e.sqlite3"), max_entries=10).size() == 2
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path, clock):
+    b = SqliteBackend(str(tmp_path / "e.sqlite3"), max_entries=3)
+    b.put_many({"a": [1.0], "b": [2.0], "c": [3.0]})
+    b.get_many(["a"])  # a is now the most recently used
+    b.put_many({"d": [4.0]})
+    assert set(b.get_many(["a", "b", "c", "d"])) == {"a", "c", "d"}
+    assert b.size() == 3
+
+
+def test_sqlite_put_keeps_a_running_count(tmp_path, monkeypatch):
+    b = SqliteBackend(str(tmp_path / "e.sqlite3"), max_entries=1000)
+    scans = []
+    monkeypatch.setattr(b, "_count", lambda: scans.append(1) or 0)
+    b.put_many({"a": [1.0], "b": [2.0]})
+    b.put_many({"b": [3.0], "c": [4.0]})  # b is replaced, not added
+    assert scans == [] and b._entries == 3
+    monkeypatch.undo()
+    assert b.size() == 3
+
+
+def test_sqlite_recounts_rows_other_writers_added(tmp_path, monkeypatch):
+    path = str(tmp_path / "e.sqlite3")
+    monkeypatch.setattr(ec, "_RECOUNT_PUTS", 2)
+    mine, other = SqliteBackend(path, max_entries=5), SqliteBackend(path, max_entries=5)
+    other.put_many({f"o{i}": [float(i)] for i in range(4)})
+    mine.put_many({"m1": [1.0]})  # running count says 1
+    mine.put_many({"m2": [2.0]})  # recount: 6 rows, over the cap by one
+    assert mine.size() == 5
+
+
+class Broken:
+    def get_many(self, keys):
+        raise RuntimeError("disk gone")
+
+    def put_many(self, items):
+        raise RuntimeError("disk gone")
+
+    def size(self):
+        raise RuntimeError("disk gone")
+
+
+@pytest.mark.anyio
+async def test_cache_counts_hits_and_survives_a_broken_backend(tmp_path):
+    cache = EmbeddingCache(SqliteBackend(str(tmp_path / "e.sqlite3"), max_entries=10))
+    await cache.put_many({"a": [1.0]})
+    assert await cache.get_many(["a", "b"]) == {"a": [1.0]}
+    stats = await cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["hit_ratio"]) == (1, 1, 1, 0.5)
+
+    broken = EmbeddingCache(Broken())
+    assert await broken.get_many(["a"]) == {}
+    await broken.put_many({"a": [1.0]})
+    assert broken.errors == 2 and (await broken.stats())["entries"] is None
+
+
+@pytest.mark.anyio
+async def test_postgres_backend_round_trip_and_eviction(fake_db):
+    fake_db.create_table("embedding_cache", [], key=("key",))
+    evictions = []
+    fake_db.rpcs["embedding_cache_evict"] = lambda p: evictions.append(p["max_entries"])
+    cache = EmbeddingCache(PostgresBackend(max_entries=5))
+    await cache.put_many({"a": [0.5, 1.0], "b": [2.0, 3.0]})
+    await cache.put_many({"a": [0.25, 1.0]})
+    assert await cache.get_many(["a", "c"]) == {"a": [0.25, 1.0]}
+    stats = await cache.stats()
+    assert (stats["backend"], stats["entries"], stats["hits"], stats["misses"]) == ("PostgresBackend", 2, 1, 1)
+    # Eviction is amortized: once on the first put, then every tenth.
+    assert evictions == [5]
+
+
+def test_factory_honours_the_backend_setting(tmp_path, monkeypatch, settings):
+    monkeypatch.setattr(ec, "_cache_init", False)
+    monkeypatch.setattr(ec, "_cache", None)
+    settings(embedding_cache_backend="off")
+    assert ec.embedding_cache() is None
+
+    monkeypatch.setattr(ec, "_cache_init", False)
+    settings(embedding_cache_backend="sqlite", embedding_cache_path=str(tmp_path / "e.sqlite3"))
+    cache = ec.embedding_cache()
+    assert isinstance(cache.backend, SqliteBackend) and ec.embedding_cache() is cache
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from app.services.entity_suggest import _HEAVY, SuggestIndex, normalize
+
+ENTRIES = [
+    ("p1", "Elizabeth Warren", "politician", 3.0),
+    ("p2", "Nancy Pelosi", "politician", 5.0),
+    ("p3", "Warren Davidson", "politician", 1.5),
+    ("c1", "Warren Buffett Holdings, Inc.", "company", 2.0),
+    ("c2", "Société Générale", "company", 4.0),
+    ("o1", "Pelosi for Congress", "pac", 0.5),
+]
+
+
+def names(results) -> list[str]:
+    return [r["name"] for r in results]
+
+
+def test_normalize():
+    assert normalize("Pelosi, Nancy") == "pelosi nancy"
+    assert normalize("  Société  Générale ") == "societe generale"
+    assert normalize("---") == ""
+
+
+def test_prefix_and_word_start_matches():
+    idx = SuggestIndex(ENTRIES)
+    # Names starting with the query get +2 over mid-name matches.
+    assert names(idx.suggest("war")) == ["Warren Buffett Holdings, Inc.", "Warren Davidson", "Elizabeth Warren"]
+    assert names(idx.suggest("Pelo")) == ["Nancy Pelosi", "Pelosi for Congress"]
+    assert names(idx.suggest("societe gen")) == ["Société Générale"]
+    assert idx.suggest("arren") == []
+    assert idx.suggest("  ") == []
+
+
+def test_entity_type_and_limit():
+    idx = SuggestIndex(ENTRIES)
+    assert names(idx.suggest("war", entity_type="politician")) == ["Warren Davidson", "Elizabeth Warren"]
+    assert names(idx.suggest("war", limit=1)) == ["Warren Buffett Holdings, Inc."]
+    assert idx.suggest("war", entity_type="pac") == []
+
+
+def test_multi_word_any_order():
+    idx = SuggestIndex(ENTRIES)
+    assert names(idx.suggest("war eliz")) == ["Elizabeth Warren"]
+    assert names(idx.suggest("pelosi con")) == ["Pelosi for Congress"]
+    assert idx.suggest("warren pelosi") == []
+    result = idx.suggest("eliz war")[0]
+    assert result == {"id": "p1", "type": "politician", "name": "Elizabeth Warren", "score": 3.0}
+
+
+def brute(entries, q: str, entity_type: str | None, limit: int) -> list[str]:
+    q = normalize(q)
+    tokens = q.split(" ")
+    scored = []
+    for eid, name, etype, w in entries:
+        if entity_type and etype != entity_type:
+            continue
+        norm = normalize(name)
+        words = norm.split(" ")
+        suffix = any(" ".join(words[i:]).startswith(q) for i in range(len(words)))
+        every = all(any(word.startswith(t) for word in words) for t in tokens)
+        if suffix or (len(tokens) > 1 and every):
+            scored.append((w + (2.0 if norm.startswith(q) else 0.0), eid))
+    return [eid for _, eid in sorted(scored, reverse=True)[:limit]]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_heavy_prefixes_match_brute_force(seed):
+    rng = random.Random(seed)
+    first = ["ann", "anna", "andrew", "amy", "alex", "al", "bob", "beth"]
+    last = ["adams", "allen", "baker", "brown", "avery", "abbott"]
+    weights = rng.sample(range(100_000), 3 * _HEAVY)  # distinct, so the top-k has no ties
+    entries = [
+        (f"e{i}", f"{rng.choice(first)} {rng.choice(last)}", rng.choice(["politician", "company"]), weights[i] / 100)
+        for i in range(3 * _HEAVY)
+    ]
+    idx = SuggestIndex(entries)
+    assert ("a", None) in idx.heavy and ("a", "company") in idx.heavy
+    for q in ["a", "an", "ann", "al", "b", "bro", "ann a", "al ba", "abbott al", "zz"]:
+        for entity_type in (None, "politician", "company"):
+            got = [r["id"] for r in idx.suggest(q, limit=10, entity_type=entity_type)]
+            assert got == brute(entries, q, entity_type, 10), (q, entity_type)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.services.es_bulk import BulkIndexer, BulkReport, bulk_index
+
+pytestmark = pytest.mark.anyio
+
+
+def docs(n: int, size: int = 10) -> list[tuple[str, dict]]:
+    return [(f"d{i}", {"id": f"d{i}", "text": "x" * size}) for i in range(n)]
+
+
+@pytest.fixture
+def bulk_settings(settings, no_backoff):
+    return settings(es_bulk_max_docs=3, es_bulk_max_bytes=100_000, es_bulk_concurrency=2, es_bulk_retries=2)
+
+
+async def test_packs_requests_by_doc_count(fake_es, bulk_settings):
+    fake_es.create_index("docs")
+    report = await bulk_index("docs", docs(7))
+    assert sorted(len(r) for r in fake_es.bulk_requests) == [1, 3, 3]
+    assert (report.indexed, report.failed, report.requests, report.retried) == (7, 0, 3, 0)
+    assert sorted(fake_es.docs("docs")) == [f"d{i}" for i in range(7)]
+    assert report.refreshed and fake_es.refreshes == ["docs"]
+
+
+async def test_packs_requests_by_serialized_size(fake_es, settings, no_backoff):
+    settings(es_bulk_max_docs=100, es_bulk_max_bytes=1024, es_bulk_concurrency=1, es_bulk_retries=0)
+    fake_es.create_index("docs")
+    batch = docs(10, size=300)
+    per_doc = len(json.dumps(batch[0][1])) + 64
+    assert 2 * per_doc <= 1024 < 3 * per_doc
+    report = await bulk_index("docs", batch)
+    assert [len(r) for r in fake_es.bulk_requests] == [2, 2, 2, 2, 2]
+    assert report.bytes == per_doc * 10 and report.retried_bytes == 0
+
+
+async def test_retries_only_retryable_items(fake_es, bulk_settings):
+    fake_es.create_index("docs")
+    # d1 is throttled once, d2 has a mapping error.
+    statuses = {"d1": [429, None], "d2": [400, 400]}
+    fake_es.bulk_status = lambda op, index, doc_id, attempt: statuses.get(doc_id, [None, None])[attempt - 1]
+    report = await bulk_index("docs", docs(3))
+    assert (report.indexed, report.failed, report.retried) == (2, 1, 1)
+    assert fake_es.bulk_requests[-1] == [("index", "d1")]
+    assert report.errors == [{"id": "d2", "status": 400, "error": {"type": "fake_error", "reason": "400"}}]
+    assert sorted(fake_es.docs("docs")) == ["d0", "d1"]
+
+
+async def test_gives_up_after_the_retry_budget(fake_es, bulk_settings):
+    fake_es.create_index("docs")
+    fake_es.bulk_status = lambda op, index, doc_id, attempt: 503 if doc_id == "d0" else None
+    report = await bulk_index("docs", docs(2))
+    assert (report.indexed, report.failed, report.retried) == (1, 1, 2)
+    sent = [r for r in fake_es.bulk_requests if ("index", "d0") in r]
+    assert sent == [[("index", "d0"), ("index", "d1")], [("index", "d0")], [("index", "d0")]]
+
+
+async def test_resends_a_whole_request_after_a_transport_failure(fake_es, bulk_settings):
+    fake_es.create_index("docs")
+    fake_es.fail_requests = 1
+    report = await bulk_index("docs", docs(2))
+    assert (report.indexed, report.failed, report.retried, report.requests) == (2, 0, 2, 2)
+    # The payload is counted once; the resend goes to retried_bytes.
+    assert report.bytes == report.retried_bytes > 0
+
+
+async def test_update_many_merges_and_fails_missing_ids(fake_es, bulk_settings):
+    fake_es.create_index("docs")
+    await bulk_index("docs", [("a", {"id": "a", "n": 1, "keep": True})])
+    async with BulkIndexer("docs") as bulk:
+        await bulk.update_many([("a", {"n": 2}), ("missing", {"n": 3})])
+    assert fake_es.docs("docs")["a"] == {"id": "a", "n": 2, "keep": True}
+    assert (bulk.report.indexed, bulk.report.failed, bulk.report.retried) == (1, 1, 0)
+
+
+async def test_pauses_and_restores_refresh(fake_es, bulk_settings):
+    fake_es.create_index("docs")
+    fake_es.indices["docs"]["settings"]["refresh_interval"] = "5s"
+    async with BulkIndexer("docs", pause_refresh=True) as bulk:
+        assert fake_es.indices["docs"]["settings"]["refresh_interval"] == "-1"
+        await bulk.index_many(docs(2))
+    assert fake_es.indices["docs"]["settings"]["refresh_interval"] == "5s"
+    assert bulk.report.refreshed
+
+
+async def test_writes_through_an_alias(fake_es, bulk_settings):
+    fake_es.create_index("docs-v1-1", aliases=["docs"])
+    await bulk_index("docs", docs(2))
+    assert sorted(fake_es.indices["docs-v1-1"]["docs"]) == ["d0", "d1"]
+
+
+def test_report_add_merges_passes():
+    load = BulkReport("i", indexed=10, failed=1, requests=2, bytes=100, seconds=1.0, errors=[{"id": "a"}] * 4)
+    catch_up = BulkReport(
+        "i", indexed=2, retried=1, requests=1, bytes=20, retried_bytes=5, seconds=0.5, refreshed=True, errors=[{"id": "b"}] * 3
+    )
+    merged = load.add(catch_up).as_dict()
+    assert merged["indexed"] == 12 and merged["failed"] == 1 and merged["retried"] == 1
+    assert merged["requests"] == 3 and merged["bytes"] == 120 and merged["retried_bytes"] == 5
+    assert merged["seconds"] == 1.5 and merged["refreshed"]
+    assert merged["errors"] == [{"id": "a"}] * 4 + [{"id": "b"}]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import pytest
+
+from app.routers import graph
+
+pytestmark = pytest.mark.anyio
+
+RELS = [
+    {"id": "r1", "type": "donation", "source_id": "a", "target_id": "b", "amount": 500.0},
+    {"id": "r2", "type": "donation", "source_id": "c", "target_id": "a", "amount": 900.0},
+    {"id": "r3", "type": "lobbying", "source_id": "a", "target_id": "d", "amount": None},
+    {"id": "r4", "type": "donation", "source_id": "b", "target_id": "c", "amount": 100.0},
+]
+
+
+def node_edges_page(p: dict) -> list[dict]:
+    """node_edges_page for sort_by=amount, as in node_edges_page_total.sql."""
+    mine = [
+        {**r, "sort_key": r["amount"] if r["amount"] is not None else float("-inf")}
+        for r in RELS
+        if p["node_id"] in (r["source_id"], r["target_id"]) and r["type"] in p["rel_types"]
+    ]
+    ranked = sorted(mine, key=lambda r: (r["sort_key"], r["id"]), reverse=True)
+    if p["after_id"] is not None:
+        ranked = [r for r in ranked if (r["sort_key"], r["id"]) < (float(p["after_key"]), p["after_id"])]
+    return [{**r, "total": len(mine)} for r in ranked[: p["max_results"]]]
+
+
+@pytest.fixture
+def postgres_graph(fake_db, monkeypatch):
+    fake_db.rpcs["node_edges_page"] = node_edges_page
+    monkeypatch.setattr(graph, "graph_snapshot", lambda: None)
+    monkeypatch.setattr(graph, "maybe_refresh_graph", lambda: None)
+
+
+async def page(node_id: str, cursor: str | None = None):
+    return await graph.node_edges(node_id=node_id, types="donation,lobbying", rank="amount", limit=2, cursor=cursor)
+
+
+async def test_postgres_fallback_reports_the_total_on_every_page(postgres_graph):
+    first = await page("a")
+    assert [e.id for e in first.edges] == ["r2", "r1"] and first.total == 3 and first.next_cursor
+    second = await page("a", first.next_cursor)
+    assert [e.id for e in second.edges] == ["r3"] and second.total == 3 and second.next_cursor is None
+
+
+async def test_a_node_without_edges_has_a_zero_total(postgres_graph):
+    empty = await page("nobody")
+    assert empty.edges == [] and empty.total == 0 and empty.next_cursor is None
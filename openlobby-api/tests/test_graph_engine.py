@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import random
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.services.graph_engine import REL_TYPES, GraphSnapshot, _allowed, apply_rows
+
+
+def rel(rid: str, src: str, dst: str, *, type: str = "donation", amount=None, date=None, **extra):
+    return {"id": rid, "type": type, "source_id": src, "target_id": dst, "amount": amount, "date": date, **extra}
+
+
+def star(n: int = 10) -> GraphSnapshot:
+    """hub -- leaf{i} with amount i, and each leaf -- far{i} with amount 100 + i."""
+    rows = [rel(f"h{i}", "hub", f"leaf{i}", amount=i, date=f"2024-01-{i:02d}") for i in range(1, n + 1)]
+    rows += [rel(f"l{i}", f"leaf{i}", f"far{i}", amount=100 + i) for i in range(1, n + 1)]
+    return apply_rows(None, rows)
+
+
+def random_graph(seed: int, *, nodes: int = 30, edges: int = 120) -> GraphSnapshot:
+    rng = random.Random(seed)
+    amounts = rng.sample(range(1, 10 * edges), edges)  # distinct, so rank order has no ties
+    rows = []
+    for i in range(edges):
+        a, b = rng.randrange(nodes), rng.randrange(nodes)
+        rows.append(
+            rel(
+                f"e{i}",
+                f"n{a}",
+                f"n{b}",
+                type=rng.choice(REL_TYPES),
+                amount=None if i % 11 == 0 else amounts[i],
+                date=None if i % 7 == 0 else f"20{10 + i % 15}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            )
+        )
+    return apply_rows(None, rows)
+
+
+def ids(snap: GraphSnapshot, edges) -> list[str]:
+    return [snap.edge_ids[int(i)] for i in edges]
+
+
+# --- neighborhood / _expand ---------------------------------------------------------------
+
+
+def ranked_incident(snap: GraphSnapshot, n: int, rank: str) -> list[int]:
+    inc = [e for e in range(snap.edge_count) if n in (int(snap.src[e]), int(snap.dst[e]))]
+    key = snap.rank_key(np.asarray(inc, dtype=np.int64), rank) if inc else []
+    return [e for _, e in sorted(zip((-float(k) for k in key), inc))]
+
+
+def brute_neighborhood(snap, seed_id, *, depth, max_edges, types, per_node, rank):
+    """Reference for GraphSnapshot.neighborhood, one Python loop per node and edge."""
+    s = snap.node_index.get(seed_id)
+    if s is None:
+        return set(), []
+    allowed = _allowed(types)
+    seen_nodes, seen_edges = {s}, set()
+    frontier, picked, remaining = [s], [], max_edges
+    for _ in range(depth):
+        if remaining <= 0 or not frontier:
+            break
+        hop: list[int] = []
+        for n in frontier:
+            mine = [e for e in ranked_incident(snap, n, rank) if allowed[snap.etype[e]] and e not in seen_edges]
+            hop.extend(e for e in mine[:per_node] if e not in hop)
+        if len(hop) > remaining:
+            key = snap.rank_key(np.asarray(hop, dtype=np.int64), rank)
+            best = sorted(range(len(hop)), key=lambda j: -key[j])[:remaining]
+            hop = [hop[j] for j in sorted(best)]
+        if not hop:
+            break
+        seen_edges.update(hop)
+        picked.extend(hop)
+        remaining -= len(hop)
+        nxt = sorted({int(x) for e in hop for x in (snap.src[e], snap.dst[e])} - seen_nodes)
+        seen_nodes.update(nxt)
+        frontier = nxt
+    return seen_nodes, picked
+
+
+def test_neighborhood_caps_each_node_at_per_node_best_first():
+    snap = star()
+    nodes, edges = snap.neighborhood("hub", depth=1, max_edges=100, per_node=3)
+    assert ids(snap, edges) == ["h10", "h9", "h8"]
+    assert sorted(snap.node_ids[i] for i in nodes) == ["hub", "leaf10", "leaf8", "leaf9"]
+
+
+def test_neighborhood_rank_recent_uses_dates():
+    rows = [rel("old", "a", "b", amount=1000, date="2001-01-01"), rel("new", "a", "c", amount=1, date="2024-01-01")]
+    rows.append(rel("none", "a", "d", amount=5000))
+    snap = apply_rows(None, rows)
+    _, edges = snap.neighborhood("a", depth=1, max_edges=10, per_node=2, rank="recent")
+    assert ids(snap, edges) == ["new", "old"]
+    _, edges = snap.neighborhood("a", depth=1, max_edges=10, per_node=2, rank="amount")
+    assert ids(snap, edges) == ["none", "old"]
+
+
+def test_neighborhood_keeps_best_of_hop_when_over_budget():
+    snap = star()
+    # Hop 1 takes 3 hub edges; hop 2 would take one far edge per leaf (3) but only 2 are left.
+    _, edges = snap.neighborhood("hub", depth=2, max_edges=5, per_node=3)
+    assert ids(snap, edges[:3]) == ["h10", "h9", "h8"]
+    assert sorted(ids(snap, edges[3:])) == ["l10", "l9"]
+
+
+def test_neighborhood_type_filter_and_unknown_seed():
+    rows = [rel("d", "a", "b", amount=1), rel("v", "a", "c", type="vote", amount=9)]
+    snap = apply_rows(None, rows)
+    _, edges = snap.neighborhood("a", depth=2, max_edges=10, types=["donation"])
+    assert ids(snap, edges) == ["d"]
+    nodes, edges = snap.neighborhood("nobody", depth=2, max_edges=10)
+    assert nodes.size == 0 and edges.size == 0
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("rank", ["amount", "recent"])
+def test_neighborhood_matches_brute_force(seed, rank):
+    snap = random_graph(seed)
+    types = [None, ["donation", "vote"]][seed % 2]
+    for depth, max_edges, per_node in [(1, 50, 3), (2, 12, 2), (3, 200, 4), (4, 7, 1)]:
+        nodes, edges = snap.neighborhood("n0", depth=depth, max_edges=max_edges, types=types, per_node=per_node, rank=rank)
+        want_nodes, want_edges = brute_neighborhood(
+            snap, "n0", depth=depth, max_edges=max_edges, types=types, per_node=per_node, rank=rank
+        )
+        assert sorted(edges.tolist()) == sorted(want_edges)
+        assert set(nodes.tolist()) == want_nodes
+        assert len(edges) <= max_edges
+
+
+def test_expand_reads_past_filtered_head_of_a_hub():
+    # 200 high-amount votes sit ahead of the hub's two donations in its ranked slice.
+    rows = [rel(f"v{i}", "hub", f"x{i}", type="vote", amount=1000 + i) for i in range(200)]
+    rows += [rel("d1", "hub", "y1", amount=5), rel("d2", "hub", "y2", amount=3), rel("d3", "hub", "y3", amount=1)]
+    snap = apply_rows(None, rows)
+    seen = np.zeros(snap.edge_count, dtype=bool)
+    frontier = np.array([snap.node_index["hub"]], dtype=np.int64)
+    hop = snap._expand(frontier, _allowed(["donation"]), seen, per_node=2, budget=10, rank="amount")
+    assert ids(snap, hop) == ["d1", "d2"]
+    assert seen[hop].all() and seen.sum() == 2
+
+
+def test_expand_counts_an_edge_between_frontier_nodes_once():
+    snap = apply_rows(None, [rel("ab", "a", "b", amount=9), rel("ac", "a", "c", amount=1), rel("bd", "b", "d", amount=1)])
+    seen = np.zeros(snap.edge_count, dtype=bool)
+    frontier = np.array([snap.node_index["a"], snap.node_index["b"]], dtype=np.int64)
+    hop = snap._expand(frontier, _allowed(None), seen, per_node=1, budget=10, rank="amount")
+    assert ids(snap, hop) == ["ab"]
+
+
+def test_expand_budget_unmarks_dropped_edges():
+    snap = star()
+    seen = np.zeros(snap.edge_count, dtype=bool)
+    frontier = np.array([snap.node_index["hub"]], dtype=np.int64)
+    hop = snap._expand(frontier, _allowed(None), seen, per_node=5, budget=2, rank="amount")
+    assert ids(snap, hop) == ["h10", "h9"]
+    assert sorted(ids(snap, np.flatnonzero(seen))) == ["h10", "h9"]
+
+
+# --- summarize ----------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_summarize_matches_counts(seed):
+    snap = random_graph(seed)
+    types = [None, ["lobbying", "employment"]][seed % 2]
+    nodes, edges = snap.neighborhood("n1", depth=2, max_edges=15, types=types, per_node=2)
+    shown = set(edges.tolist())
+    allowed = _allowed(types)
+    want = []
+    for n in nodes.tolist():
+        inc = [e for e in range(snap.edge_count) if n in (int(snap.src[e]), int(snap.dst[e])) and allowed[snap.etype[e]]]
+        hidden: dict[str, int] = {}
+        for e in inc:
+            if e not in shown:
+                t = REL_TYPES[int(snap.etype[e])]
+                hidden[t] = hidden.get(t, 0) + 1
+        if hidden:
+            vis = sum(e in shown for e in inc)
+            want.append({"node_id": snap.node_ids[n], "total": len(inc), "shown": vis, "hidden": hidden})
+    assert snap.summarize(nodes, edges, types) == want
+
+
+def test_summarize_counts_a_self_loop_once():
+    snap = apply_rows(None, [rel("loop", "a", "a", amount=1), rel("ab", "a", "b", amount=2)])
+    nodes, edges = snap.neighborhood("a", depth=1, max_edges=1)
+    assert ids(snap, edges) == ["ab"]
+    assert snap.summarize(nodes, edges) == [{"node_id": "a", "total": 2, "shown": 1, "hidden": {"donation": 1}}]
+    assert snap.summarize(np.zeros(0, np.int64), np.zeros(0, np.int32)) == []
+
+
+# --- edge_page ----------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("rank", ["amount", "recent"])
+def test_edge_page_walks_every_edge_once_in_rank_order(rank):
+    # Repeated amounts and dates, plus missing ones, so the keyset tie-break matters.
+    rows = [
+        rel(f"e{i}", "hub", f"x{i % 5}", type=REL_TYPES[i % 3], amount=None if i % 6 == 0 else i % 4,
+            date=None if i % 5 == 0 else f"2024-01-{1 + i % 3:02d}")
+        for i in range(40)
+    ]
+    snap = apply_rows(None, rows)
+    for types in (None, ["donation", "vote"]):
+        got, after, pages = [], None, 0
+        while True:
+            page, after, total = snap.edge_page("hub", types=types, rank=rank, limit=7, after=after)
+            got.extend(page.tolist())
+            pages += 1
+            if after is None:
+                break
+        allowed = _allowed(types)
+        want = [e for e in ranked_incident(snap, snap.node_index["hub"], rank) if allowed[snap.etype[e]]]
+        assert got == want
+        assert total == len(want)
+        assert pages == -(-len(want) // 7)
+
+
+def test_edge_page_unknown_node():
+    page, after, total = star().edge_page("nobody", types=None, rank="amount", limit=5, after=None)
+    assert page.size == 0 and after is None and total == 0
+
+
+# --- paths --------------------------------------------------------------------------------
+
+
+def path_ids(snap, found):
+    return [[snap.node_ids[n] for n in nodes] for nodes, _ in found]
+
+
+def test_paths_fewest_hops_then_most_money():
+    rows = [
+        rel("ab", "a", "b", amount=10), rel("bt", "b", "t", amount=10),
+        rel("ac", "a", "c", amount=1_000_000), rel("ct", "c", "t", amount=1_000_000),
+        rel("ad", "a", "d", amount=5), rel("de", "d", "e", amount=5), rel("et", "e", "t", amount=5),
+    ]
+    snap = apply_rows(None, rows)
+    found, timed_out = snap.paths("a", "t", k=3)
+    assert not timed_out
+    assert path_ids(snap, found) == [["a", "c", "t"], ["a", "b", "t"], ["a", "d", "e", "t"]]
+    assert ids(snap, found[0][1]) == ["ac", "ct"]
+    assert path_ids(snap, snap.paths("a", "t", max_hops=2, k=5)[0]) == [["a", "c", "t"], ["a", "b", "t"]]
+    assert snap.paths("a", "nobody")[0] == []
+    assert path_ids(snap, snap.paths("a", "a")[0]) == [["a"]]
+
+
+def test_paths_follow_edges_in_either_direction_and_respect_types():
+    snap = apply_rows(None, [rel("ba", "b", "a"), rel("bt", "b", "t", type="vote")])
+    assert path_ids(snap, snap.paths("a", "t")[0]) == [["a", "b", "t"]]
+    assert snap.paths("a", "t", types=["donation"])[0] == []
+
+
+def bfs_hops(snap: GraphSnapshot, s: int, t: int, allowed) -> int | None:
+    dist = {s: 0}
+    q = deque([s])
+    while q:
+        u = q.popleft()
+        for e in range(snap.edge_count):
+            a, b = int(snap.src[e]), int(snap.dst[e])
+            if u not in (a, b) or not allowed[snap.etype[e]]:
+                continue
+            v = b if a == u else a
+            if v not in dist:
+                dist[v] = dist[u] + 1
+                q.append(v)
+    return dist.get(t)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_paths_against_bfs(seed):
+    snap = random_graph(seed, nodes=25, edges=50)
+    types = [None, ["donation", "lobbying", "vote"]][seed % 2]
+    allowed = _allowed(types)
+    s, t = snap.node_index.get("n0"), snap.node_index.get("n1")
+    if s is None or t is None:
+        pytest.skip("endpoint has no edges")
+    found, timed_out = snap.paths("n0", "n1", types=types, max_hops=6, k=4, budget=5.0)
+    assert not timed_out
+    hops = bfs_hops(snap, s, t, allowed)
+    if hops is None or hops > 6:
+        assert found == []
+        return
+    assert len(found[0][1]) == hops
+    lengths = [len(edges) for _, edges in found]
+    assert lengths == sorted(lengths) and max(lengths) <= 6
+    assert len({tuple(nodes) for nodes, _ in found}) == len(found)
+    for nodes, edges in found:
+        assert nodes[0] == s and nodes[-1] == t
+        assert len(set(nodes)) == len(nodes)
+        for (u, v), e in zip(zip(nodes, nodes[1:]), edges):
+            assert {int(snap.src[e]), int(snap.dst[e])} == {u, v}
+            assert allowed[snap.etype[e]]
+
+
+# --- edge_record / apply_rows -------------------------------------------------------------
+
+
+def test_edge_record_round_trips_rows():
+    row = rel(
+        "r1", "a", "b", amount="10.5", date="2024-03-01", cycle="2024", description="d",
+        metadata={"fec": "x"}, last_updated="2026-02-16T08:00:00.123456+00:00",
+    )
+    bare = rel("r2", "b", "c", type="vote", cycle=None, description=None, metadata={}, last_updated=None)
+    snap = apply_rows(None, [row, bare])
+    assert snap.edge_record(0) == {
+        **row,
+        "amount": 10.5,
+        "last_updated": datetime(2026, 2, 16, 8, 0, 0, 123456, tzinfo=timezone.utc),
+    }
+    assert snap.edge_record(1) == bare
+    assert snap.metadata[1] is None
+
+
+def test_apply_rows_updates_in_place_and_appends():
+    first = apply_rows(None, [rel("r1", "a", "b", amount=1, metadata={"k": 0}), rel("r2", "b", "c", amount=2)])
+    second = apply_rows(first, [rel("r1", "a", "d", amount=7, metadata={"k": 1}), rel("r3", "c", "a", amount=3)])
+    assert second.edge_ids == ["r1", "r2", "r3"] and second.layout == first.layout
+    assert second.edge_record(0)["target_id"] == "d" and second.edge_record(0)["metadata"] == {"k": 1}
+    assert first.edge_record(0)["target_id"] == "b" and first.edge_record(0)["metadata"] == {"k": 0}
+    _, edges = second.neighborhood("a", depth=1, max_edges=10)
+    assert ids(second, edges) == ["r1", "r3"]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import math
+import random
+from itertools import groupby
+
+import numpy as np
+import pytest
+
+from app.services.graph_engine import NO_CYCLE, NO_DATE, apply_rows, date_days
+from app.services.graph_format import EdgeColumns, collapse
+
+
+def random_rows(seed: int, n: int = 80) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"e{i}",
+            "type": rng.choice(["donation", "lobbying"]),
+            "source_id": f"n{rng.randrange(4)}",
+            "target_id": f"n{rng.randrange(4)}",
+            "amount": None if rng.random() < 0.2 else rng.choice([5.0, 10.0, 250.0, 1000.0]),
+            "date": None if rng.random() < 0.2 else f"2024-{rng.randrange(1, 13):02d}-01",
+            "cycle": rng.choice([None, "2022", "2024"]),
+        }
+        for i in range(n)
+    ]
+
+
+def columns(rows: list[dict]) -> EdgeColumns:
+    nodes = sorted({x for r in rows for x in (r["source_id"], r["target_id"])})
+    return EdgeColumns.from_rows(rows, {nid: i for i, nid in enumerate(nodes)})
+
+
+def brute_collapse(rows: list[dict]) -> list[dict]:
+    """Reference for collapse(): itertools.groupby over the rows sorted by group key."""
+
+    def key(r):
+        return (r["source_id"], r["target_id"], r["type"], r["cycle"] or "")
+
+    groups = []
+    for k, members in groupby(sorted(rows, key=key), key=key):
+        members = list(members)
+        amounts = [float(r["amount"]) for r in members if r["amount"] is not None]
+        days = [date_days(r["date"]) for r in members if r["date"]]
+        # Largest amount first (none last), then row order.
+        rep = min(members, key=lambda r: (-(float(r["amount"]) if r["amount"] is not None else -math.inf), rows.index(r)))
+        groups.append(
+            {
+                "key": k,
+                "id": rep["id"],
+                "rep": rows.index(rep),
+                "count": len(members),
+                "amount": sum(amounts) if amounts else None,
+                "first": min(days) if days else NO_DATE,
+                "last": max(days) if days else NO_DATE,
+            }
+        )
+    groups.sort(key=lambda g: (-(g["amount"] if g["amount"] is not None else -math.inf), g["rep"]))
+    return groups
+
+
+def as_dicts(rows: list[dict], cols: EdgeColumns) -> list[dict]:
+    out = collapse(cols)
+    nodes = sorted({x for r in rows for x in (r["source_id"], r["target_id"])})
+    types = {0: "donation", 1: "lobbying", 2: "vote", 3: "employment"}
+    return [
+        {
+            "key": (
+                nodes[int(out.source[j])],
+                nodes[int(out.target[j])],
+                types[int(out.type[j])],
+                out.cycles[int(out.cycle[j])] if out.cycle[j] != NO_CYCLE else "",
+            ),
+            "id": out.ids[j],
+            "count": int(out.count[j]),
+            "amount": None if np.isnan(out.amount[j]) else float(out.amount[j]),
+            "first": int(out.first_date[j]),
+            "last": int(out.last_date[j]),
+        }
+        for j in range(len(out))
+    ]
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_collapse_matches_groupby(seed):
+    rows = random_rows(seed)
+    want = [{k: v for k, v in g.items() if k != "rep"} for g in brute_collapse(rows)]
+    assert as_dicts(rows, columns(rows)) == want
+
+
+def test_collapse_from_snapshot_matches_rows():
+    rows = random_rows(99)
+    snap = apply_rows(None, rows)
+    nodes, edges = snap.neighborhood("n0", depth=2, max_edges=1000, per_node=1000)
+    from_snap = collapse(EdgeColumns.from_snapshot(snap, edges, nodes))
+    from_rows = collapse(columns([rows[snap.edge_index[snap.edge_ids[int(e)]]] for e in edges]))
+    assert from_snap.ids == from_rows.ids
+    assert from_snap.count.tolist() == from_rows.count.tolist()
+    np.testing.assert_array_equal(from_snap.amount, from_rows.amount)
+    assert from_snap.first_date.tolist() == from_rows.first_date.tolist()
+    assert from_snap.last_date.tolist() == from_rows.last_date.tolist()
+
+
+def test_collapse_sums_parallel_edges():
+    rows = [
+        {"id": "a", "type": "donation", "source_id": "x", "target_id": "y", "amount": 10, "date": "2024-02-01", "cycle": "2024"},
+        {"id": "b", "type": "donation", "source_id": "x", "target_id": "y", "amount": 30, "date": "2024-01-01", "cycle": "2024"},
+        {"id": "c", "type": "donation", "source_id": "x", "target_id": "y", "amount": None, "date": None, "cycle": "2024"},
+        {"id": "d", "type": "donation", "source_id": "y", "target_id": "x", "amount": None, "date": None, "cycle": None},
+    ]
+    out = collapse(columns(rows))
+    assert out.ids == ["b", "d"]
+    assert out.count.tolist() == [3, 1]
+    assert out.amount[0] == 40 and np.isnan(out.amount[1])
+    assert out.first_date.tolist() == [date_days("2024-01-01"), NO_DATE]
+    assert out.last_date.tolist() == [date_days("2024-02-01"), NO_DATE]
+
+
+def test_collapse_empty():
+    out = collapse(columns([]))
+    assert len(out) == 0 and out.count.size == 0
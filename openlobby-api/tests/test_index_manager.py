@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import index_manager as im
+from app.services.db import DbError
+
+pytestmark = pytest.mark.anyio
+
+ALIAS = "openlobby-documents"
+OLD = "2024-01-01T00:00:00+00:00"
+
+
+def doc(i: int, updated_at: str = OLD) -> dict:
+    return {
+        "id": f"d{i:03d}",
+        "source": "news",
+        "url": f"https://news.test/{i}",
+        "title": f"Story {i}",
+        "excerpt": "",
+        "metadata": {"from": "Test", "topic_tags": ["t"]},
+        "updated_at": updated_at,
+    }
+
+
+@pytest.fixture
+def index_env(fake_es, fake_db, settings, no_backoff, monkeypatch):
+    settings(jina_api_key="", es_reindex_page_size=100, es_index_keep_versions=1, es_index_replicas=1)
+    monkeypatch.setattr(im, "_ready", False)
+    bumps = []
+    monkeypatch.setattr(im, "bump_search_generation", lambda: bumps.append(1))
+    return fake_es, fake_db, bumps
+
+
+async def test_rebuild_replaces_a_legacy_index_and_pages_every_row(index_env):
+    es, db, bumps = index_env
+    es.create_index(ALIAS)  # pre-alias deployment: a concrete index holds the name
+    db.create_table("documents", [doc(i) for i in range(250)])
+
+    report = await im.rebuild("documents")
+
+    assert report.status == "succeeded" and report.rows == 250 and report.caught_up == 0
+    assert report.previous == [ALIAS] and ALIAS not in es.indices
+    assert es.aliases[ALIAS] == {report.index}
+    assert len(es.docs(ALIAS)) == 250
+    # The bulk-load settings are undone before the index goes live.
+    assert es.indices[report.index]["settings"]["number_of_replicas"] == 1
+    assert es.indices[report.index]["settings"]["refresh_interval"] is None
+    assert bumps == [1]
+
+
+async def test_rebuild_catches_up_rows_written_during_the_load(index_env, monkeypatch):
+    es, db, bumps = index_env
+    es.create_index(f"{ALIAS}-v1-00000000000000", aliases=[ALIAS])
+    db.create_table("documents", [doc(i) for i in range(3)])
+
+    def write_during_swap():
+        # Lands in Supabase after the load read the table, before the catch-up pass.
+        bumps.append(1)
+        db.rows("documents").append(doc(99, updated_at=datetime.now(timezone.utc).isoformat()))
+
+    monkeypatch.setattr(im, "bump_search_generation", write_during_swap)
+    report = await im.rebuild("documents")
+    assert (report.rows, report.caught_up) == (3, 1)
+    assert sorted(es.docs(ALIAS)) == ["d000", "d001", "d002", "d099"]
+    assert report.bulk["indexed"] == 4
+
+
+async def test_rebuild_keeps_one_previous_version(index_env, monkeypatch):
+    es, db, _ = index_env
+    for stamp in ("20240101000000", "20240201000000"):
+        es.create_index(f"{ALIAS}-v1-{stamp}")
+    es.create_index(f"{ALIAS}-v1-20240301000000", aliases=[ALIAS])
+    db.create_table("documents", [doc(0)])
+    monkeypatch.setattr(im, "_versioned_name", lambda kind, suffix=None: f"{ALIAS}-v1-20240401000000")
+
+    report = await im.rebuild("documents")
+    assert report.previous == [f"{ALIAS}-v1-20240301000000"]
+    assert report.deleted == [f"{ALIAS}-v1-20240201000000", f"{ALIAS}-v1-20240101000000"]
+    assert sorted(es.indices) == [f"{ALIAS}-v1-20240301000000", f"{ALIAS}-v1-20240401000000"]
+
+
+async def test_a_failed_rebuild_leaves_the_alias_alone(index_env):
+    es, db, bumps = index_env
+    live = f"{ALIAS}-v1-00000000000000"
+    es.create_index(live, aliases=[ALIAS])
+    # No documents table: the load fails.
+    with pytest.raises(DbError):
+        await im.rebuild("documents")
+    assert es.aliases[ALIAS] == {live} and sorted(es.indices) == [live]
+    assert im._rebuilds["documents"].status == "failed" and bumps == []
+
+
+async def test_sync_index_copies_rows_changed_since_the_watermark(index_env):
+    es, db, bumps = index_env
+    rows = [
+        {"id": f"e{i}", "type": "org", "name": f"E{i}", "last_updated": f"2024-05-0{1 + i}T00:00:00+00:00"}
+        for i in range(4)
+    ]
+    db.create_table("entities", rows)
+    await im.ensure_indices()
+    alias = "openlobby-entities"
+    es.docs(alias).update({r["id"]: im.entity_body(r) for r in rows[:2]})
+
+    report = await im.sync_index("entities")
+    # The boundary row (at the watermark) is re-sent; older ones are not.
+    assert report["since"] == rows[1]["last_updated"] and report["rows"] == 3
+    assert [op for req in es.bulk_requests for op in req] == [("index", "e1"), ("index", "e2"), ("index", "e3")]
+    assert sorted(es.docs(alias)) == ["e0", "e1", "e2", "e3"] and bumps == [1]
+
+
+def test_document_body_stamps_an_aware_utc_time():
+    stamp = datetime.fromisoformat(im.document_body(doc(1))["last_updated"])
+    assert stamp.tzinfo is not None and stamp.utcoffset().total_seconds() == 0
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services import ingest_jobs as jobs
+from app.services.ingest_news import IngestRun
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def job_table(fake_db, settings):
+    settings(perplexity_api_key="p", ingest_job_stale_seconds=120, ingest_job_heartbeat_seconds=60)
+    now = datetime.now(timezone.utc).isoformat()
+    fake_db.create_table(
+        "ingest_jobs",
+        defaults=lambda: {"id": fake_db.next_id(), "created_at": now, "checkpoint": None, "started_at": None},
+    )
+    # The partial unique index from the migration: one queued/running job per kind.
+    fake_db.unique("ingest_jobs", ("kind",), where=lambda r: r.get("status") in jobs.ACTIVE)
+    return fake_db
+
+
+@pytest.fixture
+def ingest_run(monkeypatch):
+    """Replace the ingest itself; `release` lets a started run finish."""
+    release = asyncio.Event()
+    calls = []
+
+    async def run_news_ingest(**kwargs):
+        calls.append(kwargs)
+        await release.wait()
+        report = {"stages": {"store": {"last_error": "DbError: boom"}, "fetch": {"last_error": None}}}
+        return IngestRun(items=[], report=report)
+
+    monkeypatch.setattr(jobs, "run_news_ingest", run_news_ingest)
+    return release, calls
+
+
+async def test_missing_configuration_is_refused_before_queuing(job_table, settings):
+    settings(perplexity_api_key="")
+    with pytest.raises(RuntimeError, match="PERPLEXITY_API_KEY"):
+        await jobs.start_news_job(limit=5)
+    assert job_table.rows("ingest_jobs") == []
+
+
+async def test_a_second_start_is_busy_until_the_first_finishes(job_table, ingest_run):
+    release, calls = ingest_run
+    job = await jobs.start_news_job(limit=5, incremental=True)
+    assert (job["status"], job["resumed"], job["params"]) == ("queued", False, {"limit": 5, "incremental": True})
+    with pytest.raises(jobs.IngestBusy):
+        await jobs.start_news_job(limit=5)
+
+    release.set()
+    await asyncio.gather(*jobs._tasks)
+    row = await jobs.get_job(job["id"])
+    assert row["status"] == "succeeded" and row["report"]["inserted"] == 0
+    assert row["error"] == "store: DbError: boom"
+    assert calls[0]["limit"] == 5 and calls[0]["incremental"] is True
+    assert (await jobs.start_news_job(limit=5))["id"] != job["id"]
+    await asyncio.gather(*jobs._tasks)
+
+
+async def test_an_abandoned_job_is_taken_over_with_the_new_params(job_table, ingest_run):
+    release, _ = ingest_run
+    release.set()
+    old = (datetime.now(timezone.utc) - timedelta(minutes=10)).isoformat()
+    job_table.rows("ingest_jobs").append(
+        {
+            "id": "dead",
+            "kind": "news",
+            "status": "running",
+            "params": {"limit": 9, "incremental": False},
+            "heartbeat_at": old,
+            "checkpoint": {"topics_done": ["a"]},
+        }
+    )
+    job = await jobs.run_news_job(limit=3)
+    assert job["id"] == "dead" and job["resumed"] and job["status"] == "succeeded"
+    assert job["params"] == {"limit": 3, "incremental": False}
+
+
+async def test_an_interrupted_job_resumes_before_a_new_one(job_table, ingest_run):
+    release, calls = ingest_run
+    release.set()
+    job_table.rows("ingest_jobs").append(
+        {
+            "id": "paused",
+            "kind": "news",
+            "status": "interrupted",
+            "params": {"limit": 9, "incremental": None},
+            "created_at": "2024-01-01T00:00:00+00:00",
+            "checkpoint": {"pending": [{"url": "https://x.test/1"}]},
+        }
+    )
+    job = await jobs.run_news_job(limit=4, incremental=True)
+    assert job["id"] == "paused" and job["resumed"]
+    assert calls[0]["checkpoint"].pending == [{"url": "https://x.test/1"}]
+    assert len(job_table.rows("ingest_jobs")) == 1
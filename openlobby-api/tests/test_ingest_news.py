@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+from app.services import content_fetch
+from app.services import ingest_news as news
+
+pytestmark = pytest.mark.anyio
+
+
+def article(body: str) -> str:
+    return f"<html><head><title>t</title></head><body><article><p>{body * 80}</p></article></body></html>"
+
+
+class Web:
+    """Article server: url -> (html, etag or None). Answers If-None-Match with a 304."""
+
+    def __init__(self):
+        self.pages: dict[str, tuple[str, str | None]] = {}
+        self.requests: list[tuple[str, str | None]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if url not in self.pages:
+            return httpx.Response(404)
+        html, etag = self.pages[url]
+        self.requests.append((url, request.headers.get("if-none-match")))
+        if etag and request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=html, headers={"etag": etag} if etag else {})
+
+
+def hit(slug: str, published: str) -> dict:
+    return {"url": f"https://news.test/{slug}", "title": slug.upper(), "published_at": published, "source": "Test"}
+
+
+@pytest.fixture
+def ingest(monkeypatch, settings, fake_db, tmp_path):
+    settings(
+        perplexity_api_key="p",
+        jina_api_key="",
+        elastic_cloud_id="",
+        elastic_api_key="",
+        news_topics="Drug pricing",
+        ingest_incremental=True,
+        ingest_batch_linger_ms=0,
+        page_cache_enabled=True,
+        page_cache_dir=str(tmp_path / "pages"),
+        page_cache_fresh_seconds=0,  # every fetch revalidates
+        parse_workers=0,
+    )
+    fake_db.create_table("documents")
+    fake_db.create_table("ingest_state", key=("topic",))
+    web = Web()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(web))
+    monkeypatch.setattr(content_fetch, "http_client", lambda name: client)
+
+    async def run(hits: list[dict]):
+        async def sonar(q, *, max_results):
+            return hits
+
+        monkeypatch.setattr(news, "sonar_search", sonar)
+        return (await news.run_news_ingest(limit=10)).report
+
+    return web, run
+
+
+async def test_incremental_run_rechecks_known_urls_and_drops_stale_hits(ingest, fake_db):
+    web, run = ingest
+    a, b, e = hit("a", "2024-05-01"), hit("b", "2024-05-02"), hit("e", "2024-04-20")
+    web.pages = {
+        a["url"]: (article("alpha "), '"a1"'),
+        b["url"]: (article("beta "), '"b1"'),
+        e["url"]: (article("eps "), None),
+    }
+    first = await run([a, b, e])
+    assert (first["new"], first["stored"]) == (3, 3)
+    mark = fake_db.rows("ingest_state")[0]["high_water_published_at"]
+    assert datetime.fromisoformat(mark) == datetime(2024, 5, 2, tzinfo=timezone.utc)
+
+    # b's body is edited under the same listing, a is untouched, e has no validators to ask with.
+    web.pages[b["url"]] = (article("beta edited "), '"b2"')
+    c, d = hit("c", "2024-04-01"), hit("d", "2024-05-03")
+    web.pages[d["url"]] = (article("delta "), '"d1"')
+    web.requests.clear()
+    second = await run([a, b, c, d, e])
+
+    assert (second["new"], second["changed"], second["skipped"], second["stale"]) == (1, 1, 2, 1)
+    assert second["stored"] == 2
+    assert sorted(web.requests) == [(a["url"], '"a1"'), (b["url"], '"b1"'), (d["url"], None)]
+    assert {r["url"] for r in fake_db.rows("documents")} == {a["url"], b["url"], d["url"], e["url"]}
+    mark = fake_db.rows("ingest_state")[0]["high_water_published_at"]
+    assert datetime.fromisoformat(mark) == datetime(2024, 5, 3, tzinfo=timezone.utc)
+
+
+async def test_same_body_without_a_304_is_unchanged(ingest):
+    web, run = ingest
+    a = hit("a", "2024-05-01")
+    web.pages = {a["url"]: (article("alpha "), '"a1"')}
+    await run([a])
+    # A new ETag (so no 304) over the same bytes.
+    web.pages[a["url"]] = (article("alpha "), '"a2"')
+    report = await run([a])
+    assert (report["skipped"], report["changed"], report["stored"]) == (1, 0, 0)
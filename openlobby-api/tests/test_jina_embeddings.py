@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from app.services import jina_embeddings as je
+
+pytestmark = pytest.mark.anyio
+
+
+def vector(text: str) -> list[float]:
+    return [float(len(text)), 1.0]
+
+
+class FakeJina:
+    """Serves /v1/embeddings from a handler; records every request's inputs."""
+
+    def __init__(self, status=lambda texts, n: 200):
+        self.status = status
+        self.calls: list[list[str]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        texts = json.loads(request.content)["input"]
+        self.calls.append(texts)
+        code = self.status(texts, len(self.calls))
+        if code != 200:
+            return httpx.Response(code, json={"detail": "nope"})
+        # Out of order on purpose: results are matched by `index`.
+        data = [{"index": i, "embedding": vector(t)} for i, t in enumerate(texts)][::-1]
+        return httpx.Response(200, json={"data": data})
+
+
+@pytest.fixture
+def jina(monkeypatch, settings):
+    settings(jina_api_key="k", jina_dims=2, jina_batch_max_items=4, jina_batch_max_tokens=1000, jina_batch_retries=1)
+    monkeypatch.setattr(je, "_stats", je._EmbedStats())
+    monkeypatch.setattr(je, "embedding_cache", lambda: None)
+
+    async def no_backoff(_seconds):
+        return None
+
+    monkeypatch.setattr(je.asyncio, "sleep", no_backoff)
+
+    def serve(fake: FakeJina) -> FakeJina:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(fake))
+        monkeypatch.setattr(je, "http_client", lambda name: client)
+        return fake
+
+    return serve
+
+
+def test_pack_bounds_items_and_tokens():
+    texts = list(enumerate(["a" * 40] * 5))  # 11 estimated tokens each
+    assert [len(b) for b in je._pack(texts, max_items=2, max_tokens=1000)] == [2, 2, 1]
+    assert [len(b) for b in je._pack(texts, max_items=10, max_tokens=25)] == [2, 2, 1]
+    # A text over the token bound still goes out, alone.
+    assert [len(b) for b in je._pack([(0, "a" * 400), (1, "b")], max_items=10, max_tokens=25)] == [1, 1]
+
+
+async def test_packs_requests_and_keeps_input_order(jina):
+    fake = jina(FakeJina())
+    texts = [f"text {i}" * (i + 1) for i in range(10)] + ["  "]
+    out = await je.embed_batch(texts)
+    assert sorted(len(c) for c in fake.calls) == [2, 4, 4]
+    assert out[:10] == [vector(t) for t in texts[:10]]
+    assert out[10] == [0.0, 0.0]  # blank text: zero vector, never sent
+    assert je.embedding_stats()["requests"] == 3
+
+
+async def test_splits_batches_the_api_rejects_as_too_large(jina):
+    fake = jina(FakeJina(status=lambda texts, n: 413 if len(texts) > 1 else 200))
+    texts = [f"t{i}" for i in range(4)]
+    assert await je.embed_batch(texts) == [vector(t) for t in texts]
+    assert je.embedding_stats()["splits"] == 3  # 4 -> 2 + 2 -> 1 + 1 + 1 + 1
+    assert sorted(len(c) for c in fake.calls) == [1, 1, 1, 1, 2, 2, 4]
+
+
+async def test_unembeddable_text_comes_back_none(jina):
+    jina(FakeJina(status=lambda texts, n: 400 if "bad" in texts else 200))
+    out = await je.embed_batch(["ok 1", "bad", "ok 2"])
+    assert out == [vector("ok 1"), None, vector("ok 2")]
+    assert je.embedding_stats()["failed_texts"] == 1
+
+
+async def test_retries_server_errors_then_gives_up(jina):
+    fake = jina(FakeJina(status=lambda texts, n: 503 if n == 1 else 200))
+    assert await je.embed_batch(["a", "b"]) == [vector("a"), vector("b")]
+    assert len(fake.calls) == 2 and je.embedding_stats()["retries"] == 1
+
+    jina(FakeJina(status=lambda texts, n: 503))
+    assert await je.embed_batch(["a", "b"]) == [None, None]
+
+
+async def test_cached_texts_are_not_sent(jina, monkeypatch):
+    class Cache:
+        def __init__(self):
+            self.store: dict[str, list[float]] = {}
+
+        async def get_many(self, keys):
+            return {k: self.store[k] for k in keys if k in self.store}
+
+        async def put_many(self, items):
+            self.store.update(items)
+
+    cache = Cache()
+    monkeypatch.setattr(je, "embedding_cache", lambda: cache)
+    fake = jina(FakeJina())
+    await je.embed_batch(["a", "b"])
+    out = await je.embed_batch(["b", "c", "a"])
+    assert out == [vector("b"), vector("c"), vector("a")]
+    assert fake.calls[1:] == [["c"]]
+
+
+async def test_requires_an_api_key(settings):
+    settings(jina_api_key="")
+    with pytest.raises(RuntimeError, match="JINA_API_KEY"):
+        await je.embed_batch(["a"])
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+
+import anyio
+import pytest
+
+from app.services.pipeline import Pipeline, Stage
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_items_flow_through_every_stage():
+    async def double(x):
+        return [x, x]
+
+    async def add_one(batch):
+        return [x + 1 for x in batch]
+
+    result = await Pipeline([Stage("double", double), Stage("add", add_one, batch_size=4)]).run(list(range(5)))
+    assert sorted(result.outputs) == sorted([x + 1 for x in range(5) for _ in range(2)])
+    report = result.report()["stages"]
+    assert report["double"]["received"] == 5 and report["double"]["emitted"] == 10
+    assert report["add"]["received"] == 10 and report["add"]["failed"] == 0
+    assert report["add"]["last_error"] is None
+
+
+async def test_failed_batch_is_logged_counted_and_kept_as_last_error(caplog):
+    async def store(batch):
+        if 3 in batch:
+            raise ValueError("row 3 rejected")
+        return batch
+
+    pipeline = Pipeline([Stage("store", store, concurrency=1, batch_size=2)])
+    with caplog.at_level(logging.ERROR, logger="app.services.pipeline"):
+        result = await pipeline.run([1, 2, 3, 4, 5])
+    assert sorted(result.outputs) == [1, 2, 5]
+    stats = result.report()["stages"]["store"]
+    assert stats["failed"] == 2
+    assert stats["last_error"] == "ValueError: row 3 rejected"
+    assert "pipeline stage store failed on a batch of 2" in caplog.text
+    assert "row 3 rejected" in caplog.text  # traceback included
+
+
+async def test_deadline_marks_the_run_timed_out():
+    async def slow(x):
+        await anyio.sleep(1)
+        return [x]
+
+    result = await Pipeline([Stage("slow", slow, concurrency=1)]).run([1, 2, 3], deadline_seconds=0.05)
+    assert result.timed_out and result.outputs == []
+
+
+async def test_batched_stage_lingers_for_a_fuller_batch():
+    async def trickle(x):
+        await anyio.sleep(0.002 * x)  # upstream emits items a few ms apart
+        return [x]
+
+    async def run(linger: float) -> list[int]:
+        sizes: list[int] = []
+
+        async def embed(batch):
+            sizes.append(len(batch))
+            return batch
+
+        stages = [Stage("fetch", trickle, concurrency=16), Stage("embed", embed, concurrency=1, batch_size=16, linger_seconds=linger)]
+        result = await Pipeline(stages).run(list(range(16)))
+        assert sorted(result.outputs) == list(range(16))
+        return sizes
+
+    eager, lingering = await run(0.0), await run(0.5)
+    assert len(eager) > 4
+    assert lingering == [16]
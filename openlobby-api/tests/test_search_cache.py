@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services import search_cache as sc
+from app.services.search_cache import SearchCache
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(sc, "time", c)
+    return c
+
+
+def counting(value="v", gate: asyncio.Event | None = None):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        if gate is not None:
+            await gate.wait()
+        return value
+
+    return compute, calls
+
+
+async def test_concurrent_misses_share_one_computation():
+    cache = SearchCache(ttl_seconds=60, max_bytes=1000)
+    gate = asyncio.Event()
+    compute, calls = counting("result", gate)
+    waiters = [asyncio.ensure_future(cache.get_or_compute("k", compute, sizeof=len)) for _ in range(5)]
+    await asyncio.sleep(0)
+    gate.set()
+    assert await asyncio.gather(*waiters) == ["result"] * 5
+    assert len(calls) == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 0)
+    assert await cache.get_or_compute("k", compute, sizeof=len) == "result" and cache.hits == 1
+
+
+async def test_a_cancelled_caller_does_not_cancel_the_shared_computation():
+    cache = SearchCache(ttl_seconds=60, max_bytes=1000)
+    gate = asyncio.Event()
+    compute, calls = counting("result", gate)
+    first = asyncio.ensure_future(cache.get_or_compute("k", compute, sizeof=len))
+    second = asyncio.ensure_future(cache.get_or_compute("k", compute, sizeof=len))
+    await asyncio.sleep(0)
+    first.cancel()
+    gate.set()
+    assert await second == "result"
+    assert first.cancelled() and len(calls) == 1
+    assert cache.stats()["entries"] == 1
+
+
+async def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = SearchCache(ttl_seconds=60, max_bytes=1000)
+    gate = asyncio.Event()
+
+    async def broken():
+        await gate.wait()
+        raise RuntimeError("upstream down")
+
+    waiters = [asyncio.ensure_future(cache.get_or_compute("k", broken, sizeof=len)) for _ in range(2)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+    compute, calls = counting()
+    assert await cache.get_or_compute("k", compute, sizeof=len) == "v" and len(calls) == 1
+
+
+async def test_bumping_the_generation_invalidates_entries_and_inflight_results():
+    cache = SearchCache(ttl_seconds=60, max_bytes=1000)
+    compute, calls = counting()
+    await cache.get_or_compute("k", compute, sizeof=len)
+    cache.bump_generation()
+    await cache.get_or_compute("k", compute, sizeof=len)
+    assert len(calls) == 2
+
+    # A result computed across a bump may predate the new data: served, but not stored.
+    gate = asyncio.Event()
+    slow, slow_calls = counting("old", gate)
+    waiter = asyncio.ensure_future(cache.get_or_compute("s", slow, sizeof=len))
+    await asyncio.sleep(0)
+    cache.bump_generation()
+    gate.set()
+    assert await waiter == "old" and "s" not in cache._entries
+    fresh, fresh_calls = counting("new")
+    assert await cache.get_or_compute("s", fresh, sizeof=len) == "new" and len(fresh_calls) == 1
+
+
+async def test_ttl_and_byte_budget(clock):
+    cache = SearchCache(ttl_seconds=10, max_bytes=10)
+    for key in "abc":
+        await cache.get_or_compute(key, counting("xxxx")[0], sizeof=len)
+    # Three 4-byte entries over a 10-byte budget: the least recently used one went.
+    assert set(cache._entries) == {"b", "c"} and cache.evictions == 1 and cache.stats()["bytes"] == 8
+
+    await cache.get_or_compute("huge", counting("x" * 11)[0], sizeof=len)
+    await cache.get_or_compute("skip", counting("")[0], sizeof=len, cacheable=bool)
+    assert set(cache._entries) == {"b", "c"}
+
+    clock.now += 10
+    compute, calls = counting()
+    await cache.get_or_compute("b", compute, sizeof=len)
+    assert len(calls) == 1
+
+
+async def test_other_processes_ingests_bump_the_generation(fake_db, monkeypatch):
+    monkeypatch.setattr(sc, "_cache", SearchCache(ttl_seconds=60, max_bytes=1000))
+    monkeypatch.setattr(sc, "_remote_marker", None)
+    fake_db.create_table(
+        "ingest_jobs",
+        [
+            {"id": "1", "status": "succeeded", "heartbeat_at": "2024-05-01T10:00:00+00:00"},
+            {"id": "2", "status": "succeeded", "heartbeat_at": None},
+            {"id": "3", "status": "running", "heartbeat_at": "2024-05-02T10:00:00+00:00"},
+        ],
+    )
+    await sc._poll_remote()
+    assert sc._remote_marker == "2024-05-01T10:00:00+00:00" and sc.search_cache().generation == 0
+    await sc._poll_remote()
+    assert sc.search_cache().generation == 0
+
+    later = {"id": "4", "status": "interrupted", "heartbeat_at": "2024-05-03T00:00:00+00:00"}
+    fake_db.rows("ingest_jobs").append(later)
+    await sc._poll_remote()
+    assert sc.search_cache().generation == 1
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+
+from app.routers import search
+from app.routers.search import _as_hit, _rrf
+
+
+def hits(*ids: str, **sources: dict) -> list[dict]:
+    return [{"_id": i, "_source": {"id": i, "name": i.upper(), **sources.get(i, {})}} for i in ids]
+
+
+def test_scores_sum_reciprocal_ranks_across_lists():
+    out = _rrf([("entities", hits("a", "b", "c")), ("entities", hits("c", "a"))], k=60, limit=10)
+    assert [h.id for h in out] == ["a", "c", "b"]
+    assert out[0].score == pytest.approx(1 / 61 + 1 / 62)
+    assert out[1].score == pytest.approx(1 / 63 + 1 / 61)
+    assert out[2].score == pytest.approx(1 / 62)
+
+
+def test_same_id_in_different_indices_stays_separate():
+    doc_x = {"_id": "x", "_source": {"title": "Doc X", "url": "https://x.test"}}
+    out = _rrf([("entities", hits("x")), ("documents", [doc_x])], k=60, limit=10)
+    assert sorted((h.type, h.id) for h in out) == [("document", "x"), ("entity", "x")]
+    doc = next(h for h in out if h.type == "document")
+    assert doc.title == "Doc X" and doc.url == "https://x.test"
+
+
+def test_ties_go_to_the_higher_pagerank_and_limit_applies():
+    lists = [
+        ("entities", hits("low", low={"pagerank": 0.1})),
+        ("entities", hits("high", high={"pagerank": 0.9})),
+        ("entities", hits("none")),
+    ]
+    out = _rrf(lists, k=60, limit=2)
+    assert [h.id for h in out] == ["high", "low"]
+
+
+def test_the_first_list_a_hit_appears_in_supplies_its_source():
+    out = _rrf(
+        [("entities", hits("a", a={"description": "keyword"})), ("entities", hits("a", a={"description": "vector"}))],
+        k=60,
+        limit=10,
+    )
+    assert out[0].snippet == "keyword"
+
+
+@pytest.mark.anyio
+async def test_supabase_fallback_fuses_keyword_and_local_vector_lists(fake_db, settings, monkeypatch):
+    settings(elastic_cloud_id="", elastic_api_key="", search_rrf_k=60)
+    ents = [{"id": f"e{i}", "type": "org", "name": f"Org {i}", "description": ""} for i in range(3)]
+    docs = [{"id": "d1", "title": "Doc", "url": "https://d.test", "metadata": {"from": "Wire"}}]
+    fake_db.create_table("entities", ents)
+    fake_db.create_table("documents", docs)
+    fake_db.rpcs["search_entities"] = lambda p: [ents[0], ents[1]]
+    fake_db.rpcs["search_documents"] = lambda p: docs
+
+    async def embed_text(q, *, task):
+        return [1.0]
+
+    async def search_vectors(qvec, *, k):
+        return [("entities", "e1", 0.9), ("documents", "d1", 0.8), ("entities", "e2", 0.7)]
+
+    monkeypatch.setattr(search, "vector_index_active", lambda: True)
+    monkeypatch.setattr(search, "maybe_sync_vector_index", lambda: None)
+    monkeypatch.setattr(search, "embed_text", embed_text)
+    monkeypatch.setattr(search, "search_vectors", search_vectors)
+
+    out, missing = await search._search("org", None, 10)
+    assert missing == []
+    # e1 and d1 are in both lists (ranks 2+1 and 1+1); e0 and e2 in one each.
+    assert [(h.type, h.id) for h in out] == [("document", "d1"), ("entity", "e1"), ("entity", "e0"), ("entity", "e2")]
+    assert out[0].metadata["source"] == "Wire"
+
+
+def test_supabase_rows_are_shaped_like_es_hits():
+    assert _as_hit("documents", {"id": "d", "metadata": {"from": "Wire"}}) == {
+        "_id": "d",
+        "_source": {"id": "d", "metadata": {"from": "Wire"}, "source": "Wire"},
+    }
+    assert _as_hit("entities", {"id": "e", "name": "E"}) == {"_id": "e", "_source": {"id": "e", "name": "E"}}
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services import vector_index as vi
+from app.services.vector_index import VectorIndex
+
+pytestmark = pytest.mark.anyio
+
+
+def entity(i: int, at: str, name: str | None = None) -> dict:
+    return {"id": f"e{i}", "type": "org", "name": name or f"Org {i}", "description": "", "last_updated": at}
+
+
+@pytest.fixture
+def index(fake_db, settings, monkeypatch, tmp_path):
+    settings(jina_dims=2, vector_index_dtype="float32", vector_index_approximate=False, vector_index_embed_attempts=2)
+    idx = VectorIndex(str(tmp_path / "vectors"), dims=2, dtype="float32")
+    monkeypatch.setattr(vi, "_index", idx)
+    fake_db.create_table("documents", [])
+    rows = [
+        entity(0, "2024-05-01T00:00:00+00:00"),
+        entity(1, "2024-05-02T00:00:00+00:00", name="bad"),
+        entity(2, "2024-05-03T00:00:00+00:00"),
+    ]
+    fake_db.create_table("entities", rows)
+
+    async def embed_batch(texts, *, task):
+        return [None if t.startswith("bad") else [1.0, float(len(t))] for t in texts]
+
+    monkeypatch.setattr(vi, "embed_batch", embed_batch)
+    return idx
+
+
+async def test_a_row_that_never_embeds_stops_holding_the_watermark(index, fake_db):
+    first = (await vi.sync_vector_index())["entities"]
+    assert (first["upserted"], first["skipped"], first["given_up"]) == (2, 1, 0)
+    assert first["watermark"] == "2024-05-02T00:00:00+00:00"  # held at the failed row
+
+    second = (await vi.sync_vector_index())["entities"]
+    assert second["since"] == "2024-05-02T00:00:00+00:00" and second["given_up"] == 1
+    assert second["watermark"] == "2024-05-03T00:00:00+00:00"
+    assert index.embed_failures("entities") == {"e1": {"at": "2024-05-02T00:00:00+00:00", "attempts": 2}}
+    assert index.stats()["embed_failures"] == {"entities": 1}
+
+    third = (await vi.sync_vector_index())["entities"]
+    assert third["rows"] == 1 and third["watermark"] == "2024-05-03T00:00:00+00:00"
+
+    # Fixed upstream: the new version embeds and leaves the failure list.
+    fake_db.rows("entities")[1].update(name="Org 1", last_updated="2024-05-04T00:00:00+00:00")
+    fourth = (await vi.sync_vector_index())["entities"]
+    # (e2 comes again too: `since` is inclusive.)
+    assert fourth["upserted"] == 2 and fourth["watermark"] == "2024-05-04T00:00:00+00:00"
+    assert index.embed_failures("entities") == {}
+    assert sorted(i for kind, i, _ in index.search([1.0, 5.0], k=10)) == ["e0", "e1", "e2"]
+
+
+async def test_a_new_version_of_a_failing_row_gets_fresh_attempts(index, fake_db):
+    await vi.sync_vector_index()
+    await vi.sync_vector_index()
+    assert index.embed_failures("entities")["e1"]["attempts"] == 2
+
+    fake_db.rows("entities")[1]["last_updated"] = "2024-05-05T00:00:00+00:00"
+    report = (await vi.sync_vector_index())["entities"]
+    assert index.embed_failures("entities")["e1"] == {"at": "2024-05-05T00:00:00+00:00", "attempts": 1}
+    assert report["given_up"] == 0 and report["watermark"] == "2024-05-05T00:00:00+00:00"
+    # Still persisted across a reload of the index files.
+    fresh = VectorIndex(index.path, dims=2, dtype="float32")
+    fresh.reload_if_changed()
+    assert fresh.embed_failures("entities")["e1"]["attempts"] == 1
@@ -8,7 +8,7 @@ type SP = { seed?: string; depth?: string; types?: string };
 export default async function ExplorePage({ searchParams }: { searchParams: Promise<SP> }) {
   const sp = await searchParams;
   const seed = (sp.seed ?? "").trim();
-  const depth = Math.max(1, Math.min(2, Number(sp.depth ?? "1") || 1));
+  const depth = Math.max(1, Math.min(4, Number(sp.depth ?? "1") || 1));
   const types = (sp.types ?? "").trim();
   const typeList = types ? types.split(",").map((t) => t.trim()).filter(Boolean) : undefined;
 
@@ -113,7 +113,8 @@ export default async function SearchPage({ searchParams }: { searchParams: Promi
           <div className="mt-10 rounded-[calc(var(--radius)+10px)] border border-[color:var(--fog)] bg-[color:rgba(7,10,15,0.55)] p-6">
             <p className="font-serif text-[20px] text-[color:var(--ink-0)]">Try a query from the homepage chips.</p>
             <p className="mt-2 text-[14px] leading-[1.65] text-[color:var(--muted)]">
-              If the index is empty, hit the landing page and trigger a refresh, or call `/api/ingest/news` once.
+              If the index is empty, hit the landing page and trigger a refresh, or start an ingest with `POST
+              /api/ingest/news` (it queues a job; poll `/api/ingest/jobs/:id`, or pass `wait=1`).
             </p>
           </div>
         ) : results.length === 0 ? (
@@ -2,8 +2,8 @@
 
 import { useEffect, useMemo, useState } from "react";
 import { useRouter, useSearchParams } from "next/navigation";
-import type { Entity, GraphResponse, RelationshipType } from "@/lib/types";
-import { fetchGraph, listEntities } from "@/lib/api";
+import type { EntitySuggestion, GraphResponse, RelationshipType } from "@/lib/types";
+import { fetchGraphColumnar, suggestEntities } from "@/lib/api";
 import { NetworkGraph } from "@/components/graph/NetworkGraph";
 
 const REL_TYPES: RelationshipType[] = ["donation", "lobbying", "vote", "employment"];
@@ -28,7 +28,7 @@ export function GraphExplorerClient({ initialSeed, initialGraph }: { initialSeed
   const [err, setErr] = useState<string | null>(null);
 
   const [q, setQ] = useState("");
-  const [suggestions, setSuggestions] = useState<Entity[]>([]);
+  const [suggestions, setSuggestions] = useState<EntitySuggestion[]>([]);
 
   const typesKey = useMemo(() => types.join(","), [types]);
 
@@ -48,7 +48,7 @@ export function GraphExplorerClient({ initialSeed, initialGraph }: { initialSeed
     }
     setErr(null);
     try {
-      const g = await fetchGraph(nextSeed, nextDepth, 200, nextTypes);
+      const g = await fetchGraphColumnar(nextSeed, nextDepth, 200, nextTypes);
       setGraph(g);
       syncUrl(nextSeed, nextDepth, nextTypes);
     } catch (e) {
@@ -64,6 +64,8 @@ export function GraphExplorerClient({ initialSeed, initialGraph }: { initialSeed
   }, [sp]);
 
   useEffect(() => {
+    // As-you-type lookups go to the in-memory prefix index (/api/entities/suggest), not full search.
+    let stale = false;
     const t = setTimeout(async () => {
       const v = q.trim();
       if (v.length < 2) {
@@ -71,13 +73,16 @@ export function GraphExplorerClient({ initialSeed, initialGraph }: { initialSeed
         return;
       }
       try {
-        const rows = await listEntities(v, 8);
-        setSuggestions(rows);
+        const rows = await suggestEntities(v, 8);
+        if (!stale) setSuggestions(rows);
       } catch {
-        setSuggestions([]);
+        if (!stale) setSuggestions([]);
       }
-    }, 250);
-    return () => clearTimeout(t);
+    }, 120);
+    return () => {
+      stale = true;
+      clearTimeout(t);
+    };
   }, [q]);
 
   return (
@@ -159,7 +164,7 @@ export function GraphExplorerClient({ initialSeed, initialGraph }: { initialSeed
           <div className="mt-6 border-t border-[color:var(--fog)] pt-6">
             <p className="font-mono text-[11px] uppercase tracking-[0.22em] text-[color:var(--muted-2)]">Depth</p>
             <div className="mt-3 flex gap-2">
-              {[1, 2].map((d) => (
+              {[1, 2, 3, 4].map((d) => (
                 <button
                   key={d}
                   type="button"
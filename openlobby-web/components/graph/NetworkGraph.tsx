@@ -47,6 +47,11 @@ export function NetworkGraph({
           graphData={data}
           nodeLabel={(n: any) => `${n.name ?? n.id} (${n.type ?? "entity"})`}
           nodeColor={(n: any) => colorFor(String(n.type ?? ""))}
+          nodeVal={(n: any) => {
+            // Precomputed influence (PageRank percentile) sizes nodes 1..9; unranked nodes stay small.
+            const p = typeof n.influence_percentile === "number" ? n.influence_percentile : 0;
+            return 1 + 8 * p * p;
+          }}
           nodeOpacity={0.9}
           linkColor={() => "rgba(244,240,232,0.22)"}
           linkOpacity={0.35}
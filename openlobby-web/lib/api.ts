@@ -2,10 +2,15 @@ import type {
   AskRequest,
   AskResponse,
   CaseFile,
+  ColumnarGraphResponse,
   CasesResponse,
+  EdgePage,
   Entity,
+  EntitySort,
+  EntitySuggestion,
   GraphResponse,
   NewsItem,
+  PathResponse,
   SearchResponse,
 } from "@/lib/types";
 
@@ -68,15 +73,26 @@ export async function fetchEntity(id: string): Promise<Entity> {
   return (await r.json()) as Entity;
 }
 
-export async function listEntities(q: string, limit = 20, type?: string): Promise<Entity[]> {
+export async function listEntities(q: string, limit = 20, type?: string, sort?: EntitySort): Promise<Entity[]> {
   const b = baseUrl();
   if (!b) throw new Error("NEXT_PUBLIC_API_URL is not set");
   const t = type ? `&type=${encodeURIComponent(type)}` : "";
-  const r = await fetch(`${b}/api/entities?q=${encodeURIComponent(q)}&limit=${limit}${t}`, { cache: "no-store" });
+  // sort only applies to listings (empty q); text queries are ranked by relevance.
+  const qp = q ? `q=${encodeURIComponent(q)}&` : sort ? `sort=${sort}&` : "";
+  const r = await fetch(`${b}/api/entities?${qp}limit=${limit}${t}`, { cache: "no-store" });
   if (!r.ok) throw new Error(`entities failed: ${r.status}`);
   return (await r.json()) as Entity[];
 }
 
+export async function suggestEntities(q: string, limit = 8, type?: string): Promise<EntitySuggestion[]> {
+  const b = baseUrl();
+  if (!b) throw new Error("NEXT_PUBLIC_API_URL is not set");
+  const t = type ? `&type=${encodeURIComponent(type)}` : "";
+  const r = await fetch(`${b}/api/entities/suggest?q=${encodeURIComponent(q)}&limit=${limit}${t}`, { cache: "no-store" });
+  if (!r.ok) throw new Error(`suggest failed: ${r.status}`);
+  return (await r.json()) as EntitySuggestion[];
+}
+
 export async function fetchGraph(seedId: string, depth = 1, limit = 200, types?: string[]): Promise<GraphResponse> {
   const b = baseUrl();
   if (!b) throw new Error("NEXT_PUBLIC_API_URL is not set");
@@ -88,3 +104,72 @@ export async function fetchGraph(seedId: string, depth = 1, limit = 200, types?:
   if (!r.ok) throw new Error(`graph failed: ${r.status}`);
   return (await r.json()) as GraphResponse;
 }
+
+// Same neighbourhood as fetchGraph in the columnar format (much smaller for large graphs), decoded
+// to a GraphResponse. Parallel relationships arrive collapsed: amount is their sum, date the latest.
+export async function fetchGraphColumnar(
+  seedId: string,
+  depth = 1,
+  limit = 200,
+  types?: string[]
+): Promise<GraphResponse> {
+  const b = baseUrl();
+  if (!b) throw new Error("NEXT_PUBLIC_API_URL is not set");
+  const tp = (types ?? []).length ? `&types=${encodeURIComponent(types!.join(","))}` : "";
+  const r = await fetch(
+    `${b}/api/graph?seed_id=${encodeURIComponent(seedId)}&depth=${depth}&limit=${limit}&format=columnar${tp}`,
+    { cache: "no-store" }
+  );
+  if (!r.ok) throw new Error(`graph failed: ${r.status}`);
+  return decodeColumnarGraph((await r.json()) as ColumnarGraphResponse);
+}
+
+export function decodeColumnarGraph(g: ColumnarGraphResponse): GraphResponse {
+  const fields = Object.keys(g.nodes);
+  const nodes = g.nodes.id.map((_, i) => Object.fromEntries(fields.map((f) => [f, g.nodes[f][i]])) as Entity);
+  const ids = g.nodes.id;
+  const e = g.edges;
+  const edges = e.id.map((id, i) => ({
+    id,
+    type: g.types[e.type[i]],
+    source_id: ids[e.source[i]],
+    target_id: ids[e.target[i]],
+    amount: e.amount[i],
+    date: e.last_date[i],
+    cycle: e.cycle[i] < 0 ? null : g.cycles[e.cycle[i]],
+    description: e.count[i] > 1 ? `${e.count[i]} records` : null,
+  }));
+  return { seed_id: g.seed_id, nodes, edges, summaries: g.summaries };
+}
+
+export async function fetchNodeEdges(
+  nodeId: string,
+  opts: { cursor?: string | null; limit?: number; rank?: "amount" | "recent"; types?: string[] } = {}
+): Promise<EdgePage> {
+  const b = baseUrl();
+  if (!b) throw new Error("NEXT_PUBLIC_API_URL is not set");
+  const tp = (opts.types ?? []).length ? `&types=${encodeURIComponent(opts.types!.join(","))}` : "";
+  const cp = opts.cursor ? `&cursor=${encodeURIComponent(opts.cursor)}` : "";
+  const r = await fetch(
+    `${b}/api/graph/edges?node_id=${encodeURIComponent(nodeId)}&limit=${opts.limit ?? 50}&rank=${opts.rank ?? "amount"}${tp}${cp}`,
+    { cache: "no-store" }
+  );
+  if (!r.ok) throw new Error(`edges failed: ${r.status}`);
+  return (await r.json()) as EdgePage;
+}
+
+export async function findPaths(
+  fromId: string,
+  toId: string,
+  opts: { k?: number; maxHops?: number; types?: string[] } = {}
+): Promise<PathResponse> {
+  const b = baseUrl();
+  if (!b) throw new Error("NEXT_PUBLIC_API_URL is not set");
+  const tp = (opts.types ?? []).length ? `&types=${encodeURIComponent(opts.types!.join(","))}` : "";
+  const r = await fetch(
+    `${b}/api/graph/path?from_id=${encodeURIComponent(fromId)}&to_id=${encodeURIComponent(toId)}&k=${opts.k ?? 3}&max_hops=${opts.maxHops ?? 6}${tp}`,
+    { cache: "no-store" }
+  );
+  if (!r.ok) throw new Error(`path failed: ${r.status}`);
+  return (await r.json()) as PathResponse;
+}
@@ -50,10 +50,26 @@ export type Entity = {
   industry?: string | null;
   total_lobbying?: number | null;
   total_donations?: number | null;
+  // Influence metrics from the centrality batch job.
+  pagerank?: number | null;
+  degree?: number | null;
+  weighted_degree?: number | null;
+  betweenness?: number | null;
+  influence_rank?: number | null;
+  influence_percentile?: number | null;
   metadata?: Record<string, unknown>;
   last_updated?: string | null;
 };
 
+export type EntitySort = "recent" | "pagerank" | "degree" | "betweenness";
+
+export type EntitySuggestion = {
+  id: string;
+  type: EntityType;
+  name: string;
+  score?: number | null;
+};
+
 export type Relationship = {
   id: string;
   type: RelationshipType;
@@ -67,10 +83,64 @@ export type Relationship = {
   last_updated?: string | null;
 };
 
+export type NodeEdgeSummary = {
+  node_id: string;
+  total: number;
+  shown: number;
+  hidden: Partial<Record<RelationshipType, number>>;
+};
+
 export type GraphResponse = {
   seed_id: string;
   nodes: Entity[];
   edges: Relationship[];
+  summaries?: NodeEdgeSummary[];
+};
+
+// format=columnar: one array per node field and per edge column. Edges are parallel relationships
+// collapsed per (source, target, type, cycle); endpoints are node positions, type/cycle index the tables.
+export type ColumnarGraphResponse = {
+  seed_id: string;
+  format: "columnar";
+  types: RelationshipType[];
+  cycles: string[];
+  nodes: { id: string[] } & Record<string, unknown[]>;
+  edges: {
+    id: string[];
+    source: number[];
+    target: number[];
+    type: number[];
+    cycle: number[];
+    count: number[];
+    amount: (number | null)[];
+    first_date: (string | null)[];
+    last_date: (string | null)[];
+  };
+  summaries?: NodeEdgeSummary[];
+};
+
+export type EdgePage = {
+  node_id: string;
+  edges: Relationship[];
+  total?: number | null;
+  next_cursor?: string | null;
+};
+
+export type GraphPath = {
+  nodes: string[];
+  edges: Relationship[];
+  hops: number;
+  total_amount: number;
+  min_amount?: number | null;
+};
+
+export type PathResponse = {
+  from_id: string;
+  to_id: string;
+  paths: GraphPath[];
+  entities: Entity[];
+  timed_out: boolean;
+  elapsed_ms: number;
 };
 
 export type SearchHit = {
@@ -11,7 +11,7 @@ API="$1"
 SECRET="$2"
 
 echo "Triggering news ingestion..."
-curl -sS -X POST "$API/api/ingest/news?limit=60" -H "Authorization: Bearer $SECRET" | cat
+curl -sS -X POST "$API/api/ingest/news?limit=60&wait=1" -H "Authorization: Bearer $SECRET" | cat
 echo
 
 echo "Warming landing endpoints..."
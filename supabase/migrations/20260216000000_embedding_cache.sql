@@ -0,0 +1,28 @@
+-- Content-addressed embedding cache (shared across API workers and cron runs).
+-- key = sha256(model, task, dims, text); see openlobby-api/app/services/embedding_cache.py
+
+create table if not exists public.embedding_cache (
+  key text primary key,
+  vector real[] not null,
+  last_used_at timestamptz not null default now()
+);
+
+create index if not exists embedding_cache_last_used_at_idx on public.embedding_cache(last_used_at);
+
+-- Server-side only (service role); no client access.
+alter table public.embedding_cache enable row level security;
+
+-- LRU eviction: keep the `max_entries` most recently used rows.
+create or replace function public.embedding_cache_evict(max_entries integer)
+returns integer
+language sql
+as $$
+  with doomed as (
+    select key from public.embedding_cache
+    order by last_used_at desc
+    offset greatest(max_entries, 0)
+  ), del as (
+    delete from public.embedding_cache c using doomed d where c.key = d.key returning 1
+  )
+  select count(*)::integer from del;
+$$;
@@ -0,0 +1,12 @@
+-- Incremental news ingest: per-document content hash + per-topic high-water marks.
+
+alter table public.documents add column if not exists content_hash text;
+
+create table if not exists public.ingest_state (
+  topic text primary key,
+  high_water_published_at timestamptz,
+  updated_at timestamptz not null default now()
+);
+
+-- Server-side only (service role); no client access.
+alter table public.ingest_state enable row level security;
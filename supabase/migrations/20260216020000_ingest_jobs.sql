@@ -0,0 +1,26 @@
+-- Background ingest jobs with progress + resumable checkpoints.
+
+create table if not exists public.ingest_jobs (
+  id uuid primary key default gen_random_uuid(),
+  kind text not null, -- e.g. 'news'
+  status text not null check (status in ('queued','running','succeeded','failed','interrupted')),
+  params jsonb not null default '{}'::jsonb,
+  progress jsonb not null default '{}'::jsonb, -- live per-stage counts
+  checkpoint jsonb not null default '{}'::jsonb, -- topics done, pending hits, stored urls
+  report jsonb,
+  error text,
+  owner text, -- host:pid of the process running it
+  created_at timestamptz not null default now(),
+  started_at timestamptz,
+  finished_at timestamptz,
+  heartbeat_at timestamptz
+);
+
+create index if not exists ingest_jobs_created_at_idx on public.ingest_jobs(created_at desc);
+
+-- Overlap guard: at most one queued/running job per kind.
+create unique index if not exists ingest_jobs_one_active_idx
+  on public.ingest_jobs(kind) where status in ('queued','running');
+
+-- Server-side only (service role); no client access.
+alter table public.ingest_jobs enable row level security;
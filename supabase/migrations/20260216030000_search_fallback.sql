@@ -0,0 +1,104 @@
+-- Keyword search without Elasticsearch: trigram + full-text indexes and ranked search functions.
+-- Used by openlobby-api/app/routers/search.py and entities.py when ELASTIC_* is not configured.
+
+create extension if not exists "pg_trgm";
+
+-- Weighted full-text vectors (name/title outrank description/excerpt).
+alter table public.entities
+  add column if not exists search_tsv tsvector generated always as (
+    setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B')
+  ) stored;
+
+alter table public.documents
+  add column if not exists search_tsv tsvector generated always as (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(excerpt, '')), 'B')
+  ) stored;
+
+create index if not exists entities_search_tsv_idx on public.entities using gin (search_tsv);
+create index if not exists documents_search_tsv_idx on public.documents using gin (search_tsv);
+
+-- Trigram indexes serve substring matches (ilike '%q%') and similarity on partial words/names.
+create index if not exists entities_name_trgm_idx on public.entities using gin (name gin_trgm_ops);
+create index if not exists entities_description_trgm_idx on public.entities using gin (description gin_trgm_ops);
+create index if not exists documents_title_trgm_idx on public.documents using gin (title gin_trgm_ops);
+create index if not exists documents_excerpt_trgm_idx on public.documents using gin (excerpt gin_trgm_ops);
+create index if not exists documents_url_trgm_idx on public.documents using gin (url gin_trgm_ops);
+
+-- Escape LIKE wildcards in user input.
+create or replace function public.search_like_pattern(q text)
+returns text
+language sql
+immutable
+as $$
+  select '%' || replace(replace(replace(coalesce(q, ''), '\', '\\'), '%', '\%'), '_', '\_') || '%';
+$$;
+
+-- Ranked entity search: full-text rank plus name similarity. Each OR branch is index-backed,
+-- so the planner combines the GIN indexes (BitmapOr) instead of scanning the table.
+create or replace function public.search_entities(q text, entity_type text default null, max_results integer default 20)
+returns table (
+  id text,
+  type text,
+  name text,
+  description text,
+  party text,
+  state text,
+  industry text,
+  total_lobbying numeric,
+  total_donations numeric,
+  metadata jsonb,
+  last_updated timestamptz,
+  rank real
+)
+language sql
+stable
+as $$
+  with params as (
+    select websearch_to_tsquery('english', q) as tsq, public.search_like_pattern(q) as pat
+  )
+  select
+    e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+    e.total_lobbying, e.total_donations, e.metadata, e.last_updated,
+    (ts_rank_cd(e.search_tsv, p.tsq) + similarity(e.name, q))::real as rank
+  from public.entities e, params p
+  where (entity_type is null or e.type = entity_type)
+    and (
+      e.search_tsv @@ p.tsq
+      or e.name ilike p.pat
+      or e.description ilike p.pat
+    )
+  order by rank desc, e.last_updated desc
+  limit greatest(1, least(max_results, 100));
+$$;
+
+create or replace function public.search_documents(q text, max_results integer default 20)
+returns table (
+  id text,
+  source text,
+  url text,
+  title text,
+  published_at timestamptz,
+  excerpt text,
+  image_url text,
+  metadata jsonb,
+  rank real
+)
+language sql
+stable
+as $$
+  with params as (
+    select websearch_to_tsquery('english', q) as tsq, public.search_like_pattern(q) as pat
+  )
+  select
+    d.id, d.source, d.url, d.title, d.published_at, d.excerpt, d.image_url, d.metadata,
+    (ts_rank_cd(d.search_tsv, p.tsq) + similarity(d.title, q))::real as rank
+  from public.documents d, params p
+  where d.search_tsv @@ p.tsq
+     or d.title ilike p.pat
+     or d.excerpt ilike p.pat
+     or d.url ilike p.pat
+  order by rank desc, d.published_at desc nulls last
+  limit greatest(1, least(max_results, 100));
+$$;
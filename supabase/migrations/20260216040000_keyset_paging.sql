@@ -0,0 +1,90 @@
+-- Keyset (cursor) paging for /api/entities and /api/search without Elasticsearch.
+-- Pages are ordered newest-first on (last_updated, id) / (created_at, id); the id breaks ties so a
+-- page boundary never skips or repeats rows, and each page is an index range scan instead of an offset.
+
+create index if not exists entities_last_updated_id_idx on public.entities (last_updated desc, id desc);
+create index if not exists entities_type_last_updated_id_idx on public.entities (type, last_updated desc, id desc);
+create index if not exists documents_created_at_id_idx on public.documents (created_at desc, id desc);
+
+-- Same match as search_entities, paged by recency after (after_ts, after_id).
+create or replace function public.search_entities_page(
+  q text,
+  entity_type text default null,
+  after_ts timestamptz default null,
+  after_id text default null,
+  max_results integer default 50
+)
+returns table (
+  id text,
+  type text,
+  name text,
+  description text,
+  party text,
+  state text,
+  industry text,
+  total_lobbying numeric,
+  total_donations numeric,
+  metadata jsonb,
+  last_updated timestamptz,
+  rank real
+)
+language sql
+stable
+as $$
+  with params as (
+    select websearch_to_tsquery('english', q) as tsq, public.search_like_pattern(q) as pat
+  )
+  select
+    e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+    e.total_lobbying, e.total_donations, e.metadata, e.last_updated,
+    (ts_rank_cd(e.search_tsv, p.tsq) + similarity(e.name, q))::real as rank
+  from public.entities e, params p
+  where (entity_type is null or e.type = entity_type)
+    and (after_ts is null or (e.last_updated, e.id) < (after_ts, after_id))
+    and (
+      e.search_tsv @@ p.tsq
+      or e.name ilike p.pat
+      or e.description ilike p.pat
+    )
+  order by e.last_updated desc, e.id desc
+  limit greatest(1, least(max_results, 200));
+$$;
+
+create or replace function public.search_documents_page(
+  q text,
+  after_ts timestamptz default null,
+  after_id text default null,
+  max_results integer default 50
+)
+returns table (
+  id text,
+  source text,
+  url text,
+  title text,
+  published_at timestamptz,
+  excerpt text,
+  image_url text,
+  metadata jsonb,
+  created_at timestamptz,
+  rank real
+)
+language sql
+stable
+as $$
+  with params as (
+    select websearch_to_tsquery('english', q) as tsq, public.search_like_pattern(q) as pat
+  )
+  select
+    d.id, d.source, d.url, d.title, d.published_at, d.excerpt, d.image_url, d.metadata, d.created_at,
+    (ts_rank_cd(d.search_tsv, p.tsq) + similarity(d.title, q))::real as rank
+  from public.documents d, params p
+  where (after_ts is null or (d.created_at, d.id) < (after_ts, after_id))
+    and (
+      d.search_tsv @@ p.tsq
+      or d.title ilike p.pat
+      or d.excerpt ilike p.pat
+      or d.url ilike p.pat
+    )
+  order by d.created_at desc, d.id desc
+  limit greatest(1, least(max_results, 200));
+$$;
@@ -0,0 +1,84 @@
+-- Bounded BFS around a seed entity in one round trip (GET /api/graph).
+-- Each hop expands the frontier along relationships of the requested types in either direction,
+-- stopping at max_depth hops or max_edges edges; nodes and edges come back hydrated as JSON.
+
+-- Frontier lookups filter on (endpoint, type); the composite indexes serve both, so the
+-- single-column ones from the initial schema are redundant.
+create index if not exists relationships_source_id_type_idx on public.relationships (source_id, type);
+create index if not exists relationships_target_id_type_idx on public.relationships (target_id, type);
+drop index if exists public.relationships_source_id_idx;
+drop index if exists public.relationships_target_id_idx;
+
+create or replace function public.graph_expand(
+  seed_id text,
+  max_depth integer default 1,
+  max_edges integer default 200,
+  rel_types text[] default array['donation', 'lobbying', 'vote', 'employment']
+)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  frontier text[] := array[seed_id];
+  node_ids text[] := array[seed_id];
+  edge_ids text[] := '{}';
+  batch text[];
+  nxt text[];
+  remaining integer := greatest(0, least(max_edges, 2000));
+  hop integer := 0;
+begin
+  if not exists (select 1 from public.entities e where e.id = seed_id) then
+    return null;
+  end if;
+
+  while hop < least(max_depth, 4) and remaining > 0 and cardinality(frontier) > 0 loop
+    hop := hop + 1;
+
+    select coalesce(array_agg(x.id), '{}') into batch
+    from (
+      select r.id from public.relationships r
+      where r.source_id = any(frontier) and r.type = any(rel_types) and r.id <> all(edge_ids)
+      union
+      select r.id from public.relationships r
+      where r.target_id = any(frontier) and r.type = any(rel_types) and r.id <> all(edge_ids)
+      limit remaining
+    ) x;
+
+    edge_ids := edge_ids || batch;
+    remaining := remaining - cardinality(batch);
+
+    select coalesce(array_agg(distinct n.id), '{}') into nxt
+    from (
+      select unnest(array[r.source_id, r.target_id]) as id
+      from public.relationships r
+      where r.id = any(batch)
+    ) n
+    where n.id <> all(node_ids);
+
+    node_ids := node_ids || nxt;
+    frontier := nxt;
+  end loop;
+
+  return jsonb_build_object(
+    'nodes', coalesce((
+      select jsonb_agg(to_jsonb(en))
+      from (
+        select e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+               e.total_lobbying, e.total_donations, e.metadata, e.last_updated
+        from public.entities e
+        where e.id = any(node_ids)
+      ) en
+    ), '[]'::jsonb),
+    'edges', coalesce((
+      select jsonb_agg(to_jsonb(re))
+      from (
+        select r.id, r.type, r.source_id, r.target_id, r.amount, r.date, r.cycle,
+               r.description, r.metadata, r.last_updated
+        from public.relationships r
+        where r.id = any(edge_ids)
+      ) re
+    ), '[]'::jsonb)
+  );
+end;
+$$;
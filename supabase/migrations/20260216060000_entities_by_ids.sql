@@ -0,0 +1,25 @@
+-- Hydrate a set of entities by id in one POST (GET /api/graph with the in-memory graph engine).
+-- Graph neighbourhoods can hold thousands of ids, which would overflow a PostgREST `in` filter URL.
+
+create or replace function public.entities_by_ids(ids text[])
+returns table (
+  id text,
+  type text,
+  name text,
+  description text,
+  party text,
+  state text,
+  industry text,
+  total_lobbying numeric,
+  total_donations numeric,
+  metadata jsonb,
+  last_updated timestamptz
+)
+language sql
+stable
+as $$
+  select e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+         e.total_lobbying, e.total_donations, e.metadata, e.last_updated
+  from public.entities e
+  where e.id = any(ids);
+$$;
@@ -0,0 +1,44 @@
+-- Keyset paging through one node's relationships, best first (GET /api/graph/edges when the
+-- in-memory graph engine is not loaded). sort_by 'amount' ranks by amount, 'recent' by date;
+-- missing values sort last. Pages continue after (after_key, after_id) from the previous page.
+
+create or replace function public.node_edges_page(
+  node_id text,
+  rel_types text[] default array['donation', 'lobbying', 'vote', 'employment'],
+  sort_by text default 'amount',
+  after_key double precision default null,
+  after_id text default null,
+  max_results integer default 50
+)
+returns table (
+  id text,
+  type text,
+  source_id text,
+  target_id text,
+  amount numeric,
+  date date,
+  cycle text,
+  description text,
+  metadata jsonb,
+  last_updated timestamptz,
+  sort_key double precision
+)
+language sql
+stable
+as $$
+  select x.*
+  from (
+    select
+      r.id, r.type, r.source_id, r.target_id, r.amount, r.date, r.cycle, r.description, r.metadata, r.last_updated,
+      case
+        when sort_by = 'recent' then coalesce((r.date - date '1970-01-01')::double precision, '-infinity')
+        else coalesce(r.amount::double precision, '-infinity')
+      end as sort_key
+    from public.relationships r
+    where (r.source_id = node_id or r.target_id = node_id)
+      and r.type = any(rel_types)
+  ) x
+  where after_id is null or (x.sort_key, x.id) < (after_key, after_id)
+  order by x.sort_key desc, x.id desc
+  limit greatest(1, least(max_results, 500));
+$$;
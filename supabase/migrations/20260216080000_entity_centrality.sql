@@ -0,0 +1,227 @@
+-- Precomputed influence metrics on entities, written by the centrality batch job
+-- (openlobby-api/app/services/centrality.py; cron or POST /api/ingest/centrality).
+-- Requests only read and sort by these columns; nothing is computed per request.
+--   pagerank              weighted PageRank over relationships (source -> target), sums to 1
+--   degree                incident relationships, both directions
+--   weighted_degree       summed amount of incident relationships
+--   betweenness           sampled betweenness estimate, normalized to [0, 1]
+--   influence_rank        position by pagerank (1 = most influential); null when not in the graph
+--   influence_percentile  1 for the top entity down to 0, for sizing nodes in the UI
+-- The job does not touch last_updated, so a run does not make index syncs reload every entity.
+
+alter table public.entities
+  add column if not exists pagerank double precision not null default 0,
+  add column if not exists degree integer not null default 0,
+  add column if not exists weighted_degree double precision not null default 0,
+  add column if not exists betweenness double precision not null default 0,
+  add column if not exists influence_rank integer,
+  add column if not exists influence_percentile double precision not null default 0,
+  add column if not exists centrality_updated_at timestamptz;
+
+-- Keyset listings of GET /api/entities?sort=... (optionally filtered by type).
+create index if not exists entities_pagerank_id_idx on public.entities (pagerank desc, id desc);
+create index if not exists entities_type_pagerank_id_idx on public.entities (type, pagerank desc, id desc);
+create index if not exists entities_degree_id_idx on public.entities (degree desc, id desc);
+create index if not exists entities_betweenness_id_idx on public.entities (betweenness desc, id desc);
+
+-- One batch of job results: [{id, pagerank, degree, ...}, ...]. Returns the rows updated.
+create or replace function public.apply_entity_centrality(rows jsonb, computed_at timestamptz)
+returns integer
+language sql
+as $$
+  with x as (
+    select *
+    from jsonb_to_recordset(rows) as t(
+      id text,
+      pagerank double precision,
+      degree integer,
+      weighted_degree double precision,
+      betweenness double precision,
+      influence_rank integer,
+      influence_percentile double precision
+    )
+  ),
+  u as (
+    update public.entities e
+    set pagerank = x.pagerank,
+        degree = x.degree,
+        weighted_degree = x.weighted_degree,
+        betweenness = x.betweenness,
+        influence_rank = x.influence_rank,
+        influence_percentile = x.influence_percentile,
+        centrality_updated_at = computed_at
+    from x
+    where e.id = x.id
+    returning 1
+  )
+  select count(*)::integer from u;
+$$;
+
+-- After a run: entities the run did not reach (no relationships any more) drop back to zero.
+-- Returns their ids so the job can reset them in the search index too.
+create or replace function public.clear_stale_centrality(computed_at timestamptz)
+returns table (id text)
+language sql
+as $$
+  with u as (
+    update public.entities e
+    set pagerank = 0,
+        degree = 0,
+        weighted_degree = 0,
+        betweenness = 0,
+        influence_rank = null,
+        influence_percentile = 0,
+        centrality_updated_at = computed_at
+    where e.centrality_updated_at is distinct from computed_at
+      and (e.pagerank <> 0 or e.degree <> 0 or e.influence_rank is not null)
+    returning e.id
+  )
+  select u.id from u;
+$$;
+
+-- Keyword search ties (same text rank) go to the more influential entity.
+create or replace function public.search_entities(q text, entity_type text default null, max_results integer default 20)
+returns table (
+  id text,
+  type text,
+  name text,
+  description text,
+  party text,
+  state text,
+  industry text,
+  total_lobbying numeric,
+  total_donations numeric,
+  metadata jsonb,
+  last_updated timestamptz,
+  rank real
+)
+language sql
+stable
+as $$
+  with params as (
+    select websearch_to_tsquery('english', q) as tsq, public.search_like_pattern(q) as pat
+  )
+  select
+    e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+    e.total_lobbying, e.total_donations, e.metadata, e.last_updated,
+    (ts_rank_cd(e.search_tsv, p.tsq) + similarity(e.name, q))::real as rank
+  from public.entities e, params p
+  where (entity_type is null or e.type = entity_type)
+    and (
+      e.search_tsv @@ p.tsq
+      or e.name ilike p.pat
+      or e.description ilike p.pat
+    )
+  order by rank desc, e.pagerank desc, e.last_updated desc
+  limit greatest(1, least(max_results, 100));
+$$;
+
+-- Graph hydration returns the metrics too, so the UI can size nodes without another request.
+drop function if exists public.entities_by_ids(text[]);
+
+create function public.entities_by_ids(ids text[])
+returns table (
+  id text,
+  type text,
+  name text,
+  description text,
+  party text,
+  state text,
+  industry text,
+  total_lobbying numeric,
+  total_donations numeric,
+  pagerank double precision,
+  degree integer,
+  weighted_degree double precision,
+  betweenness double precision,
+  influence_rank integer,
+  influence_percentile double precision,
+  metadata jsonb,
+  last_updated timestamptz
+)
+language sql
+stable
+as $$
+  select e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+         e.total_lobbying, e.total_donations,
+         e.pagerank, e.degree, e.weighted_degree, e.betweenness, e.influence_rank, e.influence_percentile,
+         e.metadata, e.last_updated
+  from public.entities e
+  where e.id = any(ids);
+$$;
+
+create or replace function public.graph_expand(
+  seed_id text,
+  max_depth integer default 1,
+  max_edges integer default 200,
+  rel_types text[] default array['donation', 'lobbying', 'vote', 'employment']
+)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  frontier text[] := array[seed_id];
+  node_ids text[] := array[seed_id];
+  edge_ids text[] := '{}';
+  batch text[];
+  nxt text[];
+  remaining integer := greatest(0, least(max_edges, 2000));
+  hop integer := 0;
+begin
+  if not exists (select 1 from public.entities e where e.id = seed_id) then
+    return null;
+  end if;
+
+  while hop < least(max_depth, 4) and remaining > 0 and cardinality(frontier) > 0 loop
+    hop := hop + 1;
+
+    select coalesce(array_agg(x.id), '{}') into batch
+    from (
+      select r.id from public.relationships r
+      where r.source_id = any(frontier) and r.type = any(rel_types) and r.id <> all(edge_ids)
+      union
+      select r.id from public.relationships r
+      where r.target_id = any(frontier) and r.type = any(rel_types) and r.id <> all(edge_ids)
+      limit remaining
+    ) x;
+
+    edge_ids := edge_ids || batch;
+    remaining := remaining - cardinality(batch);
+
+    select coalesce(array_agg(distinct n.id), '{}') into nxt
+    from (
+      select unnest(array[r.source_id, r.target_id]) as id
+      from public.relationships r
+      where r.id = any(batch)
+    ) n
+    where n.id <> all(node_ids);
+
+    node_ids := node_ids || nxt;
+    frontier := nxt;
+  end loop;
+
+  return jsonb_build_object(
+    'nodes', coalesce((
+      select jsonb_agg(to_jsonb(en))
+      from (
+        select e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+               e.total_lobbying, e.total_donations,
+               e.pagerank, e.degree, e.weighted_degree, e.betweenness, e.influence_rank, e.influence_percentile,
+               e.metadata, e.last_updated
+        from public.entities e
+        where e.id = any(node_ids)
+      ) en
+    ), '[]'::jsonb),
+    'edges', coalesce((
+      select jsonb_agg(to_jsonb(re))
+      from (
+        select r.id, r.type, r.source_id, r.target_id, r.amount, r.date, r.cycle,
+               r.description, r.metadata, r.last_updated
+        from public.relationships r
+        where r.id = any(edge_ids)
+      ) re
+    ), '[]'::jsonb)
+  );
+end;
+$$;
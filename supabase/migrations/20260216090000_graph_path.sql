@@ -0,0 +1,121 @@
+-- Shortest connection between two entities (GET /api/graph/path while the in-memory graph engine
+-- is disabled or loading). Bidirectional BFS over relationships of the requested types in either
+-- direction: each round expands the smaller frontier by one hop, and each newly reached entity keeps
+-- its largest-amount link back. Stops when the frontiers meet, after max_hops, or when budget_ms of
+-- wall-clock time is spent (then timed_out is true and no path is returned).
+-- Returns {nodes: [ids from from_id to to_id], edges: [relationship rows in path order], timed_out},
+-- empty arrays when there's no connection, or null if either entity doesn't exist.
+
+create or replace function public.graph_path(
+  from_id text,
+  to_id text,
+  max_hops integer default 6,
+  rel_types text[] default array['donation', 'lobbying', 'vote', 'employment'],
+  budget_ms integer default 250
+)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  -- Visited entities per side with the relationship that reached them (null for the root).
+  fwd_nodes text[] := array[from_id];
+  fwd_edges text[] := array[null::text];
+  bwd_nodes text[] := array[to_id];
+  bwd_edges text[] := array[null::text];
+  fwd_front text[] := array[from_id];
+  bwd_front text[] := array[to_id];
+  new_nodes text[];
+  new_edges text[];
+  forward boolean;
+  hops integer := 0;
+  meet text;
+  cur text;
+  e text;
+  path_nodes text[];
+  path_edges text[] := '{}';
+  deadline timestamptz := clock_timestamp() + make_interval(secs => greatest(budget_ms, 1) / 1000.0);
+begin
+  if not exists (select 1 from public.entities en where en.id = from_id)
+     or not exists (select 1 from public.entities en where en.id = to_id) then
+    return null;
+  end if;
+  if from_id = to_id then
+    meet := from_id;
+  end if;
+
+  while meet is null and hops < least(max_hops, 8) loop
+    if clock_timestamp() > deadline then
+      return jsonb_build_object('nodes', '[]'::jsonb, 'edges', '[]'::jsonb, 'timed_out', true);
+    end if;
+    forward := cardinality(fwd_front) <= cardinality(bwd_front);
+
+    select coalesce(array_agg(x.other), '{}'), coalesce(array_agg(x.id), '{}') into new_nodes, new_edges
+    from (
+      select distinct on (y.other) y.other, y.id
+      from (
+        select r.target_id as other, r.id, r.amount
+        from public.relationships r
+        where r.source_id = any(case when forward then fwd_front else bwd_front end) and r.type = any(rel_types)
+        union all
+        select r.source_id as other, r.id, r.amount
+        from public.relationships r
+        where r.target_id = any(case when forward then fwd_front else bwd_front end) and r.type = any(rel_types)
+      ) y
+      where y.other <> all(case when forward then fwd_nodes else bwd_nodes end)
+      order by y.other, y.amount desc nulls last, y.id
+    ) x;
+
+    if forward then
+      fwd_nodes := fwd_nodes || new_nodes;
+      fwd_edges := fwd_edges || new_edges;
+      fwd_front := new_nodes;
+      select n into meet from unnest(new_nodes) n where n = any(bwd_nodes) limit 1;
+    else
+      bwd_nodes := bwd_nodes || new_nodes;
+      bwd_edges := bwd_edges || new_edges;
+      bwd_front := new_nodes;
+      select n into meet from unnest(new_nodes) n where n = any(fwd_nodes) limit 1;
+    end if;
+    hops := hops + 1;
+    exit when cardinality(new_nodes) = 0;
+  end loop;
+
+  if meet is null then
+    return jsonb_build_object('nodes', '[]'::jsonb, 'edges', '[]'::jsonb, 'timed_out', false);
+  end if;
+
+  -- Walk from the meeting entity back to each root along the recorded links.
+  path_nodes := array[meet];
+  cur := meet;
+  while cur <> from_id loop
+    e := fwd_edges[array_position(fwd_nodes, cur)];
+    select case when r.source_id = cur then r.target_id else r.source_id end into cur
+    from public.relationships r where r.id = e;
+    path_edges := array_prepend(e, path_edges);
+    path_nodes := array_prepend(cur, path_nodes);
+  end loop;
+  cur := meet;
+  while cur <> to_id loop
+    e := bwd_edges[array_position(bwd_nodes, cur)];
+    select case when r.source_id = cur then r.target_id else r.source_id end into cur
+    from public.relationships r where r.id = e;
+    path_edges := array_append(path_edges, e);
+    path_nodes := array_append(path_nodes, cur);
+  end loop;
+
+  return jsonb_build_object(
+    'nodes', to_jsonb(path_nodes),
+    'edges', coalesce((
+      select jsonb_agg(to_jsonb(re) order by array_position(path_edges, re.id))
+      from (
+        select r.id, r.type, r.source_id, r.target_id, r.amount, r.date, r.cycle,
+               r.description, r.metadata, r.last_updated
+        from public.relationships r
+        where r.id = any(path_edges)
+      ) re
+    ), '[]'::jsonb),
+    'timed_out', false
+  );
+end;
+$$;
@@ -0,0 +1,28 @@
+-- Change tracking for documents. Index rebuild catch-up and incremental loads key on updated_at
+-- (openlobby-api/app/services/index_manager.py SOURCES["documents"]); created_at never moves
+-- when ingest re-upserts a changed document, so those loads used to miss updates.
+
+alter table public.documents add column if not exists updated_at timestamptz;
+update public.documents set updated_at = created_at where updated_at is null;
+alter table public.documents
+  alter column updated_at set default now(),
+  alter column updated_at set not null;
+
+create index if not exists documents_updated_at_id_idx on public.documents (updated_at, id);
+
+-- Upserts go through insert ... on conflict do update, which fires the update trigger, so a
+-- re-ingested document always gets a fresh updated_at whatever the client sends.
+create or replace function public.touch_documents_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists documents_touch_updated_at on public.documents;
+create trigger documents_touch_updated_at
+  before update on public.documents
+  for each row execute function public.touch_documents_updated_at();
@@ -0,0 +1,3 @@
+-- Incremental index syncs page relationships oldest change first on (last_updated, id)
+-- (openlobby-api/app/services/index_manager.py stream_rows(by_change=True)).
+create index if not exists relationships_last_updated_id_idx on public.relationships (last_updated, id);
@@ -0,0 +1,136 @@
+-- graph_expand with the in-memory engine's per-node budget (GET /api/graph while the engine is
+-- disabled or loading). Each frontier entity contributes at most per_node of its not-yet-picked
+-- relationships of the requested types, best first by sort_by ('amount' or 'recent', missing
+-- values last, then id); if a hop's picks exceed what is left of max_edges, the best of them
+-- across the hop are kept. A supernode therefore adds per_node edges, not its whole fan-out.
+-- Also returns `summaries`: for every returned entity with relationships beyond the ones shown,
+-- {node_id, total, shown, hidden: {type: count}} (page through the rest with node_edges_page).
+
+drop function if exists public.graph_expand(text, integer, integer, text[]);
+
+create function public.graph_expand(
+  seed_id text,
+  max_depth integer default 1,
+  max_edges integer default 200,
+  rel_types text[] default array['donation', 'lobbying', 'vote', 'employment'],
+  per_node integer default 25,
+  sort_by text default 'amount'
+)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  frontier text[] := array[seed_id];
+  node_ids text[] := array[seed_id];
+  edge_ids text[] := '{}';
+  batch text[];
+  nxt text[];
+  remaining integer := greatest(0, least(max_edges, 2000));
+  budget integer := greatest(1, least(per_node, 500));
+  hop integer := 0;
+begin
+  if not exists (select 1 from public.entities e where e.id = seed_id) then
+    return null;
+  end if;
+
+  while hop < least(max_depth, 4) and remaining > 0 and cardinality(frontier) > 0 loop
+    hop := hop + 1;
+
+    -- Each frontier entity's best `budget` unpicked relationships; an edge between two frontier
+    -- entities counts once; then the best of the hop up to the remaining edge budget.
+    select coalesce(array_agg(z.id), '{}') into batch
+    from (
+      select c.id
+      from (
+        select distinct on (p.id) p.id, p.sort_key
+        from unnest(frontier) f(node)
+        cross join lateral (
+          select y.id, y.sort_key
+          from (
+            select r.id,
+                   case
+                     when sort_by = 'recent' then coalesce((r.date - date '1970-01-01')::double precision, '-infinity')
+                     else coalesce(r.amount::double precision, '-infinity')
+                   end as sort_key
+            from public.relationships r
+            where r.source_id = f.node and r.type = any(rel_types) and r.id <> all(edge_ids)
+            union
+            select r.id,
+                   case
+                     when sort_by = 'recent' then coalesce((r.date - date '1970-01-01')::double precision, '-infinity')
+                     else coalesce(r.amount::double precision, '-infinity')
+                   end as sort_key
+            from public.relationships r
+            where r.target_id = f.node and r.type = any(rel_types) and r.id <> all(edge_ids)
+          ) y
+          order by y.sort_key desc, y.id desc
+          limit budget
+        ) p
+        order by p.id
+      ) c
+      order by c.sort_key desc, c.id desc
+      limit remaining
+    ) z;
+
+    exit when cardinality(batch) = 0;
+    edge_ids := edge_ids || batch;
+    remaining := remaining - cardinality(batch);
+
+    select coalesce(array_agg(distinct n.id), '{}') into nxt
+    from (
+      select unnest(array[r.source_id, r.target_id]) as id
+      from public.relationships r
+      where r.id = any(batch)
+    ) n
+    where n.id <> all(node_ids);
+
+    node_ids := node_ids || nxt;
+    frontier := nxt;
+  end loop;
+
+  return jsonb_build_object(
+    'nodes', coalesce((
+      select jsonb_agg(to_jsonb(en))
+      from (
+        select e.id, e.type, e.name, e.description, e.party, e.state, e.industry,
+               e.total_lobbying, e.total_donations,
+               e.pagerank, e.degree, e.weighted_degree, e.betweenness, e.influence_rank, e.influence_percentile,
+               e.metadata, e.last_updated
+        from public.entities e
+        where e.id = any(node_ids)
+      ) en
+    ), '[]'::jsonb),
+    'edges', coalesce((
+      select jsonb_agg(to_jsonb(re))
+      from (
+        select r.id, r.type, r.source_id, r.target_id, r.amount, r.date, r.cycle,
+               r.description, r.metadata, r.last_updated
+        from public.relationships r
+        where r.id = any(edge_ids)
+      ) re
+    ), '[]'::jsonb),
+    'summaries', coalesce((
+      select jsonb_agg(
+               jsonb_build_object('node_id', s.node, 'total', s.total, 'shown', s.shown, 'hidden', s.hidden)
+               order by s.node
+             )
+      from (
+        select t.node,
+               sum(t.cnt)::integer as total,
+               sum(t.shown)::integer as shown,
+               coalesce(jsonb_object_agg(t.type, t.cnt - t.shown) filter (where t.cnt > t.shown), '{}'::jsonb) as hidden
+        from (
+          select n.id as node, r.type, count(*) as cnt, count(*) filter (where r.id = any(edge_ids)) as shown
+          from unnest(node_ids) n(id)
+          join public.relationships r
+            on (r.source_id = n.id or r.target_id = n.id) and r.type = any(rel_types)
+          group by n.id, r.type
+        ) t
+        group by t.node
+        having sum(t.cnt) > sum(t.shown)
+      ) s
+    ), '[]'::jsonb)
+  );
+end;
+$$;
@@ -0,0 +1,49 @@
+-- node_edges_page also returns `total`: how many of the node's relationships match rel_types,
+-- on every row of every page (counted before the keyset filter), so GET /api/graph/edges reports
+-- the same total with or without the in-memory graph engine. An empty page carries no rows and
+-- therefore no total.
+
+drop function if exists public.node_edges_page(text, text[], text, double precision, text, integer);
+
+create function public.node_edges_page(
+  node_id text,
+  rel_types text[] default array['donation', 'lobbying', 'vote', 'employment'],
+  sort_by text default 'amount',
+  after_key double precision default null,
+  after_id text default null,
+  max_results integer default 50
+)
+returns table (
+  id text,
+  type text,
+  source_id text,
+  target_id text,
+  amount numeric,
+  date date,
+  cycle text,
+  description text,
+  metadata jsonb,
+  last_updated timestamptz,
+  sort_key double precision,
+  total bigint
+)
+language sql
+stable
+as $$
+  select x.*
+  from (
+    select
+      r.id, r.type, r.source_id, r.target_id, r.amount, r.date, r.cycle, r.description, r.metadata, r.last_updated,
+      case
+        when sort_by = 'recent' then coalesce((r.date - date '1970-01-01')::double precision, '-infinity')
+        else coalesce(r.amount::double precision, '-infinity')
+      end as sort_key,
+      count(*) over () as total
+    from public.relationships r
+    where (r.source_id = node_id or r.target_id = node_id)
+      and r.type = any(rel_types)
+  ) x
+  where after_id is null or (x.sort_key, x.id) < (after_key, after_id)
+  order by x.sort_key desc, x.id desc
+  limit greatest(1, least(max_results, 500));
+$$;